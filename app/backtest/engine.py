@@ -14,9 +14,17 @@ from .schemas import BacktestConfig, BacktestResult, Trade, PositionType
 from .metrics import PerformanceMetrics
 from app.services.data_service import DataService
 from app.services.indicators import IndicatorCalculator
+from .monte_carlo import empty_monte_carlo_result, run_monte_carlo
+from .executor import arrays_to_frame, fetch_symbols_concurrently, frame_to_arrays, symbol_executor
 
 warnings.filterwarnings('ignore')
 
+def _plan_symbol_worker(symbol: str, arrays: Dict[str, Any], config: BacktestConfig) -> List[Dict[str, Any]]:
+    """نقطة الدخول في العملية الفرعية: خطة صفقات رمز واحد"""
+    engine = BacktestEngine(data_service=None)
+    return asyncio.run(engine._plan_symbol(symbol, arrays_to_frame(arrays), config))
+
+
 class BacktestEngine:
     """محرك الباك-تيست التاريخي الكامل"""
     
@@ -44,78 +52,7 @@ class BacktestEngine:
         print(f"⏰ Timeframe: {config.timeframe}")
         
         try:
-            # 1. جلب البيانات التاريخية لجميع الرموز
-            all_data = {}
-            for symbol in config.symbols:
-                try:
-                    print(f"📥 Fetching data for {symbol}...")
-                    
-                    # حساب عدد الأيام المطلوبة
-                    days_required = (config.end_date - config.start_date).days + 30
-                    
-                    data = await self.data_service.get_historical(
-                        symbol=symbol,
-                        timeframe=config.timeframe,
-                        market=config.market,
-                        days=days_required,
-                        use_cache=True
-                    )
-                    
-                    if not data.empty:
-
-                        # توحيد الـ index ليكون UTC tz-aware
-                        data.index = pd.to_datetime(data.index, utc=True)
-
-                        # توحيد تواريخ الكونفيق
-                        start = config.start_date.astimezone(timezone.utc)
-                        end = config.end_date.astimezone(timezone.utc)
-
-                        mask = (data.index >= start) & (data.index <= end)
-                        filtered_data = data.loc[mask]
-
-                        # فلترة البيانات حسب النطاق الزمني المطلوب
-                        # if isinstance(data.index[0], pd.Timestamp):
-                        #     mask = (data.index >= config.start_date) & (data.index <= config.end_date)
-                        #     filtered_data = data.loc[mask]
-                        # else:
-                        #     data.index = pd.to_datetime(data.index, utc=True)
-
-                        #     data.index = pd.to_datetime(data.index)
-                        #     mask = (data.index >= config.start_date) & (data.index <= config.end_date)
-                        #     filtered_data = data.loc[mask]
-                        
-                        if not filtered_data.empty:
-                            all_data[symbol] = filtered_data
-                            print(f"✅ Got {len(filtered_data)} bars for {symbol}")
-                        else:
-                            print(f"⚠️ No data in date range for {symbol}")
-                    else:
-                        print(f"⚠️ No data available for {symbol}")
-                        
-                except Exception as e:
-                    print(f"❌ Error fetching data for {symbol}: {str(e)}")
-                    traceback.print_exc()
-            
-            if not all_data:
-                raise ValueError("No data available for any symbol")
-            
-            # 2. محاكاة التداول
-            trades = []
-            equity_curve = [config.initial_capital]
-            current_capital = config.initial_capital
-            
-            # محاكاة لكل رمز
-            for symbol, data in all_data.items():
-                symbol_trades = await self._simulate_trades_for_symbol(
-                    symbol, data, config, current_capital
-                )
-                trades.extend(symbol_trades)
-                
-                # تحديث رأس المال بناءً على الصفقات
-                for trade in symbol_trades:
-                    if trade.pnl:
-                        current_capital += trade.pnl
-                        equity_curve.append(current_capital)
+            trades, equity_curve = await self._simulate_portfolio(config)
             
             # 3. حساب المقاييس
             result = await self._create_backtest_result(
@@ -144,6 +81,98 @@ class BacktestEngine:
     
 
 
+    async def _simulate_portfolio(self, config: BacktestConfig) -> Tuple[List[Trade], List[float]]:
+        """
+        جلب ومحاكاة كل الرموز.
+
+        الجلب متزامن، وخطة كل رمز تُحسب في مجمع العمليات، ثم تُنفذ الخطط
+        بالتسلسل بترتيب config.symbols حتى تبقى النتيجة حتمية.
+        """
+        # 1. جلب البيانات التاريخية لجميع الرموز بالتوازي
+        all_data = await self._load_symbols(config)
+        
+        # 2. خطة الصفقات لكل رمز في عمليات منفصلة (المؤشرات والإشارات لا تعتمد على رأس المال)
+        async def plan_inline(symbol, arrays, config):
+            return await self._plan_symbol(symbol, all_data[symbol], config)
+
+        plans = await symbol_executor.map(
+            _plan_symbol_worker,
+            {symbol: (symbol, frame_to_arrays(data), config) for symbol, data in all_data.items()},
+            inline=plan_inline
+        )
+        
+        # 3. محاكاة التداول بالتسلسل (رأس المال يتراكم بين الرموز بترتيب التكوين)
+        return self._execute_portfolio(plans, config)
+
+    def _execute_portfolio(
+        self,
+        plans: Dict[str, List[Dict[str, Any]]],
+        config: BacktestConfig
+    ) -> Tuple[List[Trade], List[float]]:
+        """تنفيذ خطط الرموز بالترتيب مع تراكم رأس المال بينها"""
+        trades = []
+        equity_curve = [config.initial_capital]
+        current_capital = config.initial_capital
+        
+        for symbol, events in plans.items():
+            symbol_trades = self._execute_plan(
+                symbol, events, config, current_capital
+            )
+            trades.extend(symbol_trades)
+            
+            # تحديث رأس المال بناءً على الصفقات
+            for trade in symbol_trades:
+                if trade.pnl:
+                    current_capital += trade.pnl
+                    equity_curve.append(current_capital)
+
+        return trades, equity_curve
+
+    async def _load_symbols(self, config: BacktestConfig) -> Dict[str, pd.DataFrame]:
+        """جلب البيانات التاريخية لجميع الرموز بالتوازي (مفلترة على فترة التكوين)"""
+        async def fetch(symbol: str) -> Optional[pd.DataFrame]:
+            print(f"📥 Fetching data for {symbol}...")
+            
+            # حساب عدد الأيام المطلوبة
+            days_required = (config.end_date - config.start_date).days + 30
+            
+            data = await self.data_service.get_historical(
+                symbol=symbol,
+                timeframe=config.timeframe,
+                market=config.market,
+                days=days_required,
+                use_cache=True
+            )
+            
+            if data.empty:
+                print(f"⚠️ No data available for {symbol}")
+                return None
+
+            # توحيد الـ index ليكون UTC tz-aware
+            data.index = pd.to_datetime(data.index, utc=True)
+
+            # توحيد تواريخ الكونفيق
+            start = config.start_date.astimezone(timezone.utc)
+            end = config.end_date.astimezone(timezone.utc)
+
+            # فلترة البيانات حسب النطاق الزمني المطلوب
+            mask = (data.index >= start) & (data.index <= end)
+            filtered_data = data.loc[mask]
+            
+            if filtered_data.empty:
+                print(f"⚠️ No data in date range for {symbol}")
+                return None
+
+            print(f"✅ Got {len(filtered_data)} bars for {symbol}")
+            return filtered_data
+
+        all_data = await fetch_symbols_concurrently(config.symbols, fetch)
+        
+        if not all_data:
+            raise ValueError("No data available for any symbol")
+
+        return all_data
+
     async def _simulate_trades_for_symbol(
         self,
         symbol: str,
@@ -152,38 +181,106 @@ class BacktestEngine:
         initial_capital: float
     ) -> List[Trade]:
         """محاكاة الصفقات لرمز معين"""
+        events = await self._plan_symbol(symbol, data, config)
+        return self._execute_plan(symbol, events, config, initial_capital)
+
+    async def _plan_symbol(
+        self,
+        symbol: str,
+        data: pd.DataFrame,
+        config: BacktestConfig
+    ) -> List[Dict[str, Any]]:
+        """خطة الصفقات لرمز معين (تُنفذ في عملية فرعية عبر executor.py)"""
         
-        # ⭐⭐ إضافة هذا الشرط فقط ⭐⭐
         if config.strategy_config:
             # استخدام الإستراتيجية الجديدة
-            return await self._simulate_with_strategy(
-                symbol, data, config, initial_capital
-            )
+            return await self._plan_with_strategy(symbol, data, config)
         else:
             # استخدام المنطق الحالي (الافتراضي)
-            return await self._simulate_with_default_logic(
-                symbol, data, config, initial_capital
-            )
-
+            return await self._plan_with_default_logic(symbol, data, config)
 
-
-
-    async def _simulate_with_default_logic(
+    def _execute_plan(
         self,
         symbol: str,
-        data: pd.DataFrame,
+        events: List[Dict[str, Any]],
         config: BacktestConfig,
         initial_capital: float
     ) -> List[Trade]:
-        """محاكاة الصفقات لرمز معين"""
+        """
+        تحويل أحداث الخطة إلى صفقات.
+
+        حجم المركز هو الجزء الوحيد المعتمد على رأس المال، لذلك يُحسب هنا
+        بالتسلسل بعد تجميع خطط كل الرموز.
+        """
         trades = []
+        trade = None
+        entry_price = 0
+        position_size = 0
         
-    
+        for event in events:
+            price = event['price']
+            
+            if event['type'] == 'entry':
+                entry_price = price
+                position_size = (initial_capital * config.position_size_percent) / entry_price
+                
+                # حساب العمولة والانزلاق
+                commission = entry_price * position_size * config.commission_rate
+                slippage = entry_price * position_size * config.slippage_percent
+                
+                trade = Trade(
+                    id=str(uuid.uuid4()),
+                    symbol=symbol,
+                    entry_time=event['time'],
+                    exit_time=None,
+                    entry_price=entry_price,
+                    exit_price=None,
+                    position_type='long',
+                    position_size=position_size,
+                    pnl=None,
+                    pnl_percentage=None,
+                    commission=commission,
+                    slippage=slippage,
+                    stop_loss=entry_price * (1 - config.stop_loss_percent/100) if config.stop_loss_percent else None,
+                    take_profit=entry_price * (1 + config.take_profit_percent/100) if config.take_profit_percent else None,
+                    exit_reason=None,
+                    metadata=event['metadata']
+                )
+                trades.append(trade)
+            
+            elif trade is not None:
+                pnl = (price - entry_price) * position_size
+                trade.exit_time = event['time']
+                trade.exit_price = price
+                trade.pnl_percentage = event['pnl_percent']
+                trade.exit_reason = event['reason']
+                
+                if event['type'] == 'exit':
+                    # حساب العمولة والانزلاق للخروج
+                    exit_commission = price * position_size * config.commission_rate
+                    exit_slippage = price * position_size * config.slippage_percent
+                    trade.pnl = pnl - exit_commission - exit_slippage
+                    trade.commission += exit_commission
+                    trade.slippage += exit_slippage
+                else:
+                    # إغلاق نهاية الفترة بدون رسوم
+                    trade.pnl = pnl
+                trade = None
+        
+        return trades
 
+    async def _plan_with_default_logic(
+        self,
+        symbol: str,
+        data: pd.DataFrame,
+        config: BacktestConfig
+    ) -> List[Dict[str, Any]]:
+        """أحداث الدخول والخروج بالمنطق الافتراضي"""
+        events = []
 
         if len(data) < 50:  # نحتاج بيانات كافية
             print(f"⚠️ Not enough data for {symbol} ({len(data)} bars)")
-            return trades
+            return events
         
         # فرز البيانات حسب التاريخ
         data = data.sort_index()
@@ -197,9 +294,6 @@ class BacktestEngine:
         
         position = None
         entry_price = 0
-        entry_time = None
-        position_size = 0
-        trade_id = None
         
         for i in range(20, len(data)):  # بدء من 20 لضمان وجود بيانات للمؤشرات
             current_time = data.index[i]
@@ -221,43 +315,19 @@ class BacktestEngine:
                     # دخول مركز شراء
                     position = 'long'
                     entry_price = current_price
-                    entry_time = current_time
-                    position_size = (initial_capital * config.position_size_percent) / entry_price
-                    
-                    # حساب العمولة والانزلاق
-                    commission = entry_price * position_size * config.commission_rate
-                    slippage = entry_price * position_size * config.slippage_percent
-                    
-                    trade_id = str(uuid.uuid4())
-                    
-                    trade = Trade(
-                        id=trade_id,
-                        symbol=symbol,
-                        entry_time=entry_time,
-                        exit_time=None,
-                        entry_price=entry_price,
-                        exit_price=None,
-                        position_type='long',
-                        position_size=position_size,
-                        pnl=None,
-                        pnl_percentage=None,
-                        commission=commission,
-                        slippage=slippage,
-                        stop_loss=entry_price * (1 - config.stop_loss_percent/100) if config.stop_loss_percent else None,
-                        take_profit=entry_price * (1 + config.take_profit_percent/100) if config.take_profit_percent else None,
-                        exit_reason=None,
-                        metadata={
+                    events.append({
+                        'type': 'entry',
+                        'time': current_time,
+                        'price': entry_price,
+                        'metadata': {
                             'entry_condition': 'rsi_oversold',
                             'rsi_value': float(current_rsi),
                             'sma_20': float(current_sma_20)
                         }
-                    )
-                    
-                    trades.append(trade)
+                    })
                     print(f"  📈 Entry long at {entry_price:.2f} for {symbol}")
             
             elif position == 'long':
-                current_pnl = (current_price - entry_price) * position_size
                 current_pnl_percent = ((current_price - entry_price) / entry_price) * 100
                 
                 # شروط الخروج
@@ -285,60 +355,44 @@ class BacktestEngine:
                     exit_reason = "below_sma"
                 
                 if exit_condition:
-                    # حساب العمولة والانزلاق للخروج
-                    exit_commission = current_price * position_size * config.commission_rate
-                    exit_slippage = current_price * position_size * config.slippage_percent
-                    
-                    # تحديث الصفقة
-                    for trade in trades:
-                        if trade.id == trade_id and trade.exit_time is None:
-                            trade.exit_time = current_time
-                            trade.exit_price = current_price
-                            trade.pnl = current_pnl - exit_commission - exit_slippage
-                            trade.pnl_percentage = current_pnl_percent
-                            trade.exit_reason = exit_reason
-                            trade.commission += exit_commission
-                            trade.slippage += exit_slippage
-                            break
-                    
+                    events.append({
+                        'type': 'exit',
+                        'time': current_time,
+                        'price': current_price,
+                        'pnl_percent': current_pnl_percent,
+                        'reason': exit_reason
+                    })
                     print(f"  📉 Exit long at {current_price:.2f} for {symbol}, P&L: {current_pnl_percent:.2f}% ({exit_reason})")
                     position = None
-                    trade_id = None
         
         # إغلاق أي مركز مفتوح في نهاية الفترة
         if position is not None:
             last_price = data['close'].iloc[-1]
-            last_time = data.index[-1]
-            final_pnl = (last_price - entry_price) * position_size
             final_pnl_percent = ((last_price - entry_price) / entry_price) * 100
-            
-            for trade in trades:
-                if trade.id == trade_id and trade.exit_time is None:
-                    trade.exit_time = last_time
-                    trade.exit_price = last_price
-                    trade.pnl = final_pnl
-                    trade.pnl_percentage = final_pnl_percent
-                    trade.exit_reason = 'end_of_period'
-                    break
-            
+            events.append({
+                'type': 'close',
+                'time': data.index[-1],
+                'price': last_price,
+                'pnl_percent': final_pnl_percent,
+                'reason': 'end_of_period'
+            })
             print(f"  🔚 Closed open position at {last_price:.2f} for {symbol}, Final P&L: {final_pnl_percent:.2f}%")
         
-        return trades
+        return events
 
 
-    async def _simulate_with_strategy(
+    async def _plan_with_strategy(
         self,
         symbol: str,
         data: pd.DataFrame,
-        config: BacktestConfig,
-        initial_capital: float
-    ) -> List[Trade]:
-        """محاكاة الصفقات باستخدام إستراتيجية مخصصة"""
+        config: BacktestConfig
+    ) -> List[Dict[str, Any]]:
+        """أحداث الدخول والخروج من إشارات إستراتيجية مخصصة"""
         
-        trades = []
+        events = []
         
         if len(data) < 20:
-            return trades
+            return events
         
         # 1. إنشاء محرك الإستراتيجية من التكوين
         try:
@@ -350,7 +404,7 @@ class BacktestEngine:
         except Exception as e:
             print(f"❌ خطأ في إنشاء الإستراتيجية: {e}")
             # استرجاع المنطق الافتراضي
-            return await self._simulate_with_default_logic(symbol, data, config, initial_capital)
+            return await self._plan_with_default_logic(symbol, data, config)
         
         # 2. تشغيل الإستراتيجية على البيانات
         try:
@@ -365,14 +419,21 @@ class BacktestEngine:
             
         except Exception as e:
             print(f"❌ خطأ في تشغيل الإستراتيجية: {e}")
-            return trades
+            return events
         
-        # 3. تحويل الإشارات إلى صفقات (باستخدام نفس منطقك الحالي)
+        return self._plan_from_signals(symbol, data, config, signals)
+
+    def _plan_from_signals(
+        self,
+        symbol: str,
+        data: pd.DataFrame,
+        config: BacktestConfig,
+        signals: List[Any]
+    ) -> List[Dict[str, Any]]:
+        """تحويل إشارات الإستراتيجية إلى أحداث (باستخدام نفس منطقك الحالي)"""
+        events = []
         position = None
         entry_price = 0
-        entry_time = None
-        position_size = 0
-        trade_id = None
         
         for signal in signals:
             try:
@@ -393,65 +454,30 @@ class BacktestEngine:
                     # دخول مركز شراء
                     position = 'long'
                     entry_price = current_price
-                    entry_time = signal_time
-                    position_size = (initial_capital * config.position_size_percent) / entry_price
-                    
-                    # حساب العمولة والانزلاق
-                    commission = entry_price * position_size * config.commission_rate
-                    slippage = entry_price * position_size * config.slippage_percent
-                    
-                    trade_id = str(uuid.uuid4())
-                    
-                    trade = Trade(
-                        id=trade_id,
-                        symbol=symbol,
-                        entry_time=entry_time,
-                        exit_time=None,
-                        entry_price=entry_price,
-                        exit_price=None,
-                        position_type='long',
-                        position_size=position_size,
-                        pnl=None,
-                        pnl_percentage=None,
-                        commission=commission,
-                        slippage=slippage,
-                        stop_loss=entry_price * (1 - config.stop_loss_percent/100) if config.stop_loss_percent else None,
-                        take_profit=entry_price * (1 + config.take_profit_percent/100) if config.take_profit_percent else None,
-                        exit_reason=None,
-                        metadata={
+                    events.append({
+                        'type': 'entry',
+                        'time': signal_time,
+                        'price': entry_price,
+                        'metadata': {
                             'strategy': config.strategy_config.get('name', 'Unknown'),
                             'signal_reason': signal.reason,
                             'rule_name': signal.rule_name
                         }
-                    )
-                    
-                    trades.append(trade)
+                    })
                     print(f"  📈 دخول بيعت على {entry_price:.2f} لـ {symbol} - {signal.reason}")
                 
                 elif signal.action in ['sell', 'close'] and position == 'long':
                     # خروج من المركز
-                    current_pnl = (current_price - entry_price) * position_size
                     current_pnl_percent = ((current_price - entry_price) / entry_price) * 100
-                    
-                    # حساب العمولة والانزلاق للخروج
-                    exit_commission = current_price * position_size * config.commission_rate
-                    exit_slippage = current_price * position_size * config.slippage_percent
-                    
-                    # تحديث الصفقة
-                    for trade in trades:
-                        if trade.id == trade_id and trade.exit_time is None:
-                            trade.exit_time = signal_time
-                            trade.exit_price = current_price
-                            trade.pnl = current_pnl - exit_commission - exit_slippage
-                            trade.pnl_percentage = current_pnl_percent
-                            trade.exit_reason = f"إشارة إستراتيجية: {signal.reason}"
-                            trade.commission += exit_commission
-                            trade.slippage += exit_slippage
-                            break
-                    
+                    events.append({
+                        'type': 'exit',
+                        'time': signal_time,
+                        'price': current_price,
+                        'pnl_percent': current_pnl_percent,
+                        'reason': f"إشارة إستراتيجية: {signal.reason}"
+                    })
                     print(f"  📉 خروج بيعت على {current_price:.2f} لـ {symbol}, ربح/خسارة: {current_pnl_percent:.2f}%")
                     position = None
-                    trade_id = None
                     
             except Exception as e:
                 print(f"⚠️ خطأ في معالجة الإشارة: {e}")
@@ -460,22 +486,17 @@ class BacktestEngine:
         # إغلاق أي مركز مفتوح في نهاية الفترة
         if position is not None:
             last_price = data['close'].iloc[-1]
-            last_time = data.index[-1]
-            final_pnl = (last_price - entry_price) * position_size
             final_pnl_percent = ((last_price - entry_price) / entry_price) * 100
-            
-            for trade in trades:
-                if trade.id == trade_id and trade.exit_time is None:
-                    trade.exit_time = last_time
-                    trade.exit_price = last_price
-                    trade.pnl = final_pnl
-                    trade.pnl_percentage = final_pnl_percent
-                    trade.exit_reason = 'نهاية الفترة'
-                    break
-            
+            events.append({
+                'type': 'close',
+                'time': data.index[-1],
+                'price': last_price,
+                'pnl_percent': final_pnl_percent,
+                'reason': 'نهاية الفترة'
+            })
             print(f"  🔚 إغلاق مركز مفتوح على {last_price:.2f} لـ {symbol}, ربح/خسارة نهائية: {final_pnl_percent:.2f}%")
         
-        return trades 
+        return events 
 
     def _calculate_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
         """حساب المؤشرات الفنية"""
@@ -897,13 +918,45 @@ class BacktestEngine:
         
         return results
     
+    async def run_walk_forward_optimization(
+        self,
+        config: BacktestConfig,
+        parameter_space: Dict[str, List[Any]],
+        periods: int = 5,
+        search: str = "grid",
+        max_combinations: Optional[int] = None,
+        objective: str = "sharpe_ratio",
+        anchored: bool = False,
+        min_trades: int = 1,
+        seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """تحسين مشي للأمام للمعاملات (راجع walk_forward.py)"""
+        # استيراد متأخر: walk_forward يعتمد على هذه الوحدة
+        from .walk_forward import WalkForwardOptimizer
+
+        return await WalkForwardOptimizer(self).run(
+            config,
+            parameter_space,
+            periods=periods,
+            search=search,
+            max_combinations=max_combinations,
+            objective=objective,
+            anchored=anchored,
+            min_trades=min_trades,
+            seed=seed
+        )
+
     async def run_monte_carlo_simulation(
         self,
         config: BacktestConfig,
-        simulations: int = 1000
+        simulations: int = 1000,
+        method: str = "shuffle",
+        block_size: int = 5,
+        ruin_threshold_percent: float = 50.0,
+        seed: Optional[int] = None
     ) -> Dict[str, Any]:
-        """تشغيل محاكاة مونت كارلو"""
-        print(f"\n🎲 Running Monte Carlo simulation ({simulations} iterations)")
+        """تشغيل محاكاة مونت كارلو (متجهة، راجع monte_carlo.py)"""
+        print(f"\n🎲 Running Monte Carlo simulation ({simulations} iterations, method={method})")
         
         # تشغيل باك-تيست أساسي للحصول على الصفقات
         print("Running base backtest for simulation data...")
@@ -912,58 +965,25 @@ class BacktestEngine:
         
         if not base_trades or len(base_trades) < 10:
             print("⚠️ Not enough trades for Monte Carlo simulation")
-            return {
-                'simulations': 0,
-                'mean_return': 0.0,
-                'std_return': 0.0,
-                'min_return': 0.0,
-                'max_return': 0.0,
-                'percentile_5': 0.0,
-                'percentile_25': 0.0,
-                'percentile_50': 0.0,
-                'percentile_75': 0.0,
-                'percentile_95': 0.0,
-                'probability_profit': 0.0,
-                'probability_loss': 0.0
-            }
-        
-        # محاكاة إعادة ترتيب الصفقات
-        simulated_returns = []
-        base_pnls = [t.pnl for t in base_trades if t.pnl is not None]
+            return empty_monte_carlo_result(method)
         
+        base_pnls = [t.pnl for t in base_trades if t.pnl is not None]
         print(f"Using {len(base_pnls)} trades for simulation")
         
-        for i in range(simulations):
-            # إعادة ترتيب عشوائي للصفقات
-            shuffled_pnls = np.random.permutation(base_pnls)
-            
-            # محاكاة العوائد
-            total_pnl = np.sum(shuffled_pnls)
-            total_return = (total_pnl / config.initial_capital) * 100
-            simulated_returns.append(total_return)
-            
-            if (i + 1) % 100 == 0:
-                print(f"  Completed {i+1}/{simulations} iterations")
-        
-        returns_array = np.array(simulated_returns)
-        
-        stats = {
-            'simulations': simulations,
-            'mean_return': float(np.mean(returns_array)),
-            'std_return': float(np.std(returns_array)),
-            'min_return': float(np.min(returns_array)),
-            'max_return': float(np.max(returns_array)),
-            'percentile_5': float(np.percentile(returns_array, 5)),
-            'percentile_25': float(np.percentile(returns_array, 25)),
-            'percentile_50': float(np.percentile(returns_array, 50)),
-            'percentile_75': float(np.percentile(returns_array, 75)),
-            'percentile_95': float(np.percentile(returns_array, 95)),
-            'probability_profit': float(np.sum(returns_array > 0) / len(returns_array)),
-            'probability_loss': float(np.sum(returns_array < 0) / len(returns_array))
-        }
+        stats = await asyncio.to_thread(
+            run_monte_carlo,
+            base_pnls,
+            config.initial_capital,
+            simulations=simulations,
+            method=method,
+            block_size=block_size,
+            ruin_threshold_percent=ruin_threshold_percent,
+            seed=seed
+        )
         
         print(f"✅ Monte Carlo simulation completed")
         print(f"   Mean return: {stats['mean_return']:.2f}%")
         print(f"   Probability of profit: {stats['probability_profit']*100:.1f}%")
+        print(f"   Probability of ruin: {stats['probability_of_ruin']*100:.1f}%")
         
-        return stats
\ No newline at end of file
+        return stats
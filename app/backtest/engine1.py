@@ -773,9 +773,17 @@ from app.backtest.schemas import BacktestConfig, BacktestResult, PnlDistribution
 from app.services.data_service import DataService
 from app.services.strategy.schemas import StrategyConfig as StrategyConfigSchema
 from app.backtest.metrics import PerformanceMetrics
+from app.backtest.executor import arrays_to_frame, fetch_symbols_concurrently, frame_to_arrays, symbol_executor
 
 warnings.filterwarnings('ignore')
 
+
+def _plan_symbol_worker(symbol: str, arrays: Dict[str, Any], config: BacktestConfig):
+    """نقطة الدخول في العملية الفرعية: قرارات رمز واحد"""
+    engine = BacktestEngine(data_service=None)
+    return asyncio.run(engine._plan_decisions(symbol, arrays_to_frame(arrays), config))
+
+
 class BacktestEngine:
     """محرك الباك-تيست التاريخي (يعمل الآن كمحرك تنفيذي للقرارات)"""
     
@@ -880,36 +888,42 @@ class BacktestEngine:
         print(f"🚀 Starting backtest (Architecture: Strategy-Driven): {config.name}")
         
         try:
-            # 1. جلب البيانات (Data Fetching)
-            all_data = {}
-            for symbol in config.symbols:
-                try:
-                   
-                    data = await self.data_service.get_historicallastvirsion(
-                        symbol=symbol, 
-                        timeframe=config.timeframe,
-                        market=config.market, 
-                        start_date=config.start_date,
-                        end_date=config.end_date,
-                        use_cache=True
-                    )
-                    
-                    if data.empty:
-                        print(f"⚠️ No data returned for {symbol}")
-                        continue
+            # 1. جلب البيانات (Data Fetching) لكل الرموز بالتوازي
+            async def fetch(symbol: str) -> Optional[pd.DataFrame]:
+                data = await self.data_service.get_historicallastvirsion(
+                    symbol=symbol, 
+                    timeframe=config.timeframe,
+                    market=config.market, 
+                    start_date=config.start_date,
+                    end_date=config.end_date,
+                    use_cache=True
+                )
+                
+                if data.empty:
+                    print(f"⚠️ No data returned for {symbol}")
+                    return None
 
-                    all_data[symbol] = data
-                    print(f"✅ Loaded {len(data)} candles for {symbol}")
-                    print(f"   First: {data.index[0]}")
-                    print(f"   Last:  {data.index[-1]}")
+                print(f"✅ Loaded {len(data)} candles for {symbol}")
+                print(f"   First: {data.index[0]}")
+                print(f"   Last:  {data.index[-1]}")
+                return data
 
-                except Exception as e:
-                    print(f"❌ Error fetching data for {symbol}: {str(e)}")
+            all_data = await fetch_symbols_concurrently(config.symbols, fetch)
                  
             if not all_data:
                 raise ValueError("No data available for any symbol")
+
+            # 2. قرارات الاستراتيجية لكل رمز في عمليات منفصلة (لا تعتمد على رأس المال)
+            async def plan_inline(symbol, arrays, config):
+                return await self._plan_decisions(symbol, all_data[symbol], config)
+
+            plans = await symbol_executor.map(
+                _plan_symbol_worker,
+                {symbol: (symbol, frame_to_arrays(data), config) for symbol, data in all_data.items()},
+                inline=plan_inline
+            )
             
-            # 2. محاكاة التداول (Simulation)
+            # 3. محاكاة التداول (Simulation) بالتسلسل لأن رأس المال يتراكم بين الرموز
             trades = []
 
             equity_curve = [config.initial_capital]
@@ -919,13 +933,9 @@ class BacktestEngine:
             current_capital = config.initial_capital
             
             for symbol, data in all_data.items():
-                # ✅ استدعاء الدالة المعدلة بالكامل
-                # symbol_trades, symbol_equity, visual_candles, trade_points = await self._simulate_with_strategy(
-                #     symbol, data, config, current_capital
-                # )
-                symbol_trades, symbol_equity, symbol_visual_candles, symbol_trade_points = await self._simulate_with_strategy(
-                    symbol, data, config, current_capital
-                )                
+                symbol_trades, symbol_equity, symbol_visual_candles, symbol_trade_points = await asyncio.to_thread(
+                    self._simulate_with_decisions, symbol, data, config, current_capital, plans[symbol]
+                )
                 trades.extend(symbol_trades)
                 visual_candles_all.extend(symbol_visual_candles)
                 trade_points_all.extend(symbol_trade_points)                
@@ -935,7 +945,7 @@ class BacktestEngine:
                     equity_curve.extend(symbol_equity[1:]) 
                     current_capital = symbol_equity[-1]
 
-            # 3. حساب المقاييس والنتيجة النهائية (Metrics & Result)
+            # 4. حساب المقاييس والنتيجة النهائية (Metrics & Result)
             result = await self._create_backtest_result(
                 config=config, 
                 trades=trades, 
@@ -963,14 +973,21 @@ class BacktestEngine:
         """
         محاكاة الصفقات مع تجهيز كامل البيانات للعرض
         """
-        trades = []
-        equity_curve = [initial_capital]
-        current_capital = initial_capital
-        visual_candles = []
-        trade_points = []
-        
+        plan = await self._plan_decisions(symbol, data, config)
+        return self._simulate_with_decisions(symbol, data, config, initial_capital, plan)
+
+    async def _plan_decisions(
+        self,
+        symbol: str,
+        data: pd.DataFrame,
+        config: BacktestConfig
+    ) -> Optional[Tuple[List[Optional[Decision]], List[Dict[str, float]]]]:
+        """
+        قرار الاستراتيجية ولقطة المؤشرات لكل شمعة.
+        لا تعتمد على رأس المال، لذلك تُحسب لكل الرموز بالتوازي (executor.py)
+        """
         if len(data) < 50:  # الحد الأدنى للمؤشرات
-            return trades, equity_curve, visual_candles, trade_points
+            return None
 
         try:
             # 1. إنشاء محرك الاستراتيجية
@@ -980,10 +997,92 @@ class BacktestEngine:
             full_calculated_data = await strategy_engine._prepare_indicators(data)
             # ✅ تخزينها في المحرك لاستخدامها داخل اللوب
             strategy_engine.full_data = full_calculated_data
+            # ✅ وضع التقييم التدريجي: القرار يُقرأ من مصفوفة المؤشرات بدون تقطيع البيانات
+            streaming_mode = strategy_engine.enable_streaming(full_calculated_data)
         except Exception as e:
           
+            return None
+
+        import time
+
+        t_strategy = 0.0
+        elapsed = 0.0
+        decisions: List[Optional[Decision]] = []
+        snapshots: List[Dict[str, float]] = []
+
+        for i in range(len(data)):
+            # طلب قرار من الاستراتيجية (Black Box Call)
+            try:
+
+                t0 = time.perf_counter()
+                if streaming_mode:
+                    decision = strategy_engine.decide(i)
+                else:
+                    decision = await strategy_engine.run(data.iloc[:i+1])
+                elapsed = time.perf_counter() - t0
+                t_strategy += elapsed
+
+
+                if i % 50 == 0:
+                    print(
+                        f"[{symbol}] candle={i+1}/{len(data)} | "
+                        f"streaming={streaming_mode} | "
+                        f"strategy_time={elapsed:.4f}s"
+                    )
+                # decision = await strategy_engine.run(slice_data)
+            except Exception as inner_e:
+              
+                decision = None
+
+            # استخراج بيانات المؤشرات من البار الحالي
+            indicators = {}
+            if streaming_mode:
+                indicators = strategy_engine.indicator_snapshot(i)
+            elif hasattr(strategy_engine, 'current_data_frame'):
+                processed_df = strategy_engine.current_data_frame
+                
+                # نتأكد أن هناك بيانات
+                if processed_df is not None and len(processed_df) > 0:
+                
+                    
+                    # نأخذ الصف الأخير (لأننا في الشمعة رقم i)
+                    last_row = processed_df.iloc[-1]
+                    
+                    # نملأ قاموس المؤشرات
+                   
+                    for col in processed_df.columns:
+                        # نتجاهل الأعمدة الأساسية
+                        if col not in ['open', 'high', 'low', 'close', 'volume']:
+                            val = last_row[col]
+                            if pd.notna(val):
+                                indicators[col] = float(val)
+
+            decisions.append(decision)
+            snapshots.append(indicators)
+
+        print(f"⏱️ [{symbol}] Strategy total time: {t_strategy:.2f}s")
+        return decisions, snapshots
+
+    def _simulate_with_decisions(
+        self,
+        symbol: str,
+        data: pd.DataFrame,
+        config: BacktestConfig,
+        initial_capital: float,
+        plan: Optional[Tuple[List[Optional[Decision]], List[Dict[str, float]]]]
+    ) -> Tuple[List[Trade], List[float], List[VisualCandle], List[dict]]:
+        """تنفيذ القرارات المحسوبة مسبقاً على المحفظة (يعتمد على رأس المال)"""
+        trades = []
+        equity_curve = [initial_capital]
+        current_capital = initial_capital
+        visual_candles = []
+        trade_points = []
+
+        if plan is None:
             return trades, equity_curve, visual_candles, trade_points
 
+        decisions, snapshots = plan
+
         # حالة المحفظة (Portfolio State)
         current_state = 'NEUTRAL'  # LONG, SHORT, NEUTRAL
         entry_price = 0.0
@@ -1002,10 +1101,8 @@ class BacktestEngine:
 
         t_total_start = time.perf_counter()
 
-        t_strategy = 0.0
         t_visual = 0.0
         t_loop = 0.0
-        elapsed = 0.0
 
         for i in range(len(data)):
             t_loop_start = time.perf_counter()
@@ -1076,27 +1173,8 @@ class BacktestEngine:
                     sl_price = 0.0
                     tp_price = 0.0
 
-            # ب) طلب قرار من الاستراتيجية (Black Box Call)
-            slice_data = data.iloc[:i+1]
-            
-            try:
-
-                t0 = time.perf_counter()
-                decision = await strategy_engine.run(slice_data)
-                elapsed = time.perf_counter() - t0
-                t_strategy += elapsed
-
-
-                if i % 50 == 0:
-                    print(
-                        f"[{symbol}] candle={i+1}/{len(data)} | "
-                        f"slice={len(slice_data)} | "
-                        f"strategy_time={elapsed:.4f}s"
-                    )
-                # decision = await strategy_engine.run(slice_data)
-            except Exception as inner_e:
-              
-                decision = None
+            # ب) قرار الاستراتيجية (محسوب مسبقاً في _plan_decisions)
+            decision = decisions[i]
 
             # ج) معالجة القرار (Decision Logic)
             target_state = 'NEUTRAL'
@@ -1207,26 +1285,7 @@ class BacktestEngine:
                 trades.append(trade)
 
             # 3️⃣ إنشاء كائن الشمعة البصرية مع كل البيانات
-            # استخراج بيانات المؤشرات من البار الحالي
-            indicators = {}
-            if hasattr(strategy_engine, 'current_data_frame'):
-                processed_df = strategy_engine.current_data_frame
-                
-                # نتأكد أن هناك بيانات
-                if processed_df is not None and len(processed_df) > 0:
-                
-                    
-                    # نأخذ الصف الأخير (لأننا في الشمعة رقم i)
-                    last_row = processed_df.iloc[-1]
-                    
-                    # نملأ قاموس المؤشرات
-                   
-                    for col in processed_df.columns:
-                        # نتجاهل الأعمدة الأساسية
-                        if col not in ['open', 'high', 'low', 'close', 'volume']:
-                            val = last_row[col]
-                            if pd.notna(val):
-                                indicators[col] = float(val)
+            indicators = snapshots[i]
             
             # حساب الربح الحالي إذا كان هناك مركز مفتوح
             current_pnl = 0.0
@@ -1363,7 +1422,6 @@ class BacktestEngine:
 
         print("====== BACKTEST PROFILING ======")
         print(f"🕯️ Candles count: {len(data)}")
-        print(f"⏱️ Strategy total time: {t_strategy:.2f}s")
         print(f"📊 VisualCandle total time: {t_visual:.2f}s")
         print(f"🔁 Loop overhead total time: {t_loop:.2f}s")
         print(f"🔥 TOTAL simulate time: {time.perf_counter() - t_total_start:.2f}s")
@@ -0,0 +1,141 @@
+# app/backtest/executor.py
+"""
+تنفيذ الباك-تيست لعدة رموز بالتوازي.
+
+- جلب بيانات كل الرموز بشكل متزامن (asyncio)
+- إرسال الجزء الثقيل لكل رمز (المؤشرات والقرارات) إلى مجمع عمليات
+  كمصفوفات NumPy بدلاً من DataFrame
+- النتائج تُعاد بترتيب الرموز في التكوين دائماً (دمج حتمي)
+"""
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def frame_to_arrays(df: pd.DataFrame) -> Dict[str, Any]:
+    """تحويل DataFrame إلى مصفوفات خام (أرخص في النقل بين العمليات)"""
+    index = df.index
+    payload: Dict[str, Any] = {"columns": {}, "index_name": index.name}
+
+    if isinstance(index, pd.DatetimeIndex):
+        payload["index"] = index.asi8
+        payload["tz"] = str(index.tz) if index.tz is not None else None
+    else:
+        payload["index"] = index.to_numpy()
+        payload["tz"] = None
+    payload["is_datetime"] = isinstance(index, pd.DatetimeIndex)
+
+    for column in df.columns:
+        payload["columns"][column] = df[column].to_numpy()
+    return payload
+
+
+def arrays_to_frame(payload: Dict[str, Any]) -> pd.DataFrame:
+    """إعادة بناء DataFrame من frame_to_arrays"""
+    if payload["is_datetime"]:
+        index = pd.DatetimeIndex(payload["index"].view("datetime64[ns]"), name=payload["index_name"])
+        if payload["tz"]:
+            index = index.tz_localize("UTC").tz_convert(payload["tz"])
+    else:
+        index = pd.Index(payload["index"], name=payload["index_name"])
+    return pd.DataFrame(payload["columns"], index=index)
+
+
+async def fetch_symbols_concurrently(
+    symbols: List[str],
+    fetch: Callable[[str], Awaitable[Optional[pd.DataFrame]]],
+    max_concurrency: int = 10
+) -> Dict[str, pd.DataFrame]:
+    """
+    جلب بيانات كل الرموز بالتوازي.
+
+    Returns:
+        {symbol: DataFrame} بترتيب symbols، بدون الرموز الفاشلة أو الفارغة
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def guarded(symbol: str):
+        async with semaphore:
+            return await fetch(symbol)
+
+    results = await asyncio.gather(*(guarded(symbol) for symbol in symbols), return_exceptions=True)
+
+    all_data = {}
+    for symbol, result in zip(symbols, results):
+        if isinstance(result, BaseException):
+            print(f"❌ Error fetching data for {symbol}: {str(result)}")
+            continue
+        if result is not None and not result.empty:
+            all_data[symbol] = result
+    return all_data
+
+
+class SymbolExecutor:
+    """مجمع عمليات مشترك لمحاكاة الرموز"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: عملية الـ API تحتوي خيوطاً (thread pools) و fork معها غير آمن
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def map(
+        self,
+        func: Callable[..., Any],
+        tasks: Dict[str, tuple],
+        inline: Optional[Callable[..., Awaitable[Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        تنفيذ func(*args) لكل رمز في العمليات الفرعية.
+
+        Args:
+            func: دالة على مستوى الوحدة (قابلة للـ pickle)
+            tasks: {symbol: args}
+            inline: بديل غير متزامن يُنفذ داخل العملية الحالية
+                    (لرمز واحد أو عند تعطل المجمع)
+
+        Returns:
+            {symbol: result} بنفس ترتيب tasks
+        """
+        if inline is not None and (len(tasks) <= 1 or self.max_workers <= 1):
+            return {symbol: await inline(*args) for symbol, args in tasks.items()}
+
+        loop = asyncio.get_running_loop()
+        try:
+            pool = self._get_pool()
+            futures = [loop.run_in_executor(pool, func, *args) for args in tasks.values()]
+            results = await asyncio.gather(*futures)
+        except BrokenProcessPool as e:
+            logger.error(f"❌ Backtest process pool broken, running inline: {e}")
+            self._pool = None
+            if inline is None:
+                raise
+            return {symbol: await inline(*args) for symbol, args in tasks.items()}
+
+        return dict(zip(tasks.keys(), results))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# المثيل العام (مشترك بين محركات الباك-تيست)
+symbol_executor = SymbolExecutor(settings.BACKTEST_WORKERS or None)
@@ -0,0 +1,201 @@
+# app/backtest/monte_carlo.py
+"""
+محاكاة مونت كارلو متجهة على نتائج الصفقات.
+
+كل دفعة محاكاة هي مصفوفة (n_sims × n_trades) من أرباح الصفقات، ومنها تُحسب
+لكل مسار: منحنى رأس المال (cumsum) والانخفاض الأقصى ومدة البقاء تحت القمة
+والإفلاس، بدون حلقة بايثون على المحاكاة.
+
+طرق إعادة العينة:
+    - shuffle         : إعادة ترتيب الصفقات (العائد النهائي ثابت، المسار يتغير)
+    - bootstrap       : سحب مع الإرجاع
+    - block_bootstrap : سحب كتل متتالية (دائرية) مع الإرجاع للحفاظ على الارتباط بين الصفقات
+"""
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+MONTE_CARLO_METHODS = ("shuffle", "bootstrap", "block_bootstrap")
+
+# الحد الأقصى لعناصر مصفوفة الدفعة الواحدة (~40MB بـ float64)
+MAX_CHUNK_CELLS = 5_000_000
+
+# عدد المسارات المستخدمة لنطاقات منحنى رأس المال
+MAX_BAND_PATHS = 1000
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def sample_indices(
+    rng: np.random.Generator,
+    n_sims: int,
+    n_trades: int,
+    method: str = "shuffle",
+    block_size: int = 5
+) -> np.ndarray:
+    """مصفوفة فهارس الصفقات (n_sims × n_trades) لكل مسار"""
+    if method == "shuffle":
+        # ترتيب مفاتيح عشوائية = تبديل مستقل لكل صف (أسرع من rng.permuted صفاً بصف)
+        return np.argsort(rng.random((n_sims, n_trades)), axis=1)
+
+    if method == "bootstrap":
+        return rng.integers(0, n_trades, size=(n_sims, n_trades))
+
+    if method == "block_bootstrap":
+        block_size = max(1, min(int(block_size), n_trades))
+        n_blocks = -(-n_trades // block_size)
+        starts = rng.integers(0, n_trades, size=(n_sims, n_blocks, 1))
+        indices = (starts + np.arange(block_size)) % n_trades
+        return indices.reshape(n_sims, n_blocks * block_size)[:, :n_trades]
+
+    raise ValueError(f"Unknown Monte Carlo method: {method}")
+
+
+def path_statistics(
+    pnl_matrix: np.ndarray,
+    initial_capital: float,
+    ruin_level: float
+) -> Dict[str, np.ndarray]:
+    """
+    إحصائيات كل مسار من مصفوفة الأرباح.
+
+    Returns:
+        equity: منحنيات رأس المال (n_sims × (n_trades + 1)) تبدأ بـ initial_capital
+        total_return: العائد النهائي %
+        max_drawdown: الانخفاض الأقصى % من القمة
+        time_under_water: أطول سلسلة صفقات تحت القمة السابقة
+        ruined: هل لمس رأس المال مستوى الإفلاس
+    """
+    n_sims = pnl_matrix.shape[0]
+    equity = np.empty((n_sims, pnl_matrix.shape[1] + 1))
+    equity[:, 0] = initial_capital
+    np.cumsum(pnl_matrix, axis=1, out=equity[:, 1:])
+    equity[:, 1:] += initial_capital
+
+    # القمة لا تقل عن رأس المال الابتدائي (> 0) فلا حاجة لحماية القسمة
+    peak = np.maximum.accumulate(equity, axis=1)
+    max_drawdown = (1 - (equity / peak).min(axis=1)) * 100
+
+    # أطول سلسلة تحت القمة: عداد تراكمي يُصفّر عند كل قمة جديدة
+    underwater = equity < peak
+    counts = np.cumsum(underwater, axis=1, dtype=np.int32)
+    counts -= np.maximum.accumulate(np.where(underwater, 0, counts), axis=1)
+
+    return {
+        "equity": equity,
+        "total_return": (equity[:, -1] - initial_capital) / initial_capital * 100,
+        "max_drawdown": max_drawdown,
+        "time_under_water": counts.max(axis=1),
+        "ruined": equity.min(axis=1) <= ruin_level,
+    }
+
+
+def _distribution(values: np.ndarray) -> Dict[str, float]:
+    stats = {
+        "mean": float(np.mean(values)),
+        "max": float(np.max(values)),
+    }
+    for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        stats[f"percentile_{q}"] = float(value)
+    return stats
+
+
+def empty_monte_carlo_result(method: str = "shuffle") -> Dict[str, Any]:
+    empty_distribution = {"mean": 0.0, "max": 0.0, **{f"percentile_{q}": 0.0 for q in PERCENTILES}}
+    return {
+        'simulations': 0,
+        'method': method,
+        'mean_return': 0.0,
+        'std_return': 0.0,
+        'min_return': 0.0,
+        'max_return': 0.0,
+        'percentile_5': 0.0,
+        'percentile_25': 0.0,
+        'percentile_50': 0.0,
+        'percentile_75': 0.0,
+        'percentile_95': 0.0,
+        'probability_profit': 0.0,
+        'probability_loss': 0.0,
+        'probability_of_ruin': 0.0,
+        'max_drawdown': dict(empty_distribution),
+        'time_under_water': dict(empty_distribution),
+        'equity_percentiles': {}
+    }
+
+
+def run_monte_carlo(
+    pnls: Sequence[float],
+    initial_capital: float,
+    simulations: int = 1000,
+    method: str = "shuffle",
+    block_size: int = 5,
+    ruin_threshold_percent: float = 50.0,
+    chunk_size: Optional[int] = None,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    تشغيل المحاكاة على أرباح الصفقات.
+
+    Args:
+        pnls: ربح/خسارة كل صفقة بالترتيب الأصلي
+        initial_capital: رأس المال الابتدائي
+        simulations: عدد المسارات
+        method: shuffle / bootstrap / block_bootstrap
+        block_size: طول الكتلة لـ block_bootstrap
+        ruin_threshold_percent: نسبة الخسارة من رأس المال التي تُعتبر إفلاساً
+        chunk_size: عدد المسارات في كل دفعة (افتراضياً حسب MAX_CHUNK_CELLS)
+        seed: بذرة المولد العشوائي
+    """
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Unknown Monte Carlo method: {method}")
+
+    pnls = np.asarray(pnls, dtype=np.float64)
+    n_trades = len(pnls)
+    if simulations <= 0 or n_trades == 0:
+        return empty_monte_carlo_result(method)
+
+    rng = np.random.default_rng(seed)
+    ruin_level = initial_capital * (1 - ruin_threshold_percent / 100)
+    if chunk_size is None:
+        chunk_size = max(1, MAX_CHUNK_CELLS // (n_trades + 1))
+
+    total_return = np.empty(simulations)
+    max_drawdown = np.empty(simulations)
+    time_under_water = np.empty(simulations, dtype=np.int64)
+    ruined = np.empty(simulations, dtype=bool)
+    band_paths = []
+
+    for start in range(0, simulations, chunk_size):
+        stop = min(start + chunk_size, simulations)
+        indices = sample_indices(rng, stop - start, n_trades, method, block_size)
+        stats = path_statistics(pnls[indices], initial_capital, ruin_level)
+
+        total_return[start:stop] = stats["total_return"]
+        max_drawdown[start:stop] = stats["max_drawdown"]
+        time_under_water[start:stop] = stats["time_under_water"]
+        ruined[start:stop] = stats["ruined"]
+
+        if start < MAX_BAND_PATHS:
+            band_paths.append(stats["equity"][:MAX_BAND_PATHS - start])
+
+    bands = np.percentile(np.concatenate(band_paths), PERCENTILES, axis=0)
+    return_percentiles = np.percentile(total_return, PERCENTILES)
+
+    result = {
+        'simulations': simulations,
+        'method': method,
+        'mean_return': float(np.mean(total_return)),
+        'std_return': float(np.std(total_return)),
+        'min_return': float(np.min(total_return)),
+        'max_return': float(np.max(total_return)),
+        'probability_profit': float(np.mean(total_return > 0)),
+        'probability_loss': float(np.mean(total_return < 0)),
+        'probability_of_ruin': float(np.mean(ruined)),
+        'ruin_threshold_percent': ruin_threshold_percent,
+        'max_drawdown': _distribution(max_drawdown),
+        'time_under_water': _distribution(time_under_water),
+        'equity_percentiles': {str(q): band.tolist() for q, band in zip(PERCENTILES, bands)}
+    }
+    for q, value in zip(PERCENTILES, return_percentiles):
+        result[f'percentile_{q}'] = float(value)
+    return result
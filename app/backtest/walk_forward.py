@@ -0,0 +1,484 @@
+# app/backtest/walk_forward.py
+"""
+تحسين مشي للأمام (Walk-Forward Optimization).
+
+- البيانات تُجلب مرة واحدة لكامل الفترة ثم تُقسم إلى نوافذ زمنية
+- لكل نافذة: بحث شبكي أو عشوائي عن المعاملات داخل العينة (in-sample)
+  في مجمع العمليات المشترك (executor.py)
+- أفضل المعاملات تُقيَّم على النافذة التالية خارج العينة (out-of-sample)
+- مجموعات المعاملات التي تشترك في نفس إعدادات المؤشرات تُرسل في نفس المهمة
+  وتعيد استخدام نتائج المؤشرات (StrategyEngine.indicators_fingerprint)
+
+المعاملات تُحدد بمسارات نقطية داخل strategy_config، مثال:
+    {
+        "indicators.0.params.period": [10, 14, 21],
+        "entry_rules.0.condition.right_value": [25, 30, 35]
+    }
+"""
+import copy
+import math
+import asyncio
+import logging
+import itertools
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.strategy.core import StrategyEngine
+from app.services.strategy.schemas import StrategyConfig as StrategyConfigSchema
+from .engine import BacktestEngine
+from .executor import SymbolExecutor, arrays_to_frame, frame_to_arrays, symbol_executor
+from .schemas import BacktestConfig, Trade
+
+logger = logging.getLogger(__name__)
+
+WALK_FORWARD_OBJECTIVES = ("total_return", "sharpe_ratio", "profit_factor", "win_rate")
+SEARCH_METHODS = ("grid", "random")
+
+
+def set_parameter(config: Dict[str, Any], path: str, value: Any):
+    """تعيين قيمة بمسار نقطي (الأرقام تُستخدم كفهارس للقوائم)"""
+    keys = path.split(".")
+    target = config
+    try:
+        for key in keys[:-1]:
+            target = target[int(key)] if isinstance(target, list) else target[key]
+        last = keys[-1]
+        if isinstance(target, list):
+            target[int(last)] = value
+        else:
+            target[last] = value
+    except (KeyError, IndexError, ValueError, TypeError):
+        raise ValueError(f"Invalid parameter path: {path}")
+
+
+def apply_parameters(strategy_config: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """نسخة من تكوين الإستراتيجية مع المعاملات المطلوبة"""
+    config = copy.deepcopy(strategy_config)
+    for path, value in params.items():
+        set_parameter(config, path, value)
+    return config
+
+
+def parameter_sets(
+    space: Dict[str, List[Any]],
+    search: str = "grid",
+    max_combinations: Optional[int] = None,
+    seed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    توليد مجموعات المعاملات.
+
+    grid: كل التوافيق (مقتطعة إلى max_combinations إن وُجد)
+    random: عينة بدون تكرار من الشبكة بحجم max_combinations
+    """
+    if search not in SEARCH_METHODS:
+        raise ValueError(f"Unknown search method: {search}")
+
+    paths = list(space.keys())
+    values = [list(space[path]) for path in paths]
+    if not paths or any(not v for v in values):
+        raise ValueError("Parameter space must define at least one value per parameter")
+
+    sizes = [len(v) for v in values]
+    total = math.prod(sizes)
+
+    if search == "grid":
+        combinations = itertools.product(*values)
+        if max_combinations:
+            combinations = itertools.islice(combinations, max_combinations)
+        return [dict(zip(paths, combo)) for combo in combinations]
+
+    count = min(max_combinations or total, total)
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(total, size=count, replace=False)
+
+    sets = []
+    for flat in sorted(chosen.tolist()):
+        # فك الفهرس المسطح إلى فهرس لكل معامل (mixed radix)
+        combo = {}
+        for path, options, size in zip(reversed(paths), reversed(values), reversed(sizes)):
+            flat, position = divmod(flat, size)
+            combo[path] = options[position]
+        sets.append({path: combo[path] for path in paths})
+    return sets
+
+
+def _to_utc(value: datetime) -> pd.Timestamp:
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp.tz_convert("UTC")
+
+
+def split_windows(
+    start: datetime,
+    end: datetime,
+    periods: int,
+    anchored: bool = False
+) -> List[Dict[str, datetime]]:
+    """
+    تقسيم الفترة إلى periods + 1 مقطع متساوٍ.
+
+    النافذة i: داخل العينة = المقطع i (أو المقاطع 0..i إذا anchored)
+               خارج العينة = المقطع i + 1
+    """
+    if periods < 1:
+        raise ValueError("periods must be >= 1")
+
+    edges = pd.date_range(_to_utc(start), _to_utc(end), periods=periods + 2)
+
+    return [
+        {
+            "in_sample_start": edges[0 if anchored else i].to_pydatetime(),
+            "in_sample_end": edges[i + 1].to_pydatetime(),
+            "out_of_sample_start": edges[i + 1].to_pydatetime(),
+            "out_of_sample_end": edges[i + 2].to_pydatetime(),
+        }
+        for i in range(periods)
+    ]
+
+
+def slice_frames(
+    frames: Dict[str, pd.DataFrame],
+    start: datetime,
+    end: datetime,
+    include_end: bool = False
+) -> Dict[str, pd.DataFrame]:
+    """شموع كل رمز في [start, end) (أو [start, end] للنافذة الأخيرة)"""
+    sliced = {}
+    for symbol, data in frames.items():
+        upper = data.index <= end if include_end else data.index < end
+        window = data.loc[(data.index >= start) & upper]
+        if not window.empty:
+            sliced[symbol] = window
+    return sliced
+
+
+def _finite(value: float) -> Optional[float]:
+    return float(value) if value is not None and math.isfinite(value) else None
+
+
+def window_metrics(
+    engine: BacktestEngine,
+    trades: List[Trade],
+    equity_curve: List[float],
+    initial_capital: float
+) -> Dict[str, Any]:
+    """مقاييس نافذة واحدة (نفس حسابات BacktestEngine)"""
+    closed = [t for t in trades if t.pnl is not None]
+    winning = [t for t in closed if t.pnl > 0]
+    losing = [t for t in closed if t.pnl <= 0]
+    drawdown = engine._calculate_drawdown_curve(equity_curve)
+
+    return {
+        "total_return": (equity_curve[-1] - initial_capital) / initial_capital * 100,
+        "sharpe_ratio": engine._calculate_sharpe_ratio(equity_curve),
+        "profit_factor": engine._calculate_profit_factor(winning, losing),
+        "win_rate": len(winning) / len(closed) * 100 if closed else 0.0,
+        "max_drawdown": max(drawdown) if drawdown else 0.0,
+        "total_trades": len(trades),
+    }
+
+
+async def score_parameter_sets(
+    frames: Dict[str, pd.DataFrame],
+    config: BacktestConfig,
+    param_sets: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    تقييم كل مجموعة معاملات على نفس البيانات.
+
+    نتائج المؤشرات تُحفظ بمفتاح (الرمز، بصمة المؤشرات) وتُعاد لكل مجموعة
+    تشترك في نفس إعدادات المؤشرات.
+    """
+    engine = BacktestEngine(data_service=None)
+    indicator_cache: Dict[Tuple[str, str], Dict[str, pd.Series]] = {}
+    results = []
+
+    for params in param_sets:
+        strategy_config = apply_parameters(config.strategy_config, params)
+        run_config = config.copy(update={"strategy_config": strategy_config})
+        strategy = StrategyConfigSchema(**strategy_config)
+
+        plans = {}
+        for symbol, data in frames.items():
+            # نفس شرط _plan_with_strategy
+            if len(data) < 20:
+                plans[symbol] = []
+                continue
+
+            strategy_engine = StrategyEngine(strategy)
+            key = (symbol, strategy_engine.indicators_fingerprint())
+            cached = key in indicator_cache
+            if cached:
+                strategy_engine.use_precomputed_indicators(data, indicator_cache[key])
+
+            try:
+                # بدون كاش المحسب العام: مفتاحه آخر 100 شمعة فقط، ونوافذ تنتهي عند
+                # نفس الشمعة بطول مختلف تتصادم فيه
+                result = await strategy_engine.run_strategy(data=data, live_mode=False, use_cache=cached)
+            except Exception as e:
+                logger.warning(f"Walk-forward: strategy failed for {symbol} with {params}: {e}")
+                plans[symbol] = []
+                continue
+
+            indicator_cache.setdefault(key, result.indicators)
+            plans[symbol] = engine._plan_from_signals(symbol, data, run_config, result.filtered_signals)
+
+        trades, equity_curve = engine._execute_portfolio(plans, run_config)
+        results.append({
+            "params": params,
+            "metrics": window_metrics(engine, trades, equity_curve, config.initial_capital)
+        })
+
+    return results
+
+
+def _score_worker(
+    arrays: Dict[str, Dict[str, Any]],
+    config: BacktestConfig,
+    param_sets: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """نقطة الدخول في العملية الفرعية"""
+    frames = {symbol: arrays_to_frame(payload) for symbol, payload in arrays.items()}
+    return asyncio.run(score_parameter_sets(frames, config, param_sets))
+
+
+def parameter_stability(
+    space: Dict[str, List[Any]],
+    chosen: List[Optional[Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """ثبات المعاملات المختارة عبر النوافذ"""
+    selected = [params for params in chosen if params]
+    stability = {}
+
+    for path in space:
+        values = [params[path] for params in selected]
+        if not values:
+            stability[path] = {"values": [], "distinct": 0}
+            continue
+
+        counts = Counter(values)
+        most_common, frequency = counts.most_common(1)[0]
+        entry = {
+            "values": values,
+            "distinct": len(counts),
+            "most_common": most_common,
+            "most_common_ratio": frequency / len(values),
+        }
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            mean = float(np.mean(values))
+            std = float(np.std(values))
+            entry.update({
+                "mean": mean,
+                "std": std,
+                "coefficient_of_variation": _finite(std / abs(mean)) if mean else None,
+            })
+        stability[path] = entry
+
+    return stability
+
+
+class WalkForwardOptimizer:
+    """تحسين مشي للأمام فوق BacktestEngine"""
+
+    def __init__(self, engine: BacktestEngine, executor: Optional[SymbolExecutor] = None):
+        self.engine = engine
+        self.executor = executor or symbol_executor
+
+    async def run(
+        self,
+        config: BacktestConfig,
+        parameter_space: Dict[str, List[Any]],
+        periods: int = 5,
+        search: str = "grid",
+        max_combinations: Optional[int] = None,
+        objective: str = "sharpe_ratio",
+        anchored: bool = False,
+        min_trades: int = 1,
+        seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        تشغيل التحسين.
+
+        Args:
+            config: تكوين الباك-تيست (strategy_config مطلوب)
+            parameter_space: {مسار: [قيم]}
+            periods: عدد نوافذ خارج العينة
+            search: grid أو random
+            max_combinations: الحد الأقصى لمجموعات المعاملات
+            objective: المقياس المستخدم لاختيار الأفضل داخل العينة
+            anchored: داخل العينة يبدأ دائماً من بداية الفترة
+            min_trades: أقل عدد صفقات داخل العينة لقبول المجموعة
+            seed: بذرة البحث العشوائي
+        """
+        if not config.strategy_config:
+            raise ValueError("Walk-forward optimization requires strategy_config")
+        if objective not in WALK_FORWARD_OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}")
+
+        started = datetime.utcnow()
+        candidates = parameter_sets(parameter_space, search, max_combinations, seed)
+        groups, invalid = self._group_by_indicators(config, candidates)
+        if not groups:
+            raise ValueError("No valid parameter sets")
+
+        print(f"🔍 Walk-forward optimization: {len(candidates)} parameter sets "
+              f"({len(groups)} indicator groups), {periods} periods, objective={objective}")
+
+        # 1. جلب كامل الفترة مرة واحدة
+        frames = await self.engine._load_symbols(config)
+        windows = split_windows(config.start_date, config.end_date, periods, anchored)
+
+        # 2. البحث داخل العينة: مهمة لكل (نافذة، مجموعة مؤشرات)
+        tasks = {}
+        for i, window in enumerate(windows):
+            in_sample = slice_frames(frames, window["in_sample_start"], window["in_sample_end"])
+            if not in_sample:
+                continue
+            arrays = {symbol: frame_to_arrays(data) for symbol, data in in_sample.items()}
+            for g, group in enumerate(groups):
+                tasks[f"{i}:{g}"] = (arrays, config, group)
+
+        in_sample_scores = await self.executor.map(_score_worker, tasks, inline=self._score_inline)
+
+        best = []
+        for i in range(len(windows)):
+            scored = [
+                entry
+                for key, results in in_sample_scores.items() if key.split(":")[0] == str(i)
+                for entry in results
+            ]
+            # ترتيب البحث الأصلي (المهام مجمعة حسب بصمة المؤشرات)
+            scored.sort(key=lambda entry: candidates.index(entry["params"]))
+            best.append(self._select_best(scored, objective, min_trades))
+
+        # 3. تقييم الأفضل خارج العينة
+        oos_tasks = {}
+        for i, window in enumerate(windows):
+            if best[i] is None:
+                continue
+            out_of_sample = slice_frames(
+                frames, window["out_of_sample_start"], window["out_of_sample_end"],
+                include_end=i == len(windows) - 1
+            )
+            if out_of_sample:
+                arrays = {symbol: frame_to_arrays(data) for symbol, data in out_of_sample.items()}
+                oos_tasks[str(i)] = (arrays, config, [best[i]["params"]])
+
+        oos_scores = await self.executor.map(_score_worker, oos_tasks, inline=self._score_inline)
+
+        report = self._build_report(
+            config, parameter_space, windows, best, oos_scores,
+            objective, search, len(candidates), invalid
+        )
+        report["execution_time_seconds"] = (datetime.utcnow() - started).total_seconds()
+        print(f"✅ Walk-forward optimization completed in {report['execution_time_seconds']:.2f}s")
+        return report
+
+    @staticmethod
+    async def _score_inline(arrays, config, param_sets):
+        frames = {symbol: arrays_to_frame(payload) for symbol, payload in arrays.items()}
+        return await score_parameter_sets(frames, config, param_sets)
+
+    @staticmethod
+    def _group_by_indicators(
+        config: BacktestConfig,
+        candidates: List[Dict[str, Any]]
+    ) -> Tuple[List[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        """تجميع المجموعات حسب بصمة المؤشرات (المجموعة الواحدة = مهمة واحدة)"""
+        groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        invalid = []
+        for params in candidates:
+            try:
+                strategy = StrategyConfigSchema(**apply_parameters(config.strategy_config, params))
+            except Exception as e:
+                invalid.append({"params": params, "error": str(e)})
+                continue
+            groups[StrategyEngine(strategy).indicators_fingerprint()].append(params)
+        return list(groups.values()), invalid
+
+    @staticmethod
+    def _select_best(
+        scored: List[Dict[str, Any]],
+        objective: str,
+        min_trades: int
+    ) -> Optional[Dict[str, Any]]:
+        eligible = [
+            entry for entry in scored
+            if entry["metrics"]["total_trades"] >= min_trades
+            and not math.isnan(entry["metrics"][objective])
+        ]
+        if not eligible:
+            return None
+        # عند التعادل: الأسبق في scored (مرتبة حسب ترتيب البحث الأصلي)
+        return max(eligible, key=lambda entry: entry["metrics"][objective])
+
+    @staticmethod
+    def _build_report(
+        config: BacktestConfig,
+        parameter_space: Dict[str, List[Any]],
+        windows: List[Dict[str, datetime]],
+        best: List[Optional[Dict[str, Any]]],
+        oos_scores: Dict[str, List[Dict[str, Any]]],
+        objective: str,
+        search: str,
+        candidates: int,
+        invalid: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        def clean(metrics: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if metrics is None:
+                return None
+            return {key: _finite(value) if isinstance(value, float) else value for key, value in metrics.items()}
+
+        periods_report = []
+        oos_returns = []
+        efficiencies = []
+        for i, window in enumerate(windows):
+            in_sample_metrics = best[i]["metrics"] if best[i] else None
+            oos_metrics = oos_scores[str(i)][0]["metrics"] if str(i) in oos_scores else None
+
+            efficiency = None
+            if in_sample_metrics and oos_metrics and in_sample_metrics["total_return"] > 0:
+                # كفاءة المشي للأمام: عائد خارج العينة / عائد داخل العينة
+                efficiency = oos_metrics["total_return"] / in_sample_metrics["total_return"]
+                efficiencies.append(efficiency)
+            if oos_metrics:
+                oos_returns.append(oos_metrics["total_return"])
+
+            periods_report.append({
+                "period": i + 1,
+                "in_sample": {
+                    "start_date": window["in_sample_start"].isoformat(),
+                    "end_date": window["in_sample_end"].isoformat(),
+                },
+                "out_of_sample": {
+                    "start_date": window["out_of_sample_start"].isoformat(),
+                    "end_date": window["out_of_sample_end"].isoformat(),
+                },
+                "best_params": best[i]["params"] if best[i] else None,
+                "in_sample_metrics": clean(in_sample_metrics),
+                "out_of_sample_metrics": clean(oos_metrics),
+                "efficiency": _finite(efficiency) if efficiency is not None else None,
+            })
+
+        compounded = float(np.prod([1 + r / 100 for r in oos_returns]) - 1) * 100 if oos_returns else 0.0
+
+        return {
+            "success": True,
+            "objective": objective,
+            "search": search,
+            "parameter_sets": candidates,
+            "invalid_parameter_sets": invalid,
+            "periods": periods_report,
+            "parameter_stability": parameter_stability(parameter_space, [b["params"] if b else None for b in best]),
+            "summary": {
+                "avg_oos_return": float(np.mean(oos_returns)) if oos_returns else 0.0,
+                "compounded_oos_return": compounded,
+                "positive_oos_periods": sum(1 for r in oos_returns if r > 0),
+                "negative_oos_periods": sum(1 for r in oos_returns if r < 0),
+                "avg_efficiency": float(np.mean(efficiencies)) if efficiencies else None,
+            },
+        }
@@ -21,6 +21,36 @@ class Settings(BaseSettings):
     ALPACA_API_KEY: Optional[str] = None
     ALPACA_SECRET_KEY: Optional[str] = None
     POLYGON_API_KEY: Optional[str] = None
+    # كاش الشموع التاريخية المحلي (Arrow IPC)
+    CANDLE_CACHE_DIR: str = "data/candles"
+    # عدد عمليات الباك-تيست المتوازية (0 = عدد الأنوية)
+    BACKTEST_WORKERS: int = 0
+    # حجم طابور الإرسال لكل اتصال WebSocket
+    WS_SEND_QUEUE_SIZE: int = 256
+    # معدل توزيع التيكات المدمجة على الشارتات (مرة/ثانية)
+    LIVE_STREAM_DISPATCH_HZ: float = 4.0
+    # لوحة الفاحص في الذاكرة: الإطار الزمني وعدد الشموع لكل رمز
+    SCREENER_TIMEFRAME: str = "1h"
+    SCREENER_BARS: int = 168
+    # تعبئة اللوحة من شموع المزود عند الإقلاع وتحديثها بعد كل شمعة
+    SCREENER_FEED: bool = True
+    # حفظ الشموع المغلقة في Postgres (market_data) وقراءة التاريخ منه أولاً
+    CANDLE_PERSISTENCE: bool = True
+    CANDLE_BACKFILL_DAYS: int = 7
+    # الكاش المحلي أمام Redis: الحجم الأقصى (بايت) وأقصى بقاء محلي وتذبذب TTL
+    CACHE_LOCAL_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_LOCAL_MAX_TTL: int = 60
+    CACHE_TTL_JITTER: float = 0.1
+    INDICATOR_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    # لقطات الشارتات على القرص: المجلد، فترة الحفظ (ثواني)، وعدد الشارتات المجهزة عند الإقلاع
+    CHART_SNAPSHOT_DIR: str = "./chart_snapshots"
+    CHART_SNAPSHOT_INTERVAL: float = 30.0
+    CHART_WARMUP_MAX: int = 50
+    # تنفيذ المؤشرات: خيوط للمؤشرات المعتمدة على NumPy وعمليات للحلقات البايثونية
+    # (0 = القيمة الافتراضية حسب عدد الأنوية)، والعمليات فقط من هذا العدد من الشموع
+    INDICATOR_THREAD_WORKERS: int = 0
+    INDICATOR_PROCESS_WORKERS: int = 0
+    INDICATOR_PROCESS_MIN_BARS: int = 20_000
     
     # إعدادات التطبيق
     DEBUG: bool = False
@@ -0,0 +1,132 @@
+# app/core/chart_snapshots.py
+"""
+لقطات حالة الشارت على القرص المحلي لاستعادتها بعد إعادة التشغيل.
+
+كل شارت في ملف ثنائي واحد {symbol}__{timeframe}.snap (أرشيف npz بدون pickle):
+- الشموع المغلقة كأعمدة NumPy (time int64 + OHLCV float64) بدل قائمة قواميس
+- الباقي كـ JSON: الشمعة الحية وتكوينات المؤشرات وآخر نتائجها وحالة المؤشرات
+  التدريجية من StreamingIndicator.to_state() (قيم بسيطة فقط، لا كائنات)
+
+الملف يُكتب بشكل ذري (ملف مؤقت ثم os.replace). لقطة بإصدار مختلف أو تالفة
+تُتجاهل ويُنشأ الشارت من المزود كالمعتاد.
+"""
+import io
+import os
+import json
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# يتغير عند تغيير شكل اللقطة أو حالة المؤشرات التدريجية
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = ".snap"
+CANDLE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def candles_to_columns(candles: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """قائمة الشموع إلى أعمدة (الحقول الإضافية مثل quote_volume لا تُحفظ)"""
+    count = len(candles)
+    times = np.fromiter((int(c["time"]) for c in candles), dtype=np.int64, count=count)
+    values = np.array(
+        [[float(c[field]) for field in CANDLE_FIELDS] for c in candles], dtype=np.float64
+    ).reshape(count, len(CANDLE_FIELDS))
+    return {"time": times, "values": values}
+
+
+def columns_to_candles(columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    values = columns["values"].tolist()
+    return [
+        {"time": time_ms, **dict(zip(CANDLE_FIELDS, row))}
+        for time_ms, row in zip(columns["time"].tolist(), values)
+    ]
+
+
+def _json_default(value: Any) -> Any:
+    """قيم NumPy داخل نتائج المؤشرات"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ChartSnapshotStore:
+    """قراءة وكتابة لقطات الشارتات في مجلد محلي"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def path(self, symbol: str, timeframe: str) -> Path:
+        safe_symbol = symbol.replace("/", "_").upper()
+        return self.directory / f"{safe_symbol}__{timeframe}{SNAPSHOT_SUFFIX}"
+
+    def dumps(self, state: Dict[str, Any]) -> bytes:
+        """
+        ترميز حالة الشارت
+
+        Args:
+            state: symbol, timeframe, candles, live_candle, indicators,
+                   indicators_results, streaming_indicators (قيم بسيطة فقط)
+        """
+        meta = {key: value for key, value in state.items() if key != "candles"}
+        meta["version"] = SNAPSHOT_VERSION
+        columns = candles_to_columns(state.get("candles") or [])
+        encoded = json.dumps(meta, default=_json_default).encode("utf-8")
+
+        buffer = io.BytesIO()
+        np.savez(buffer, meta=np.frombuffer(encoded, dtype=np.uint8), **columns)
+        return buffer.getvalue()
+
+    def loads(self, data: bytes) -> Optional[Dict[str, Any]]:
+        try:
+            with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+                payload = json.loads(archive["meta"].tobytes().decode("utf-8"))
+                if not isinstance(payload, dict) or payload.get("version") != SNAPSHOT_VERSION:
+                    return None
+                columns = {"time": archive["time"], "values": archive["values"]}
+        except Exception as e:
+            logger.warning(f"⚠️ Unreadable chart snapshot: {e}")
+            return None
+        payload["candles"] = columns_to_candles(columns)
+        return payload
+
+    def write(self, symbol: str, timeframe: str, data: bytes):
+        """كتابة ذرية (تُستدعى من thread)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(symbol, timeframe)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.directory), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def read(self, symbol: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        path = self.path(symbol, timeframe)
+        if not path.exists():
+            return None
+        return self.loads(path.read_bytes())
+
+    def list_charts(self) -> List[Tuple[str, str]]:
+        """(symbol, timeframe) لكل اللقطات المحفوظة (الأحدث أولاً)"""
+        if not self.directory.exists():
+            return []
+        paths = sorted(
+            self.directory.glob(f"*{SNAPSHOT_SUFFIX}"),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True
+        )
+        charts = []
+        for path in paths:
+            symbol, _, timeframe = path.name[:-len(SNAPSHOT_SUFFIX)].partition("__")
+            if symbol and timeframe:
+                charts.append((symbol, timeframe))
+        return charts
@@ -1,6 +1,11 @@
 # \app\core\live_stream.py
 """
 نظام البث الحي المحسّن للأداء العالي
+
+التيكات الواردة لا تُرسل للمعالجات فوراً: يُحتفظ بآخر تيك لكل رمز في مجموعة
+"متسخة" (مع تجميع الحجم وأعلى/أدنى سعر بين الدفعات)، ومهمة توزيع منفصلة
+تفرغها بمعدل ثابت. لكل رمز معالجة واحدة قيد التنفيذ على الأكثر، فلا تتراكم
+coroutines مهما كانت كثافة التيكات.
 """
 import asyncio
 import json
@@ -9,10 +14,21 @@ from typing import Dict, List, Set, Optional, Callable, Any
 from contextlib import asynccontextmanager
 import logging
 
+from app.config import settings
 from app.providers.binance_market_streamca import stream_all_marketca
 
 logger = logging.getLogger(__name__)
 
+
+def merge_ticks(older: Dict, newer: Dict) -> Dict:
+    """دمج تيك أقدم في الأحدث: السعر الأخير، مجموع الحجم، وأعلى/أدنى سعر للفترة"""
+    newer["volume"] = older["volume"] + newer["volume"]
+    newer["high"] = max(older["high"], newer["high"])
+    newer["low"] = min(older["low"], newer["low"])
+    newer["tick_count"] = older["tick_count"] + newer["tick_count"]
+    return newer
+
+
 class LiveStreamManager:
     """مدير البث الحي المركزي"""
     
@@ -37,6 +53,13 @@ class LiveStreamManager:
         self._active_streams: Set[str] = set()
         self._stream_data: Dict[str, Dict] = {}  # Latest data per symbol
         self._lock = asyncio.Lock()
+        # آخر تيك مدمج لكل رمز بانتظار التوزيع
+        self._dirty: Dict[str, Dict] = {}
+        # معالجة واحدة قيد التنفيذ لكل رمز
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._dispatch_task = None
+        self.dispatch_interval = 1.0 / max(settings.LIVE_STREAM_DISPATCH_HZ, 0.1)
+        self.stats = {"ticks_received": 0, "ticks_coalesced": 0, "dispatches": 0}
         self._initialized = True
         logger.info("✅ LiveStreamManager initialized")
     
@@ -45,6 +68,8 @@ class LiveStreamManager:
         if self._stream_task is None or self._stream_task.done():
             self._stream_task = asyncio.create_task(self._global_stream_loop())
             logger.info("🚀 Global live stream started")
+        if self._dispatch_task is None or self._dispatch_task.done():
+            self._dispatch_task = asyncio.create_task(self._dispatch_loop())
 
 
 
@@ -60,6 +85,17 @@ class LiveStreamManager:
                 pass
             self._stream_task = None
             logger.info("🛑 Global live stream stopped")
+        if self._dispatch_task:
+            self._dispatch_task.cancel()
+            try:
+                await self._dispatch_task
+            except asyncio.CancelledError:
+                pass
+            self._dispatch_task = None
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
+        self._dirty.clear()
     
     async def subscribe(self, symbol: str, callback: Callable):
         """اشتراك في رمز معين"""
@@ -80,6 +116,7 @@ class LiveStreamManager:
                 
                 if not self._subscribers[symbol]:
                     del self._subscribers[symbol]
+                    self._dirty.pop(symbol, None)
                     
                 # تحديث البث النشط
                 await self._update_active_streams()
@@ -100,24 +137,8 @@ class LiveStreamManager:
                     if not market_data or "data" not in market_data:
                         continue
                     
-                    # معالجة كل عنصر في البيانات
-                    for item in market_data["data"]:
-                        symbol = item.get("symbol")
-                        if not symbol:
-                            continue
-                        
-                        # تحديث أحدث البيانات
-                        self._stream_data[symbol] = {
-                            "price": float(item.get("price", 0)),
-                            "volume": float(item.get("volume", 0)),
-                            "time":self._now_ms(),
-                            "bid": float(item.get("bid", 0)),
-                            "ask": float(item.get("ask", 0)),
-                            "change": float(item.get("change", 0))
-                        }
-                        
-                        # إرسال للمشتركين
-                        await self._notify_subscribers(symbol, self._stream_data[symbol])
+                    # تحديث آخر البيانات فقط؛ التوزيع على المشتركين في _dispatch_loop
+                    self._ingest(market_data["data"])
                 
                 await asyncio.sleep(0.1)  # منع الاستهلاك العالي للـ CPU
                 
@@ -128,6 +149,73 @@ class LiveStreamManager:
                 logger.error(f"⚠️ Error in global stream: {e}")
                 await asyncio.sleep(5)  # إعادة المحاولة بعد 5 ثواني
     
+    def _ingest(self, items: List[Dict]):
+        """تحديث آخر سعر لكل رمز وتعليم الرموز المشترك بها كمتسخة (بدون انتظار)"""
+        now_ms = self._now_ms()
+        for item in items:
+            symbol = item.get("symbol")
+            if not symbol:
+                continue
+            
+            price = float(item.get("price", 0))
+            tick = {
+                "price": price,
+                "volume": float(item.get("volume", 0)),
+                "time": now_ms,
+                "bid": float(item.get("bid", 0)),
+                "ask": float(item.get("ask", 0)),
+                "change": float(item.get("change", 0))
+            }
+            self._stream_data[symbol] = tick
+            self.stats["ticks_received"] += 1
+            
+            if symbol in self._subscribers:
+                self._mark_dirty(symbol, {**tick, "high": price, "low": price, "tick_count": 1})
+    
+    def _mark_dirty(self, symbol: str, tick: Dict):
+        pending = self._dirty.get(symbol)
+        if pending is not None:
+            tick = merge_ticks(pending, tick)
+            self.stats["ticks_coalesced"] += 1
+        self._dirty[symbol] = tick
+    
+    async def _dispatch_loop(self):
+        """تفريغ الرموز المتسخة بمعدل ثابت"""
+        while True:
+            await asyncio.sleep(self.dispatch_interval)
+            try:
+                self._drain_dirty()
+            except Exception as e:
+                logger.error(f"⚠️ Error dispatching live ticks: {e}")
+    
+    def _drain_dirty(self) -> int:
+        """
+        إطلاق معالجة لكل رمز متسخ ليس له معالجة قيد التنفيذ.
+
+        Returns:
+            عدد المعالجات التي أُطلقت
+        """
+        dirty, self._dirty = self._dirty, {}
+        started = 0
+        for symbol, tick in dirty.items():
+            if symbol in self._inflight:
+                # المعالجة السابقة لم تنته: يُدمج التيك مع ما يصل لاحقاً ويُرسل في الدورة التالية
+                newer = self._dirty.get(symbol)
+                self._dirty[symbol] = merge_ticks(tick, newer) if newer is not None else tick
+                continue
+            
+            task = asyncio.create_task(self._notify_subscribers(symbol, tick))
+            self._inflight[symbol] = task
+            task.add_done_callback(lambda t, s=symbol: self._finish_dispatch(s, t))
+            started += 1
+        
+        self.stats["dispatches"] += started
+        return started
+    
+    def _finish_dispatch(self, symbol: str, task: asyncio.Task):
+        if self._inflight.get(symbol) is task:
+            del self._inflight[symbol]
+    
     async def _notify_subscribers(self, symbol: str, data: Dict):
         """إرسال البيانات للمشتركين"""
         if symbol not in self._subscribers:
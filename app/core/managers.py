@@ -11,7 +11,11 @@ from dataclasses import dataclass, field
 from enum import Enum
 from app.core.live_stream import live_stream_manager
 from app.core.indicators import indicator_manager
+from app.services.indicators.streaming import StreamingIndicator, create_streaming_indicator
 from app.providers.binance_provider import BinanceProvider
+from app.services.candle_cache import to_utc_datetime
+from app.core.chart_snapshots import ChartSnapshotStore
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +45,8 @@ class ChartState:
 
     price_handler: Optional[Callable] = None 
     indicators_results: Dict = field(default_factory=dict)
+    # حالة المؤشرات التدريجية: الاسم -> (التكوين، StreamingIndicator أو None)
+    streaming_indicators: Dict[str, tuple] = field(default_factory=dict)
 
 
 
@@ -54,6 +60,12 @@ class ChartManager:
         self.initialized = False
         self.crypto_provider = BinanceProvider()
         self.ws_manager: Optional["WebSocketManager"] = None
+        # لقطات الحالة على القرص (استعادة فورية بعد إعادة التشغيل)
+        self.snapshots = ChartSnapshotStore(settings.CHART_SNAPSHOT_DIR)
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._snapshot_saved: Dict[str, datetime] = {}
+        # الشارتات قيد الإنشاء: الطلبات المتزامنة تنتظر اكتمال التحميل
+        self._chart_ready: Dict[str, asyncio.Event] = {}
       
     def set_ws_manager(self, ws_manager: "WebSocketManager"):
         """ربط WebSocketManager بعد الإنشاء لتجنب circular import"""
@@ -100,35 +112,118 @@ class ChartManager:
             chart = ChartState(symbol=symbol, timeframe=tf_str, candles=initial_candles or [])
             self.charts[key] = chart
             self.candle_locks[key] = asyncio.Lock()
+            ready = self._chart_ready[key] = asyncio.Event()
+            created = False
 
-            handler = self._create_price_handler(symbol, tf_str)
-            chart.price_handler = handler
-
-            if market == "crypto" and not initial_candles:
-                try:
-                    # 1️⃣ جلب آخر N شمعة مغلقة فقط
-                    df_last_closed = await self.crypto_provider.get_last_closed_candles(
-                        symbol=symbol,
-                        timeframe=tf_str,
-                        limit=num_last_candles
-                    )
+            try:
+                handler = self._create_price_handler(symbol, tf_str)
+                chart.price_handler = handler
+
+                # 0️⃣ الاستعادة من اللقطة المحلية وجلب الشموع الناقصة فقط
+                restored = False
+                if market == "crypto" and not initial_candles:
+                    try:
+                        restored = await self._restore_from_snapshot(chart, num_last_candles)
+                    except Exception as e:
+                        logger.error(f"❌ Snapshot restore failed for {key}: {e}")
+
+                if market == "crypto" and not initial_candles and not restored:
+                    try:
+                        # 1️⃣ جلب آخر N شمعة مغلقة فقط
+                        df_last_closed = await self.crypto_provider.get_last_closed_candles(
+                            symbol=symbol,
+                            timeframe=tf_str,
+                            limit=num_last_candles
+                        )
+
+                        if not df_last_closed.empty:
+                            # ترتيب الشموع من الأقدم إلى الأحدث
+                            df_last_closed = df_last_closed.sort_values('time')
+                            chart.candles = df_last_closed.to_dict('records')
+
+                            # لا نقوم بإنشاء أي شمعة حية مسبقة
+                            # البث الحي سيحدث الشمعة الحالية مباشرة عند وصول البيانات الحقيقية
+
+                    except Exception as e:
+                        logger.error(f"❌ Failed to load last {num_last_candles} closed candles for {key}: {e}")
+
+                # 2️⃣ الاشتراك في البث الحي مباشرة
+                await live_stream_manager.subscribe(symbol, handler)
+                created = True
+            finally:
+                if not created:
+                    # إنشاء فاشل أو ملغى: لا يبقى شارت بدون اشتراك، والطلب التالي يعيد المحاولة
+                    self.charts.pop(key, None)
+                    self.candle_locks.pop(key, None)
+                # المنتظرون لا يعلقون أبداً مهما كانت نتيجة الإنشاء
+                ready.set()
+                self._chart_ready.pop(key, None)
+            logger.info(f"📊 Chart {key} created and subscribed to live stream.")
+        elif key in self._chart_ready:
+            await self._chart_ready[key].wait()
+            if key not in self.charts:
+                return await self.get_or_create_chart(
+                    symbol, timeframe, market, num_last_candles, initial_candles
+                )
 
-                    if not df_last_closed.empty:
-                        # ترتيب الشموع من الأقدم إلى الأحدث
-                        df_last_closed = df_last_closed.sort_values('time')
-                        chart.candles = df_last_closed.to_dict('records')
+        return self.charts[key]
 
-                        # لا نقوم بإنشاء أي شمعة حية مسبقة
-                        # البث الحي سيحدث الشمعة الحالية مباشرة عند وصول البيانات الحقيقية
+    async def _restore_from_snapshot(self, chart: ChartState, max_missing: int) -> bool:
+        """
+        استعادة الشارت من لقطته وإكمال الشموع التي أُغلقت منذ حفظها
 
-                except Exception as e:
-                    logger.error(f"❌ Failed to load last {num_last_candles} closed candles for {key}: {e}")
+        Returns:
+            False إذا لم توجد لقطة صالحة أو كانت الفجوة أكبر من max_missing
+            (الشارت لا يتغير ويُحمّل من المزود كالمعتاد)
+        """
+        snapshot = await asyncio.to_thread(self.snapshots.read, chart.symbol, chart.timeframe)
+        if not snapshot or not snapshot["candles"]:
+            return False
 
-            # 2️⃣ الاشتراك في البث الحي مباشرة
-            await live_stream_manager.subscribe(symbol, handler)
-            logger.info(f"📊 Chart {key} created and subscribed to live stream.")
+        tf_ms = self._timeframe_to_minutes(chart.timeframe) * 60 * 1000
+        current_open = self._align_time(self._now_ms(), tf_ms // 60000)
+        candles = snapshot["candles"]
+        last_time = candles[-1]["time"]
+        missing = (current_open - tf_ms - last_time) // tf_ms
+        if missing > max_missing:
+            return False
 
-        return self.charts[key]
+        new_candles = []
+        if missing > 0:
+            df = await self.crypto_provider.get_historicalcandl(
+                symbol=chart.symbol,
+                timeframe=chart.timeframe,
+                start_date=to_utc_datetime(last_time + tf_ms),
+                end_date=to_utc_datetime(self._now_ms())
+            )
+            if df is None or df.empty:
+                return False
+            new_candles = [
+                {"time": int(row.time), "open": row.open, "high": row.high,
+                 "low": row.low, "close": row.close, "volume": row.volume}
+                for row in df.itertuples(index=False) if row.time > last_time
+            ]
+
+        chart.candles = (candles + new_candles)[-500:]
+        chart.indicators = snapshot.get("indicators") or []
+        chart.indicators_results = snapshot.get("indicators_results") or {}
+        chart.streaming_indicators = self._load_streaming_states(snapshot.get("streaming_indicators") or {})
+        live = snapshot.get("live_candle")
+        # شمعة حية من فترة انتهت تكون ناقصة (فاتتها تيكات)، وتُجلب مغلقة من المزود
+        chart.live_candle = live if live and live["time"] == current_open else None
+
+        if new_candles:
+            # الحالة المحفوظة تتقدم بالشموع الجديدة فقط بدل warm_up من البداية
+            for candle in new_candles:
+                self._commit_streaming_indicators(chart, candle)
+            if chart.indicators:
+                await self._calculate_indicators_on_close(chart)
+
+        logger.info(
+            f"♻️ Chart {chart.symbol}_{chart.timeframe} restored from snapshot "
+            f"({len(chart.candles)} candles, {len(new_candles)} backfilled)"
+        )
+        return True
 
 
     def _calculate_lookback(self, timeframe: str, count: int) -> timedelta:
@@ -173,12 +268,16 @@ class ChartManager:
         candle_time = self._align_time(now_ms, tf_min)
         
         # إذا لم يكن هناك شمعة حية، نبدأ واحدة جديدة
+        # التيك قد يكون مدمجاً من عدة تيكات (high/low للفترة المدمجة)
+        tick_high = price_data.get("high", price_data["price"])
+        tick_low = price_data.get("low", price_data["price"])
+
         if chart.live_candle is None:
             chart.live_candle = {
                 "time": candle_time,
                 "open": price_data["price"],
-                "high": price_data["price"],
-                "low": price_data["price"],
+                "high": tick_high,
+                "low": tick_low,
                 "close": price_data["price"],
                 "volume": price_data["volume"]
             }
@@ -187,9 +286,10 @@ class ChartManager:
             candle = chart.live_candle
 
             if now_ms - candle["time"] >= tf_ms:
-                # إغلاق الشمعة الحالية
-                await self._close_current_candle(chart, candle["time"] + tf_ms, price_data)
-                new_candle_time = candle["time"] + tf_ms
+                # إغلاق الشمعة الحالية (الإغلاق يغير candle["time"] لوقت الإغلاق)
+                open_time_ms = candle["time"]
+                await self._close_current_candle(chart, open_time_ms + tf_ms, price_data)
+                new_candle_time = open_time_ms + tf_ms
                 # بدء شمعة جديدة
                 chart.live_candle = {
                     "time": new_candle_time,
@@ -201,24 +301,30 @@ class ChartManager:
                 }
             else:
                 # تحديث الشمعة الحالية
-                candle["high"] = max(candle["high"], price_data["price"])
-                candle["low"] = min(candle["low"], price_data["price"])
+                candle["high"] = max(candle["high"], tick_high)
+                candle["low"] = min(candle["low"], tick_low)
                 candle["close"] = price_data["price"]
                 candle["volume"] += price_data["volume"]
 
         # ✅ التعديل هنا: نأخذ القيم الجديدة فقط للمؤشرات
         latest_indicators = {}
         if chart.indicators:
-            # ندمج الشموع المغلقة مع الشمعة الحية الحالية للحساب
-            temp_candles = chart.candles + [chart.live_candle]
-            full_indicators = await indicator_manager.calculate_indicators(
-                candles=temp_candles[-100:],
-                indicators_config=chart.indicators,
-                symbol=chart.symbol,
-                timeframe=chart.timeframe,
-                on_close=False
-            )
-            
+            # المؤشرات التدريجية تُحدّث في O(1) من حالتها المحفوظة
+            streaming_results, fallback_configs = self._update_streaming_indicators(chart)
+
+            full_indicators = {}
+            if fallback_configs:
+                # ندمج الشموع المغلقة مع الشمعة الحية الحالية للحساب
+                temp_candles = chart.candles + [chart.live_candle]
+                full_indicators = await indicator_manager.calculate_indicators(
+                    candles=temp_candles[-100:],
+                    indicators_config=fallback_configs,
+                    symbol=chart.symbol,
+                    timeframe=chart.timeframe,
+                    on_close=False
+                )
+            full_indicators.update(streaming_results)
+
             # استخراج القيم الجديدة فقط
             latest_indicators = self._extract_latest_indicator_values(full_indicators)
 
@@ -244,13 +350,18 @@ class ChartManager:
     ):
         if chart.live_candle is None:return
 
+        open_time_ms = chart.live_candle["time"]
         chart.live_candle["close"] = price_data["price"]
         chart.live_candle["time"] = close_time_ms
 
-        chart.candles.append(chart.live_candle.copy())
+        # الشموع المغلقة بوقت الفتح مثل الشموع المجلوبة من المزود
+        chart.candles.append({**chart.live_candle, "time": open_time_ms})
 
         if len(chart.candles) > 500:chart.candles = chart.candles[-500:]
 
+        # تثبيت الشمعة المغلقة في حالة المؤشرات التدريجية
+        self._commit_streaming_indicators(chart, chart.candles[-1])
+
         # --- تحديث المؤشرات رسمياً عند الإغلاق ---
         await self._calculate_indicators_on_close(chart)
 
@@ -306,6 +417,78 @@ class ChartManager:
 
 
 
+    def _sync_streaming_indicators(self, chart: ChartState):
+        """إنشاء/إعادة بناء المؤشرات التدريجية حسب تكوينات الشارت الحالية"""
+        active = {}
+        for config in chart.indicators:
+            name = config.get('name')
+            entry = chart.streaming_indicators.get(name)
+            if entry is None or entry[0] != config:
+                indicator = create_streaming_indicator(config)
+                if indicator is not None:
+                    # تهيئة الحالة من كامل تاريخ الشارت المغلق
+                    indicator.warm_up(chart.candles)
+                entry = (dict(config), indicator)
+            active[name] = entry
+        chart.streaming_indicators = active
+
+    def _update_streaming_indicators(self, chart: ChartState):
+        """
+        حساب قيم الشمعة الحية للمؤشرات التدريجية.
+
+        Returns:
+            (نتائج المؤشرات التدريجية، تكوينات المؤشرات التي تحتاج الحساب الكامل)
+        """
+        self._sync_streaming_indicators(chart)
+
+        results = {}
+        fallback_configs = []
+        for config in chart.indicators:
+            _, indicator = chart.streaming_indicators[config.get('name')]
+            if indicator is None:
+                fallback_configs.append(config)
+                continue
+            try:
+                results[indicator.name] = indicator.update(chart.live_candle)
+            except Exception as e:
+                logger.error(f"❌ Streaming indicator {indicator.name} failed: {e}")
+                fallback_configs.append(config)
+        return results, fallback_configs
+
+    def _commit_streaming_indicators(self, chart: ChartState, candle: Dict):
+        """تثبيت شمعة مغلقة في حالة كل مؤشر تدريجي"""
+        for name, (config, indicator) in list(chart.streaming_indicators.items()):
+            if indicator is None:
+                continue
+            try:
+                indicator.commit(candle)
+            except Exception as e:
+                logger.error(f"❌ Streaming indicator {name} commit failed: {e}")
+                # إعادة البناء من التاريخ في التحديث القادم
+                chart.streaming_indicators.pop(name, None)
+
+    @staticmethod
+    def _dump_streaming_states(chart: ChartState) -> Dict[str, Dict]:
+        """حالة المؤشرات التدريجية كقيم بسيطة للقطة"""
+        return {
+            name: {"config": config, "state": indicator.to_state()}
+            for name, (config, indicator) in chart.streaming_indicators.items()
+            if indicator is not None
+        }
+
+    @staticmethod
+    def _load_streaming_states(states: Dict[str, Dict]) -> Dict[str, tuple]:
+        """
+        إعادة بناء المؤشرات التدريجية من اللقطة.
+        المؤشر الذي لا تصلح حالته يُحذف ويُعاد بناؤه بـ warm_up في التحديث القادم.
+        """
+        restored = {}
+        for name, entry in states.items():
+            indicator = StreamingIndicator.from_state(entry["config"], entry["state"])
+            if indicator is not None:
+                restored[name] = (entry["config"], indicator)
+        return restored
+
     async def add_indicator(
         self,
         symbol: str,
@@ -326,6 +509,7 @@ class ChartManager:
         exists = any(ind.get('name') == indicator_name for ind in chart.indicators)
         if not exists:
             chart.indicators.append(indicator_config)
+            chart.last_update = datetime.utcnow()
             logger.info(f"📌 Indicator {indicator_name} registered for {key}")
 
         # 2. الحساب الفوري إذا كانت الشموع جاهزة
@@ -436,6 +620,98 @@ class ChartManager:
 
 
 
+    # ---------------------- اللقطات والإقلاع ----------------------
+
+    async def save_snapshots(self) -> int:
+        """حفظ لقطة لكل شارت تغير منذ آخر حفظ"""
+        saved = 0
+        for key, chart in list(self.charts.items()):
+            if not chart.candles or self._snapshot_saved.get(key) == chart.last_update:
+                continue
+            try:
+                # الترميز في الحلقة (نسخة متسقة)، والكتابة في thread
+                data = self.snapshots.dumps({
+                    "symbol": chart.symbol,
+                    "timeframe": chart.timeframe,
+                    "candles": chart.candles,
+                    "live_candle": chart.live_candle,
+                    "indicators": chart.indicators,
+                    "indicators_results": chart.indicators_results,
+                    "streaming_indicators": self._dump_streaming_states(chart),
+                })
+                await asyncio.to_thread(self.snapshots.write, chart.symbol, chart.timeframe, data)
+                self._snapshot_saved[key] = chart.last_update
+                saved += 1
+            except Exception as e:
+                logger.error(f"❌ Failed to snapshot chart {key}: {e}")
+        return saved
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(settings.CHART_SNAPSHOT_INTERVAL)
+            await self.save_snapshots()
+
+    def start_snapshots(self):
+        """بدء الحفظ الدوري للقطات"""
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def stop_snapshots(self):
+        """إيقاف الحفظ الدوري مع حفظ أخير"""
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+        await self.save_snapshots()
+
+    async def warm_up(
+        self,
+        saved_states: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_charts: Optional[int] = None,
+        max_concurrency: int = 8
+    ) -> int:
+        """
+        تجهيز الشارتات عند الإقلاع قبل اتصال العملاء
+
+        اللقطات المحلية أولاً (الأحدث)، ثم تكوينات chart_states.db
+        (ChartStateDB.get_all_chart_states) للشارتات التي ليس لها لقطة.
+
+        Returns:
+            int: عدد الشارتات الجاهزة
+        """
+        max_charts = max_charts or settings.CHART_WARMUP_MAX
+        await self.initialize()
+        targets: Dict[str, list] = {}
+        for symbol, timeframe in await asyncio.to_thread(self.snapshots.list_charts):
+            targets.setdefault(self.get_chart_key(symbol, timeframe), [symbol, timeframe, []])
+        for state in (saved_states or {}).values():
+            key = self.get_chart_key(state["symbol"], state["timeframe"])
+            target = targets.setdefault(key, [state["symbol"], state["timeframe"], []])
+            target[2] = state.get("indicators") or []
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def warm(symbol: str, timeframe: str, indicators: List[Dict]) -> bool:
+            async with semaphore:
+                try:
+                    chart = await self.get_or_create_chart(symbol, timeframe)
+                    known = {config.get("name") for config in chart.indicators}
+                    added = [c for c in indicators if isinstance(c, dict) and c.get("name") not in known]
+                    if added:
+                        chart.indicators.extend(added)
+                        await self._calculate_indicators_on_close(chart)
+                    return True
+                except Exception as e:
+                    logger.error(f"❌ Warm-up failed for {symbol}_{timeframe}: {e}")
+                    return False
+
+        results = await asyncio.gather(*(warm(*target) for target in list(targets.values())[:max_charts]))
+        logger.info(f"🔥 Warmed up {sum(results)} charts")
+        return sum(results)
+
     def _now_ms(self) -> int:
         return int(datetime.utcnow().timestamp() * 1000)
 
@@ -0,0 +1,364 @@
+# app/database/cache.py
+"""
+كاش ثنائي الطبقات: LRU داخل العملية أمام Redis.
+
+- الطبقة المحلية: حجمها محدود بالبايت، وتخزن القيم مرمّزة (كل قارئ يحصل
+  على نسخة مستقلة فلا يفسد تعديل DataFrame الكاش)
+- الترميز: DataFrame عبر Arrow IPC (يحفظ الفهرس والأنواع)، مصفوفات NumPy
+  كمخزن خام، وباقي القيم JSON. القيم القديمة في Redis (JSON بدون ترويسة)
+  تُقرأ كما هي
+- get_or_set: طلب واحد فقط للمصدر لكل مفتاح أثناء التنفيذ (single-flight)
+- TTL مع تذبذب عشوائي حتى لا تنتهي المفاتيح المكتوبة معاً في نفس اللحظة
+- عدادات إصابة/إخفاق/زمن لكل مساحة مفاتيح (الجزء قبل أول ":")
+
+فشل Redis لا يوقف الطلب: تُستخدم الطبقة المحلية ويُعاد المحاولة بعد مهلة.
+"""
+import io
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # DataFrame يُرمّز بـ JSON (orient="table")
+    pa = None
+
+try:
+    import orjson
+except ImportError:  # الرجوع إلى json القياسي
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# ترويسة القيم المرمّزة (JSON لا يبدأ أبداً بالبايت صفر)
+MAGIC = b"\x00c"
+TAG_JSON = b"J"
+TAG_ARROW = b"A"
+TAG_FRAME_JSON = b"T"
+TAG_NUMPY = b"N"
+
+# بعد فشل Redis لا نحاول مرة أخرى قبل هذه المدة (ثواني)
+REMOTE_RETRY_DELAY = 30
+
+
+# ---------------------- الترميز ----------------------
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str).encode()
+
+
+def encode_value(value: Any) -> bytes:
+    """ترميز قيمة للتخزين"""
+    if isinstance(value, pd.DataFrame):
+        if pa is not None:
+            table = pa.Table.from_pandas(value, preserve_index=True)
+            sink = pa.BufferOutputStream()
+            with ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return MAGIC + TAG_ARROW + sink.getvalue().to_pybytes()
+        return MAGIC + TAG_FRAME_JSON + value.to_json(orient="table", date_unit="ns").encode()
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        buffer = io.BytesIO()
+        np.save(buffer, value, allow_pickle=False)
+        return MAGIC + TAG_NUMPY + buffer.getvalue()
+    return MAGIC + TAG_JSON + _dumps(value)
+
+
+def decode_value(payload: bytes) -> Any:
+    """فك قيمة مخزنة (بدون ترويسة = JSON قديم)"""
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if not payload.startswith(MAGIC):
+        return json.loads(payload)
+
+    tag, body = payload[2:3], memoryview(payload)[3:]
+    if tag == TAG_JSON:
+        return orjson.loads(body) if orjson is not None else json.loads(bytes(body))
+    if tag == TAG_ARROW:
+        return ipc.open_stream(pa.py_buffer(body)).read_all().to_pandas()
+    if tag == TAG_FRAME_JSON:
+        return pd.read_json(io.StringIO(bytes(body).decode()), orient="table")
+    if tag == TAG_NUMPY:
+        return np.load(io.BytesIO(body), allow_pickle=False)
+    raise ValueError(f"Unknown cache payload tag: {tag!r}")
+
+
+def is_cacheable(value: Any) -> bool:
+    """النتائج الفارغة لا تُخزن (مثل المسار القديم: if cached / if not df.empty)"""
+    if value is None:
+        return False
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return value.size > 0
+    if isinstance(value, (list, dict, str)):
+        return len(value) > 0
+    return True
+
+
+def key_namespace(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+# ---------------------- الطبقة المحلية ----------------------
+
+class LocalLRU:
+    """
+    LRU محدود بالحجم (بايت) وعدد العناصر، مع انتهاء لكل عنصر
+
+    آمن للاستخدام من عدة threads (حساب المؤشرات المتوازي).
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int = 10_000):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size_bytes = 0
+        self._items: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._items.get(key)
+        return item is not None and item[2] > time.monotonic()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[2] <= time.monotonic():
+                if item is not None:
+                    self._delete(key)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float, size: Optional[int] = None):
+        if size is None:
+            size = len(value) if isinstance(value, (bytes, bytearray)) else sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._delete(key)
+            self._items[key] = (value, size, time.monotonic() + ttl)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes or len(self._items) > self.max_entries:
+                _, (_, evicted_size, _) = self._items.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.evictions += 1
+
+    def _delete(self, key: Hashable):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size_bytes -= item[1]
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._items), "bytes": self.size_bytes,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions
+        }
+
+
+# ---------------------- الكاش ثنائي الطبقات ----------------------
+
+class TieredCache:
+    """LRU محلي أمام مخزن بعيد (Redis أو أي كائن فيه get / setex)"""
+
+    def __init__(
+        self,
+        get_remote: Optional[Callable[[], Awaitable[Any]]],
+        local: LocalLRU,
+        local_max_ttl: float = 60,
+        ttl_jitter: float = 0.1
+    ):
+        self.get_remote = get_remote
+        self.local = local
+        # حد بقاء القيمة محلياً حتى لا تتأخر النسخ عن Redis المشترك
+        self.local_max_ttl = local_max_ttl
+        self.ttl_jitter = ttl_jitter
+
+        self._remote_retry_at = 0.0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._loop = None
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def _namespace_stats(self, key: str) -> Dict[str, float]:
+        namespace = key_namespace(key)
+        stats = self.stats.get(namespace)
+        if stats is None:
+            stats = self.stats[namespace] = {
+                "local_hits": 0, "remote_hits": 0, "misses": 0, "sets": 0,
+                "coalesced": 0, "errors": 0, "lookups": 0, "latency_ms": 0.0
+            }
+        return stats
+
+    def jittered_ttl(self, ttl: float) -> int:
+        return max(1, int(ttl * (1 + random.uniform(0, self.ttl_jitter))))
+
+    async def _remote(self):
+        if self.get_remote is None or time.monotonic() < self._remote_retry_at:
+            return None
+        try:
+            return await self.get_remote()
+        except Exception as e:
+            self._remote_failed(e)
+            return None
+
+    def _remote_failed(self, error: Exception):
+        logger.warning(f"Remote cache unavailable: {error}. Using local tier only.")
+        self._remote_retry_at = time.monotonic() + REMOTE_RETRY_DELAY
+
+    async def _get_payload(self, key: str) -> Optional[bytes]:
+        stats = self._namespace_stats(key)
+        started = time.perf_counter()
+        stats["lookups"] += 1
+        try:
+            payload = self.local.get(key)
+            if payload is not None:
+                stats["local_hits"] += 1
+                return payload
+
+            remote = await self._remote()
+            if remote is not None:
+                try:
+                    payload = await remote.get(key)
+                except Exception as e:
+                    stats["errors"] += 1
+                    self._remote_failed(e)
+                    payload = None
+                if payload is not None:
+                    if isinstance(payload, str):
+                        payload = payload.encode()
+                    stats["remote_hits"] += 1
+                    self.local.set(key, payload, self.local_max_ttl)
+                    return payload
+
+            stats["misses"] += 1
+            return None
+        finally:
+            stats["latency_ms"] += (time.perf_counter() - started) * 1000
+
+    def _decode(self, key: str, payload: Optional[bytes]) -> Optional[Any]:
+        """فك القيمة (قيمة تالفة تُحذف محلياً وتُعامل كإخفاق)"""
+        if payload is None:
+            return None
+        try:
+            return decode_value(payload)
+        except Exception as e:
+            logger.warning(f"Cache decode error for {key}: {e}")
+            self._namespace_stats(key)["errors"] += 1
+            self.local.delete(key)
+            return None
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._decode(key, await self._get_payload(key))
+
+    async def set(self, key: str, value: Any, ttl: float = 300) -> bytes:
+        payload = encode_value(value)
+        await self._set_payload(key, payload, ttl)
+        return payload
+
+    async def _set_payload(self, key: str, payload: bytes, ttl: float):
+        stats = self._namespace_stats(key)
+        stats["sets"] += 1
+        ttl = self.jittered_ttl(ttl)
+        self.local.set(key, payload, min(ttl, self.local_max_ttl))
+
+        remote = await self._remote()
+        if remote is not None:
+            try:
+                await remote.setex(key, ttl, payload)
+            except Exception as e:
+                stats["errors"] += 1
+                self._remote_failed(e)
+
+    async def delete(self, key: str):
+        self.local.delete(key)
+        remote = await self._remote()
+        if remote is not None:
+            try:
+                await remote.delete(key)
+            except Exception as e:
+                self._remote_failed(e)
+
+    async def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: float = 300
+    ) -> Any:
+        """
+        القيمة من الكاش، أو من factory مرة واحدة لكل الطلبات المتزامنة
+
+        أخطاء factory تُرفع لكل المنتظرين ولا تُخزن.
+        """
+        cached = self._decode(key, await self._get_payload(key))
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._inflight = {}
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self._namespace_stats(key)["coalesced"] += 1
+            value, payload = await asyncio.shield(future)
+            # كل منتظر يحصل على نسخة مستقلة
+            return decode_value(payload) if payload is not None else value
+
+        async def load() -> Tuple[Any, Optional[bytes]]:
+            value = await factory()
+            if not is_cacheable(value):
+                return value, None
+            return value, await self.set(key, value, ttl)
+
+        future = asyncio.ensure_future(load())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        value, _ = await asyncio.shield(future)
+        return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        namespaces = {}
+        for namespace, stats in self.stats.items():
+            hits = stats["local_hits"] + stats["remote_hits"]
+            lookups = stats["lookups"] or 1
+            namespaces[namespace] = {
+                **stats,
+                "latency_ms": round(stats["latency_ms"], 3),
+                "hit_rate": round(hits / lookups, 4),
+                "avg_latency_ms": round(stats["latency_ms"] / lookups, 4),
+            }
+        return {
+            "local_entries": len(self.local),
+            "local_bytes": self.local.size_bytes,
+            "local_evictions": self.local.evictions,
+            "remote_available": time.monotonic() >= self._remote_retry_at,
+            "namespaces": namespaces,
+        }
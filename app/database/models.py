@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 from .session import Base
 
@@ -16,6 +16,11 @@ class MarketData(Base):
     timestamp = Column(DateTime(timezone=True), index=True)
     source = Column(String)  # binance, alpaca, etc.
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # قراءة النطاقات ومنع تكرار الشمعة (candle_persistence)
+    __table_args__ = (
+        Index("ix_market_data_symbol_timeframe_timestamp", "symbol", "timeframe", "timestamp", unique=True),
+    )
 
 class TradingSignal(Base):
     __tablename__ = "trading_signals"
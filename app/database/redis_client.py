@@ -1,36 +1,53 @@
 import redis.asyncio as redis
 from app.config import settings
-import json
+from app.database.cache import LocalLRU, TieredCache
 
 class RedisClient:
+    """
+    عميل الكاش المشترك: LRU محلي أمام Redis (انظر app/database/cache.py)
+
+    get_cached / set_cached تقبل أي قيمة JSON أو DataFrame أو مصفوفة NumPy.
+    """
     def __init__(self):
         self.redis = None
-    
-    async def connect(self):
-        self.redis = await redis.from_url(
-            settings.REDIS_URL,
-            encoding="utf-8",
-            decode_responses=True
-            
+        self.cache = TieredCache(
+            self._get_redis,
+            LocalLRU(settings.CACHE_LOCAL_MAX_BYTES),
+            local_max_ttl=settings.CACHE_LOCAL_MAX_TTL,
+            ttl_jitter=settings.CACHE_TTL_JITTER
         )
-    
+
+    async def connect(self):
+        # القيم ثنائية (Arrow / NumPy)، لذا بدون decode_responses
+        self.redis = await redis.from_url(settings.REDIS_URL)
+
     async def disconnect(self):
         if self.redis:
             await self.redis.close()
-    
-    async def get_cached(self, key: str):
+            self.redis = None
+
+    async def _get_redis(self):
         if not self.redis:
             await self.connect()
-        data = await self.redis.get(key)
-        return json.loads(data) if data else None
-    
+        return self.redis
+
+    async def ping(self):
+        return await (await self._get_redis()).ping()
+
+    async def get_cached(self, key: str):
+        return await self.cache.get(key)
+
     async def set_cached(self, key: str, value, expire: int = 300):
-        if not self.redis:
-            await self.connect()
-        await self.redis.setex(
-            key,
-            expire,
-            json.dumps(value)
-        )
+        await self.cache.set(key, value, expire)
+
+    async def get_or_set(self, key: str, factory, expire: int = 300):
+        """القيمة من الكاش أو من factory (طلب واحد لكل المتزامنين على نفس المفتاح)"""
+        return await self.cache.get_or_set(key, factory, expire)
+
+    async def delete_cached(self, key: str):
+        await self.cache.delete(key)
+
+    def get_stats(self):
+        return self.cache.get_stats()
 
-redis_client = RedisClient()
\ No newline at end of file
+redis_client = RedisClient()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import traceback
 from datetime import datetime
@@ -76,6 +77,37 @@ except ImportError as e:
     logger.error(f"Failed to import backtest_router1: {e}")
     backtest_router1 = None
 
+async def _backfill_candles(persistence):
+    """إكمال الشموع التي فاتت أثناء توقف الخادم (في الخلفية)"""
+    from app.providers.binance_provider import BinanceProvider
+    from app.services.candle_cache import timeframe_to_ms, to_utc_datetime
+
+    provider = BinanceProvider()
+
+    async def fetch(symbol: str, timeframe: str, start_ms: int, end_ms: int):
+        # المزود يعيد الشموع المغلقة حتى end_date - مدة الشمعة
+        return await provider.get_historicalcandl(
+            symbol=symbol,
+            timeframe=timeframe,
+            start_date=to_utc_datetime(start_ms),
+            end_date=to_utc_datetime(end_ms + timeframe_to_ms(timeframe))
+        )
+
+    try:
+        await persistence.backfill_gaps(fetch, max_days=settings.CANDLE_BACKFILL_DAYS)
+    except Exception as e:
+        logger.error(f"❌ Candle backfill failed: {e}")
+
+
+async def _run_screener_feed():
+    """تغذية لوحة الفاحص من شموع المزود (في الخلفية)"""
+    from app.services.data_service import DataService
+    from app.services.filtering import get_filtering_engine
+
+    # get_symbols/get_historical لا تستخدم جلسة قاعدة البيانات
+    await get_filtering_engine().run_screener_feed(DataService(None))
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     
@@ -90,10 +122,43 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Failed to initialize database: {e}")
         logger.error(traceback.format_exc())
+
+    backfill_task = None
+    try:
+        from app.services.candle_persistence import candle_persistence
+        if candle_persistence.enabled:
+            await candle_persistence.start()
+            backfill_task = asyncio.create_task(_backfill_candles(candle_persistence))
+    except Exception as e:
+        logger.error(f"❌ Failed to start candle persistence: {e}")
+
+    # استعادة الشارتات من اللقطات المحلية وتكوينات chart_states.db في الخلفية
+    warm_up_task = None
+    try:
+        from app.websocket.chart_ws import chart_state_db
+        saved_states = await asyncio.to_thread(chart_state_db.get_all_chart_states)
+        warm_up_task = asyncio.create_task(chart_manager.warm_up(saved_states))
+        chart_manager.start_snapshots()
+    except Exception as e:
+        logger.error(f"❌ Failed to start chart warm-up: {e}")
+
+    screener_task = None
+    if settings.SCREENER_FEED:
+        screener_task = asyncio.create_task(_run_screener_feed())
     
     yield
+
+    if screener_task is not None:
+        screener_task.cancel()
     
     # إغلاق التشغيل
+    try:
+        if warm_up_task is not None:
+            warm_up_task.cancel()
+        await chart_manager.stop_snapshots()
+    except Exception as e:
+        logger.error(f"❌ Error saving chart snapshots: {e}")
+
     # logger.info("🔌 Shutting down application...")
     try:
         await close_db()
@@ -101,6 +166,32 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ Error closing database: {e}")
 
+    try:
+        if backfill_task is not None:
+            backfill_task.cancel()
+        from app.services.candle_persistence import candle_persistence
+        await candle_persistence.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping candle persistence: {e}")
+
+    try:
+        from app.providers.http_client import close_http_clients
+        await close_http_clients()
+    except Exception as e:
+        logger.error(f"❌ Error closing provider HTTP sessions: {e}")
+
+    try:
+        from app.services.indicators.executor import indicator_executor
+        indicator_executor.shutdown()
+    except Exception as e:
+        logger.error(f"❌ Error stopping indicator executor: {e}")
+
+    try:
+        from app.backtest.executor import symbol_executor
+        symbol_executor.shutdown()
+    except Exception as e:
+        logger.error(f"❌ Error stopping backtest executor: {e}")
+
 
   
 
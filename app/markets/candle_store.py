@@ -1,36 +1,132 @@
 # app/market/candle_store.py
+import numpy as np
 import pandas as pd
-from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, Optional
 from app.markets.models import Candle
 
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+class CandleRing:
+    """
+    مخزن دائري عمودي بحجم ثابت لرمز/إطار واحد.
+
+    كل قيمة تُكتب مرتين (في الموضع و الموضع + السعة)، لذلك آخر N شمعة
+    تكون دائماً شريحة متصلة في الذاكرة:
+    - الإضافة O(1) بدون إعادة بناء القوائم
+    - القراءة views بدون نسخ
+    الذاكرة ثابتة: 2 × السعة × 6 أعمدة × 8 بايت.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(int(capacity), 1)
+        self.values = np.zeros((len(OHLCV_COLUMNS), 2 * self.capacity), dtype=np.float64)
+        self.times = np.zeros(2 * self.capacity, dtype=np.int64)  # open_time بالنانو ثانية
+        self.head = 0  # موضع الكتابة التالي (0 .. capacity-1)
+        self.size = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.times.nbytes
+
+    def append(self, time_ns: int, open_: float, high: float, low: float, close: float, volume: float):
+        mirror = self.head + self.capacity
+        for pos in (self.head, mirror):
+            self.values[:, pos] = (open_, high, low, close, volume)
+            self.times[pos] = time_ns
+
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def window(self, limit: Optional[int] = None) -> slice:
+        """شريحة آخر limit شمعة (من الأقدم إلى الأحدث)"""
+        count = self.size if limit is None else max(min(int(limit), self.size), 0)
+        end = self.head + self.capacity
+        return slice(end - count, end)
+
+    def view(self, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        أعمدة آخر limit شمعة كـ views للقراءة فقط.
+        تبقى صالحة حتى الإضافة التالية على نفس المفتاح (انسخها للاحتفاظ بها).
+        """
+        window = self.window(limit)
+        columns = {"time": self._readonly(self.times[window])}
+        for i, name in enumerate(OHLCV_COLUMNS):
+            columns[name] = self._readonly(self.values[i, window])
+        return columns
+
+    def to_dataframe(self, limit: Optional[int] = None, copy: bool = True) -> pd.DataFrame:
+        window = self.window(limit)
+        block = self.values[:, window].T  # (bars × 5) بدون نسخ
+        if copy:
+            block = block.copy()
+        else:
+            block = self._readonly(block)
+
+        index = pd.DatetimeIndex(self.times[window].view("datetime64[ns]"), name="timestamp")
+        return pd.DataFrame(block, index=index, columns=list(OHLCV_COLUMNS), copy=False)
+
+    @staticmethod
+    def _readonly(array: np.ndarray) -> np.ndarray:
+        array = array.view()
+        array.setflags(write=False)
+        return array
+
+
 class CandleStore:
     def __init__(self, max_candles: int = 1000):
         self.max_candles = max_candles
-        self._store: Dict[str, List[Candle]] = defaultdict(list)
+        self._store: Dict[str, CandleRing] = {}
+
+    @staticmethod
+    def _key(symbol: str, timeframe: str) -> str:
+        return f"{symbol}:{timeframe}"
 
     def add(self, candle: Candle):
-        key = f"{candle.symbol}:{candle.timeframe}"
-        self._store[key].append(candle)
+        key = self._key(candle.symbol, candle.timeframe)
+        ring = self._store.get(key)
+        if ring is None:
+            ring = self._store[key] = CandleRing(self.max_candles)
+
+        ring.append(
+            pd.Timestamp(candle.open_time).value,
+            candle.open,
+            candle.high,
+            candle.low,
+            candle.close,
+            candle.volume
+        )
 
-        if len(self._store[key]) > self.max_candles:
-            self._store[key] = self._store[key][-self.max_candles:]
+    def count(self, symbol: str, timeframe: str) -> int:
+        ring = self._store.get(self._key(symbol, timeframe))
+        return ring.size if ring else 0
 
-    def to_dataframe(self, symbol: str, timeframe: str) -> pd.DataFrame:
-        key = f"{symbol}:{timeframe}"
-        candles = self._store.get(key, [])
+    def view(self, symbol: str, timeframe: str, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """أعمدة NumPy لآخر limit شمعة بدون نسخ (راجع CandleRing.view)"""
+        ring = self._store.get(self._key(symbol, timeframe))
+        if ring is None:
+            return {}
+        return ring.view(limit)
 
-        if not candles:
+    def to_dataframe(
+        self,
+        symbol: str,
+        timeframe: str,
+        limit: Optional[int] = None,
+        copy: bool = True
+    ) -> pd.DataFrame:
+        """
+        الشموع كـ DataFrame مفهرس بـ timestamp.
+        copy=False يعيد DataFrame فوق المخزن مباشرة (للاستخدام الفوري فقط).
+        """
+        ring = self._store.get(self._key(symbol, timeframe))
+
+        if ring is None or ring.size == 0:
             return pd.DataFrame()
 
-        data = [{
-            "timestamp": c.open_time,
-            "open": c.open,
-            "high": c.high,
-            "low": c.low,
-            "close": c.close,
-            "volume": c.volume
-        } for c in candles]
-
-        df = pd.DataFrame(data).set_index("timestamp")
-        return df
+        return ring.to_dataframe(limit, copy=copy)
+
+    @property
+    def nbytes(self) -> int:
+        """إجمالي الذاكرة المحجوزة لكل المفاتيح"""
+        return sum(ring.nbytes for ring in self._store.values())
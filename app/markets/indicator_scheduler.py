@@ -26,17 +26,31 @@ class IndicatorScheduler:
 
 
 
-    def on_candle_close(self, candle: Candle):
-        key = f"{candle.symbol}:{candle.timeframe}"
+    def on_candles_close(self, candles: List[Candle]):
+        """إغلاق دفعة شموع (من BatchCandleAggregator)"""
+        for candle in candles:
+            # حفظ الشمعة
+            self.store.add(candle)
+
+        # الحساب فقط للمفاتيح التي لها مؤشرات مسجلة
+        for candle in candles:
+            if f"{candle.symbol}:{candle.timeframe}" in self.active_indicators:
+                self._calculate(candle)
 
+    def on_candle_close(self, candle: Candle):
         # حفظ الشمعة
         self.store.add(candle)
+        self._calculate(candle)
+
+    def _calculate(self, candle: Candle):
+        key = f"{candle.symbol}:{candle.timeframe}"
 
         # لا مؤشرات؟ نخرج
         if key not in self.active_indicators:
             return
 
-        df = self.store.to_dataframe(candle.symbol, candle.timeframe)
+        # DataFrame فوق المخزن مباشرة بدون نسخ (يُستخدم فوراً ولا يُحتفظ به)
+        df = self.store.to_dataframe(candle.symbol, candle.timeframe, copy=False)
         if df.empty:
             return
 
@@ -0,0 +1,189 @@
+# app/market/tick_aggregator.py
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+from .models import Candle
+from .timeframe import TIMEFRAME_SECONDS, next_close_time
+
+DEFAULT_TIMEFRAMES = ("1m", "5m", "15m", "1h", "4h", "1d")
+
+
+class BatchCandleAggregator:
+    """
+    بناء الشموع لكل الرموز وكل الأطر الزمنية دفعة واحدة.
+
+    بديل متجه لـ CandleBuilder.process_tick: رسالة !ticker@arr كاملة تُمرر
+    كمصفوفات، والحالة محفوظة في مصفوفات (رموز × أطر زمنية).
+    النتيجة مطابقة لاستدعاء process_tick لكل تيك بالترتيب بنفس الطابع الزمني.
+    """
+
+    def __init__(self, timeframes: Sequence[str] = DEFAULT_TIMEFRAMES, initial_capacity: int = 4096):
+        self.timeframes = list(timeframes)
+        self.seconds = np.array([TIMEFRAME_SECONDS[tf] for tf in self.timeframes], dtype=np.int64)
+
+        self._symbols = pd.Index([], dtype=object)
+        self._symbol_list: List[str] = []
+        self._allocate(initial_capacity)
+        self._on_close: Optional[Callable[[List[Candle]], None]] = None
+
+    def _allocate(self, capacity: int):
+        shape = (capacity, len(self.timeframes))
+        self.open_time = np.full(shape, -1, dtype=np.int64)  # بداية الشمعة (ثوانٍ)، -1 = لا توجد شمعة
+        self.open = np.zeros(shape, dtype=np.float64)
+        self.high = np.zeros(shape, dtype=np.float64)
+        self.low = np.zeros(shape, dtype=np.float64)
+        self.close = np.zeros(shape, dtype=np.float64)
+        self.volume = np.zeros(shape, dtype=np.float64)
+
+    def _grow(self, needed: int):
+        capacity = len(self.open_time)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+
+        old = (self.open_time, self.open, self.high, self.low, self.close, self.volume)
+        self._allocate(capacity)
+        for new_array, old_array in zip(
+            (self.open_time, self.open, self.high, self.low, self.close, self.volume), old
+        ):
+            new_array[:len(old_array)] = old_array
+
+    def on_candles_close(self, callback: Callable[[List[Candle]], None]):
+        """تسجيل دالة تستقبل كل الشموع المغلقة في الدفعة مرة واحدة"""
+        self._on_close = callback
+
+    @property
+    def symbol_count(self) -> int:
+        return len(self._symbol_list)
+
+    def _rows(self, symbols: Sequence[str]) -> np.ndarray:
+        """أرقام الصفوف للرموز (إضافة الرموز الجديدة)"""
+        rows = self._symbols.get_indexer(symbols) if len(self._symbols) else np.full(len(symbols), -1)
+        missing = rows < 0
+        if missing.any():
+            new_symbols = pd.unique(np.asarray(symbols, dtype=object)[missing])
+            self._symbol_list.extend(new_symbols)
+            self._symbols = pd.Index(self._symbol_list, dtype=object)
+            self._grow(len(self._symbol_list))
+            rows = self._symbols.get_indexer(symbols)
+        return rows.astype(np.intp, copy=False)
+
+    def process_batch(
+        self,
+        symbols: Sequence[str],
+        prices: np.ndarray,
+        volumes: np.ndarray,
+        timestamp: datetime
+    ) -> List[Candle]:
+        """
+        تحديث OHLCV لكل الرموز في الدفعة على كل الأطر الزمنية.
+
+        Returns:
+            الشموع التي أُغلقت في هذه الدفعة (تُمرر أيضاً لـ on_candles_close)
+        """
+        if len(symbols) == 0:
+            return []
+
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        rows = self._rows(symbols)
+
+        rows, first, last, high, low, volume = self._aggregate(rows, prices, volumes)
+
+        closed: List[Candle] = []
+        epoch = int(timestamp.timestamp())
+
+        for j, timeframe in enumerate(self.timeframes):
+            open_epoch = epoch - (epoch % int(self.seconds[j]))
+            current = self.open_time[rows, j]
+            rolled = current != open_epoch
+
+            # إغلاق الشموع السابقة قبل الكتابة فوقها
+            closing = rows[rolled & (current >= 0)]
+            if len(closing):
+                closed.extend(self._build_candles(closing, j, timeframe))
+
+            new_rows = rows[rolled]
+            self.open_time[new_rows, j] = open_epoch
+            self.open[new_rows, j] = first[rolled]
+            self.high[new_rows, j] = high[rolled]
+            self.low[new_rows, j] = low[rolled]
+            self.volume[new_rows, j] = volume[rolled]
+
+            kept = ~rolled
+            kept_rows = rows[kept]
+            self.high[kept_rows, j] = np.maximum(self.high[kept_rows, j], high[kept])
+            self.low[kept_rows, j] = np.minimum(self.low[kept_rows, j], low[kept])
+            self.volume[kept_rows, j] += volume[kept]
+
+            self.close[rows, j] = last
+
+        if closed and self._on_close:
+            self._on_close(closed)
+        return closed
+
+    @staticmethod
+    def _aggregate(rows: np.ndarray, prices: np.ndarray, volumes: np.ndarray):
+        """دمج التيكات المتكررة لنفس الرمز (أول/آخر سعر، أعلى، أدنى، مجموع الحجم)"""
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+
+        if len(starts) == len(rows):
+            return rows, prices, prices, prices, prices, volumes
+
+        sorted_prices = prices[order]
+        ends = np.r_[starts[1:], len(rows)] - 1
+        return (
+            sorted_rows[starts],
+            sorted_prices[starts],
+            sorted_prices[ends],
+            np.maximum.reduceat(sorted_prices, starts),
+            np.minimum.reduceat(sorted_prices, starts),
+            np.add.reduceat(volumes[order], starts),
+        )
+
+    def _build_candles(self, rows: np.ndarray, j: int, timeframe: str) -> List[Candle]:
+        open_times = self.open_time[rows, j]
+        columns = zip(
+            rows.tolist(),
+            open_times.tolist(),
+            self.open[rows, j].tolist(),
+            self.high[rows, j].tolist(),
+            self.low[rows, j].tolist(),
+            self.close[rows, j].tolist(),
+            self.volume[rows, j].tolist(),
+        )
+
+        candles = []
+        times = {}
+        for row, open_epoch, o, h, l, c, v in columns:
+            # كل الشموع المغلقة في الإطار نفسه تشترك غالباً في نفس الوقت
+            if open_epoch not in times:
+                open_time = datetime.fromtimestamp(open_epoch)
+                times[open_epoch] = (open_time, next_close_time(open_time, timeframe))
+            open_time, close_time = times[open_epoch]
+            candles.append(Candle(
+                symbol=self._symbol_list[row],
+                timeframe=timeframe,
+                open_time=open_time,
+                close_time=close_time,
+                open=o,
+                high=h,
+                low=l,
+                close=c,
+                volume=v,
+            ))
+        return candles
+
+    def current_candle(self, symbol: str, timeframe: str) -> Optional[Candle]:
+        """الشمعة الحية الحالية لرمز/إطار"""
+        row = self._symbols.get_indexer([symbol])[0] if len(self._symbols) else -1
+        if row < 0 or timeframe not in self.timeframes:
+            return None
+        j = self.timeframes.index(timeframe)
+        if self.open_time[row, j] < 0:
+            return None
+        return self._build_candles(np.array([row]), j, timeframe)[0]
@@ -8,8 +8,20 @@ import asyncio
 import logging
 import os
 
+from .http_client import get_http_client
+from .rate_limiter import TokenBucket
+
 logger = logging.getLogger(__name__)
 
+# الخطة المجانية: 5 طلبات في الدقيقة
+ALPHA_VANTAGE_REQUESTS_PER_MINUTE = 5
+
+alphavantage_http = get_http_client(
+    "alphavantage",
+    rate_limiter=TokenBucket(ALPHA_VANTAGE_REQUESTS_PER_MINUTE, ALPHA_VANTAGE_REQUESTS_PER_MINUTE / 60),
+    max_concurrency=2
+)
+
 class AlphaVantageClient:
     """عميل Alpha Vantage للبيانات المتقدمة والمؤشرات"""
     
@@ -19,37 +31,33 @@ class AlphaVantageClient:
         self.session = None
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        # الجلسة مشتركة (alphavantage_http) ولا تُغلق مع السياق
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        pass
     
     async def make_request(self, params: Dict) -> Dict:
         """إرسال طلب إلى Alpha Vantage"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-        
         params['apikey'] = self.api_key
         
         try:
-            async with self.session.get(self.base_url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # التحقق من وجود رسالة خطأ
-                    if "Error Message" in data:
-                        logger.error(f"Alpha Vantage error: {data['Error Message']}")
-                        return {}
-                    if "Note" in data:  # Rate limit
-                        logger.warning(f"Alpha Vantage rate limit: {data['Note']}")
-                        return {}
-                    
-                    return data
-                else:
-                    logger.error(f"Alpha Vantage HTTP error: {response.status}")
+            response = await alphavantage_http.get(self.base_url, params)
+            if response.ok and isinstance(response.data, dict):
+                data = response.data
+                
+                # التحقق من وجود رسالة خطأ
+                if "Error Message" in data:
+                    logger.error(f"Alpha Vantage error: {data['Error Message']}")
+                    return {}
+                if "Note" in data:  # Rate limit
+                    logger.warning(f"Alpha Vantage rate limit: {data['Note']}")
                     return {}
+                
+                return data
+            else:
+                logger.error(f"Alpha Vantage HTTP error: {response.status}")
+                return {}
         except Exception as e:
             logger.error(f"Alpha Vantage request error: {e}")
             return {}
@@ -4,11 +4,33 @@ import aiohttp
 import httpx
 import asyncio
 import json
+import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from app.config import settings
 from ..services.data_provider import MarketDataProvider
+from .rate_limiter import TokenBucket
+from .http_client import get_http_client
+
+# حدود Binance REST: 6000 وزن في الدقيقة، طلب klines وزنه 2
+BINANCE_WEIGHT_LIMIT_1M = 6000
+KLINES_REQUEST_WEIGHT = 2
+TICKER_PRICE_WEIGHT = 2
+EXCHANGE_INFO_WEIGHT = 20
+KLINES_PAGE_LIMIT = 1000
+KLINES_MAX_RETRIES = 3
+MAX_CONCURRENT_KLINE_REQUESTS = 8
+
+# مشترك بين كل نسخ BinanceProvider (DataService ينشئ نسخة لكل طلب)
+binance_rate_limiter = TokenBucket(BINANCE_WEIGHT_LIMIT_1M, BINANCE_WEIGHT_LIMIT_1M / 60)
+
+# عميل HTTP المشترك: اتصالات دائمة، حد تزامن، أوزان Binance، ودمج الطلبات المتطابقة
+binance_http = get_http_client(
+    "binance",
+    rate_limiter=binance_rate_limiter,
+    max_concurrency=MAX_CONCURRENT_KLINE_REQUESTS
+)
 
 class BinanceProvider(MarketDataProvider):
     def __init__(self):
@@ -35,18 +57,17 @@ class BinanceProvider(MarketDataProvider):
         """الحصول على السعر الحالي لرمز محدد"""
         url = f"{self.base_url}/api/v3/ticker/price"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params={"symbol": symbol.upper()}) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return {
-                            "symbol": data["symbol"],
-                            "price": float(data["price"]),
-                            "timestamp": datetime.utcnow(),
-                            "source": "binance"
-                        }
-                    else:
-                        raise Exception(f"Binance API error: {response.status}")
+            response = await binance_http.get(url, {"symbol": symbol.upper()}, weight=TICKER_PRICE_WEIGHT)
+            if response.ok:
+                data = response.data
+                return {
+                    "symbol": data["symbol"],
+                    "price": float(data["price"]),
+                    "timestamp": datetime.utcnow(),
+                    "source": "binance"
+                }
+            else:
+                raise Exception(f"Binance API error: {response.status}")
         except Exception as e:
             print(f"Error fetching live price: {e}")
             return {}
@@ -69,35 +90,35 @@ class BinanceProvider(MarketDataProvider):
         }
         interval = interval_map.get(timeframe, "1h")
 
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/api/v3/klines"
-            params = {
-                "symbol": symbol.upper(),
-                "interval": interval,
-                "limit": limit + 1  # نأخذ واحدة إضافية لنزيل الشمعة الحالية غير المغلقة
-            }
-            async with session.get(url, params=params) as resp:
-                if resp.status != 200:
-                    raise Exception(f"Error fetching candles: {resp.status}")
-                data = await resp.json()
-                
-                if not data:
-                    return pd.DataFrame()
-                
-                # تحويل إلى DataFrame
-                df = pd.DataFrame(data, columns=[
-                    'open_time', 'open', 'high', 'low', 'close',
-                    'volume', 'close_time', 'quote_volume',
-                    'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-                ])
-                numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-                df[numeric_cols] = df[numeric_cols].astype(float)
-                df['time'] = df['open_time'].astype(int)
-                
+        url = f"{self.base_url}/api/v3/klines"
+        params = {
+            "symbol": symbol.upper(),
+            "interval": interval,
+            "limit": limit + 1  # نأخذ واحدة إضافية لنزيل الشمعة الحالية غير المغلقة
+        }
+        # فتح عدة شارتات لنفس الرمز في نفس اللحظة = طلب واحد للمزود
+        response = await binance_http.get(url, params, weight=KLINES_REQUEST_WEIGHT)
+        if not response.ok:
+            raise Exception(f"Error fetching candles: {response.status}")
+        data = response.data
         
-                df = df.iloc[:-1] if len(df) > 1 else df
-                
-                return df
+        if not data:
+            return pd.DataFrame()
+        
+        # تحويل إلى DataFrame
+        df = pd.DataFrame(data, columns=[
+            'open_time', 'open', 'high', 'low', 'close',
+            'volume', 'close_time', 'quote_volume',
+            'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
+        ])
+        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
+        df[numeric_cols] = df[numeric_cols].astype(float)
+        df['time'] = df['open_time'].astype(int)
+        
+
+        df = df.iloc[:-1] if len(df) > 1 else df
+        
+        return df
 
 
 
@@ -113,7 +134,12 @@ class BinanceProvider(MarketDataProvider):
         start_date: datetime,
         end_date: datetime = None
     ) -> pd.DataFrame:
-        """الحصول على كل الشموع التاريخية حتى آخر شمعة حية - مؤكد الجلب"""
+        """
+        الحصول على كل الشموع التاريخية حتى آخر شمعة مغلقة.
+
+        النطاق يُقسّم مسبقاً إلى نوافذ من 1000 شمعة تُجلب بالتوازي عبر عميل HTTP
+        المشترك (حد التزامن وأوزان Binance)، ثم تُجمع بمصفوفات NumPy.
+        """
         
         interval_map = {
             "1m": "1m", "5m": "5m", "15m": "15m", "30m": "30m",
@@ -134,91 +160,108 @@ class BinanceProvider(MarketDataProvider):
         
         start_ms = int(start_date.timestamp() * 1000)
         end_ms = int(last_closed_end_date.timestamp() * 1000)
-        
+        if end_ms < start_ms:
+            return pd.DataFrame()
 
-        all_candles = []
-        current_start = start_ms
+        # نوافذ ثابتة: كل نافذة تغطي 1000 وقت فتح على الأكثر
+        window_ms = KLINES_PAGE_LIMIT * timeframe_minutes * 60 * 1000
+        windows = [
+            (window_start, min(window_start + window_ms - 1, end_ms))
+            for window_start in range(start_ms, end_ms + 1, window_ms)
+        ]
 
         try:
-            async with aiohttp.ClientSession() as session:
-                while True:
-                    url = f"{self.base_url}/api/v3/klines"
-                    params = {
-                        "symbol": symbol.upper(),
-                        "interval": interval,
-                        "startTime": current_start,
-                        "limit": 1000
-                    }
-                    
-                    # أضف endTime فقط في الطلب الأخير
-                    if current_start + (1000 * timeframe_minutes * 60 * 1000) >= end_ms:
-                        params["endTime"] = end_ms
-                    
-                   
-                    async with session.get(url, params=params, timeout=30) as response:
-                        if response.status != 200:
-                           
-                            break
-                        
-                        data = await response.json()
-                        if not data:
-                            
-                            break
-
-                        batch_df = pd.DataFrame(data, columns=[
-                            'open_time', 'open', 'high', 'low', 'close',
-                            'volume', 'close_time', 'quote_volume',
-                            'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-                        ])
-                        
-                        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-                        batch_df[numeric_cols] = batch_df[numeric_cols].astype(float)
-                        batch_df['time'] = batch_df['open_time'].astype(int)
-                        
-                        # إضافة دفعة الشموع
-                        all_candles.append(batch_df[['time', 'open', 'high', 'low', 'close', 'volume']])
-                        
-                        last_candle_time = batch_df['time'].max()
-                        
-                        # إذا وصلنا إلى النهاية أو حصلنا على أقل من 1000 شمعة
-                        if last_candle_time >= end_ms or len(data) < 1000:
-                         
-                            break
-                        
-                        # التالي: ابدأ من آخر شمعة + 1 مللي ثانية
-                        current_start = last_candle_time + 1
-                        
-                        # تأخير لتجنب rate limiting
-                        await asyncio.sleep(0.05)
-
-                if all_candles:
-                    # دمج كل الدفعات
-                    df = pd.concat(all_candles, ignore_index=True)
-                    
-                    # إزالة التكرارات وترتيب
-                    df = df.drop_duplicates(subset=['time']).sort_values('time')
-                    
-                    # تصفية الشموع بعد end_ms
-                    df = df[df['time'] <= end_ms]
-                    
-                    # تسجيل النتائج
-                  
-                    if len(df) > 0:
-                        first_time = datetime.fromtimestamp(df.iloc[0]['time']/1000)
-                        last_time = datetime.fromtimestamp(df.iloc[-1]['time']/1000)
-               
-
-                    return df
-                else:
-                   
-                    return pd.DataFrame()
+            pages = await asyncio.gather(*(
+                self._fetch_klines_window(symbol.upper(), interval, *window) for window in windows
+            ))
+        except Exception as e:
+            print(f"❌ Error fetching klines for {symbol}: {e}")
+            return pd.DataFrame()
+
+        # نحتفظ بالبادئة المتصلة فقط: نافذة فاشلة في المنتصف تعني فجوة في البيانات
+        valid_pages = []
+        for page in pages:
+            if page is None:
+                break
+            valid_pages.append(page)
 
-        except asyncio.TimeoutError:
-           
+        if not valid_pages:
             return pd.DataFrame()
-        except Exception as e:
-           
+
+        times = np.concatenate([page[0] for page in valid_pages])
+        values = np.concatenate([page[1] for page in valid_pages])
+        if len(times) == 0:
             return pd.DataFrame()
+
+        # إزالة التكرارات وترتيب وتصفية الشموع بعد end_ms
+        times, unique_index = np.unique(times, return_index=True)
+        values = values[unique_index]
+        keep = times <= end_ms
+        times, values = times[keep], values[keep]
+
+        return pd.DataFrame({
+            "time": times,
+            "open": values[:, 0],
+            "high": values[:, 1],
+            "low": values[:, 2],
+            "close": values[:, 3],
+            "volume": values[:, 4],
+        })
+
+    async def _fetch_klines_window(
+        self,
+        symbol: str,
+        interval: str,
+        start_ms: int,
+        end_ms: int
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        جلب نافذة واحدة من الشموع.
+
+        Returns:
+            (أوقات الفتح int64، مصفوفة OHLCV float64) أو None عند الفشل
+        """
+        url = f"{self.base_url}/api/v3/klines"
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "startTime": start_ms,
+            "endTime": end_ms,
+            "limit": KLINES_PAGE_LIMIT
+        }
+
+        for attempt in range(KLINES_MAX_RETRIES):
+            try:
+                response = await binance_http.get(url, params, weight=KLINES_REQUEST_WEIGHT, timeout=30)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"⚠️ Klines request failed for {symbol} (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(0.5 * (attempt + 1))
+                continue
+
+            used_weight = response.headers.get("X-MBX-USED-WEIGHT-1M")
+            if used_weight is not None:
+                binance_rate_limiter.sync_used_weight(float(used_weight))
+
+            if response.status in (418, 429):
+                retry_after = float(response.headers.get("Retry-After", 2 ** attempt))
+                binance_rate_limiter.pause(retry_after)
+                continue
+
+            if not response.ok:
+                print(f"❌ Binance klines error {response.status} for {symbol} [{start_ms}-{end_ms}]")
+                return None
+
+            data = response.data
+
+            if not data:
+                return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+
+            times = np.fromiter((row[0] for row in data), dtype=np.int64, count=len(data))
+            # open, high, low, close, volume (نصوص في استجابة Binance)
+            values = np.array([row[1:6] for row in data], dtype=np.float64)
+            return times, values
+
+        return None
     
     def _timeframe_to_minutes(self, timeframe: str) -> int:
         """تحويل الإطار الزمني إلى دقائق"""
@@ -321,37 +364,36 @@ class BinanceProvider(MarketDataProvider):
             params["endTime"] = int(end_date.timestamp() * 1000)
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if not data:
-                            print(f"⚠️ No data returned from Binance for {symbol}")
-                            return pd.DataFrame()
-                        
-                        print(f"✅ Got {len(data)} candles from Binance")
-                        
-                        df = pd.DataFrame(data, columns=[
-                            'open_time', 'open', 'high', 'low', 'close',
-                            'volume', 'close_time', 'quote_volume',
-                            'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-                        ])
-                        
-                        # التحقق من الفاصل الزمني
-                        if len(data) > 1:
-                            time_diff = (pd.to_datetime(data[1][0], unit='ms') - 
-                                        pd.to_datetime(data[0][0], unit='ms')).total_seconds() / 60
-                            print(f"⏱️ Binance interval: {time_diff} minutes")
-                        
-                        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-                        df[numeric_cols] = df[numeric_cols].astype(float)
-                        df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
-                        df.set_index('timestamp', inplace=True)
-                        return df[['open', 'high', 'low', 'close', 'volume']]
-                    else:
-                        error_text = await response.text()
-                        print(f"❌ Binance API error {response.status}: {error_text}")
-                        return pd.DataFrame()
+            response = await binance_http.get(url, params, weight=KLINES_REQUEST_WEIGHT)
+            if response.ok:
+                data = response.data
+                if not data:
+                    print(f"⚠️ No data returned from Binance for {symbol}")
+                    return pd.DataFrame()
+                
+                print(f"✅ Got {len(data)} candles from Binance")
+                
+                df = pd.DataFrame(data, columns=[
+                    'open_time', 'open', 'high', 'low', 'close',
+                    'volume', 'close_time', 'quote_volume',
+                    'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
+                ])
+                
+                # التحقق من الفاصل الزمني
+                if len(data) > 1:
+                    time_diff = (pd.to_datetime(data[1][0], unit='ms') - 
+                                pd.to_datetime(data[0][0], unit='ms')).total_seconds() / 60
+                    print(f"⏱️ Binance interval: {time_diff} minutes")
+                
+                numeric_cols = ['open', 'high', 'low', 'close', 'volume']
+                df[numeric_cols] = df[numeric_cols].astype(float)
+                df['timestamp'] = pd.to_datetime(df['open_time'], unit='ms')
+                df.set_index('timestamp', inplace=True)
+                return df[['open', 'high', 'low', 'close', 'volume']]
+            else:
+                error_text = response.data
+                print(f"❌ Binance API error {response.status}: {error_text}")
+                return pd.DataFrame()
         except Exception as e:
             print(f"❌ Error fetching Binance data: {e}")
             import traceback
@@ -398,27 +440,25 @@ class BinanceProvider(MarketDataProvider):
             
 
         try:
-            # إنشاء الجلسة باستخدام aiohttp
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/api/v3/exchangeInfo"
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        raise Exception(f"Failed to fetch: {response.status}")
-                    
-                    data = await response.json()
-                    symbols = [
-                        s['symbol'] 
-                        for s in data['symbols'] 
-                        if s['status'] == "TRADING"
-                    ]
+            url = f"{self.base_url}/api/v3/exchangeInfo"
+            response = await binance_http.get(url, weight=EXCHANGE_INFO_WEIGHT)
+            if not response.ok:
+                raise Exception(f"Failed to fetch: {response.status}")
+            
+            data = response.data
+            symbols = [
+                s['symbol'] 
+                for s in data['symbols'] 
+                if s['status'] == "TRADING"
+            ]
 
-                    # تحديث الكاش
-                    self.symbols_cache = symbols
-                    self.cache_expiry = datetime.utcnow() + timedelta(hours=1)
+            # تحديث الكاش
+            self.symbols_cache = symbols
+            self.cache_expiry = datetime.utcnow() + timedelta(hours=1)
 
 
-                    filtered_symbols = [s for s in symbols if s.endswith(("USDT", "USDC"))]
-                    return filtered_symbols
+            filtered_symbols = [s for s in symbols if s.endswith(("USDT", "USDC"))]
+            return filtered_symbols
 
                 
 
@@ -0,0 +1,204 @@
+# app/providers/http_client.py
+"""
+طبقة HTTP مشتركة لكل مزودي بيانات السوق.
+
+لكل مزود عميل واحد طويل العمر (get_http_client(name)) يوفر:
+- جلسة aiohttp دائمة لكل حلقة أحداث مع اتصالات keep-alive لكل مضيف وكاش DNS
+- حد أقصى للطلبات المتزامنة (Semaphore) ومحدد معدل اختياري (TokenBucket)
+- دمج الطلبات المتطابقة الجارية: نفس (method, url, params) أثناء طلب قائم
+  ينتظر نفس النتيجة بدل إرسال طلب جديد للمزود
+
+run(key, factory) يطبق نفس الدمج والحد على عمليات ليست HTTP مباشرة
+(مثل استدعاءات yfinance في thread pool).
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional
+
+import aiohttp
+
+from .rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HTTPResult:
+    """نتيجة طلب (مشتركة بين كل من انتظرها، لا تُعدّل)"""
+    status: int
+    headers: Mapping[str, str]
+    data: Any  # JSON إذا أمكن، وإلا النص
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+
+class ProviderHTTPClient:
+    """عميل HTTP مشترك لمزود واحد"""
+
+    def __init__(
+        self,
+        name: str,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_concurrency: int = 8,
+        limit_per_host: Optional[int] = None,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 60,
+        timeout: float = 30
+    ):
+        self.name = name
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit_per_host = limit_per_host or self.max_concurrency * 2
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+
+        # الجلسة والقفل والطلبات الجارية مرتبطة بحلقة الأحداث الحالية
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._loop = None
+
+        self.stats = {"requests": 0, "coalesced": 0, "errors": 0}
+
+    async def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        stale_session, stale_loop = self._session, self._loop
+        self._loop = loop
+        self._session = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._inflight = {}
+        if stale_session is not None and not stale_session.closed:
+            await self._close_stale(stale_session, stale_loop)
+
+    async def _close_stale(self, session: aiohttp.ClientSession, loop):
+        """إغلاق جلسة حلقة أحداث سابقة (على حلقتها إن كانت ما زالت تعمل)"""
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        # الحلقة السابقة انتهت (asyncio.run): الإغلاق من هنا يغلق مقابس الاتصالات
+        try:
+            await session.close()
+        except Exception as e:
+            logger.warning(f"{self.name}: closing stale HTTP session failed: {e}")
+
+    async def session(self) -> aiohttp.ClientSession:
+        """الجلسة الدائمة (تُنشأ عند أول طلب في كل حلقة أحداث)"""
+        await self._bind_loop()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        تنفيذ عملية مع الدمج والحد من التزامن
+
+        Args:
+            key: مفتاح الدمج (نفس المفتاح أثناء التنفيذ = نفس النتيجة)
+            factory: دالة تنشئ الـ coroutine عند الحاجة فقط
+        """
+        await self._bind_loop()
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(self._limited(factory))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _limited(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        async with self._semaphore:
+            self.stats["requests"] += 1
+            try:
+                return await factory()
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        weight: float = 1,
+        timeout: Optional[float] = None
+    ) -> HTTPResult:
+        """
+        طلب HTTP عبر الجلسة المشتركة
+
+        Raises:
+            aiohttp.ClientError / asyncio.TimeoutError عند فشل الاتصال
+        """
+        params = {k: str(v) for k, v in (params or {}).items()}
+        key = (method.upper(), url, tuple(sorted(params.items())))
+
+        async def send() -> HTTPResult:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(weight)
+            session = await self.session()
+            request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+            async with session.request(method, url, params=params, timeout=request_timeout) as response:
+                text = await response.text()
+                try:
+                    data = await response.json(content_type=None)
+                except ValueError:
+                    data = text
+                return HTTPResult(response.status, dict(response.headers), data)
+
+        return await self.run(key, send)
+
+    async def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        weight: float = 1,
+        timeout: Optional[float] = None
+    ) -> HTTPResult:
+        return await self.request("GET", url, params, weight, timeout)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+# عميل واحد لكل مزود على مستوى العملية
+_clients: Dict[str, ProviderHTTPClient] = {}
+
+
+def get_http_client(name: str, **options) -> ProviderHTTPClient:
+    """العميل المشترك للمزود (الخيارات تُطبق عند أول إنشاء فقط)"""
+    client = _clients.get(name)
+    if client is None:
+        client = ProviderHTTPClient(name, **options)
+        _clients[name] = client
+    return client
+
+
+async def close_http_clients():
+    """إغلاق كل الجلسات (عند إيقاف التطبيق)"""
+    for client in _clients.values():
+        try:
+            await client.close()
+        except Exception as e:
+            logger.error(f"❌ Error closing {client.name} HTTP session: {e}")
+
+
+def get_http_stats() -> Dict[str, Dict[str, int]]:
+    return {name: dict(client.stats) for name, client in _clients.items()}
@@ -0,0 +1,68 @@
+# app/providers/rate_limiter.py
+"""
+محدد معدل (Token Bucket) بأوزان الطلبات مثل حدود Binance.
+"""
+import asyncio
+import time
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    دلو رموز يمتلئ بمعدل ثابت.
+
+    - acquire(weight): ينتظر حتى يتوفر الوزن المطلوب
+    - sync_used_weight(used): مزامنة مع الوزن المستخدم الذي يعلنه الخادم
+    - pause(seconds): إيقاف كل الطلبات (Retry-After بعد 429/418)
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    async def acquire(self, weight: float = 1):
+        weight = min(float(weight), self.capacity)
+
+        # الطلبات تُخدم بالترتيب حتى لا يتجاوز طلب ثقيل بالانتظار
+        async with self._get_lock():
+            while True:
+                self._refill()
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep((weight - self.tokens) / self.refill_per_second)
+
+    def _get_lock(self) -> asyncio.Lock:
+        # القفل مرتبط بحلقة الأحداث الحالية (المثيل مشترك على مستوى الوحدة)
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def sync_used_weight(self, used_weight: float):
+        """الخادم هو المرجع: لا نسمح برموز أكثر من المتبقي فعلاً في نافذته"""
+        self._refill()
+        self.tokens = min(self.tokens, max(self.capacity - float(used_weight), 0.0))
+
+    def pause(self, seconds: float):
+        logger.warning(f"⏳ Rate limit hit, pausing requests for {seconds:.1f}s")
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
@@ -2,7 +2,7 @@
 import asyncio
 import json
 import logging
-from typing import Dict, List, Set, Optional, Any
+from typing import Awaitable, Callable, Dict, List, Set, Optional, Any
 from datetime import datetime, timedelta
 from collections import defaultdict
 import aiohttp
@@ -15,6 +15,66 @@ from .us_stock_provider import USStockProvider
 
 logger = logging.getLogger(__name__)
 
+# عدد الرموز في كل طلب اقتباسات متعدد، وعدد الطلبات المتزامنة
+QUOTE_BATCH_SIZE = 100
+QUOTE_BATCH_CONCURRENCY = 4
+
+# الحقول التي يُعتبر تغيرها تحديثاً يستحق البث
+QUOTE_DIFF_FIELDS = ("price", "change", "change_percent", "volume", "open", "high", "low", "bid", "ask")
+
+
+def quote_changed(previous: Optional[Dict], quote: Dict) -> bool:
+    """هل تغير الاقتباس عن آخر نسخة مبثوثة؟"""
+    if previous is None:
+        return True
+    return any(previous.get(field) != quote.get(field) for field in QUOTE_DIFF_FIELDS)
+
+
+class BatchQuotePoller:
+    """
+    جلب اقتباسات كل الرموز النشطة بطلبات متعددة الرموز.
+
+    الرموز تُقسم إلى دفعات من batch_size وتُجلب بتوازٍ محدود،
+    فزمن الدورة يعتمد على عدد الدفعات لا عدد الرموز.
+    """
+
+    def __init__(
+        self,
+        fetch_batch: Callable[[List[str]], Awaitable[Dict[str, Dict]]],
+        batch_size: int = QUOTE_BATCH_SIZE,
+        max_concurrency: int = QUOTE_BATCH_CONCURRENCY
+    ):
+        self.fetch_batch = fetch_batch
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.stats = {"polls": 0, "batches": 0, "failed_batches": 0}
+
+    async def fetch(self, symbols: List[str]) -> Dict[str, Dict]:
+        symbols = sorted(set(symbols))
+        if not symbols:
+            return {}
+
+        chunks = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_chunk(chunk: List[str]) -> Dict[str, Dict]:
+            async with semaphore:
+                try:
+                    return await self.fetch_batch(chunk)
+                except Exception as e:
+                    # دفعة فاشلة لا توقف بقية الرموز، وتُعاد في الدورة التالية
+                    self.stats["failed_batches"] += 1
+                    logger.error(f"Batch quote fetch failed ({len(chunk)} symbols): {e}")
+                    return {}
+
+        quotes: Dict[str, Dict] = {}
+        for result in await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks)):
+            quotes.update(result)
+
+        self.stats["polls"] += 1
+        self.stats["batches"] += len(chunks)
+        return quotes
+
 
 class StockWebSocketManager:
     """مدير WebSocket للأسهم الأمريكية - يدعم تعدد المستخدمين والرموز"""
@@ -29,6 +89,9 @@ class StockWebSocketManager:
         self.price_cache: Dict[str, Dict] = {}
         self.cache_timestamps: Dict[str, datetime] = {}
         
+        # جلب الاقتباسات بدفعات متعددة الرموز
+        self.quote_poller = BatchQuotePoller(self.yahoo_client.get_batch_quotes)
+        
         # إحصائيات
         self.stats = {
             "total_connections": 0,
@@ -433,20 +496,7 @@ class StockWebSocketManager:
             self.cache_timestamps[symbol] = datetime.utcnow()
             
             # إعداد رسالة تحديث السعر
-            message = {
-                "type": "price_update",
-                "symbol": symbol,
-                "price": quote.get("price", 0),
-                "change": quote.get("change", 0),
-                "change_percent": quote.get("change_percent", 0),
-                "volume": quote.get("volume", 0),
-                "timestamp": quote.get("timestamp", datetime.utcnow().isoformat()),
-                "bid": quote.get("bid", 0),
-                "ask": quote.get("ask", 0),
-                "open": quote.get("open", 0),
-                "high": quote.get("high", 0),
-                "low": quote.get("low", 0)
-            }
+            message = self._price_message(symbol, quote)
             
             # بث التحديث لجميع المشتركين
             await self.broadcast_to_symbol(symbol, message)
@@ -458,6 +508,67 @@ class StockWebSocketManager:
         except Exception as e:
             logger.error(f"Error updating price for {symbol}: {e}")
     
+    async def update_prices(self, symbols: List[str]) -> int:
+        """
+        تحديث أسعار عدة رموز بطلبات مجمّعة وبث المتغير منها فقط
+        
+        Returns:
+            int: عدد الرموز التي تغير سعرها وتم بثها
+        """
+        quotes = await self.quote_poller.fetch(symbols)
+        
+        # خريطة رمز -> مشتركين مرة واحدة لكل الدورة
+        subscribers: Dict[str, List[WebSocket]] = defaultdict(list)
+        for websocket, subscribed in self.subscription_data.items():
+            for symbol in subscribed:
+                subscribers[symbol].append(websocket)
+        
+        now = datetime.utcnow()
+        sends = []
+        changed = 0
+        for symbol, quote in quotes.items():
+            # رمز أُلغي اشتراكه أثناء الجلب
+            if symbol not in self.stats["active_symbols"]:
+                continue
+            if not quote_changed(self.price_cache.get(symbol), quote):
+                continue
+            
+            self.price_cache[symbol] = quote
+            self.cache_timestamps[symbol] = now
+            changed += 1
+            
+            message = self._price_message(symbol, quote)
+            candle_update = {
+                "type": "candle_update",
+                "symbol": symbol,
+                "price": quote.get("price", 0),
+                "volume": quote.get("volume", 0),
+                "timestamp": now.isoformat()
+            }
+            for websocket in subscribers.get(symbol, []):
+                sends.append(self.send_personal_message(message, websocket))
+                sends.append(self.send_personal_message(candle_update, websocket))
+        
+        if sends:
+            await asyncio.gather(*sends)
+        return changed
+    
+    def _price_message(self, symbol: str, quote: Dict) -> Dict:
+        return {
+            "type": "price_update",
+            "symbol": symbol,
+            "price": quote.get("price", 0),
+            "change": quote.get("change", 0),
+            "change_percent": quote.get("change_percent", 0),
+            "volume": quote.get("volume", 0),
+            "timestamp": quote.get("timestamp", datetime.utcnow().isoformat()),
+            "bid": quote.get("bid", 0),
+            "ask": quote.get("ask", 0),
+            "open": quote.get("open", 0),
+            "high": quote.get("high", 0),
+            "low": quote.get("low", 0)
+        }
+    
     async def _send_candle_update(self, symbol: str):
         """إرسال تحديث للشمعة (محاكاة لتكوين شمعة جديدة)"""
         # هذه محاكاة، في النظام الحقيقي ستأتي البيانات من مصدر حي
@@ -535,21 +646,24 @@ class StockWebSocketTask:
         logger.info("🛑 StockWebSocketTask stopped")
     
     async def _update_loop(self):
-        """حلقة التحديث الرئيسية"""
+        """حلقة التحديث الرئيسية (إيقاع ثابت: الدورة تبدأ كل update_interval)"""
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
         while self.is_running:
             try:
-                # تحديث الأسعار للرموز النشطة
+                # تحديث أسعار كل الرموز النشطة بطلبات مجمّعة
                 active_symbols = list(self.manager.stats["active_symbols"])
+                if active_symbols:
+                    await self.manager.update_prices(active_symbols)
                 
-                for symbol in active_symbols:
-                    await self.manager.update_price(symbol)
-                
-                # انتظار الفترة المحددة
-                await asyncio.sleep(self.update_interval)
+                # انتظار باقي الفترة فقط (بدون تراكم إذا تأخرت الدورة)
+                next_run = max(next_run + self.update_interval, loop.time())
+                await asyncio.sleep(next_run - loop.time())
                 
             except Exception as e:
                 logger.error(f"Error in update loop: {e}")
                 await asyncio.sleep(1)
+                next_run = loop.time()
     
     def set_update_interval(self, interval: int):
         """تحديث الفترة الزمنية للتحديث"""
@@ -10,10 +10,15 @@ from concurrent.futures import ThreadPoolExecutor
 import logging
 import warnings
 
+from .http_client import get_http_client
+
 warnings.filterwarnings('ignore')
 
 logger = logging.getLogger(__name__)
 
+# yfinance يدير اتصالاته بنفسه؛ الطبقة المشتركة توفر الدمج وحد التزامن فقط
+yahoo_http = get_http_client("yahoo", max_concurrency=10)
+
 
 YAHOO_INTERVAL_MAP = {
     "1m": "1m",
@@ -26,6 +31,53 @@ YAHOO_INTERVAL_MAP = {
     "1M": "1mo",
 }
 
+def quotes_from_download(df: pd.DataFrame, symbols: List[str]) -> Dict[str, Dict]:
+    """تحويل نتيجة yf.download (شموع يومية لعدة رموز) إلى اقتباسات"""
+    quotes = {}
+    if df is None or df.empty:
+        return quotes
+
+    multi = isinstance(df.columns, pd.MultiIndex)
+    tickers = set(df.columns.get_level_values(0)) if multi else set()
+    timestamp = datetime.utcnow().isoformat()
+
+    for symbol in symbols:
+        if multi:
+            if symbol not in tickers:
+                continue
+            frame = df[symbol]
+        elif len(symbols) == 1:
+            frame = df
+        else:
+            continue
+
+        frame = frame.dropna(subset=["Close"])
+        if frame.empty:
+            continue
+
+        last = frame.iloc[-1]
+        price = float(last["Close"])
+        prev = float(frame["Close"].iloc[-2]) if len(frame) > 1 else float(last["Open"])
+        change = price - prev
+
+        quotes[symbol] = {
+            "symbol": symbol,
+            "price": price,
+            "previous_close": prev,
+            "change": change,
+            "change_percent": (change / prev) * 100 if prev else 0,
+            "open": float(last["Open"]),
+            "high": float(last["High"]),
+            "low": float(last["Low"]),
+            "volume": int(last["Volume"]) if pd.notna(last["Volume"]) else 0,
+            "currency": "USD",
+            "timestamp": timestamp,
+            "source": "yahoo_finance"
+        }
+
+    return quotes
+
+
 class YahooFinanceClient:
     """عميل Yahoo Finance المتكامل مع جميع وظائف التحليل الفني"""
     
@@ -80,7 +132,9 @@ class YahooFinanceClient:
             else:
                 params["period"] = period
 
-            df = await self._run_in_thread(lambda: ticker.history(**params))
+            # نفس الطلب الجاري لنفس الرمز يُدمج، وعدد استدعاءات yfinance المتزامنة محدود
+            key = ("history", symbol, tuple(sorted(params.items())))
+            df = await yahoo_http.run(key, lambda: self._run_in_thread(lambda: ticker.history(**params)))
 
             if df.empty:
                 return pd.DataFrame()
@@ -139,6 +193,30 @@ class YahooFinanceClient:
         except Exception as e:
             logger.error(f"Live quote failed [{symbol}]: {e}")
             raise
+
+    async def get_batch_quotes(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        اقتباسات عدة رموز باستدعاء yfinance واحد (yf.download متعدد الرموز)
+
+        Returns:
+            {symbol: quote} بنفس حقول get_live_quote (الرموز بدون بيانات تُحذف)
+        """
+        if not symbols:
+            return {}
+
+        symbols = sorted(set(symbols))
+        key = ("batch_quotes", tuple(symbols))
+        df = await yahoo_http.run(key, lambda: self._run_in_thread(
+            yf.download,
+            symbols,
+            period="5d",
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=False,
+            threads=True,
+            progress=False
+        ))
+        return quotes_from_download(df, symbols)
         
 
     async def get_company_info(self, symbol: str) -> Dict:
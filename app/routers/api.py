@@ -3,8 +3,10 @@ import asyncio
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, logger, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db, redis_client
+from app.database import get_db
+from app.database.redis_client import redis_client
 from app.services.data_service import DataService
+from app.services.indicators import get_indicator_cache_stats
 from app.providers.binance_market_stream import stream_all_market
 
 router = APIRouter(tags=["core"])
@@ -99,6 +101,8 @@ async def health_check():
         services_status["redis"] = "healthy"
     except Exception as e:
         services_status["redis"] = f"unhealthy: {str(e)}"
+    services_status["cache"] = redis_client.get_stats()
+    services_status["indicator_cache"] = get_indicator_cache_stats()
     
     # فحص المزودين
     try:
@@ -138,10 +138,55 @@ async def run_walk_forward_analysis(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/walk-forward/optimize")
+async def run_walk_forward_optimization(
+    config: BacktestConfig = Body(...),
+    parameter_space: Dict[str, List[Any]] = Body(...),
+    periods: int = Query(5, ge=1, le=20),
+    search: str = Query("grid", regex="^(grid|random)$"),
+    max_combinations: Optional[int] = Query(None, ge=1, le=10000),
+    objective: str = Query("sharpe_ratio", regex="^(total_return|sharpe_ratio|profit_factor|win_rate)$"),
+    anchored: bool = Query(False),
+    min_trades: int = Query(1, ge=0),
+    db = Depends(get_db)
+):
+    """
+    تحسين مشي للأمام: بحث عن المعاملات داخل كل نافذة وتقييمها على النافذة التالية
+    
+    - **config**: تكوين الباك-تيست (مع strategy_config)
+    - **parameter_space**: {مسار داخل strategy_config: [قيم]}
+    - **periods**: عدد نوافذ خارج العينة
+    - **search**: grid أو random
+    - **objective**: مقياس اختيار الأفضل داخل العينة
+    """
+    try:
+        engine = get_backtest_engine(db)
+        
+        print(f"Starting walk-forward optimization with {periods} periods")
+        
+        return await engine.run_walk_forward_optimization(
+            config,
+            parameter_space,
+            periods=periods,
+            search=search,
+            max_combinations=max_combinations,
+            objective=objective,
+            anchored=anchored,
+            min_trades=min_trades
+        )
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/monte-carlo")
 async def run_monte_carlo_simulation(
     config: BacktestConfig = Body(...),
-    simulations: int = Query(1000, ge=100, le=10000),
+    simulations: int = Query(1000, ge=100, le=100000),
+    method: str = Query("shuffle", regex="^(shuffle|bootstrap|block_bootstrap)$"),
+    block_size: int = Query(5, ge=1, le=100),
+    ruin_threshold_percent: float = Query(50.0, gt=0, le=100),
     db = Depends(get_db)
 ):
     """
@@ -149,13 +194,22 @@ async def run_monte_carlo_simulation(
     
     - **config**: تكوين الباك-تيست
     - **simulations**: عدد المحاكاة
+    - **method**: shuffle / bootstrap / block_bootstrap
+    - **block_size**: طول الكتلة لـ block_bootstrap
+    - **ruin_threshold_percent**: نسبة الخسارة التي تُعتبر إفلاساً
     """
     try:
         engine = get_backtest_engine(db)
         
         print(f"Starting Monte Carlo simulation with {simulations} iterations")
         
-        results = await engine.run_monte_carlo_simulation(config, simulations)
+        results = await engine.run_monte_carlo_simulation(
+            config,
+            simulations,
+            method=method,
+            block_size=block_size,
+            ruin_threshold_percent=ruin_threshold_percent
+        )
         
         return {
             "success": True,
@@ -166,7 +220,9 @@ async def run_monte_carlo_simulation(
                 "probability_of_loss": f"{results['probability_loss'] * 100:.1f}%",
                 "expected_return_range": f"{results['percentile_5']:.1f}% to {results['percentile_95']:.1f}%",
                 "worst_case_scenario": f"{results['min_return']:.1f}%",
-                "best_case_scenario": f"{results['max_return']:.1f}%"
+                "best_case_scenario": f"{results['max_return']:.1f}%",
+                "probability_of_ruin": f"{results['probability_of_ruin'] * 100:.1f}%",
+                "median_max_drawdown": f"{results['max_drawdown']['percentile_50']:.1f}%"
             }
         }
         
@@ -5,7 +5,7 @@ import json
 
 from app.services.filtering import (
     FilteringEngine, FilterCriteria, FilterResult,
-    get_filtering_engine
+    BulkFilterPlanner, get_filtering_engine
 )
 from app.services.data_service import DataService
 from app.database import get_db
@@ -118,56 +118,33 @@ async def get_filtering_stats():
 async def bulk_filter_symbols(
     markets: List[str] = Body(["crypto"]),
     criteria_list: List[FilterCriteria] = Body(...),
-    parallel: bool = Query(True)
+    parallel: bool = Query(True),
+    max_concurrency: int = Query(8, ge=1, le=64),
+    db = Depends(get_db)
 ):
     """
     فلترة الرموز في عدة أسواق دفعة واحدة
     
     - **markets**: قائمة الأسواق
     - **criteria_list**: قائمة معايير الفلترة
-    - **parallel**: التشغيل بالتوازي
-    """
-    filtering_engine = get_filtering_engine()
+    - **parallel**: التشغيل بالتوازي (False = طلب بيانات واحد في كل مرة)
+    - **max_concurrency**: أقصى عدد طلبات بيانات متزامنة
     
-    results = {}
+    البيانات المشتركة بين المعايير (نفس الرمز/الإطار/الفترة) تُجلب مرة واحدة،
+    وتُرجع الاستجابة زمن كل مرحلة في timings_ms.
+    """
+    planner = BulkFilterPlanner(
+        get_filtering_engine(),
+        max_concurrency=max_concurrency if parallel else 1,
+        data_service=DataService(db)
+    )
     
-    if parallel:
-        # فلترة بالتوازي
-        import asyncio
-        
-        tasks = []
-        for market in markets:
-            for criteria in criteria_list:
-                task = filtering_engine.filter_symbols(market, criteria)
-                tasks.append((market, criteria, task))
-        
-        for market, criteria, task in tasks:
-            try:
-                result = await task
-                key = f"{market}_{criteria.json()[:50]}..."
-                results[key] = {
-                    "symbols": result.symbols,
-                    "count": len(result.symbols)
-                }
-            except Exception as e:
-                key = f"{market}_error"
-                results[key] = {"error": str(e)}
-    else:
-        # فلترة تسلسلية
-        for market in markets:
-            for criteria in criteria_list:
-                try:
-                    result = await filtering_engine.filter_symbols(market, criteria)
-                    key = f"{market}_{criteria.json()[:50]}..."
-                    results[key] = {
-                        "symbols": result.symbols,
-                        "count": len(result.symbols)
-                    }
-                except Exception as e:
-                    key = f"{market}_error"
-                    results[key] = {"error": str(e)}
+    try:
+        bulk = await planner.run(markets, criteria_list)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
     
     return {
-        "total_results": len(results),
-        "results": results
-    }
\ No newline at end of file
+        "total_results": len(bulk["results"]),
+        **bulk
+    }
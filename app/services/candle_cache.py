@@ -0,0 +1,225 @@
+# app/services/candle_cache.py
+"""
+كاش محلي عمودي للشموع التاريخية (Arrow IPC).
+
+التخزين: {root}/{market}/{symbol}/{timeframe}/
+    - YYYY-MM.arrow : شموع الشهر (time, open, high, low, close, volume)
+    - coverage.json : الفترات المجلوبة فعلاً [[start_ms, end_ms], ...] بوقت فتح الشمعة
+
+القراءة تتم عبر memory-map بدلاً من فك JSON، والجلب من المزود يقتصر على
+الفجوات غير المغطاة في النطاق المطلوب.
+"""
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from app.config import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+except ImportError:  # الكاش يُعطّل ويُستخدم الجلب المباشر
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+CANDLE_COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+# دالة الجلب: (start_ms, end_ms) -> DataFrame بأعمدة CANDLE_COLUMNS
+FetchRange = Callable[[int, int], Awaitable[pd.DataFrame]]
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """تحويل الإطار الزمني إلى مللي ثانية"""
+    units = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+    try:
+        return int(timeframe[:-1]) * units[timeframe[-1]]
+    except (KeyError, ValueError):
+        return 60_000
+
+
+def merge_intervals(intervals: List[Tuple[int, int]], step: int) -> List[Tuple[int, int]]:
+    """دمج الفترات المتداخلة أو المتجاورة (الفارق شمعة واحدة)"""
+    merged: List[List[int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + step:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def missing_intervals(
+    coverage: List[Tuple[int, int]],
+    start: int,
+    end: int,
+    step: int
+) -> List[Tuple[int, int]]:
+    """الفترات غير المغطاة من [start, end]"""
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in coverage:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - step))
+        cursor = max(cursor, covered_end + step)
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class HistoricalCandleCache:
+    """كاش الشموع التاريخية على القرص"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def available(self) -> bool:
+        return pa is not None
+
+    def _directory(self, market: str, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, market, symbol.upper(), timeframe)
+
+    async def get_range(
+        self,
+        market: str,
+        symbol: str,
+        timeframe: str,
+        start_ms: int,
+        end_ms: int,
+        fetch: FetchRange
+    ) -> pd.DataFrame:
+        """
+        الشموع التي يقع وقت فتحها في [start_ms, end_ms].
+
+        تُجلب الفجوات فقط عبر fetch ثم تُحفظ، والنتيجة تُقرأ من الملفات.
+        """
+        step = timeframe_to_ms(timeframe)
+        # محاذاة النطاق مع حدود الشموع
+        start_ms = -(-start_ms // step) * step
+        end_ms = (end_ms // step) * step
+        if end_ms < start_ms:
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+
+        directory = self._directory(market, symbol, timeframe)
+        lock = self._locks.setdefault(directory, asyncio.Lock())
+
+        async with lock:
+            coverage = await asyncio.to_thread(self._read_coverage, directory)
+
+            for gap_start, gap_end in missing_intervals(coverage, start_ms, end_ms, step):
+                fetched = await fetch(gap_start, gap_end)
+                if fetched is None or fetched.empty:
+                    # لا نعلم هل الفراغ حقيقي أم خطأ في المزود: لا نسجل التغطية
+                    logger.info(f"Candle cache: no data for {symbol} {timeframe} gap {gap_start}-{gap_end}")
+                    continue
+
+                fetched = self._normalize(fetched)
+                fetched = fetched[(fetched["time"] >= gap_start) & (fetched["time"] <= gap_end)]
+                if fetched.empty:
+                    continue
+
+                # التغطية حتى آخر شمعة مستلمة فقط (الجلب قد يتوقف قبل النهاية)
+                covered_until = int(fetched["time"].iloc[-1])
+                await asyncio.to_thread(self._write, directory, fetched)
+                coverage = merge_intervals(coverage + [(gap_start, covered_until)], step)
+                await asyncio.to_thread(self._write_coverage, directory, coverage)
+
+            return await asyncio.to_thread(self._read, directory, start_ms, end_ms)
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        df = df[CANDLE_COLUMNS].copy()
+        df["time"] = df["time"].astype(np.int64)
+        for column in CANDLE_COLUMNS[1:]:
+            df[column] = df[column].astype(np.float64)
+        return df.drop_duplicates(subset=["time"], keep="last").sort_values("time")
+
+    @staticmethod
+    def _partition(time_ms: np.ndarray) -> np.ndarray:
+        return pd.to_datetime(time_ms, unit="ms", utc=True).strftime("%Y-%m").to_numpy()
+
+    def _read_coverage(self, directory: str) -> List[Tuple[int, int]]:
+        path = os.path.join(directory, "coverage.json")
+        try:
+            with open(path, "r") as f:
+                return [tuple(interval) for interval in json.load(f)]
+        except FileNotFoundError:
+            return []
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Corrupted candle cache coverage {path}: {e}")
+            return []
+
+    def _write_coverage(self, directory: str, coverage: List[Tuple[int, int]]):
+        path = os.path.join(directory, "coverage.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([list(interval) for interval in coverage], f)
+        os.replace(tmp_path, path)
+
+    def _load_table(self, path: str) -> "pa.Table":
+        with pa.memory_map(path, "r") as source:
+            return ipc.open_file(source).read_all()
+
+    def _write(self, directory: str, df: pd.DataFrame):
+        """دمج الشموع الجديدة مع ملفات الأشهر الموجودة"""
+        os.makedirs(directory, exist_ok=True)
+        partitions = self._partition(df["time"].to_numpy())
+
+        for month in np.unique(partitions):
+            path = os.path.join(directory, f"{month}.arrow")
+            new_rows = df[partitions == month]
+            if os.path.exists(path):
+                existing = self._load_table(path).to_pandas()
+                new_rows = self._normalize(pd.concat([existing, new_rows], ignore_index=True))
+
+            table = pa.Table.from_pandas(new_rows, preserve_index=False)
+            tmp_path = f"{path}.tmp"
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+
+    def _read(self, directory: str, start_ms: int, end_ms: int) -> pd.DataFrame:
+        months = pd.period_range(
+            pd.Timestamp(start_ms, unit="ms", tz="UTC").tz_localize(None),
+            pd.Timestamp(end_ms, unit="ms", tz="UTC").tz_localize(None),
+            freq="M"
+        )
+
+        tables = []
+        for month in months:
+            path = os.path.join(directory, f"{month.strftime('%Y-%m')}.arrow")
+            if os.path.exists(path):
+                tables.append(self._load_table(path))
+
+        if not tables:
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+
+        table = pa.concat_tables(tables)
+        mask = pc.and_(
+            pc.greater_equal(table["time"], start_ms),
+            pc.less_equal(table["time"], end_ms)
+        )
+        return table.filter(mask).to_pandas()
+
+
+def to_utc_datetime(time_ms: int) -> datetime:
+    return datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc)
+
+
+# المثيل العام (مشترك بين كل نسخ DataService)
+candle_cache = HistoricalCandleCache(settings.CANDLE_CACHE_DIR)
@@ -0,0 +1,386 @@
+# app/services/candle_persistence.py
+"""
+تخزين الشموع المغلقة في Postgres (جدول market_data).
+
+- الكتابة: شموع المزود (klines) المغلقة فقط، من get_range و backfill_gaps،
+  تُجمع في ذاكرة مؤقتة وتُكتب دفعات عبر asyncpg COPY إلى جدول مؤقت ثم
+  INSERT ... ON CONFLICT DO NOTHING (COPY وحده لا يتجاهل التكرار).
+  الشموع المبنية من التيكات لا تُحفظ: حجمها حجم 24 ساعة متحرك وأول شمعة
+  بعد فتح الشارت ناقصة، و DO NOTHING كان سيثبتها بدل شموع المزود
+- القراءة: نطاق (symbol, timeframe, timestamp) عبر الفهرس المركب، كمصفوفات NumPy
+- الفجوات: get_range يجلب الفترات الناقصة فقط من المزود ويكتبها،
+  و backfill_gaps عند الإقلاع يكمل ما فات منذ آخر شمعة محفوظة؛ كلاهما يبطل
+  بادئات بصمات المؤشرات للسلسلة (invalidate_prefix_states)
+
+بهذا تقرأ كل نسخ الخادم التاريخ من قاعدة البيانات المشتركة بدل
+أن يطلب كل منها نفس الشموع من Binance بعد إعادة التشغيل.
+"""
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from app.services.candle_cache import (
+    CANDLE_COLUMNS, FetchRange, missing_intervals, timeframe_to_ms
+)
+from app.services.indicators.fingerprint import invalidate_prefix_states
+
+try:
+    import asyncpg
+except ImportError:  # التخزين الدائم يُعطّل ويُستخدم الكاش المحلي/المزود مباشرة
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+TABLE = "market_data"
+COPY_COLUMNS = ("symbol", "timeframe", "timestamp", "open", "high", "low", "close", "volume", "source")
+
+# فهرس فريد يخدم قراءة النطاقات ويمنع تكرار الشمعة
+INDEX_SQL = (
+    f"CREATE UNIQUE INDEX IF NOT EXISTS ix_market_data_symbol_timeframe_timestamp "
+    f"ON {TABLE} (symbol, timeframe, timestamp)"
+)
+
+# جدول الاستقبال المؤقت لـ COPY (لكل اتصال، يُفرغ عند نهاية المعاملة)
+TEMP_TABLE_SQL = (
+    "CREATE TEMP TABLE IF NOT EXISTS _candles_in ("
+    "symbol text, timeframe text, timestamp timestamptz, open float8, high float8, "
+    "low float8, close float8, volume float8, source text) ON COMMIT DELETE ROWS"
+)
+
+# بعد فشل الاتصال لا نحاول مرة أخرى قبل هذه المدة (ثواني)
+RECONNECT_DELAY = 60
+
+
+def to_asyncpg_dsn(url: str) -> str:
+    """تحويل رابط SQLAlchemy (postgresql+asyncpg://?ssl=) إلى رابط asyncpg (sslmode=)"""
+    url = url.replace("postgresql+asyncpg://", "postgresql://", 1)
+    return url.replace("?ssl=", "?sslmode=").replace("&ssl=", "&sslmode=")
+
+
+def ms_to_datetime(time_ms: int) -> datetime:
+    return datetime.fromtimestamp(time_ms / 1000, tz=timezone.utc)
+
+
+def covered_runs(times: np.ndarray, step: int) -> List[Tuple[int, int]]:
+    """الفترات المتصلة من أوقات الشموع المحفوظة (مرتبة)"""
+    if len(times) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(times) > step)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(times) - 1]))
+    return [(int(times[s]), int(times[e])) for s, e in zip(starts, ends)]
+
+
+class CandlePersistence:
+    """كتابة وقراءة الشموع المغلقة في Postgres"""
+
+    def __init__(
+        self,
+        dsn: str,
+        enabled: bool = True,
+        batch_size: int = 5000,
+        flush_interval: float = 2.0,
+        max_pending: int = 200_000
+    ):
+        self.dsn = dsn
+        self.enabled = enabled and asyncpg is not None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # حد الذاكرة المؤقتة إذا تعطلت قاعدة البيانات (الأقدم يُحذف)
+        self.max_pending = max_pending
+
+        # (symbol, timeframe, open_time_ms) -> صف COPY (آخر نسخة تفوز)
+        self._buffer: Dict[Tuple[str, str, int], Tuple] = {}
+        self._pool = None
+        self._pool_loop = None
+        self._retry_at = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+        self.stats = {
+            "buffered": 0, "written": 0, "dropped": 0, "flushes": 0,
+            "errors": 0, "read_hits": 0, "gap_fetches": 0
+        }
+
+    # ---------------------- الاتصال ----------------------
+
+    async def _create_pool(self):
+        return await asyncpg.create_pool(to_asyncpg_dsn(self.dsn), min_size=1, max_size=4)
+
+    async def get_pool(self):
+        """مجمع الاتصالات (None إذا كان التخزين معطلاً أو الاتصال فاشلاً مؤخراً)"""
+        if not self.enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._pool is not None and self._pool_loop is loop:
+            return self._pool
+        if time.monotonic() < self._retry_at:
+            return None
+
+        try:
+            pool = await self._create_pool()
+            async with pool.acquire() as conn:
+                await conn.execute(INDEX_SQL)
+        except Exception as e:
+            logger.error(f"❌ Candle persistence unavailable: {e}")
+            self._retry_at = time.monotonic() + RECONNECT_DELAY
+            return None
+
+        self._pool = pool
+        self._pool_loop = loop
+        self._flush_lock = asyncio.Lock()
+        return pool
+
+    async def start(self):
+        """بدء الكتابة الدورية"""
+        if self.enabled and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    # ---------------------- الكتابة ----------------------
+
+    def record(
+        self,
+        symbol: str,
+        timeframe: str,
+        open_time_ms: int,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+        source: str = "binance"
+    ):
+        """إضافة شمعة مغلقة للذاكرة المؤقتة (بدون انتظار)"""
+        if not self.enabled:
+            return
+        open_time_ms = int(open_time_ms)
+        self._buffer[(symbol, timeframe, open_time_ms)] = (
+            symbol, timeframe, ms_to_datetime(open_time_ms),
+            float(open), float(high), float(low), float(close), float(volume), source
+        )
+        self.stats["buffered"] += 1
+        if len(self._buffer) > self.max_pending:
+            del self._buffer[next(iter(self._buffer))]
+            self.stats["dropped"] += 1
+
+    def write_frame(self, symbol: str, timeframe: str, df: pd.DataFrame, source: str = "binance"):
+        """إضافة شموع DataFrame (time بالمللي ثانية) للذاكرة المؤقتة"""
+        for row in df[CANDLE_COLUMNS].itertuples(index=False):
+            self.record(symbol, timeframe, row.time, row.open, row.high, row.low, row.close, row.volume, source)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Candle flush loop error: {e}")
+
+    async def flush(self) -> int:
+        """كتابة الذاكرة المؤقتة دفعات عبر COPY"""
+        if not self._buffer:
+            return 0
+        pool = await self.get_pool()
+        if pool is None:
+            return 0
+
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                keys = list(self._buffer)[:self.batch_size]
+                rows = [self._buffer[key] for key in keys]
+                try:
+                    async with pool.acquire() as conn:
+                        await self._copy_rows(conn, rows)
+                except Exception as e:
+                    # تبقى الصفوف في الذاكرة للمحاولة التالية
+                    self.stats["errors"] += 1
+                    logger.error(f"❌ Candle COPY failed ({len(rows)} rows): {e}")
+                    break
+                for key, row in zip(keys, rows):
+                    # شمعة أُعيد تسجيلها أثناء الكتابة تبقى للدفعة التالية
+                    if self._buffer.get(key) is row:
+                        del self._buffer[key]
+                written += len(rows)
+
+        self.stats["written"] += written
+        self.stats["flushes"] += 1
+        return written
+
+    async def _copy_rows(self, conn, rows: List[Tuple]):
+        async with conn.transaction():
+            await conn.execute(TEMP_TABLE_SQL)
+            await conn.copy_records_to_table("_candles_in", records=rows, columns=COPY_COLUMNS)
+            columns = ", ".join(COPY_COLUMNS)
+            await conn.execute(
+                f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM _candles_in "
+                f"ON CONFLICT (symbol, timeframe, timestamp) DO NOTHING"
+            )
+
+    # ---------------------- القراءة ----------------------
+
+    async def read_range(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_ms: int,
+        end_ms: int
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        الشموع المحفوظة التي يقع وقت فتحها في [start_ms, end_ms]
+
+        Returns:
+            {"time": int64 ms, "open".."volume": float64} أو None إذا كان التخزين غير متاح
+        """
+        pool = await self.get_pool()
+        if pool is None:
+            return None
+
+        async with pool.acquire() as conn:
+            records = await conn.fetch(
+                f"SELECT (extract(epoch FROM timestamp) * 1000)::bigint AS time, "
+                f"open, high, low, close, volume FROM {TABLE} "
+                f"WHERE symbol = $1 AND timeframe = $2 AND timestamp BETWEEN $3 AND $4 "
+                f"ORDER BY timestamp",
+                symbol, timeframe, ms_to_datetime(start_ms), ms_to_datetime(end_ms)
+            )
+        return records_to_arrays(records)
+
+    async def get_range(
+        self,
+        market: str,
+        symbol: str,
+        timeframe: str,
+        start_ms: int,
+        end_ms: int,
+        fetch: FetchRange
+    ) -> Optional[pd.DataFrame]:
+        """
+        النطاق من قاعدة البيانات، مع جلب الفجوات فقط من المزود وحفظها
+
+        Returns:
+            DataFrame بأعمدة CANDLE_COLUMNS أو None إذا كان التخزين غير متاح
+        """
+        step = timeframe_to_ms(timeframe)
+        start_ms = -(-start_ms // step) * step
+        end_ms = (end_ms // step) * step
+        if end_ms < start_ms:
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+
+        stored = await self.read_range(symbol, timeframe, start_ms, end_ms)
+        if stored is None:
+            return None
+
+        frames = [pd.DataFrame(stored)]
+        gaps = missing_intervals(covered_runs(stored["time"], step), start_ms, end_ms, step)
+        if not gaps:
+            self.stats["read_hits"] += 1
+
+        for gap_start, gap_end in gaps:
+            self.stats["gap_fetches"] += 1
+            fetched = await fetch(gap_start, gap_end)
+            if fetched is None or fetched.empty:
+                continue
+            fetched = fetched[CANDLE_COLUMNS]
+            fetched = fetched[(fetched["time"] >= gap_start) & (fetched["time"] <= gap_end)]
+            self.write_frame(symbol, timeframe, fetched)
+            frames.append(fetched)
+
+        if len(frames) > 1:
+            # شموع أُدرجت داخل النطاق: بصمات المؤشرات لا تستأنف من بادئة قديمة
+            invalidate_prefix_states(symbol, timeframe)
+            await self.flush()
+
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        df["time"] = df["time"].astype(np.int64)
+        return df.drop_duplicates(subset=["time"], keep="last").sort_values("time").reset_index(drop=True)
+
+    async def backfill_gaps(
+        self,
+        fetch: Callable[[str, str, int, int], Awaitable[pd.DataFrame]],
+        max_days: int = 7,
+        max_concurrency: int = 4
+    ) -> int:
+        """
+        إكمال ما فات منذ آخر شمعة محفوظة لكل (symbol, timeframe) عند الإقلاع
+
+        Args:
+            fetch: (symbol, timeframe, start_ms, end_ms) -> DataFrame
+            max_days: أقصى مدة يُكمل منها (الرموز المتوقفة منذ مدة أطول تُكمل جزئياً)
+
+        Returns:
+            int: عدد الشموع المجلوبة
+        """
+        pool = await self.get_pool()
+        if pool is None:
+            return 0
+
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"SELECT symbol, timeframe, (extract(epoch FROM max(timestamp)) * 1000)::bigint AS last "
+                f"FROM {TABLE} GROUP BY symbol, timeframe"
+            )
+
+        now_ms = int(time.time() * 1000)
+        floor_ms = now_ms - max_days * 86_400_000
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fill(symbol: str, timeframe: str, last_ms: int) -> int:
+            step = timeframe_to_ms(timeframe)
+            start_ms = max(last_ms + step, floor_ms)
+            # آخر شمعة مغلقة
+            end_ms = (now_ms // step) * step - step
+            if end_ms < start_ms:
+                return 0
+            async with semaphore:
+                try:
+                    df = await fetch(symbol, timeframe, start_ms, end_ms)
+                except Exception as e:
+                    logger.error(f"❌ Backfill failed for {symbol} {timeframe}: {e}")
+                    return 0
+            if df is None or df.empty:
+                return 0
+            self.write_frame(symbol, timeframe, df)
+            invalidate_prefix_states(symbol, timeframe)
+            return len(df)
+
+        counts = await asyncio.gather(*(fill(r["symbol"], r["timeframe"], r["last"]) for r in rows))
+        await self.flush()
+        logger.info(f"✅ Candle backfill: {sum(counts)} candles for {len(rows)} series")
+        return sum(counts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "enabled": self.enabled, "pending": len(self._buffer)}
+
+
+def records_to_arrays(records: Iterable[Any]) -> Dict[str, np.ndarray]:
+    """صفوف (time, open, high, low, close, volume) إلى أعمدة NumPy"""
+    records = list(records)
+    arrays = {"time": np.fromiter((r[0] for r in records), dtype=np.int64, count=len(records))}
+    values = np.array([tuple(r[1:6]) for r in records], dtype=np.float64).reshape(len(records), 5)
+    for i, column in enumerate(CANDLE_COLUMNS[1:]):
+        arrays[column] = values[:, i]
+    return arrays
+
+
+# المثيل العام (مشترك بين كل نسخ DataService ومصادر إغلاق الشموع)
+candle_persistence = CandlePersistence(settings.DATABASE_URL, enabled=settings.CANDLE_PERSISTENCE)
@@ -51,7 +51,9 @@ class ChartManager:
                 dataframe=df,
                 indicators_config=indicators_config,
                 parallel=parallel,
-                use_cache=use_cache
+                use_cache=use_cache,
+                symbol=symbol,
+                timeframe=timeframe
             )
         else:
             indicators_result = {}
@@ -8,6 +8,8 @@ from app.services.indicators import apply_indicators, calculate_trading_signals
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database.redis_client import redis_client
 from app.providers.binance_provider import BinanceProvider
+from app.services.candle_cache import candle_cache, timeframe_to_ms, to_utc_datetime
+from app.services.candle_persistence import candle_persistence
 from app.utils.converters import TimeframeConverter
 import math
 import pandas as pd
@@ -206,16 +208,40 @@ class DataService:
         """
         الحصول على بيانات تاريخية
         """
-        cache_key = f"historical:{market}:{symbol}:{timeframe}:{days}"
-        
-        if use_cache:
+        if use_cache and market == "crypto" and candle_persistence.enabled:
+            # التخزين الدائم المشترك أولاً (Postgres)، الفجوات فقط من الكاش المحلي/المزود
             try:
-                cached = await redis_client.get_cached(cache_key)
-                if cached:
-                    return pd.DataFrame(cached)
+                df = await self._get_persisted_candles(symbol, timeframe, market, days)
+                if df is not None:
+                    return df
             except Exception as e:
-                logger.warning(f"Cache read error: {e}. Continuing without cache.")
-        
+                logger.warning(f"Candle persistence read error: {e}. Falling back.")
+
+        if use_cache and market == "crypto" and candle_cache.available:
+            # كاش الشموع المحلي: جلب الفجوات فقط بدلاً من كامل الفترة
+            return await self._get_cached_candles(symbol, timeframe, market, days)
+
+        cache_key = f"historical:{market}:{symbol}:{timeframe}:{days}"
+        if not use_cache:
+            return await self._load_historical(symbol, timeframe, market, days)
+
+        # الكاش ثنائي الطبقات: DataFrame ثنائي (Arrow) وجلب واحد لكل المتزامنين
+        cached = await redis_client.get_or_set(
+            cache_key,
+            lambda: self._load_historical(symbol, timeframe, market, days),
+            expire=3600
+        )
+        # قيم قديمة في Redis بصيغة records
+        return cached if isinstance(cached, pd.DataFrame) else pd.DataFrame(cached)
+
+    async def _load_historical(
+        self,
+        symbol: str,
+        timeframe: str,
+        market: str,
+        days: int
+    ) -> pd.DataFrame:
+        """جلب التاريخ من المزود مباشرة"""
         # تحديد المزود
         provider = self.providers.get(market)
         if not provider:
@@ -266,18 +292,7 @@ class DataService:
                 start_date=start_date,
                 end_date=end_date
             )
-        
-        # تخزين في الكاش (انتهاء بعد ساعة)
-        if use_cache and not df.empty:
-            try:
-                await redis_client.set_cached(
-                    cache_key,
-                    df.to_dict('records'),
-                    expire=3600
-                )
-            except Exception as e:
-                logger.warning(f"Cache write error: {e}. Continuing without caching.")
-        
+
         return df
     
 
@@ -286,6 +301,88 @@ class DataService:
 
 
 
+    async def _get_cached_candles(
+        self,
+        symbol: str,
+        timeframe: str,
+        market: str,
+        days: int
+    ) -> pd.DataFrame:
+        """الشموع المغلقة لآخر days يوم من كاش الشموع المحلي"""
+        provider = self.providers.get(market)
+        if not provider:
+            raise ValueError(f"Unsupported market: {market}")
+
+        step = timeframe_to_ms(timeframe)
+        end_date = datetime.now(timezone.utc)
+        start_date = end_date - timedelta(days=days)
+
+        async def fetch(gap_start: int, gap_end: int) -> pd.DataFrame:
+            # المزود يعيد الشموع المغلقة حتى end_date - مدة الشمعة
+            return await provider.get_historicalcandl(
+                symbol=symbol,
+                timeframe=timeframe,
+                start_date=to_utc_datetime(gap_start),
+                end_date=to_utc_datetime(gap_end + step)
+            )
+
+        return await candle_cache.get_range(
+            market=market,
+            symbol=symbol,
+            timeframe=timeframe,
+            start_ms=int(start_date.timestamp() * 1000),
+            end_ms=int(end_date.timestamp() * 1000) - step,
+            fetch=fetch
+        )
+
+    async def _get_persisted_candles(
+        self,
+        symbol: str,
+        timeframe: str,
+        market: str,
+        days: int
+    ) -> Optional[pd.DataFrame]:
+        """الشموع المغلقة من Postgres (None إذا كان التخزين غير متاح)"""
+        provider = self.providers.get(market)
+        if not provider:
+            raise ValueError(f"Unsupported market: {market}")
+
+        step = timeframe_to_ms(timeframe)
+        end_date = datetime.now(timezone.utc)
+        start_date = end_date - timedelta(days=days)
+
+        async def fetch(gap_start: int, gap_end: int) -> pd.DataFrame:
+            if candle_cache.available:
+                # الفجوة تمر بالكاش المحلي أولاً
+                async def fetch_provider(start: int, end: int) -> pd.DataFrame:
+                    return await provider.get_historicalcandl(
+                        symbol=symbol,
+                        timeframe=timeframe,
+                        start_date=to_utc_datetime(start),
+                        end_date=to_utc_datetime(end + step)
+                    )
+                return await candle_cache.get_range(market, symbol, timeframe, gap_start, gap_end, fetch_provider)
+            return await provider.get_historicalcandl(
+                symbol=symbol,
+                timeframe=timeframe,
+                start_date=to_utc_datetime(gap_start),
+                end_date=to_utc_datetime(gap_end + step)
+            )
+
+        return await candle_persistence.get_range(
+            market=market,
+            symbol=symbol,
+            timeframe=timeframe,
+            start_ms=int(start_date.timestamp() * 1000),
+            end_ms=int(end_date.timestamp() * 1000) - step,
+            fetch=fetch
+        )
+
+
+
+
+
+
     async def get_historicallastvirsion(
         self,
         symbol: str,
@@ -299,16 +396,26 @@ class DataService:
         الحصول على بيانات تاريخية
         """
         cache_key = f"historical:{market}:{symbol}:{timeframe}:{start_date.isoformat()}:{end_date.isoformat()}"
+        if not use_cache:
+            return await self._load_historical_range(symbol, timeframe, market, start_date, end_date)
+
+        # Arrow يحفظ فهرس الوقت (records كانت تفقده عند القراءة من الكاش)
+        cached = await redis_client.get_or_set(
+            cache_key,
+            lambda: self._load_historical_range(symbol, timeframe, market, start_date, end_date),
+            expire=3600
+        )
+        return cached if isinstance(cached, pd.DataFrame) else pd.DataFrame(cached)
 
-        
-        if use_cache:
-            try:
-                cached = await redis_client.get_cached(cache_key)
-                if cached:
-                    return pd.DataFrame(cached)
-            except Exception as e:
-                logger.warning(f"Cache read error: {e}. Continuing without cache.")
-        
+    async def _load_historical_range(
+        self,
+        symbol: str,
+        timeframe: str,
+        market: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> pd.DataFrame:
+        """جلب التاريخ لنطاق محدد من المزود مباشرة"""
         # تحديد المزود
         provider = self.providers.get(market)
         if not provider:
@@ -365,20 +472,6 @@ class DataService:
             df['time'] = pd.to_datetime(df['time'], unit='ms', utc=True)
             df = df.set_index('time')
 
-           
-
-
-        # تخزين في الكاش (انتهاء بعد ساعة)
-        if use_cache and not df.empty:
-            try:
-                await redis_client.set_cached(
-                    cache_key,
-                    df.to_dict('records'),
-                    expire=3600
-                )
-            except Exception as e:
-                logger.warning(f"Cache write error: {e}. Continuing without caching.")
-        
         return df
     
 
@@ -415,7 +508,9 @@ class DataService:
         indicator_results = apply_indicators(
             dataframe=dataframe,
             indicators_config=indicators_config,
-            use_cache=use_cache
+            use_cache=use_cache,
+            symbol=symbol,
+            timeframe=timeframe
         )
         
         # تحويل النتائج وتنظيفها
@@ -1,12 +1,17 @@
 from .core import FilteringEngine
 from .schemas import FilterCriteria, FilterResult, FilterRule, CompositeFilter
+from .screener import ScreenerPanel, screener_panel
+from .bulk import BulkFilterPlanner
 
 __all__ = [
     "FilteringEngine",
     "FilterCriteria",
     "FilterResult",
     "FilterRule",
-    "CompositeFilter"
+    "CompositeFilter",
+    "ScreenerPanel",
+    "screener_panel",
+    "BulkFilterPlanner"
 ]
 
 # إنشاء كائن FilteringEngine عالمي
@@ -0,0 +1,270 @@
+# app/services/filtering/bulk.py
+"""
+مخطط تنفيذ الفلترة المجمّعة (/filtering/bulk).
+
+بدلاً من تشغيل filter_symbols لكل (سوق × معايير) وكل منها يجلب الرموز
+والتاريخ بنفسه، يعمل المخطط على مراحل:
+
+1. plan: تجميع احتياجات البيانات لكل المعايير بدون تكرار
+   (قائمة رموز واحدة لكل سوق، وتاريخ واحد لكل رمز/إطار/فترة)
+2. prefetch: جلب الاحتياجات مرة واحدة بتوازٍ محدود (Semaphore)
+3. evaluate: تقييم كل المعايير على البيانات المشتركة في الذاكرة
+   عبر لوحة فاحص مؤقتة (ScreenerPanel) لكل سوق
+
+المعايير التي تستطيع لوحة الفاحص العامة الإجابة عليها لا تحتاج أي جلب،
+والمعايير غير المدعومة في اللوحة (مؤشر بدون نواة متجهة) ترجع للمسار القديم.
+"""
+import re
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from .schemas import FilterCriteria
+from .screener import ScreenerPanel
+from app.markets.timeframe import TIMEFRAME_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DataNeed:
+    """احتياج بيانات تاريخية واحد (مفتاح إزالة التكرار)"""
+    market: str
+    symbol: str
+    timeframe: str
+    days: int
+
+
+@dataclass
+class BulkJob:
+    """معايير واحدة على سوق واحد"""
+    key: str
+    market: str
+    index: int
+    criteria: FilterCriteria
+    source: str = "prefetch"  # screener / symbols / prefetch / legacy
+    candidates: List[str] = field(default_factory=list)
+    universe: int = 0  # عدد رموز السوق قبل الفلترة
+
+
+def needs_market_data(criteria: FilterCriteria) -> bool:
+    """هل تحتاج المعايير بيانات أسعار/مؤشرات (وليس أسماء الرموز فقط)؟"""
+    return bool(
+        criteria.min_price or criteria.max_price or criteria.min_volume
+        or criteria.min_volume_24h or criteria.max_volatility
+        or criteria.required_indicators or criteria.indicator_filters
+        or criteria.custom_filters or criteria.composite_filter
+        or criteria.sort_by
+    )
+
+
+def candidate_symbols(symbols: List[str], criteria: FilterCriteria) -> List[str]:
+    """الفلاتر التي لا تحتاج بيانات (النمط والرموز المستبعدة)"""
+    excluded = set((criteria.user_preferences or {}).get("excluded_symbols") or [])
+    if criteria.symbol_pattern:
+        regex = re.compile("^" + criteria.symbol_pattern.replace("*", ".*").replace("?", ".") + "$")
+        symbols = [s for s in symbols if regex.match(s)]
+    return [s for s in symbols if s not in excluded]
+
+
+class BulkFilterPlanner:
+    """تنفيذ عدة معايير على عدة أسواق ببيانات مشتركة"""
+
+    def __init__(
+        self,
+        engine: Any,
+        max_concurrency: int = 8,
+        timeframe: str = "1h",
+        days: int = 7,
+        data_service: Any = None
+    ):
+        # مصدر بيانات الطلب على نسخة من المحرك (المحرك العام لا يحتفظ بجلسة الطلب)
+        self.engine = engine.with_data_service(data_service) if data_service is not None else engine
+        self.max_concurrency = max(1, max_concurrency)
+        # نفس نافذة المسار القديم (_evaluate_symbol_indicators)
+        self.timeframe = timeframe
+        self.days = days
+
+    async def run(self, markets: List[str], criteria_list: List[FilterCriteria]) -> Dict[str, Any]:
+        """
+        تنفيذ الفلترة المجمّعة
+
+        Returns:
+            results: نتيجة لكل (سوق، رقم المعايير)
+            plan: إحصائيات إزالة التكرار
+            timings_ms: زمن كل مرحلة
+        """
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+
+        # 1. التخطيط: الأسواق التي تحتاج قائمة رموز
+        jobs = [
+            BulkJob(f"{market}_{index}", market, index, criteria)
+            for market in markets
+            for index, criteria in enumerate(criteria_list)
+        ]
+        for job in jobs:
+            if self.engine.screener.can_screen(job.market, job.criteria):
+                job.source = "screener"
+
+        symbol_markets = sorted({job.market for job in jobs if job.source != "screener"})
+        stage = time.perf_counter()
+        symbols_by_market = dict(zip(
+            symbol_markets,
+            await asyncio.gather(*(self.engine._get_all_symbols(m) for m in symbol_markets))
+        ))
+        timings["symbols"] = (time.perf_counter() - stage) * 1000
+
+        # احتياجات التاريخ بدون تكرار
+        stage = time.perf_counter()
+        needs: Set[DataNeed] = set()
+        requested = 0
+        for job in jobs:
+            if job.source == "screener":
+                continue
+            job.universe = len(symbols_by_market[job.market])
+            job.candidates = candidate_symbols(symbols_by_market[job.market], job.criteria)
+            if not needs_market_data(job.criteria):
+                job.source = "symbols"
+                continue
+            requested += len(job.candidates)
+            needs.update(DataNeed(job.market, s, self.timeframe, self.days) for s in job.candidates)
+        timings["plan"] = (time.perf_counter() - stage) * 1000
+
+        # 2. الجلب المسبق
+        stage = time.perf_counter()
+        history = await self._prefetch(needs)
+        timings["prefetch"] = (time.perf_counter() - stage) * 1000
+
+        # 3. التقييم على البيانات المشتركة
+        stage = time.perf_counter()
+        panels = self._build_panels(symbol_markets, history)
+        results: Dict[str, Any] = {}
+        legacy_jobs = []
+        for job in jobs:
+            try:
+                if job.source == "screener":
+                    results[job.key] = self._panel_result(job, self.engine.screener)
+                elif job.source == "symbols":
+                    results[job.key] = self._symbols_result(job)
+                else:
+                    panel = panels[job.market]
+                    if panel.supports(job.criteria):
+                        results[job.key] = self._panel_result(job, panel)
+                    else:
+                        job.source = "legacy"
+                        legacy_jobs.append(job)
+            except Exception as e:
+                results[job.key] = {"market": job.market, "criteria_index": job.index, "error": str(e)}
+        timings["evaluate"] = (time.perf_counter() - stage) * 1000
+
+        # المسار القديم للمعايير غير المدعومة (بنفس حد التوازي)
+        if legacy_jobs:
+            stage = time.perf_counter()
+            results.update(await self._run_legacy(legacy_jobs))
+            timings["legacy"] = (time.perf_counter() - stage) * 1000
+
+        timings["total"] = (time.perf_counter() - started) * 1000
+        return {
+            "results": {job.key: results[job.key] for job in jobs},
+            "plan": {
+                "jobs": len(jobs),
+                "sources": {s: sum(1 for j in jobs if j.source == s) for s in ("screener", "symbols", "prefetch", "legacy")},
+                "history_requested": requested,
+                "history_unique": len(needs),
+                "history_loaded": len(history),
+                "max_concurrency": self.max_concurrency,
+            },
+            "timings_ms": {name: round(value, 3) for name, value in timings.items()},
+        }
+
+    async def _prefetch(self, needs: Set[DataNeed]) -> Dict[DataNeed, pd.DataFrame]:
+        """جلب كل احتياج مرة واحدة بتوازٍ محدود"""
+        data_service = self.engine.data_service
+        if data_service is None or not needs:
+            return {}
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(need: DataNeed) -> Tuple[DataNeed, Optional[pd.DataFrame]]:
+            async with semaphore:
+                try:
+                    df = await data_service.get_historical(
+                        symbol=need.symbol,
+                        timeframe=need.timeframe,
+                        market=need.market,
+                        days=need.days
+                    )
+                    return need, df
+                except Exception as e:
+                    print(f"Error prefetching {need.symbol} ({need.market}): {e}")
+                    return need, None
+
+        fetched = await asyncio.gather(*(fetch(need) for need in needs))
+        return {need: df for need, df in fetched if df is not None and not df.empty}
+
+    def _build_panels(
+        self,
+        markets: List[str],
+        history: Dict[DataNeed, pd.DataFrame]
+    ) -> Dict[str, ScreenerPanel]:
+        """لوحة مؤقتة لكل سوق من البيانات المجلوبة (فارغة إذا لم يُجلب شيء)"""
+        max_bars = self.days * 86400 // TIMEFRAME_SECONDS.get(self.timeframe, 3600)
+        panels = {
+            market: ScreenerPanel(self.timeframe, max_bars, market, initial_capacity=max(len(history), 1))
+            for market in markets
+        }
+        for need in sorted(history, key=lambda need: need.symbol):
+            panels[need.market].load_history(need.symbol, history[need])
+        return panels
+
+    def _panel_result(self, job: BulkJob, panel: ScreenerPanel) -> Dict[str, Any]:
+        screened = panel.screen(job.criteria)
+        if job.source != "screener":
+            # اللوحة المؤقتة تحوي الرموز المجلوبة فقط، العدد الكلي = رموز السوق
+            screened["total_count"] = job.universe
+        return self._format(job, screened)
+
+    def _symbols_result(self, job: BulkJob) -> Dict[str, Any]:
+        criteria = job.criteria
+        page = job.candidates[criteria.offset:criteria.offset + criteria.limit]
+        return self._format(job, {
+            "symbols": page,
+            "total_count": job.universe,
+            "filtered_count": len(job.candidates),
+            "filtered_symbols": [{"symbol": s, "market": job.market} for s in page],
+        })
+
+    async def _run_legacy(self, jobs: List[BulkJob]) -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(job: BulkJob) -> Tuple[str, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    result = await self.engine.filter_symbols(job.market, job.criteria)
+                except Exception as e:
+                    return job.key, {"market": job.market, "criteria_index": job.index, "error": str(e)}
+                return job.key, self._format(job, {
+                    "symbols": result.symbols,
+                    "total_count": result.total_count,
+                    "filtered_count": result.filtered_count,
+                    "filtered_symbols": result.filtered_symbols,
+                })
+
+        return dict(await asyncio.gather(*(run(job) for job in jobs)))
+
+    def _format(self, job: BulkJob, screened: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "market": job.market,
+            "criteria_index": job.index,
+            "source": job.source,
+            "symbols": screened["symbols"],
+            "count": len(screened["symbols"]),
+            "total_count": screened["total_count"],
+            "filtered_count": screened["filtered_count"],
+            "filtered_symbols": screened["filtered_symbols"],
+        }
@@ -1,5 +1,7 @@
 from typing import Dict, List, Any, Optional, Tuple
 import re
+import copy
+import time
 import asyncio
 from datetime import datetime, timedelta
 import pandas as pd
@@ -10,26 +12,42 @@ from .schemas import (
     CompositeFilter, FilterType, FilterOperator
 )
 from app.services.data_service import DataService
+from app.database.redis_client import redis_client
 from app.services.indicators import IndicatorCalculator
+from app.markets.timeframe import TIMEFRAME_SECONDS
+from .screener import ScreenerPanel, screener_panel
+
+# ثوانٍ بعد إغلاق الشمعة قبل تحديث لوحة الفاحص
+SCREENER_REFRESH_DELAY = 5
+
 
 class FilteringEngine:
     """محرك فلترة متقدم"""
     
-    def __init__(self, data_service: DataService = None):
+    def __init__(self, data_service: DataService = None, screener: Optional[ScreenerPanel] = None):
         self.data_service = data_service
         self.indicator_calculator = IndicatorCalculator()
+        # لوحة الشموع في الذاكرة (فلترة متجهة بدون شبكة)
+        self.screener = screener or screener_panel
         
-        # كاش للنتائج
-        self.cache: Dict[str, Tuple[datetime, FilterResult]] = {}
+        # كاش النتائج: الكاش المشترك (LRU محلي + Redis)، مساحة المفاتيح "filter"
+        self.cache = redis_client.cache
         self.cache_ttl = 300  # 5 دقائق
         
         # إحصائيات
         self.stats = {
             "total_filters": 0,
             "cache_hits": 0,
-            "cache_misses": 0
+            "cache_misses": 0,
+            "screener_hits": 0
         }
     
+    def with_data_service(self, data_service: DataService) -> "FilteringEngine":
+        """نسخة تشارك اللوحة والكاش والإحصائيات مع مصدر بيانات آخر (جلسة طلب)"""
+        engine = copy.copy(self)
+        engine.data_service = data_service
+        return engine
+    
     async def filter_symbols(
         self,
         market: str,
@@ -49,13 +67,17 @@ class FilteringEngine:
         """
         start_time = datetime.utcnow()
         
+        # المسار السريع: اللوحة في الذاكرة تجيب بدون كاش ولا شبكة
+        if self.screener.can_screen(market, criteria):
+            return self._screen_from_panel(criteria, start_time)
+        
         # التحقق من الكاش
         cache_key = self._generate_cache_key(market, criteria)
-        if use_cache and cache_key in self.cache:
-            cached_time, cached_result = self.cache[cache_key]
-            if (datetime.utcnow() - cached_time).seconds < self.cache_ttl:
+        if use_cache:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
                 self.stats["cache_hits"] += 1
-                return cached_result
+                return FilterResult.model_validate(cached)
         
         self.stats["cache_misses"] += 1
         self.stats["total_filters"] += 1
@@ -132,13 +154,93 @@ class FilteringEngine:
         
         # تخزين في الكاش
         if use_cache:
-            self.cache[cache_key] = (datetime.utcnow(), result)
-            
-            # تنظيف الكاش القديم
-            self._clean_cache()
+            await self.cache.set(cache_key, result.model_dump(mode="json"), self.cache_ttl)
         
         return result
     
+    def _screen_from_panel(self, criteria: FilterCriteria, start_time: datetime) -> FilterResult:
+        """فلترة كل الرموز دفعة واحدة من لوحة الفاحص"""
+        self.stats["total_filters"] += 1
+        self.stats["screener_hits"] += 1
+        
+        screened = self.screener.screen(criteria)
+        execution_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+        
+        return FilterResult(
+            symbols=screened["symbols"],
+            total_count=screened["total_count"],
+            filtered_count=screened["filtered_count"],
+            filtered_symbols=screened["filtered_symbols"],
+            criteria=criteria,
+            execution_time_ms=execution_time
+        )
+    
+    async def warm_up_screener(
+        self,
+        symbols: List[str],
+        days: int = 7,
+        max_concurrency: int = 8,
+        data_service: Optional[DataService] = None
+    ) -> int:
+        """
+        تعبئة لوحة الفاحص من البيانات التاريخية
+        
+        Returns:
+            int: عدد الرموز التي تم تحميلها
+        """
+        data_service = data_service or self.data_service
+        if data_service is None:
+            return 0
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def load(symbol: str) -> bool:
+            async with semaphore:
+                try:
+                    df = await data_service.get_historical(
+                        symbol=symbol,
+                        timeframe=self.screener.timeframe,
+                        market=self.screener.market,
+                        days=days
+                    )
+                except Exception as e:
+                    print(f"Error warming up screener for {symbol}: {e}")
+                    return False
+                if df is None or df.empty:
+                    return False
+                self.screener.load_history(symbol, df)
+                return True
+        
+        loaded = await asyncio.gather(*(load(symbol) for symbol in symbols))
+        return sum(loaded)
+    
+    async def run_screener_feed(
+        self,
+        data_service: DataService,
+        days: int = 7,
+        max_concurrency: int = 8
+    ):
+        """
+        تغذية لوحة الفاحص من شموع المزود (في الخلفية حتى الإلغاء)
+        
+        تُعبأ كل رموز السوق عند الإقلاع ثم يُعاد تحميلها بعد إغلاق كل شمعة
+        من إطار اللوحة، فتحمل اللوحة نفس نافذة get_historical (days) التي
+        يقرؤها المسار القديم. كاش الشموع المحلي يجعل التحديث يجلب الفجوة فقط.
+        """
+        interval = TIMEFRAME_SECONDS.get(self.screener.timeframe, 3600)
+        while True:
+            try:
+                symbols = await data_service.get_symbols(self.screener.market)
+                loaded = await self.warm_up_screener(symbols, days, max_concurrency, data_service)
+                print(f"✅ Screener panel refreshed: {loaded}/{len(symbols)} symbols")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error refreshing screener: {e}")
+            
+            # حتى إغلاق الشمعة التالية (مع هامش حتى تتوفر عند المزود)
+            await asyncio.sleep(interval - time.time() % interval + SCREENER_REFRESH_DELAY)
+    
     async def _get_all_symbols(self, market: str) -> List[str]:
         """الحصول على جميع الرموز في سوق معين"""
         if self.data_service:
@@ -573,24 +675,13 @@ class FilteringEngine:
         import hashlib
         
         criteria_str = f"{market}_{criteria.json()}"
-        return hashlib.md5(criteria_str.encode()).hexdigest()
-    
-    def _clean_cache(self):
-        """تنظيف الكاش القديم"""
-        current_time = datetime.utcnow()
-        expired_keys = []
-        
-        for key, (cached_time, _) in self.cache.items():
-            if (current_time - cached_time).seconds > self.cache_ttl:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del self.cache[key]
+        return f"filter:{hashlib.md5(criteria_str.encode()).hexdigest()}"
     
     def get_stats(self) -> Dict[str, Any]:
         """الحصول على إحصائيات المحرك"""
         return {
             **self.stats,
-            "cache_size": len(self.cache),
-            "cache_ttl": self.cache_ttl
+            "cache": self.cache.get_stats()["namespaces"].get("filter", {}),
+            "cache_ttl": self.cache_ttl,
+            "screener": self.screener.get_stats()
         }
\ No newline at end of file
@@ -0,0 +1,564 @@
+# app/services/filtering/screener.py
+"""
+فاحص السوق الكامل (Screener) فوق لوحة شموع في الذاكرة.
+
+اللوحة مصفوفة (رموز × شموع) لآخر N شمعة لكل رمز، تُغذّى من شموع المزود
+(FilteringEngine.run_screener_feed: إحماء عند الإقلاع ثم تحديث بعد كل شمعة).
+آخر شمعة دائماً في العمود الأخير، والرموز ذات التاريخ الأقصر تُبطّن بـ NaN من اليسار.
+
+اللوحة تجيب فقط إذا كان لكل رمز تاريخ كافٍ للمعايير (can_screen): إما مُعبأ
+من التاريخ الكامل (load_history) أو يحمل النافذة المطلوبة، وإلا يُستخدم المسار القديم.
+
+المؤشرات والشروط والترتيب تُحسب لكل الرموز دفعة واحدة بعمليات متجهة،
+بدون أي طلب شبكة أثناء الفلترة. القيم مطابقة لآخر قيمة من مؤشرات السجل
+(نفس الصيغ: rolling بدون min_periods و ewm(adjust=False)) على نفس النافذة.
+"""
+import re
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .schemas import CompositeFilter, FilterCondition, FilterCriteria, FilterOperator, FilterRule
+from app.config import settings
+from app.markets.timeframe import TIMEFRAME_SECONDS
+from app.services.indicators.registry import IndicatorRegistry
+from app.services.indicators.indicators import (
+    SMAIndicator, SMAFastIndicator, SMASlowIndicator,
+    EMAIndicator, EMA9Indicator, EMA21Indicator,
+    RSIIndicator, MACDIndicator, StochasticIndicator,
+    BollingerBandsIndicator, ATRIndicator
+)
+
+logger = logging.getLogger(__name__)
+
+PANEL_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# أقل عدد شموع لتقييم المؤشرات (نفس شرط _evaluate_symbol_indicators)
+MIN_INDICATOR_BARS = 20
+
+# حقول محسوبة من الشموع مباشرة (بدون مؤشر)
+BASE_FIELDS = ("price", "volume", "volume_24h", "change_24h", "volatility")
+
+
+# ====================== نوى المؤشرات المتجهة ======================
+
+def ewm_series(values: np.ndarray, alpha: float) -> np.ndarray:
+    """ewm(alpha, adjust=False) لكل صف، يبدأ من أول قيمة غير NaN في الصف"""
+    out = np.empty_like(values)
+    current = np.full(values.shape[0], np.nan)
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        current = np.where(np.isnan(current), x, alpha * x + (1 - alpha) * current)
+        out[:, t] = current
+    return out
+
+
+def rolling_mean_last(values: np.ndarray, period: int) -> np.ndarray:
+    """آخر قيمة من rolling(period).mean() (NaN إذا كانت الشموع أقل من الفترة)"""
+    period = int(period)
+    if period <= 0 or values.shape[1] < period:
+        return np.full(values.shape[0], np.nan)
+    return values[:, -period:].mean(axis=1)
+
+
+def panel_sma(panel: Dict[str, np.ndarray], period: int) -> np.ndarray:
+    return rolling_mean_last(panel["close"], period)
+
+
+def panel_ema(panel: Dict[str, np.ndarray], period: int) -> np.ndarray:
+    return ewm_series(panel["close"], 2.0 / (period + 1))[:, -1]
+
+
+def panel_rsi(panel: Dict[str, np.ndarray], period: int = 14) -> np.ndarray:
+    close = panel["close"]
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    valid = ~np.isnan(close)
+    # أول شمعة لكل رمز: فرق NaN يصبح 0 (مثل fillna(0))
+    gain = np.where(valid, np.nan_to_num(np.clip(delta, 0, None)), np.nan)
+    loss = np.where(valid, np.nan_to_num(np.clip(-delta, 0, None)), np.nan)
+
+    avg_gain = ewm_series(gain, 1.0 / period)[:, -1]
+    avg_loss = ewm_series(loss, 1.0 / period)[:, -1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    rsi[(avg_loss == 0) & (avg_gain > 0)] = 100
+    rsi[(avg_gain == 0) & (avg_loss > 0)] = 0
+    rsi[(avg_gain == 0) & (avg_loss == 0)] = 50
+    return rsi
+
+
+def panel_macd(panel: Dict[str, np.ndarray], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    close = panel["close"]
+    macd_line = ewm_series(close, 2.0 / (fast + 1)) - ewm_series(close, 2.0 / (slow + 1))
+    signal_line = ewm_series(macd_line, 2.0 / (signal + 1))
+    return {
+        "macd_line": macd_line[:, -1],
+        "signal_line": signal_line[:, -1],
+        "histogram": macd_line[:, -1] - signal_line[:, -1],
+    }
+
+
+def panel_atr(panel: Dict[str, np.ndarray], period: int = 14) -> np.ndarray:
+    high, low, close = panel["high"], panel["low"], panel["close"]
+    prev_close = np.roll(close, 1, axis=1)
+    prev_close[:, 0] = np.nan
+    # fmax يتجاهل NaN مثل concat(...).max(axis=1)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return rolling_mean_last(true_range, period)
+
+
+def panel_stochastic(panel: Dict[str, np.ndarray], k_period: int = 14, smooth: int = 3) -> np.ndarray:
+    """آخر قيمة من %K المنعّم (قيم StochasticIndicator)"""
+    width = k_period + smooth - 1
+    n = panel["close"].shape[0]
+    if panel["close"].shape[1] < width:
+        return np.full(n, np.nan)
+    low_min = sliding_window_view(panel["low"][:, -width:], k_period, axis=1).min(axis=2)
+    high_max = sliding_window_view(panel["high"][:, -width:], k_period, axis=1).max(axis=2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k_line = 100 * (panel["close"][:, -smooth:] - low_min) / (high_max - low_min)
+    return k_line.mean(axis=1)
+
+
+def _sma_period(name: str, params: Dict[str, Any]) -> int:
+    """نفس منطق SMAIndicator: الفترة من الاسم (sma_8_1h -> 8) وإلا من المعاملات"""
+    try:
+        return int(name.split('_')[1])
+    except (IndexError, ValueError):
+        return params.get("period", 20)
+
+
+# فئة المؤشر في السجل -> نواة تعيد آخر قيمة (values) لكل الرموز
+_PANEL_KERNELS: Dict[type, Callable[[Dict[str, np.ndarray], str, Dict[str, Any]], np.ndarray]] = {
+    SMAIndicator: lambda panel, name, params: panel_sma(panel, _sma_period(name, params)),
+    SMAFastIndicator: lambda panel, name, params: panel_sma(panel, params.get("period", 10)),
+    SMASlowIndicator: lambda panel, name, params: panel_sma(panel, params.get("period", 20)),
+    EMAIndicator: lambda panel, name, params: panel_ema(panel, params.get("period", 20)),
+    EMA9Indicator: lambda panel, name, params: panel_ema(panel, params.get("period", 9)),
+    EMA21Indicator: lambda panel, name, params: panel_ema(panel, params.get("period", 21)),
+    RSIIndicator: lambda panel, name, params: panel_rsi(panel, int(params.get("period", 14))),
+    MACDIndicator: lambda panel, name, params: panel_macd(
+        panel, params.get("fast", 12), params.get("slow", 26), params.get("signal", 9)
+    )["macd_line"],
+    BollingerBandsIndicator: lambda panel, name, params: panel_sma(panel, params.get("period", 20)),
+    ATRIndicator: lambda panel, name, params: panel_atr(panel, params.get("period", 14)),
+    StochasticIndicator: lambda panel, name, params: panel_stochastic(
+        panel, params.get("k_period", 14), params.get("smooth", 3)
+    ),
+}
+
+
+def panel_kernel(name: str) -> Optional[Callable]:
+    """نواة المؤشر المتجهة، أو None إذا لم يكن مدعوماً في اللوحة"""
+    return _PANEL_KERNELS.get(IndicatorRegistry.get_indicator(name))
+
+
+# ====================== اللوحة ======================
+
+class ScreenerPanel:
+    """لوحة (رموز × شموع) لإطار زمني واحد مع فحص متجه"""
+
+    def __init__(
+        self,
+        timeframe: str = "1h",
+        max_bars: int = 168,
+        market: str = "crypto",
+        initial_capacity: int = 512
+    ):
+        self.timeframe = timeframe
+        self.max_bars = max(int(max_bars), 2)
+        self.market = market
+        self.bars_per_day = max(86400 // TIMEFRAME_SECONDS.get(timeframe, 3600), 1)
+
+        self.symbols: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._allocate(initial_capacity)
+
+        # يتغير مع كل إضافة؛ كاش الحقول المحسوبة صالح لنفس الإصدار فقط
+        self.version = 0
+        self._field_cache: Dict[Tuple, np.ndarray] = {}
+        self._field_cache_version = -1
+
+    def _allocate(self, capacity: int):
+        self.data = np.full((len(PANEL_COLUMNS), capacity, self.max_bars), np.nan)
+        self.times = np.full((capacity, self.max_bars), -1, dtype=np.int64)  # open_time بالنانو ثانية
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        # الرمز مُعبأ من تاريخ المزود (تاريخه كامل حتى لو كان أقصر من النافذة)
+        self.loaded = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, needed: int):
+        capacity = self.data.shape[1]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        data, times, counts, loaded = self.data, self.times, self.counts, self.loaded
+        self._allocate(capacity)
+        self.data[:, :data.shape[1]] = data
+        self.times[:len(times)] = times
+        self.counts[:len(counts)] = counts
+        self.loaded[:len(loaded)] = loaded
+
+    @property
+    def symbol_count(self) -> int:
+        return len(self.symbols)
+
+    def _row_indices(self, symbols: Sequence[str]) -> np.ndarray:
+        for symbol in symbols:
+            if symbol not in self._rows:
+                self._rows[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+        self._grow(len(self.symbols))
+        return np.fromiter((self._rows[s] for s in symbols), dtype=np.intp, count=len(symbols))
+
+    def append_batch(
+        self,
+        symbols: Sequence[str],
+        times_ns: np.ndarray,
+        ohlcv: np.ndarray
+    ):
+        """
+        إضافة شمعة مغلقة لكل رمز في الدفعة.
+
+        Args:
+            symbols: رموز فريدة
+            times_ns: وقت فتح الشمعة بالنانو ثانية لكل رمز
+            ohlcv: مصفوفة (5 × len(symbols)) بترتيب PANEL_COLUMNS
+        """
+        if len(symbols) == 0:
+            return
+        rows = self._row_indices(symbols)
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+
+        # نفس وقت آخر شمعة (إعادة إرسال/تحديث): استبدال بدل الإزاحة
+        same = self.times[rows, -1] == times_ns
+        shift_rows = rows[~same]
+        if len(shift_rows):
+            block = self.data[:, shift_rows]
+            block[:, :, :-1] = block[:, :, 1:]
+            self.data[:, shift_rows] = block
+            self.times[shift_rows, :-1] = self.times[shift_rows, 1:]
+            self.counts[shift_rows] = np.minimum(self.counts[shift_rows] + 1, self.max_bars)
+
+        self.data[:, rows, -1] = ohlcv
+        self.times[rows, -1] = times_ns
+        self.version += 1
+
+    def on_candles_close(self, candles: List[Any]):
+        """إضافة دفعة شموع مغلقة (يتجاهل الأطر الزمنية الأخرى)"""
+        candles = [c for c in candles if c.timeframe == self.timeframe]
+        if not candles:
+            return
+        # آخر شمعة لكل رمز إذا تكرر في الدفعة
+        latest = {c.symbol: c for c in candles}
+        self.append_batch(
+            list(latest),
+            np.fromiter((pd.Timestamp(c.open_time).value for c in latest.values()), dtype=np.int64),
+            np.array([[c.open, c.high, c.low, c.close, c.volume] for c in latest.values()]).T
+        )
+
+    def load_history(self, symbol: str, df: pd.DataFrame):
+        """تعبئة رمز من DataFrame تاريخي (open/high/low/close/volume)"""
+        if df is None or df.empty:
+            return
+        df = df.iloc[-self.max_bars:]
+        if "time" in df.columns:
+            unit = "ms" if np.issubdtype(df["time"].dtype, np.number) else None
+            times = pd.DatetimeIndex(pd.to_datetime(df["time"], unit=unit))
+        else:
+            times = pd.DatetimeIndex(df.index)
+        if times.tz is not None:
+            times = times.tz_convert(None)
+
+        row = self._row_indices([symbol])[0]
+        n = len(df)
+        self.data[:, row] = np.nan
+        self.times[row] = -1
+        for i, column in enumerate(PANEL_COLUMNS):
+            self.data[i, row, -n:] = df[column].to_numpy(dtype=np.float64)
+        self.times[row, -n:] = times.asi8
+        self.counts[row] = n
+        self.loaded[row] = True
+        self.version += 1
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """أعمدة اللوحة للرموز المسجلة فقط (views)"""
+        n = self.symbol_count
+        return {name: self.data[i, :n] for i, name in enumerate(PANEL_COLUMNS)}
+
+    # ---------------------- الحقول ----------------------
+
+    def supports_field(self, field: str) -> bool:
+        if field in BASE_FIELDS:
+            return True
+        if field.startswith("indicator."):
+            field = field.split(".", 1)[1]
+        return panel_kernel(field) is not None
+
+    def field(self, field: str, params: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """قيمة حقل لكل الرموز (مع كاش حتى الإضافة التالية)"""
+        if self._field_cache_version != self.version:
+            self._field_cache.clear()
+            self._field_cache_version = self.version
+
+        if field.startswith("indicator."):
+            field = field.split(".", 1)[1]
+        params = params or {}
+        cache_key = (field, tuple(sorted((k, repr(v)) for k, v in params.items())))
+        if cache_key not in self._field_cache:
+            self._field_cache[cache_key] = self._compute_field(field, params)
+        return self._field_cache[cache_key]
+
+    def _compute_field(self, field: str, params: Dict[str, Any]) -> np.ndarray:
+        panel = self.columns()
+        close = panel["close"]
+        day = min(self.bars_per_day, self.max_bars - 1)
+
+        if field == "price":
+            return close[:, -1]
+        if field == "volume":
+            return panel["volume"][:, -1]
+        if field == "volume_24h":
+            return np.nansum(panel["volume"][:, -day:], axis=1)
+        if field == "change_24h":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return (close[:, -1] / close[:, -1 - day] - 1) * 100
+        if field == "volatility":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                returns = close[:, -day:] / close[:, -day - 1:-1] - 1
+            return np.std(returns, axis=1, ddof=1) * 100
+
+        kernel = panel_kernel(field)
+        if kernel is None:
+            raise ValueError(f"Indicator not supported by screener: {field}")
+        values = kernel(panel, field, params)
+        # نفس شرط المسار القديم: أقل من MIN_INDICATOR_BARS شمعة = غير صالح
+        return np.where(self.counts[:self.symbol_count] >= MIN_INDICATOR_BARS, values, np.nan)
+
+    # ---------------------- الفحص ----------------------
+
+    def can_screen(self, market: str, criteria: FilterCriteria) -> bool:
+        """هل يمكن الإجابة على المعايير من اللوحة وحدها؟"""
+        if market != self.market or self.symbol_count == 0 or not self.supports(criteria):
+            return False
+        # كل رمز يجب أن يحمل تاريخاً كافياً، وإلا تختلف النتيجة عن المسار القديم
+        n = self.symbol_count
+        ready = self.loaded[:n] | (self.counts[:n] >= self.required_bars(criteria))
+        return bool(ready.all())
+
+    def supports(self, criteria: FilterCriteria) -> bool:
+        """هل كل حقول المعايير محسوبة في اللوحة؟"""
+        names = list(criteria.indicator_filters or {}) + list(criteria.required_indicators or [])
+        if any(panel_kernel(name) is None for name in names):
+            return False
+        return all(self.supports_field(field) for field in _criteria_fields(criteria))
+
+    def required_bars(self, criteria: FilterCriteria) -> int:
+        """
+        أقل عدد شموع لكل رمز غير مُعبأ من التاريخ
+
+        المؤشرات تحتاج النافذة كاملة (EMA/RSI تبدأ من أول شمعة في نافذة
+        get_historical)، وحقول الـ 24 ساعة تحتاج يوماً + شمعة.
+        """
+        fields = _criteria_fields(criteria)
+        if criteria.indicator_filters or criteria.required_indicators:
+            return self.max_bars
+        if any(field not in BASE_FIELDS for field in fields):
+            return self.max_bars
+        if fields & {"volume_24h", "change_24h", "volatility"}:
+            return min(self.bars_per_day, self.max_bars - 1) + 1
+        return 1
+
+    def screen(self, criteria: FilterCriteria) -> Dict[str, Any]:
+        """
+        تقييم المعايير على كل الرموز دفعة واحدة.
+
+        Returns:
+            symbols: الرموز بعد الترتيب والترقيم
+            total_count / filtered_count
+            filtered_symbols: بيانات الرموز المعروضة (من اللوحة)
+        """
+        n = self.symbol_count
+        symbols = np.asarray(self.symbols, dtype=object)
+        mask = self.counts[:n] > 0
+
+        # 1. الفلاتر الأساسية
+        if criteria.symbol_pattern:
+            regex = re.compile("^" + criteria.symbol_pattern.replace("*", ".*").replace("?", ".") + "$")
+            mask &= np.fromiter((bool(regex.match(s)) for s in self.symbols), dtype=bool, count=n)
+        price = self.field("price")
+        if criteria.min_price:
+            mask &= price >= criteria.min_price
+        if criteria.max_price:
+            mask &= price <= criteria.max_price
+        if criteria.min_volume:
+            mask &= self.field("volume") >= criteria.min_volume
+        if criteria.min_volume_24h:
+            mask &= self.field("volume_24h") >= criteria.min_volume_24h
+        if criteria.max_volatility:
+            mask &= self.field("volatility") <= criteria.max_volatility
+
+        # 2. فلاتر المؤشرات (min/max على آخر قيمة)
+        indicator_values = {}
+        if criteria.required_indicators or criteria.indicator_filters:
+            mask &= self.counts[:n] >= MIN_INDICATOR_BARS
+            for name in criteria.required_indicators or []:
+                indicator_values[name] = self.field(name)
+            for name, filter_config in (criteria.indicator_filters or {}).items():
+                values = self.field(name, filter_config.get("params"))
+                indicator_values[name] = values
+                mask &= ~np.isnan(values)
+                if "min" in filter_config:
+                    mask &= values >= filter_config["min"]
+                if "max" in filter_config:
+                    mask &= values <= filter_config["max"]
+
+        # 3. تفضيلات المستخدم
+        excluded = (criteria.user_preferences or {}).get("excluded_symbols")
+        if excluded:
+            mask &= ~np.isin(symbols, list(excluded))
+
+        # 4. الفلاتر المخصصة والمركبة
+        for rule in criteria.custom_filters or []:
+            if rule.enabled:
+                mask &= self._rule_mask(rule)
+        if criteria.composite_filter:
+            mask &= self._composite_mask(criteria.composite_filter)
+
+        # 5. الترتيب (NaN في النهاية) والترقيم
+        rows = np.flatnonzero(mask)
+        if criteria.sort_by:
+            keys = self.field(criteria.sort_by)[rows]
+            keys = -keys if criteria.sort_order == "desc" else keys
+            rows = rows[np.argsort(np.where(np.isnan(keys), np.inf, keys), kind="stable")]
+
+        page = rows[criteria.offset:criteria.offset + criteria.limit]
+        return {
+            "symbols": symbols[page].tolist(),
+            "total_count": n,
+            "filtered_count": int(len(rows)),
+            "filtered_symbols": self._symbols_data(page, indicator_values),
+        }
+
+    def _symbols_data(self, rows: np.ndarray, indicator_values: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        price = self.field("price")
+        change = self.field("change_24h")
+        volume = self.field("volume_24h")
+        last_times = self.times[rows, -1]
+
+        data = []
+        for i, row in enumerate(rows.tolist()):
+            item = {
+                "symbol": self.symbols[row],
+                "price": _finite(price[row]),
+                "timestamp": pd.Timestamp(int(last_times[i])).isoformat() if last_times[i] >= 0 else None,
+                "market": self.market,
+                "change_24h": _finite(change[row]),
+                "volume_24h": _finite(volume[row]),
+            }
+            if indicator_values:
+                item["indicators"] = {name: _finite(values[row]) for name, values in indicator_values.items()}
+            data.append(item)
+        return data
+
+    def _condition_mask(self, condition: FilterCondition) -> np.ndarray:
+        values = self.field(condition.field)
+        target = condition.value
+        op = condition.operator
+        valid = ~np.isnan(values)
+
+        with np.errstate(invalid="ignore"):
+            if op == FilterOperator.EQUALS:
+                result = values == target
+            elif op == FilterOperator.NOT_EQUALS:
+                result = values != target
+            elif op == FilterOperator.GREATER_THAN:
+                result = values > target
+            elif op == FilterOperator.GREATER_THAN_EQUAL:
+                result = values >= target
+            elif op == FilterOperator.LESS_THAN:
+                result = values < target
+            elif op == FilterOperator.LESS_THAN_EQUAL:
+                result = values <= target
+            elif op == FilterOperator.BETWEEN:
+                result = (values >= target[0]) & (values <= target[1])
+            elif op == FilterOperator.IN:
+                result = np.isin(values, target)
+            elif op == FilterOperator.NOT_IN:
+                result = ~np.isin(values, target)
+            else:
+                # معاملات نصية: نفس منطق FilteringEngine._evaluate_condition على str(القيمة)
+                text = [str(v) for v in values.tolist()]
+                if op == FilterOperator.CONTAINS:
+                    result = np.array([str(target) in t for t in text], dtype=bool)
+                elif op == FilterOperator.STARTS_WITH:
+                    result = np.array([t.startswith(target) for t in text], dtype=bool)
+                elif op == FilterOperator.ENDS_WITH:
+                    result = np.array([t.endswith(target) for t in text], dtype=bool)
+                elif op == FilterOperator.MATCHES_PATTERN:
+                    regex = re.compile(target)
+                    result = np.array([bool(regex.match(t)) for t in text], dtype=bool)
+                else:
+                    result = np.zeros(len(values), dtype=bool)
+        return result & valid
+
+    def _rule_mask(self, rule: FilterRule) -> np.ndarray:
+        mask = np.ones(self.symbol_count, dtype=bool)
+        for condition in rule.conditions:
+            mask &= self._condition_mask(condition)
+        return mask
+
+    def _composite_mask(self, composite: CompositeFilter) -> np.ndarray:
+        masks = [
+            self._composite_mask(f) if isinstance(f, CompositeFilter) else self._rule_mask(f)
+            for f in composite.filters
+        ]
+        if composite.type == "and":
+            return np.logical_and.reduce(masks)
+        return np.logical_or.reduce(masks)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "market": self.market,
+            "timeframe": self.timeframe,
+            "symbols": self.symbol_count,
+            "max_bars": self.max_bars,
+            "ready_symbols": int((self.counts[:self.symbol_count] >= MIN_INDICATOR_BARS).sum()),
+            "loaded_symbols": int(self.loaded[:self.symbol_count].sum()),
+            "memory_bytes": int(self.data.nbytes + self.times.nbytes),
+        }
+
+
+def _composite_rules(composite: CompositeFilter) -> List[FilterRule]:
+    rules = []
+    for f in composite.filters:
+        rules.extend(_composite_rules(f) if isinstance(f, CompositeFilter) else [f])
+    return rules
+
+
+def _criteria_fields(criteria: FilterCriteria) -> set:
+    """حقول اللوحة التي تقرؤها المعايير (الشروط والترتيب والفلاتر الأساسية)"""
+    rules = list(criteria.custom_filters or [])
+    if criteria.composite_filter:
+        rules.extend(_composite_rules(criteria.composite_filter))
+    fields = {condition.field for rule in rules for condition in rule.conditions}
+    if criteria.sort_by:
+        fields.add(criteria.sort_by)
+    if criteria.min_volume_24h:
+        fields.add("volume_24h")
+    if criteria.max_volatility:
+        fields.add("volatility")
+    return fields
+
+
+def _finite(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+# المثيل العام (يُغذّى من FilteringEngine.run_screener_feed)
+screener_panel = ScreenerPanel(settings.SCREENER_TIMEFRAME, settings.SCREENER_BARS)
@@ -3,7 +3,7 @@ from typing import Dict, List, Any, Optional
 import pandas as pd
 import numpy as np
 import math
-from .base import IndicatorConfig, IndicatorResult, IndicatorType
+from .base import IndicatorConfig, IndicatorResult, IndicatorType, ColumnarIndicatorResult, IndicatorBatch
 from .registry import IndicatorFactory, IndicatorRegistry
 from .calculator import IndicatorCalculator
 from .pine_transpiler import PineScriptTranspiler
@@ -204,16 +204,66 @@ def _clean_item(item):
     else:
         return item
 
+def _prepare_dataframe(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """نسخة من البيانات بدون inf و NaN (ffill ثم bfill)"""
+    df = dataframe.copy()
+    df = df.replace([np.inf, -np.inf], np.nan)
+    return df.ffill().bfill()
+
+def _config_dicts(indicators_config: List[Any]) -> List[Dict[str, Any]]:
+    """تحويل التكوين إلى dicts إذا كان IndicatorConfig"""
+    config_dicts = []
+    for config in indicators_config:
+        if isinstance(config, dict):
+            config_dicts.append(config)
+        elif hasattr(config, 'dict'):
+            config_dicts.append(config.dict())
+        else:
+            config_dicts.append(vars(config))
+    return config_dicts
+
+def get_indicator_cache_stats() -> Dict[str, Any]:
+    """إحصائيات كاش المؤشرات المشترك (نسبة الإصابة والحجم)"""
+    return _calculator.get_cache_stats()
+
+def apply_indicators_columnar(
+    dataframe: pd.DataFrame,
+    indicators_config: List[Dict[str, Any]],
+    use_cache: bool = True,
+    parallel: bool = True,
+    symbol: Optional[str] = None,
+    timeframe: Optional[str] = None
+) -> Optional[IndicatorBatch]:
+    """
+    مثل apply_indicators لكن النتائج تبقى مصفوفات NumPy (للاستخدام الداخلي)
+
+    Returns:
+        IndicatorBatch أو None إذا كانت البيانات فارغة
+    """
+    if dataframe is None or dataframe.empty:
+        return None
+    return _calculator.calculate_columnar(
+        _prepare_dataframe(dataframe),
+        _config_dicts(indicators_config),
+        use_cache=use_cache,
+        parallel=parallel,
+        symbol=symbol,
+        timeframe=timeframe
+    )
+
 def apply_indicators(
     dataframe: pd.DataFrame,
     indicators_config: List[Dict[str, Any]],
     use_cache: bool = True,
     return_raw: bool = False,
-    parallel: bool = True
-    
+    parallel: bool = True,
+    symbol: Optional[str] = None,
+    timeframe: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     الوظيفة المركزية لتطبيق المؤشرات على DataFrame
+
+    symbol / timeframe (اختياريان) يدخلان في مفتاح كاش المؤشرات.
     """
     import logging
     logger = logging.getLogger(__name__)
@@ -223,24 +273,8 @@ def apply_indicators(
         logger.error("❌ DataFrame فارغ أو None")
         return {}
     
-    # نسخة من DataFrame للعمل عليها
-    df = dataframe.copy()
-    
-    # استبدال قيم inf و nan في DataFrame
-    df = df.replace([np.inf, -np.inf], np.nan)
-    
-    # ملء القيم NaN باستخدام forward fill ثم backward fill
-    df = df.ffill().bfill()
-    
-    # تحويل التكوين إلى dicts إذا كان IndicatorConfig
-    config_dicts = []
-    for config in indicators_config:
-        if isinstance(config, dict):
-            config_dicts.append(config)
-        elif hasattr(config, 'dict'):
-            config_dicts.append(config.dict())
-        else:
-            config_dicts.append(vars(config))
+    df = _prepare_dataframe(dataframe)
+    config_dicts = _config_dicts(indicators_config)
     
     logger.info(f"📊 تطبيق {len(config_dicts)} مؤشر على DataFrame بطول {len(df)}")
     logger.info(f"📄 تكوينات المؤشرات: {[c.get('name', 'unknown') for c in config_dicts]}")
@@ -250,7 +284,9 @@ def apply_indicators(
             dataframe=df,
             indicators_config=config_dicts,
             use_cache=use_cache,
-            parallel=parallel
+            parallel=parallel,
+            symbol=symbol,
+            timeframe=timeframe
         )
 
 
@@ -410,6 +446,10 @@ __all__ = [
     "IndicatorCalculator",
     "PineScriptTranspiler",
     "apply_indicators",
+    "apply_indicators_columnar",
+    "get_indicator_cache_stats",
+    "ColumnarIndicatorResult",
+    "IndicatorBatch",
     "get_available_indicators",
     "transpile_pine_script",
     "create_indicator_from_pine",
@@ -10,6 +10,7 @@ import pandas as pd
 import numpy as np
 from pydantic import BaseModel, ConfigDict, Field, field_validator, validator
 import json
+from .graph import PrimitiveGraph
 
 class IndicatorType(Enum):
     """أنواع المؤشرات المتاحة"""
@@ -133,6 +134,118 @@ class IndicatorResult:
         return cls.from_dict(json.loads(json_str))
 
 
+def _column(series: pd.Series) -> np.ndarray:
+    """مصفوفة القيم بدون نسخ إذا كانت رقمية"""
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(copy=False)
+    return series.to_numpy(dtype=object)
+
+
+@dataclass
+class ColumnarIndicatorResult:
+    """
+    نتيجة مؤشر داخلية بمصفوفات NumPy (بدون tolist)
+
+    index مشترك بين كل نتائج دفعة الحساب إذا كانت القيم على نفس فهرس البيانات،
+    والتحويل إلى قوائم/JSON يتم فقط عند الحافة عبر to_dict.
+    """
+    name: str
+    values: np.ndarray
+    index: pd.Index
+    dtype: str = "float64"
+    signals: Optional[np.ndarray] = None
+    signals_index: Optional[pd.Index] = None
+    signals_dtype: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @classmethod
+    def from_result(cls, result: IndicatorResult, index: pd.Index) -> 'ColumnarIndicatorResult':
+        """تحويل IndicatorResult مع مشاركة index الدفعة إذا تطابق"""
+        def shared(own: pd.Index) -> pd.Index:
+            return index if own is index or own.equals(index) else own
+
+        signals = signals_index = signals_dtype = None
+        if result.signals is not None and not result.signals.empty:
+            signals = _column(result.signals)
+            signals_index = shared(result.signals.index)
+            signals_dtype = str(result.signals.dtype)
+
+        return cls(
+            name=result.name,
+            values=_column(result.values),
+            index=shared(result.values.index),
+            dtype=str(result.values.dtype) if len(result.values) else "float64",
+            signals=signals,
+            signals_index=signals_index,
+            signals_dtype=signals_dtype,
+            metadata=result.metadata
+        )
+
+    @classmethod
+    def failed(cls, name: str, index: pd.Index, error: str) -> 'ColumnarIndicatorResult':
+        return cls(name=name, values=np.full(len(index), np.nan), index=index, error=error)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + (self.signals.nbytes if self.signals is not None else 0)
+
+    def freeze(self):
+        """منع التعديل في المكان (النتيجة مشتركة عبر الكاش)"""
+        self.values.flags.writeable = False
+        if self.signals is not None:
+            self.signals.flags.writeable = False
+
+    def series(self) -> pd.Series:
+        return pd.Series(self.values, index=self.index, name=self.name, copy=False)
+
+    def signal_series(self) -> Optional[pd.Series]:
+        if self.signals is None:
+            return None
+        return pd.Series(self.signals, index=self.signals_index, copy=False)
+
+    def to_dict(self) -> Dict:
+        """نفس شكل IndicatorResult.to_dict (للحافة فقط: HTTP / WebSocket)"""
+        if self.error is not None:
+            return {"name": self.name, "values": self.values.tolist(), "metadata": {"error": self.error}}
+
+        if len(self.values):
+            values_dict = {"data": self.values.tolist(), "index": self.index.tolist(), "dtype": self.dtype}
+        else:
+            values_dict = {"data": [], "index": [], "dtype": "float64"}
+
+        signals_dict = None
+        if self.signals is not None:
+            signals_dict = {
+                "data": self.signals.tolist(),
+                "index": self.signals_index.tolist(),
+                "dtype": self.signals_dtype
+            }
+
+        return {
+            "name": self.name,
+            "values": values_dict,
+            "signals": signals_dict,
+            "metadata": self.metadata
+        }
+
+
+@dataclass
+class IndicatorBatch:
+    """نتائج دفعة حساب واحدة على نفس البيانات (فهرس زمني واحد مشترك)"""
+    index: pd.Index
+    results: Dict[str, ColumnarIndicatorResult] = field(default_factory=dict)
+    # عدد طلبات العمليات الأولية وعدد ما حُسب فعلاً (انظر graph.py)
+    primitives: Dict[str, int] = field(default_factory=dict)
+
+    def series(self, name: str) -> Optional[pd.Series]:
+        result = self.results.get(name)
+        return result.series() if result is not None else None
+
+    def to_dicts(self) -> Dict[str, Dict]:
+        return {name: result.to_dict() for name, result in self.results.items()}
+
+
 class IndicatorConfig(BaseModel):
     """تكوين المؤشر"""
     name: str
@@ -181,6 +294,9 @@ class IndicatorConfig(BaseModel):
     
 class BaseIndicator(ABC):
 
+    # طريقة التنفيذ المتوازي (انظر executor.py): "thread" للمؤشرات المعتمدة على
+    # NumPy/pandas و "process" للمؤشرات ذات الحلقات البايثونية (تمسك الـ GIL)
+    execution: str = "thread"
     
     def __init__(self, config: IndicatorConfig):
         self.config = config
@@ -189,6 +305,14 @@ class BaseIndicator(ABC):
         self.timeframe = config.timeframe
         self._validate_params()
         self._last_result: Optional[IndicatorResult] = None
+        # رسم العمليات المشتركة لدفعة الحساب الحالية (يضبطه IndicatorCalculator)
+        self.graph: Optional[PrimitiveGraph] = None
+
+    def primitive(self, data: pd.DataFrame, key: tuple) -> pd.Series:
+        """عملية أولية مشتركة (انظر graph.py)؛ بدون رسم لنفس البيانات تُحسب مباشرة"""
+        if self.graph is not None and self.graph.data is data:
+            return self.graph.get(key)
+        return PrimitiveGraph(data).get(key)
     
     def _validate_params(self):
     
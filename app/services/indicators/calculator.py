@@ -3,21 +3,36 @@ from typing import Dict, List, Any, Optional
 import pandas as pd
 import numpy as np
 import asyncio
-from .base import IndicatorConfig, IndicatorResult
+from .base import IndicatorConfig, IndicatorResult, ColumnarIndicatorResult, IndicatorBatch
 from .registry import IndicatorRegistry
-from concurrent.futures import ThreadPoolExecutor
+from .fingerprint import DataFingerprint, DataFingerprinter, config_hash
+from .graph import PrimitiveGraph
+from .executor import PROCESS, indicator_executor
+from app.config import settings
+from app.database.cache import LocalLRU
+
+# عمر نتيجة المؤشر في الكاش المحلي (ثواني)
+INDICATOR_CACHE_TTL = 300
 
 class IndicatorCalculator:
     """محرك حساب المؤشرات فقط - لا يعتمد على أي خدمات خارجية"""
     
     def __init__(self):
         self.registry = IndicatorRegistry()
-        self.cache = {}
-
-    def _calculate_single_indicator(self, dataframe, config, use_cache):
-        import pandas as pd
-        import numpy as np
+        # الطبقة المحلية من الكاش المشترك (محدودة الحجم بدل قاموس ينمو بلا حد)
+        self.cache = LocalLRU(settings.INDICATOR_CACHE_MAX_BYTES)
+        self.fingerprinter = DataFingerprinter()
+        self.executor = indicator_executor
 
+    def _calculate_single_indicator(
+        self,
+        dataframe,
+        config,
+        use_cache,
+        fingerprint: Optional[DataFingerprint] = None,
+        graph: Optional[PrimitiveGraph] = None
+    ) -> tuple:
+        """حساب مؤشر واحد كنتيجة عمودية (name, ColumnarIndicatorResult)"""
         if callable(dataframe):
             raise ValueError(f"Expected a DataFrame, got callable: {dataframe}")
 
@@ -25,53 +40,146 @@ class IndicatorCalculator:
             raise ValueError(f"Expected a DataFrame, got {type(dataframe)}")
 
         name = config.get('name', 'unknown')
-        cache_key = self._generate_cache_key(dataframe, config)
+        cache_key = None
 
-        if use_cache and cache_key in self.cache:
-            return name, self.cache[cache_key]
+        if use_cache:
+            if fingerprint is None:
+                fingerprint = self.fingerprinter.fingerprint(dataframe)
+            cache_key = self._generate_cache_key(fingerprint, config)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return name, cached
 
         try:
             indicator_config = IndicatorConfig(**config)
             indicator = self.registry.create_indicator(indicator_config)
-            result = indicator.calculate(dataframe)
+            indicator.graph = graph
+            result = ColumnarIndicatorResult.from_result(indicator.calculate(dataframe), dataframe.index)
             if use_cache:
-                self.cache[cache_key] = result.to_dict()
-            return name, result.to_dict()
+                self._store(cache_key, result)
+            return name, result
         except Exception as e:
-            return name, {"name": name, "values": [np.nan] * len(dataframe), "metadata": {"error": str(e)}}
+            return name, ColumnarIndicatorResult.failed(name, dataframe.index, str(e))
 
+    def _store(self, cache_key: str, result: ColumnarIndicatorResult):
+        # النتيجة مشتركة بين المستدعين، لذا للقراءة فقط
+        result.freeze()
+        self.cache.set(cache_key, result, INDICATOR_CACHE_TTL, size=result.nbytes + 512)
 
-    def apply_indicators(
+    def _calculate_parallel(self, dataframe, configs, use_cache, fingerprint, graph) -> List[tuple]:
+        """
+        توزيع المؤشرات على المنفذ: الخيوط لمؤشرات NumPy والعمليات للحلقات البايثونية
+
+        Returns:
+            [(name, ColumnarIndicatorResult)] بترتيب configs
+        """
+        results: List[Optional[tuple]] = [None] * len(configs)
+        process_slots = []
+        futures = {}
+        for slot, cfg in enumerate(configs):
+            indicator_class = self.registry.get_indicator(cfg.get('name', ''))
+            if self.executor.backend_for(indicator_class, len(dataframe)) == PROCESS:
+                process_slots.append(slot)
+            else:
+                futures[slot] = self.executor.submit(
+                    self._calculate_single_indicator, dataframe, cfg, use_cache, fingerprint, graph
+                )
+
+        # دفعة العمليات تُنتظر هنا بشكل متزامن في خيط المستدعي،
+        # ومؤشرات الخيوط المرسلة أعلاه تُحسب بالتوازي معها
+        if process_slots:
+            process_configs = [configs[slot] for slot in process_slots]
+            for slot, item in zip(process_slots, self._calculate_in_processes(
+                dataframe, process_configs, use_cache, fingerprint, graph
+            )):
+                results[slot] = item
+
+        for slot, future in futures.items():
+            results[slot] = future.result()
+        return results
+
+    def _calculate_in_processes(self, dataframe, configs, use_cache, fingerprint, graph) -> List[tuple]:
+        results: List[Optional[tuple]] = [None] * len(configs)
+        keys: List[Optional[str]] = [None] * len(configs)
+        missing = []
+        for slot, cfg in enumerate(configs):
+            if use_cache:
+                keys[slot] = self._generate_cache_key(fingerprint, cfg)
+                cached = self.cache.get(keys[slot])
+                if cached is not None:
+                    results[slot] = (cfg.get('name', 'unknown'), cached)
+                    continue
+            missing.append(slot)
+
+        if not missing:
+            return results
+
+        computed = self.executor.run_in_processes(dataframe, [configs[slot] for slot in missing])
+        if computed is None:
+            # المجمع غير متاح أو الفهرس غير مدعوم: نفس الحساب داخل هذه العملية
+            for slot in missing:
+                results[slot] = self._calculate_single_indicator(dataframe, configs[slot], use_cache, fingerprint, graph)
+            return results
+
+        for slot, result in zip(missing, computed):
+            if use_cache and result.error is None:
+                self._store(keys[slot], result)
+            results[slot] = (configs[slot].get('name', 'unknown'), result)
+        return results
+
+    def calculate_columnar(
         self,
         dataframe: pd.DataFrame,
-        indicators_config: List[Dict[str, Any]],  # استخدام Dict مباشرة
+        indicators_config: List[Dict[str, Any]],
         use_cache: bool = True,
-        parallel: bool = False  # ✅ إضافة خيار parallel
-    ) -> Dict[str, Dict[str, Any]]:
+        parallel: bool = False,
+        symbol: Optional[str] = None,
+        timeframe: Optional[str] = None
+    ) -> IndicatorBatch:
+        """
+        حساب المؤشرات بدون تحويل إلى قوائم
 
-        results = {}
+        Args:
+            symbol, timeframe: جزء من مفتاح الكاش (افتراضياً من dataframe.attrs)
+
+        Returns:
+            IndicatorBatch: مصفوفات float64 مع فهرس زمني واحد للدفعة
+        """
+        batch = IndicatorBatch(index=dataframe.index)
+        configs = [cfg for cfg in indicators_config if cfg.get('enabled', True)]
+        # بصمة واحدة للدفعة بدل هاش البيانات لكل مؤشر
+        fingerprint = self.fingerprinter.fingerprint(dataframe, symbol, timeframe) if use_cache else None
+        # العمليات الأولية المشتركة (rolling / EMA / true range) تُحسب مرة واحدة للدفعة
+        graph = PrimitiveGraph(dataframe)
 
-   
         if parallel:
-            with ThreadPoolExecutor() as executor:
-                futures = [
-                    executor.submit(self._calculate_single_indicator, dataframe, cfg, use_cache)
-                    for cfg in indicators_config if cfg.get('enabled', True)
-                ]
-                for future in futures:
-                    name, res = future.result()
-                    # تنظيف النتيجة
-                    results[name] = self._clean_indicator_result(res)
+            results = self._calculate_parallel(dataframe, configs, use_cache, fingerprint, graph)
         else:
-            # التشغيل المتسلسل
-            for cfg in indicators_config:
-                if not cfg.get('enabled', True):
-                    continue
-                name, res = self._calculate_single_indicator(dataframe, cfg, use_cache)
-                # تنظيف النتيجة
-                results[name] = self._clean_indicator_result(res)
+            results = [
+                self._calculate_single_indicator(dataframe, cfg, use_cache, fingerprint, graph)
+                for cfg in configs
+            ]
+        for name, res in results:
+            batch.results[name] = res
 
-        return results  # ✅ إرجاع results هنا
+        batch.primitives = graph.get_stats()
+        return batch
+
+    def apply_indicators(
+        self,
+        dataframe: pd.DataFrame,
+        indicators_config: List[Dict[str, Any]],  # استخدام Dict مباشرة
+        use_cache: bool = True,
+        parallel: bool = False,  # ✅ إضافة خيار parallel
+        symbol: Optional[str] = None,
+        timeframe: Optional[str] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """نفس calculate_columnar لكن بقواميس نظيفة جاهزة لـ JSON (للحافة: HTTP / WebSocket)"""
+        batch = self.calculate_columnar(dataframe, indicators_config, use_cache, parallel, symbol, timeframe)
+        return {
+            name: self._clean_indicator_result(res.to_dict())
+            for name, res in batch.results.items()
+        }
 
 
     
@@ -257,15 +365,19 @@ class IndicatorCalculator:
     
     def _generate_cache_key(
         self, 
-        dataframe: pd.DataFrame, 
+        fingerprint: DataFingerprint, 
         config: Dict[str, Any]
     ) -> str:
-        """إنشاء مفتاح كاش فريد"""
-        # استخدام هاش DataFrame والتكوين
-        data_hash = hash(str(dataframe.iloc[-100:].to_dict()))
-        config_hash = hash(str(config))
-        
-        return f"indicator_{config.get('name', 'unknown')}_{data_hash}_{config_hash}"
+        """مفتاح الكاش: بصمة البيانات + هاش ثابت للتكوين"""
+        return f"indicator:{config.get('name', 'unknown')}:{fingerprint.key}:{config_hash(config)}"
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """إحصائيات كاش المؤشرات (نسبة الإصابة، الحجم، الإخراج)"""
+        stats = self.cache.get_stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["fingerprints"] = self.fingerprinter.get_stats()
+        return stats
     
     def validate_dataframe(self, dataframe: pd.DataFrame) -> bool:
         """التحقق من صحة DataFrame"""
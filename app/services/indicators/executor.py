@@ -0,0 +1,271 @@
+# app/services/indicators/executor.py
+"""
+تنفيذ المؤشرات بالتوازي حسب نوع المؤشر.
+
+- "thread": مجمع خيوط دائم للمؤشرات المعتمدة على NumPy/pandas (تحرر الـ GIL)
+- "process": مجمع عمليات دائم للمؤشرات ذات الحلقات البايثونية (تمسك الـ GIL)
+
+كل مؤشر يحدد نوعه عبر BaseIndicator.execution. العمليات تُستخدم فقط للبيانات
+الكبيرة (INDICATOR_PROCESS_MIN_BARS) وإلا تكلفة النقل أكبر من الفائدة.
+أعمدة OHLCV تُنسخ مرة واحدة إلى ذاكرة مشتركة (SharedMemory) لكل دفعة، والعمليات
+تبني DataFrame فوقها بدون نسخ؛ فقط النتيجة تعود عبر pickle.
+"""
+import os
+import sys
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+from .base import ColumnarIndicatorResult, IndicatorConfig
+
+logger = logging.getLogger(__name__)
+
+THREAD = "thread"
+PROCESS = "process"
+
+
+# ---------------------- الذاكرة المشتركة ----------------------
+
+def _frame_layout(dataframe: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    وصف أعمدة DataFrame داخل كتلة واحدة (None إذا كان الفهرس غير مدعوم)
+
+    تُنقل الأعمدة الرقمية فقط (الأعمدة النصية لا تحتاجها المؤشرات).
+    """
+    index = dataframe.index
+    if isinstance(index, pd.DatetimeIndex):
+        index_info = {"kind": "datetime", "tz": str(index.tz) if index.tz is not None else None}
+    elif pd.api.types.is_numeric_dtype(index.dtype):
+        index_info = {"kind": "numeric", "dtype": index.dtype.str}
+    else:
+        return None
+    index_info["name"] = index.name
+
+    offset = 0
+    columns: List[Tuple[Any, str, int]] = []
+    for column in dataframe.columns:
+        dtype = dataframe[column].dtype
+        if not (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)):
+            continue
+        columns.append((column, np.dtype(dtype).str, offset))
+        offset += len(dataframe) * np.dtype(dtype).itemsize
+    index_dtype = np.dtype("int64") if index_info["kind"] == "datetime" else index.dtype
+    index_info["offset"] = offset
+    offset += len(dataframe) * index_dtype.itemsize
+    return {"length": len(dataframe), "columns": columns, "index": index_info, "nbytes": max(offset, 1)}
+
+
+def _write_frame(buffer, dataframe: pd.DataFrame, layout: Dict[str, Any]):
+    length = layout["length"]
+    for column, dtype, offset in layout["columns"]:
+        target = np.ndarray(length, dtype=dtype, buffer=buffer, offset=offset)
+        target[:] = dataframe[column].to_numpy()
+    index = dataframe.index
+    info = layout["index"]
+    source = index.asi8 if info["kind"] == "datetime" else index.to_numpy()
+    np.ndarray(length, dtype=source.dtype, buffer=buffer, offset=info["offset"])[:] = source
+
+
+def _read_frame(buffer, layout: Dict[str, Any]) -> pd.DataFrame:
+    """DataFrame فوق الذاكرة المشتركة (للقراءة فقط)"""
+    length = layout["length"]
+    info = layout["index"]
+    if info["kind"] == "datetime":
+        raw = np.ndarray(length, dtype=np.int64, buffer=buffer, offset=info["offset"])
+        index = pd.DatetimeIndex(raw.view("datetime64[ns]"), name=info["name"])
+        if info["tz"]:
+            index = index.tz_localize("UTC").tz_convert(info["tz"])
+    else:
+        index = pd.Index(
+            np.ndarray(length, dtype=info["dtype"], buffer=buffer, offset=info["offset"]),
+            name=info["name"]
+        )
+    columns = {}
+    for column, dtype, offset in layout["columns"]:
+        array = np.ndarray(length, dtype=dtype, buffer=buffer, offset=offset)
+        array.flags.writeable = False
+        columns[column] = array
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # قبل 3.13 العامل يسجلها لدى متتبع موارد العملية الرئيسية (نفس المتتبع مع spawn)
+    # والتسجيل المكرر لا يؤثر؛ الحذف (unlink) من العملية الرئيسية فقط
+    return shared_memory.SharedMemory(name=name)
+
+
+def _owned(array: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """نسخة خارج الذاكرة المشتركة (المؤشر قد يُرجع عموداً كما هو)"""
+    if array is None or array.flags.owndata:
+        return array
+    return np.array(array, copy=True)
+
+
+def _detach_index(index: Optional[pd.Index], frame_index: pd.Index) -> Optional[pd.Index]:
+    if index is None or index is frame_index:
+        return None
+    return index.copy(deep=True)
+
+
+def calculate_in_worker(shm_name: str, layout: Dict[str, Any], config: Dict[str, Any]) -> ColumnarIndicatorResult:
+    """حساب مؤشر واحد داخل عملية فرعية (دالة على مستوى الوحدة لتكون قابلة للـ pickle)"""
+    from .registry import IndicatorRegistry
+
+    name = config.get("name", "unknown")
+    shm = _attach(shm_name)
+    try:
+        frame = _read_frame(shm.buf, layout)
+        try:
+            indicator = IndicatorRegistry.create_indicator(IndicatorConfig(**config))
+            result = ColumnarIndicatorResult.from_result(indicator.calculate(frame), frame.index)
+        except Exception as e:
+            failed = ColumnarIndicatorResult.failed(name, frame.index, str(e))
+            failed.index = None
+            return failed
+        result.values = _owned(result.values)
+        result.signals = _owned(result.signals)
+        # None = فهرس الدفعة (يُعاد ربطه في العملية الرئيسية بدل نقله)
+        result.index = _detach_index(result.index, frame.index)
+        result.signals_index = _detach_index(result.signals_index, frame.index)
+        del frame
+        return result
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            # مراجع pandas الداخلية ما زالت حية؛ تُغلق مع جمع القمامة
+            pass
+
+
+# ---------------------- المنفذ ----------------------
+
+class IndicatorExecutor:
+    """مجمعات دائمة (خيوط + عمليات) لحساب المؤشرات"""
+
+    def __init__(
+        self,
+        thread_workers: Optional[int] = None,
+        process_workers: Optional[int] = None,
+        process_min_bars: int = 20_000
+    ):
+        self.thread_workers = thread_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.process_workers = process_workers or os.cpu_count() or 1
+        self.process_min_bars = process_min_bars
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self.stats = {THREAD: 0, PROCESS: 0, "process_fallbacks": 0}
+
+    @property
+    def threads(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self.thread_workers, thread_name_prefix="indicators"
+            )
+        return self._threads
+
+    def submit(self, fn, *args):
+        """تنفيذ في مجمع الخيوط الدائم"""
+        self.stats[THREAD] += 1
+        return self.threads.submit(fn, *args)
+
+    def _get_processes(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            # spawn: عملية الـ API تحتوي خيوطاً و fork معها غير آمن
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._processes
+
+    def backend_for(self, indicator_class, bars: int) -> str:
+        """نوع التنفيذ لمؤشر على عدد معين من الشموع"""
+        execution = getattr(indicator_class, "execution", THREAD)
+        if execution == PROCESS and bars >= self.process_min_bars:
+            return PROCESS
+        return THREAD
+
+    def run_in_processes(
+        self,
+        dataframe: pd.DataFrame,
+        configs: List[Dict[str, Any]]
+    ) -> Optional[List[ColumnarIndicatorResult]]:
+        """
+        حساب المؤشرات في مجمع العمليات عبر ذاكرة مشتركة واحدة للدفعة
+
+        Returns:
+            النتائج بترتيب configs، أو None إذا تعذر (يحسبها المستدعي في الخيوط)
+        """
+        layout = _frame_layout(dataframe)
+        if layout is None:
+            return None
+
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=layout["nbytes"])
+        except Exception as e:
+            logger.error(f"❌ Shared memory unavailable, falling back to threads: {e}")
+            self.stats["process_fallbacks"] += 1
+            return None
+
+        futures = []
+        try:
+            _write_frame(shm.buf, dataframe, layout)
+            pool = self._get_processes()
+            futures = [pool.submit(calculate_in_worker, shm.name, layout, cfg) for cfg in configs]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool as e:
+            logger.error(f"❌ Indicator process pool broken, falling back to threads: {e}")
+            self._processes = None
+            self.stats["process_fallbacks"] += 1
+            return None
+        except Exception as e:
+            # خطأ في الإرسال أو نقل النتيجة (pickle...): المجمع سليم، والدفعة تُحسب في الخيوط
+            logger.error(f"❌ Indicator process batch failed, falling back to threads: {e}", exc_info=True)
+            for future in futures:
+                future.cancel()
+            self.stats["process_fallbacks"] += 1
+            return None
+        finally:
+            shm.close()
+            shm.unlink()
+
+        for result in results:
+            # فهرس واحد مشترك للدفعة بدل فهرس كل عملية
+            if result.index is None:
+                result.index = dataframe.index
+            if result.signals is not None and result.signals_index is None:
+                result.signals_index = dataframe.index
+        self.stats[PROCESS] += len(configs)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "thread_workers": self.thread_workers,
+            "process_workers": self.process_workers,
+            "process_pool_running": self._processes is not None
+        }
+
+    def shutdown(self):
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+
+
+# المثيل العام (مشترك بين كل حاسبات المؤشرات)
+indicator_executor = IndicatorExecutor(
+    settings.INDICATOR_THREAD_WORKERS or None,
+    settings.INDICATOR_PROCESS_WORKERS or None,
+    settings.INDICATOR_PROCESS_MIN_BARS
+)
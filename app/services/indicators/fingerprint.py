@@ -0,0 +1,205 @@
+# app/services/indicators/fingerprint.py
+"""
+بصمة سريعة لبيانات OHLCV لاستخدامها كمفتاح كاش المؤشرات.
+
+البصمة = الرمز + الإطار الزمني + أول/آخر وقت + الطول + CRC32 لكل عمود
+(الوقت و open/high/low/close/volume) محسوب مباشرة على ذاكرة المصفوفات
+بدل str(dataframe.to_dict()). الوقت هو الفهرس الزمني، أو عمود time إذا كان
+الفهرس غير زمني (إطارات DataService.get_historical على RangeIndex).
+
+CRC32 تراكمي: عند نمو نفس السلسلة بشموع جديدة تُستأنف الحسابات من حالة
+البادئة المحفوظة (كل الشموع عدا الأخيرة التي قد تكون حية) فيُمرّ فقط على
+الشموع الجديدة. هذا يفترض أن الشموع المغلقة لا تتغير، لذا يُفعّل فقط للسلاسل
+المسماة (symbol معروف) وتُقبل البادئة فقط إذا تطابقت عينة موزعة على البادئة
+(PREFIX_SAMPLE_ROWS صفاً تشمل الأول وشمعة الحد). البيانات بدون رمز تُحسب
+بصمتها كاملة دائماً.
+
+إدراج شموع ناقصة داخل البادئة يزيح أوقات صفوف العينة فيُكتشف دائماً، لكن
+تصحيح قيم شمعة بين صفين من العينة لا يُكتشف. لذلك مسارات إكمال الفجوات في
+CandlePersistence تستدعي invalidate_prefix_states(symbol, timeframe) فتُحسب
+البصمة التالية للسلسلة كاملة في كل الحاسبات.
+"""
+import zlib
+import hashlib
+import json
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# عدد حالات البادئة المحفوظة (واحدة لكل سلسلة رمز/إطار/بداية)
+MAX_PREFIX_STATES = 2048
+
+# عدد صفوف البادئة التي يُعاد فحصها قبل استئناف CRC منها
+PREFIX_SAMPLE_ROWS = 64
+
+
+@dataclass(frozen=True)
+class DataFingerprint:
+    symbol: str
+    timeframe: str
+    first: int
+    last: int
+    length: int
+    checksum: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.symbol}:{self.timeframe}:{self.first}:{self.last}:{self.length}:{self.checksum:08x}"
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """هاش ثابت للتكوين (لا يتأثر بترتيب المفاتيح)"""
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=8).hexdigest()
+
+
+def _index_array(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8
+    if pd.api.types.is_numeric_dtype(index.dtype):
+        return index.to_numpy(dtype=np.float64)
+    return pd.util.hash_array(index.to_numpy())
+
+
+def _time_arrays(dataframe: pd.DataFrame) -> list:
+    """
+    مصفوفة الوقت أولاً (منها first/last ومفتاح البادئة).
+    مع فهرس غير زمني وعمود time يُستخدم العمود، ويُضاف الفهرس بعده
+    لأن النتائج المخزنة تحمل فهرس الإطار.
+    """
+    index = dataframe.index
+    if isinstance(index, pd.DatetimeIndex) or "time" not in dataframe.columns:
+        return [_index_array(index)]
+    time = dataframe["time"]
+    if pd.api.types.is_datetime64_any_dtype(time.dtype):
+        times = pd.DatetimeIndex(time).asi8
+    elif pd.api.types.is_numeric_dtype(time.dtype):
+        times = time.to_numpy(dtype=np.int64)
+    else:
+        times = pd.util.hash_array(time.to_numpy())
+    return [times, _index_array(index)]
+
+
+def _columns(dataframe: pd.DataFrame) -> Tuple[str, ...]:
+    columns = tuple(c for c in OHLCV_COLUMNS if c in dataframe.columns)
+    if columns:
+        return columns
+    return tuple(c for c in dataframe.columns if pd.api.types.is_numeric_dtype(dataframe[c].dtype))
+
+
+def _crc(array: np.ndarray, start: int, stop: int, value: int) -> int:
+    chunk = np.ascontiguousarray(array[start:stop])
+    return zlib.crc32(memoryview(chunk).cast("B"), value)
+
+
+# كل الحاسبات الحية (لكل IndicatorCalculator حاسبته) لإبطال البادئات معاً
+_fingerprinters: "weakref.WeakSet[DataFingerprinter]" = weakref.WeakSet()
+
+
+def invalidate_prefix_states(symbol: Optional[str] = None, timeframe: Optional[str] = None) -> int:
+    """إبطال حالات البادئة للسلسلة في كل الحاسبات (بعد كتابة شموع مغلقة لها)"""
+    return sum(fingerprinter.invalidate(symbol, timeframe) for fingerprinter in list(_fingerprinters))
+
+
+class DataFingerprinter:
+    """حساب البصمات مع إعادة استخدام بادئة السلسلة عند إضافة شموع جديدة"""
+
+    def __init__(self, max_states: int = MAX_PREFIX_STATES):
+        self.max_states = max_states
+        self._states: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.full = 0
+        self.incremental = 0
+        _fingerprinters.add(self)
+
+    def fingerprint(
+        self,
+        dataframe: pd.DataFrame,
+        symbol: Optional[str] = None,
+        timeframe: Optional[str] = None
+    ) -> DataFingerprint:
+        symbol = str(symbol or dataframe.attrs.get("symbol", "") or "").upper()
+        timeframe = str(timeframe or dataframe.attrs.get("timeframe", "") or "")
+        length = len(dataframe)
+        columns = _columns(dataframe)
+        arrays = _time_arrays(dataframe) + [
+            dataframe[c].to_numpy(dtype=np.float64, copy=False) for c in columns
+        ]
+        if length == 0:
+            return DataFingerprint(symbol, timeframe, 0, 0, 0, 0)
+
+        first = int(arrays[0][0])
+        last = int(arrays[0][-1])
+        state_key = (symbol, timeframe, first, columns)
+        boundary = length - 1
+
+        # استئناف من البادئة المحفوظة إن كانت ما تزال صالحة
+        start, crcs = 0, [0] * len(arrays)
+        with self._lock:
+            state = self._states.get(state_key) if symbol else None
+        if state is not None:
+            prefix_len, sample, prefix_crcs = state
+            if 0 < prefix_len <= boundary and self._matches(arrays, prefix_len, sample):
+                start, crcs = prefix_len, list(prefix_crcs)
+
+        crcs = [_crc(a, start, boundary, c) for a, c in zip(arrays, crcs)]
+        if symbol and boundary > 0:
+            with self._lock:
+                self._states[state_key] = (boundary, self._sample(arrays, boundary), tuple(crcs))
+                self._states.move_to_end(state_key)
+                while len(self._states) > self.max_states:
+                    self._states.popitem(last=False)
+        crcs = [_crc(a, boundary, length, c) for a, c in zip(arrays, crcs)]
+
+        if start:
+            self.incremental += 1
+        else:
+            self.full += 1
+
+        # أسماء كل الأعمدة جزء من البصمة (مؤشرات قد تقرأ أعمدة غير OHLCV)
+        names = ",".join(map(str, dataframe.columns)).encode()
+        checksum = zlib.crc32(np.asarray(crcs, dtype=np.uint32).tobytes(), zlib.crc32(names))
+        return DataFingerprint(symbol, timeframe, first, last, length, checksum)
+
+    @staticmethod
+    def _positions(prefix_len: int) -> np.ndarray:
+        """صفوف العينة: موزعة بالتساوي من أول شمعة حتى شمعة الحد"""
+        return np.unique(np.linspace(0, prefix_len - 1, min(prefix_len, PREFIX_SAMPLE_ROWS)).astype(np.int64))
+
+    def _sample(self, arrays, prefix_len: int) -> tuple:
+        positions = self._positions(prefix_len)
+        return tuple(a[positions].copy() for a in arrays)
+
+    def _matches(self, arrays, prefix_len: int, sample: tuple) -> bool:
+        positions = self._positions(prefix_len)
+        return all(
+            np.array_equal(a[positions], saved, equal_nan=True)
+            for a, saved in zip(arrays, sample)
+        )
+
+    def invalidate(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> int:
+        """
+        حذف حالات البادئة (كلها أو لرمز/إطار معين) بعد تعديل شموع مغلقة.
+
+        Returns:
+            عدد الحالات المحذوفة
+        """
+        symbol = symbol.upper() if symbol else None
+        with self._lock:
+            keys = [
+                key for key in self._states
+                if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe)
+            ]
+            for key in keys:
+                del self._states[key]
+        return len(keys)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"prefix_states": len(self._states), "full": self.full, "incremental": self.incremental}
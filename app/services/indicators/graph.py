@@ -0,0 +1,147 @@
+# app/services/indicators/graph.py
+"""
+رسم اعتماديات (DAG) للعمليات الأولية المشتركة بين المؤشرات.
+
+كل عملية أولية (rolling mean/std، EMA، diff، true range، ...) لها مفتاح
+tuple يحتوي اسم العملية ومفاتيح مدخلاتها ومعاملاتها، مثل:
+
+    rolling_mean(col("close"), 20) == ("rolling_mean", ("col", "close"), 20)
+
+PrimitiveGraph مربوط بـ DataFrame واحد (دفعة حساب واحدة) ويحسب كل مفتاح
+مرة واحدة فقط (حساب كسول: كل عقدة تطلب مدخلاتها من الرسم قبلها)، فـ sma_slow
+و bollinger_bands بنفس الفترة يتشاركان نفس المتوسط، و MACD بكل أطره يتشارك
+EMA الإغلاق. المؤشرات تطلب العمليات عبر BaseIndicator.primitive وبدون رسم
+تُحسب مباشرة بنفس الطريقة.
+
+القيم المُرجعة مشتركة بين المؤشرات: لا تُعدّل في المكان.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import pandas as pd
+
+Key = Tuple[Any, ...]
+
+
+# ---------------------- مفاتيح العمليات ----------------------
+
+def col(name: str) -> Key:
+    return ("col", name)
+
+
+def rolling_mean(source: Key, window: int) -> Key:
+    return ("rolling_mean", source, window)
+
+
+def rolling_std(source: Key, window: int) -> Key:
+    return ("rolling_std", source, window)
+
+
+def rolling_min(source: Key, window: int) -> Key:
+    return ("rolling_min", source, window)
+
+
+def rolling_max(source: Key, window: int) -> Key:
+    return ("rolling_max", source, window)
+
+
+def ema(source: Key, span: int) -> Key:
+    return ("ema", source, span)
+
+
+def wilder(source: Key, period: int) -> Key:
+    """تنعيم Wilder (ewm بـ alpha = 1 / period)"""
+    return ("wilder", source, period)
+
+
+def diff(source: Key) -> Key:
+    return ("diff", source)
+
+
+def shift(source: Key, periods: int = 1) -> Key:
+    return ("shift", source, periods)
+
+
+def sub(left: Key, right: Key) -> Key:
+    return ("sub", left, right)
+
+
+def absolute(source: Key) -> Key:
+    return ("abs", source)
+
+
+def gain(source: Key) -> Key:
+    return ("gain", source)
+
+
+def loss(source: Key) -> Key:
+    return ("loss", source)
+
+
+def true_range() -> Key:
+    return ("true_range",)
+
+
+# ---------------------- التنفيذ ----------------------
+
+def _true_range(graph: "PrimitiveGraph") -> pd.Series:
+    high = graph.get(col("high"))
+    low = graph.get(col("low"))
+    prev_close = graph.get(shift(col("close"), 1))
+    high_low = high - low
+    high_close = abs(high - prev_close)
+    low_close = abs(low - prev_close)
+    return pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+
+
+_OPS: Dict[str, Callable[..., pd.Series]] = {
+    "col": lambda g, name: g.data[name],
+    "rolling_mean": lambda g, src, n: g.get(src).rolling(window=n).mean(),
+    "rolling_std": lambda g, src, n: g.get(src).rolling(window=n).std(),
+    "rolling_min": lambda g, src, n: g.get(src).rolling(window=n).min(),
+    "rolling_max": lambda g, src, n: g.get(src).rolling(window=n).max(),
+    "ema": lambda g, src, n: g.get(src).ewm(span=n, adjust=False).mean(),
+    "wilder": lambda g, src, n: g.get(src).ewm(alpha=1.0 / n, adjust=False).mean(),
+    "diff": lambda g, src: g.get(src).diff(),
+    "shift": lambda g, src, n: g.get(src).shift(n),
+    "sub": lambda g, a, b: g.get(a) - g.get(b),
+    "abs": lambda g, src: g.get(src).abs(),
+    "gain": lambda g, src: g.get(src).clip(lower=0).fillna(0),
+    "loss": lambda g, src: -g.get(src).clip(upper=0).fillna(0),
+    "true_range": _true_range,
+}
+
+
+class PrimitiveGraph:
+    """حساب كسول مع حفظ لكل عملية أولية على DataFrame واحد (آمن بين threads)"""
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+        self._values: Dict[Hashable, pd.Series] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.computed = 0
+
+    def get(self, key: Key) -> pd.Series:
+        self.requests += 1
+        value = self._values.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        # قفل لكل مفتاح: الاعتماديات تُقفل بترتيب الـ DAG فلا يوجد تداخل دائري
+        with key_lock:
+            value = self._values.get(key)
+            if value is None:
+                op = _OPS.get(key[0])
+                if op is None:
+                    raise ValueError(f"Unknown primitive: {key[0]}")
+                value = op(self, *key[1:])
+                self._values[key] = value
+                self.computed += 1
+        return value
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "computed": self.computed}
@@ -6,6 +6,17 @@ from typing import Dict, Any, List
 
 from app.services.indicators.base import BaseIndicator, IndicatorResult, IndicatorType
 from app.services.indicators.registry import IndicatorRegistry
+from app.services.indicators import graph as ops
+
+CLOSE = ops.col("close")
+
+
+def _format_times(index: pd.Index, positions: np.ndarray) -> List[str]:
+    """أوقات الشموع المحددة كنصوص (isoformat للتواريخ)"""
+    return [
+        value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        for value in index[positions]
+    ]
 
 
 
@@ -39,25 +50,26 @@ class SupplyDemandIndicator(BaseIndicator):
         threshold = self.params.get("threshold", 2.0)
 
         # حساب حجم جسم الشمعة مقارنة بالمتوسط
-        body = (data['close'] - data['open']).abs()
-        avg_body = body.rolling(window=period).mean()
+        body_key = ops.absolute(ops.sub(CLOSE, ops.col("open")))
+        body = self.primitive(data, body_key)
+        avg_body = self.primitive(data, ops.rolling_mean(body_key, period))
         
-        # اكتشاف الشموع المتفجرة
-        explosive = body > (avg_body * threshold)
+        # اكتشاف الشموع المتفجرة (الشمعة الأولى لا تُعتبر لأنه لا قاعدة قبلها)
+        explosive = (body > (avg_body * threshold)).to_numpy()
+        positions = np.flatnonzero(explosive[1:]) + 1
         
-        zones = []
-        for i in range(1, len(data)):
-            if explosive.iloc[i]:
-                # المنطقة هي الشمعة التي سبقت الانفجار
-                base_idx = i - 1
-                is_bullish = data['close'].iloc[i] > data['open'].iloc[i]
-                
-                zones.append({
-                    "type": "DZ" if is_bullish else "SZ",
-                    "top": float(data['high'].iloc[base_idx]),
-                    "bottom": float(data['low'].iloc[base_idx]),
-                    "time": data.index[base_idx].isoformat() if hasattr(data.index[base_idx], 'isoformat') else str(data.index[base_idx])
-                })
+        # المنطقة هي الشمعة التي سبقت الانفجار
+        base = positions - 1
+        bullish = data['close'].to_numpy()[positions] > data['open'].to_numpy()[positions]
+        zones = [
+            {"type": "DZ" if is_bullish else "SZ", "top": top, "bottom": bottom, "time": time}
+            for is_bullish, top, bottom, time in zip(
+                bullish.tolist(),
+                data['high'].to_numpy(dtype=float)[base].tolist(),
+                data['low'].to_numpy(dtype=float)[base].tolist(),
+                _format_times(data.index, base)
+            )
+        ]
 
         return IndicatorResult(
             name=self.name,
@@ -112,20 +124,21 @@ class VolumeClimaxIndicator(BaseIndicator):
         period = self.params.get("period", 20)
         std_mult = self.params.get("std_mult", 2.0)
 
-        vol_mean = data['volume'].rolling(window=period).mean()
-        vol_std = data['volume'].rolling(window=period).std()
+        vol_mean = self.primitive(data, ops.rolling_mean(ops.col("volume"), period))
+        vol_std = self.primitive(data, ops.rolling_std(ops.col("volume"), period))
         
         # شرط الذروة: الفوليوم الحالي أكبر من (المتوسط + 2 انحراف معياري)
         climax_mask = data['volume'] > (vol_mean + (std_mult * vol_std))
         
-        climax_points = []
-        for i in range(len(data)):
-            if climax_mask.iloc[i]:
-                climax_points.append({
-                    "time": data.index[i].isoformat() if hasattr(data.index[i], 'isoformat') else str(data.index[i]),
-                    "high": float(data['high'].iloc[i]),
-                    "low": float(data['low'].iloc[i])
-                })
+        positions = np.flatnonzero(climax_mask.to_numpy())
+        climax_points = [
+            {"time": time, "high": high, "low": low}
+            for time, high, low in zip(
+                _format_times(data.index, positions),
+                data['high'].to_numpy(dtype=float)[positions].tolist(),
+                data['low'].to_numpy(dtype=float)[positions].tolist()
+            )
+        ]
 
         return IndicatorResult(
             name=self.name,
@@ -152,18 +165,32 @@ class HarmonicIndicator(BaseIndicator):
 
     def calculate(self, data: pd.DataFrame) -> IndicatorResult:
         depth = self.params.get("depth", 10)
-        # خوارزمية البحث عن القمم والقيعان (ZigZag)
+        # خوارزمية البحث عن القمم والقيعان (ZigZag): الشمعة i قمة إذا كانت أعلى
+        # نافذة [i - depth, i + depth) وقاع إذا كانت أدنى نافذة low المقابلة
         pivots = []
-        for i in range(depth, len(data) - depth):
-            is_high = data['high'].iloc[i] == data['high'].iloc[i-depth:i+depth].max()
-            is_low = data['low'].iloc[i] == data['low'].iloc[i-depth:i+depth].min()
-            if is_high or is_low:
-                pivots.append({
-                    "type": "high" if is_high else "low",
-                    "price": float(data['high'].iloc[i] if is_high else data['low'].iloc[i]),
-                    "time": data.index[i].isoformat() if hasattr(data.index[i], 'isoformat') else str(data.index[i]),
-                    "idx": i
-                })
+        count = len(data) - 2 * depth
+        if depth > 0 and count > 0:
+            window = 2 * depth
+            # min_periods=1: مثل Series.max() تُتجاهل NaN داخل النافذة
+            # القيمة عند نهاية النافذة i + depth - 1 تخص الشمعة i
+            high_max = data['high'].rolling(window, min_periods=1).max().to_numpy()[window - 1:window - 1 + count]
+            low_min = data['low'].rolling(window, min_periods=1).min().to_numpy()[window - 1:window - 1 + count]
+            highs = data['high'].to_numpy(dtype=float)[depth:depth + count]
+            lows = data['low'].to_numpy(dtype=float)[depth:depth + count]
+
+            is_high = highs == high_max
+            is_low = lows == low_min
+            offsets = np.flatnonzero(is_high | is_low)
+            positions = offsets + depth
+            pivot_high = is_high[offsets]
+            prices = np.where(pivot_high, highs[offsets], lows[offsets])
+            pivots = [
+                {"type": "high" if high else "low", "price": price, "time": time, "idx": idx}
+                for high, price, time, idx in zip(
+                    pivot_high.tolist(), prices.tolist(),
+                    _format_times(data.index, positions), positions.tolist()
+                )
+            ]
 
         # منطق اكتشاف النماذج (هنا نرسل الـ Pivots للفرونت أند ليرسم الخطوط)
         return IndicatorResult(
@@ -319,7 +346,7 @@ class SMAIndicator(BaseIndicator):
         except:
             period = self.params.get("period", 20)
             
-        values = data['close'].rolling(window=period).mean()
+        values = self.primitive(data, ops.rolling_mean(CLOSE, period))
         
         return IndicatorResult(
             name=self.name,
@@ -347,7 +374,7 @@ class SMAFastIndicator(BaseIndicator):
     
     def calculate(self, data: pd.DataFrame) -> IndicatorResult:
         period = self.params.get("period", 10)
-        values = data['close'].rolling(window=period).mean()
+        values = self.primitive(data, ops.rolling_mean(CLOSE, period))
         
         return IndicatorResult(
             name=self.name,
@@ -384,7 +411,7 @@ class SMASlowIndicator(BaseIndicator):
     
     def calculate(self, data: pd.DataFrame) -> IndicatorResult:
         period = self.params.get("period", 20)
-        values = data['close'].rolling(window=period).mean()
+        values = self.primitive(data, ops.rolling_mean(CLOSE, period))
         
         return IndicatorResult(
             name=self.name,
@@ -420,7 +447,7 @@ class EMAIndicator(BaseIndicator):
     
     def calculate(self, data: pd.DataFrame) -> IndicatorResult:
         period = self.params.get("period", 20)
-        values = data['close'].ewm(span=period, adjust=False).mean()
+        values = self.primitive(data, ops.ema(CLOSE, period))
         
         return IndicatorResult(
             name=self.name,
@@ -449,7 +476,7 @@ class EMA21Indicator(BaseIndicator):
     
     def calculate(self, data: pd.DataFrame) -> IndicatorResult:
         period = self.params.get("period", 21)
-        values = data['close'].ewm(span=period, adjust=False).mean()
+        values = self.primitive(data, ops.ema(CLOSE, period))
         
         return IndicatorResult(
             name=self.name,
@@ -478,7 +505,7 @@ class EMA9Indicator(BaseIndicator):
     
     def calculate(self, data: pd.DataFrame) -> IndicatorResult:
         period = self.params.get("period", 9)
-        values = data['close'].ewm(span=period, adjust=False).mean()
+        values = self.primitive(data, ops.ema(CLOSE, period))
         
         return IndicatorResult(
             name=self.name,
@@ -495,6 +522,7 @@ class EMA9Indicator(BaseIndicator):
 )
 class WMAIndicator(BaseIndicator):
     """المتوسط المتحرك المرجح"""
+    execution = "process"  # حلقة بايثون لكل شمعة
     
     @classmethod
     def get_default_params(cls) -> Dict[str, Any]:
@@ -560,7 +588,8 @@ class MomentumIndicator(BaseIndicator):
     def calculate(self, data: pd.DataFrame) -> IndicatorResult:
         period = int(self.params.get("period", 10))
         # Formula: ((Price - Price_N) / Price_N) * 100
-        momentum = (data['close'] - data['close'].shift(period)) / data['close'].shift(period) * 100
+        previous = self.primitive(data, ops.shift(CLOSE, period))
+        momentum = (data['close'] - previous) / previous * 100
         
         return IndicatorResult(
             name=self.name,
@@ -646,6 +675,10 @@ class RSIIndicator(BaseIndicator):
         logger.debug(f"🔹 Avg Gain head:\n{avg_gain.head(20)}")
         logger.debug(f"🔹 Avg Loss head:\n{avg_loss.head(20)}")
 
+        return self._rsi_from_averages(avg_gain, avg_loss)
+
+    def _rsi_from_averages(self, avg_gain: pd.Series, avg_loss: pd.Series) -> pd.Series:
+        """RSI من متوسطات Wilder للمكاسب والخسائر"""
         with np.errstate(divide='ignore', invalid='ignore'):
             rs = avg_gain / avg_loss
             rsi = 100 - (100 / (1 + rs))
@@ -671,7 +704,12 @@ class RSIIndicator(BaseIndicator):
         logger.debug(f"🔹 Data columns: {data.columns.tolist()}")
         logger.debug(f"🔹 Close head:\n{data['close'].head(20)}")
 
-        rsi_values = self._calculate_rsi(data["close"], period)
+        # diff و gain/loss و تنعيم Wilder مشتركة بين rsi وأطره عبر رسم العمليات
+        delta = ops.diff(CLOSE)
+        rsi_values = self._rsi_from_averages(
+            self.primitive(data, ops.wilder(ops.gain(delta), period)),
+            self.primitive(data, ops.wilder(ops.loss(delta), period))
+        )
 
         logger.debug(f"🔹 RSI after calculation:\n{rsi_values.head(20)}")
 
@@ -752,12 +790,11 @@ class MACDIndicator(BaseIndicator):
         signal_period = self.params.get("signal", 9)
         
         # حساب المتوسطات المتحركة الأسية
-        ema_fast = data['close'].ewm(span=fast_period, adjust=False).mean()
-        ema_slow = data['close'].ewm(span=slow_period, adjust=False).mean()
+        macd_key = ops.sub(ops.ema(CLOSE, fast_period), ops.ema(CLOSE, slow_period))
         
         # حساب MACD وخط الإشارة
-        macd_line = ema_fast - ema_slow
-        signal_line = macd_line.ewm(span=signal_period, adjust=False).mean()
+        macd_line = self.primitive(data, macd_key)
+        signal_line = self.primitive(data, ops.ema(macd_key, signal_period))
         histogram = macd_line - signal_line
         
         # توليد إشارات
@@ -813,8 +850,8 @@ class StochasticIndicator(BaseIndicator):
         oversold = self.params.get("oversold", 20)
         
         # حساب %K
-        low_min = data['low'].rolling(window=k_period).min()
-        high_max = data['high'].rolling(window=k_period).max()
+        low_min = self.primitive(data, ops.rolling_min(ops.col("low"), k_period))
+        high_max = self.primitive(data, ops.rolling_max(ops.col("high"), k_period))
         
         k_line = 100 * ((data['close'] - low_min) / (high_max - low_min))
         
@@ -883,10 +920,10 @@ class BollingerBandsIndicator(BaseIndicator):
         std_dev = self.params.get("std", 2)
         
         # حساب المتوسط المتحرك البسيط
-        sma = data['close'].rolling(window=period).mean()
+        sma = self.primitive(data, ops.rolling_mean(CLOSE, period))
         
         # حساب الانحراف المعياري
-        rolling_std = data['close'].rolling(window=period).std()
+        rolling_std = self.primitive(data, ops.rolling_std(CLOSE, period))
         
         # حساب النطاقات
         upper_band = sma + (rolling_std * std_dev)
@@ -931,23 +968,11 @@ class ATRIndicator(BaseIndicator):
     def get_required_columns(cls) -> List[str]:
         return ['high', 'low', 'close']
     
-    def _calculate_true_range(self, data: pd.DataFrame) -> pd.Series:
-        """حساب المدى الحقيقي"""
-        high_low = data['high'] - data['low']
-        high_close = abs(data['high'] - data['close'].shift(1))
-        low_close = abs(data['low'] - data['close'].shift(1))
-        
-        true_range = pd.concat([high_low, high_close, low_close], axis=1)
-        return true_range.max(axis=1)
-    
     def calculate(self, data: pd.DataFrame) -> IndicatorResult:
         period = self.params.get("period", 14)
         
-        # حساب المدى الحقيقي
-        true_range = self._calculate_true_range(data)
-        
-        # حساب ATR
-        atr_values = true_range.rolling(window=period).mean()
+        # حساب ATR (المدى الحقيقي مشترك عبر رسم العمليات)
+        atr_values = self.primitive(data, ops.rolling_mean(ops.true_range(), period))
         
         return IndicatorResult(
             name=self.name,
@@ -1004,6 +1029,7 @@ class VWAPIndicator(BaseIndicator):
 )
 class OBVIndicator(BaseIndicator):
     """مؤشر حجم الرصيد"""
+    execution = "process"  # حلقة بايثون لكل شمعة
     
     @classmethod
     def get_default_params(cls) -> Dict[str, Any]:
@@ -1055,6 +1081,7 @@ class OBVIndicator(BaseIndicator):
 )
 class PivotPointsIndicator(BaseIndicator):
     """نقاط المحورية"""
+    execution = "process"  # حلقة بايثون لكل شمعة
     
     @classmethod
     def get_default_params(cls) -> Dict[str, Any]:
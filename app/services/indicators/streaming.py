@@ -0,0 +1,569 @@
+# app/services/indicators/streaming.py
+"""
+نسخ تدريجية (Streaming) من مؤشرات السجل للبث الحي.
+
+كل مؤشر يحتفظ بحالته الخاصة (نوافذ متحركة، متوسطات أسية، آخر إغلاق):
+- update(candle): قيمة الشمعة الحية في O(1) بدون تعديل الحالة
+- commit(candle): إغلاق الشمعة وتثبيتها في الحالة
+- to_state()/from_state(): الحالة كقيم بسيطة (قوائم وأرقام) للقطات الشارت
+
+المخرجات بنفس شكل نتائج IndicatorManager._calculate_sync (قيمة واحدة لكل قائمة)
+حتى تمر على ChartManager._extract_latest_indicator_values كما هي.
+"""
+import math
+import logging
+from collections import deque
+from typing import Dict, List, Any, Optional, Type
+
+import numpy as np
+import pandas as pd
+
+from .base import IndicatorConfig, BaseIndicator
+from .registry import IndicatorRegistry
+from .indicators import (
+    SMAIndicator, SMAFastIndicator, SMASlowIndicator,
+    EMAIndicator, EMA9Indicator, EMA21Indicator,
+    RSIIndicator, MACDIndicator, StochasticIndicator,
+    BollingerBandsIndicator, ATRIndicator
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _clean(value: float) -> Optional[float]:
+    """نفس تنظيف IndicatorCalculator._clean_value للأرقام"""
+    if value is None or math.isnan(value) or math.isinf(value):
+        return None
+    return round(float(value), 8)
+
+
+class RollingWindow:
+    """
+    نافذة متحركة بمجموع تراكمي.
+    تحتفظ بآخر (size - 1) قيمة مغلقة، والقيمة الحية تُضاف عند الاستعلام فقط.
+    """
+
+    # إعادة حساب المجاميع دورياً لمنع تراكم خطأ الفاصلة العائمة على مدى أيام
+    RESYNC_EVERY = 1000
+
+    def __init__(self, size: int):
+        self.size = max(int(size), 1)
+        self.values: deque = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.non_finite = 0
+        self._pushes = 0
+
+    def ready(self) -> bool:
+        return len(self.values) == self.size - 1
+
+    def mean(self, value: float) -> float:
+        if not self.ready():
+            return np.nan
+        if self.non_finite or not math.isfinite(value):
+            return self._slow_sum(value) / self.size
+        return (self.total + value) / self.size
+
+    def std(self, value: float) -> float:
+        """الانحراف المعياري للعينة (ddof=1) مثل pandas rolling().std()"""
+        if not self.ready() or self.size < 2:
+            return np.nan
+        if self.non_finite or not math.isfinite(value):
+            return float(np.std(list(self.values) + [value], ddof=1))
+        n = self.size
+        total = self.total + value
+        variance = (self.total_sq + value * value - total * total / n) / (n - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+    def push(self, value: float):
+        self.values.append(value)
+        self._add(value, 1)
+        if len(self.values) > self.size - 1:
+            self._add(self.values.popleft(), -1)
+
+        self._pushes += 1
+        if self._pushes % self.RESYNC_EVERY == 0:
+            self._resync()
+
+    def _add(self, value: float, sign: int):
+        if math.isfinite(value):
+            self.total += sign * value
+            self.total_sq += sign * value * value
+        else:
+            self.non_finite += sign
+
+    def _slow_sum(self, value: float) -> float:
+        return float(np.sum(list(self.values) + [value]))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"values": list(self.values), "pushes": self._pushes}
+
+    def load_state(self, state: Dict[str, Any]):
+        values = [float(v) for v in state["values"]]
+        if len(values) > self.size - 1:
+            raise ValueError(f"window state has {len(values)} values for size {self.size}")
+        self.values = deque(values)
+        self._pushes = int(state["pushes"])
+        self._resync()
+
+    def _resync(self):
+        finite = [v for v in self.values if math.isfinite(v)]
+        self.total = math.fsum(finite)
+        self.total_sq = math.fsum(v * v for v in finite)
+        self.non_finite = len(self.values) - len(finite)
+
+
+class RollingExtreme:
+    """أعلى/أدنى قيمة في نافذة متحركة (طابور رتيب - O(1) مطفأ)"""
+
+    def __init__(self, size: int, mode: str):
+        self.size = max(int(size), 1)
+        self.is_max = mode == "max"
+        self.window: deque = deque()  # (seq, value)
+        self.count = 0
+
+    def ready(self) -> bool:
+        return self.count >= self.size - 1
+
+    def _better(self, a: float, b: float) -> bool:
+        return a >= b if self.is_max else a <= b
+
+    def extreme(self, value: float) -> float:
+        if not self.ready():
+            return np.nan
+        if not self.window:
+            return value
+        best = self.window[0][1]
+        return value if self._better(value, best) else best
+
+    def push(self, value: float):
+        while self.window and self._better(value, self.window[-1][1]):
+            self.window.pop()
+        self.window.append((self.count, value))
+        self.count += 1
+        # نحتفظ فقط بآخر (size - 1) قيمة مغلقة
+        while self.window and self.window[0][0] <= self.count - self.size:
+            self.window.popleft()
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"window": [[seq, value] for seq, value in self.window], "count": self.count}
+
+    def load_state(self, state: Dict[str, Any]):
+        self.window = deque((int(seq), float(value)) for seq, value in state["window"])
+        self.count = int(state["count"])
+
+
+class ExponentialAverage:
+    """ewm(adjust=False).mean() تدريجياً"""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value: Optional[float] = None
+
+    @classmethod
+    def from_span(cls, span: float) -> 'ExponentialAverage':
+        return cls(2.0 / (span + 1.0))
+
+    def peek(self, x: float) -> float:
+        if self.value is None:
+            return x
+        return (1.0 - self.alpha) * self.value + self.alpha * x
+
+    def push(self, x: float):
+        self.value = self.peek(x)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"value": self.value}
+
+    def load_state(self, state: Dict[str, Any]):
+        value = state["value"]
+        self.value = float(value) if value is not None else None
+
+
+class StreamingIndicator:
+    """الأساس المشترك للمؤشرات التدريجية"""
+
+    # الخصائص التي تتغير مع commit (الباقي يُعاد بناؤه من التكوين)
+    STATE_FIELDS: tuple = ()
+
+    def __init__(self, name: str, params: Dict[str, Any]):
+        self.name = name
+        self.params = params or {}
+
+    def update(self, candle: Dict[str, Any]) -> Dict[str, Any]:
+        """قيمة الشمعة الحية بدون تعديل الحالة"""
+        return self._format(self._step(candle, commit=False), candle)
+
+    def commit(self, candle: Dict[str, Any]) -> Dict[str, Any]:
+        """إغلاق الشمعة وتثبيتها في الحالة"""
+        return self._format(self._step(candle, commit=True), candle)
+
+    def warm_up(self, candles: List[Dict[str, Any]]):
+        """تهيئة الحالة من الشموع المغلقة"""
+        for candle in candles:
+            self._step(candle, commit=True)
+
+    def to_state(self) -> Dict[str, Any]:
+        """حالة المؤشر كقيم بسيطة قابلة للترميز (بدون كائنات)"""
+        fields = {}
+        for field in self.STATE_FIELDS:
+            value = getattr(self, field)
+            fields[field] = value.to_state() if hasattr(value, "to_state") else value
+        return {"kind": type(self).__name__, "fields": fields}
+
+    def load_state(self, state: Dict[str, Any]):
+        if state.get("kind") != type(self).__name__:
+            raise ValueError(f"state of {state.get('kind')} does not match {type(self).__name__}")
+        fields = state["fields"]
+        for field in self.STATE_FIELDS:
+            current = getattr(self, field)
+            if hasattr(current, "load_state"):
+                current.load_state(fields[field])
+            else:
+                value = fields[field]
+                setattr(self, field, float(value) if value is not None else None)
+
+    @classmethod
+    def from_state(cls, config: Dict[str, Any], state: Dict[str, Any]) -> Optional['StreamingIndicator']:
+        """
+        إعادة بناء المؤشر من تكوينه وحالته المحفوظة
+
+        Returns:
+            StreamingIndicator أو None إذا لم تعد الحالة تطابق المؤشر
+            (يُعاد بناؤه حينها بـ warm_up)
+        """
+        indicator = create_streaming_indicator(config)
+        if indicator is None:
+            return None
+        try:
+            indicator.load_state(state)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Discarding streaming state of {indicator.name}: {e}")
+            return None
+        return indicator
+
+    def _step(self, candle: Dict[str, Any], commit: bool) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def _format(self, outputs: Dict[str, Any], candle: Dict[str, Any]) -> Dict[str, Any]:
+        value = _clean(outputs["value"])
+
+        signals = None
+        if "signal" in outputs:
+            signals = {
+                "data": [outputs["signal"]],
+                "index": [pd.Timestamp(candle["time"], unit='ms').isoformat()],
+                "dtype": "int64"
+            }
+
+        metadata = {}
+        for key, val in outputs.get("metadata", {}).items():
+            metadata[key] = [_clean(val)] if isinstance(val, float) else val
+
+        return {
+            "name": self.name,
+            "values": [value] if value is not None else [],
+            "signals": signals,
+            "metadata": metadata
+        }
+
+
+class StreamingSMA(StreamingIndicator):
+
+    STATE_FIELDS = ("window",)
+
+    def __init__(self, name: str, params: Dict[str, Any], period: int):
+        super().__init__(name, params)
+        self.period = period
+        self.window = RollingWindow(period)
+
+    def _step(self, candle, commit):
+        close = float(candle["close"])
+        value = self.window.mean(close)
+        if commit:
+            self.window.push(close)
+        return {"value": value, "metadata": {"period": self.period}}
+
+
+class StreamingEMA(StreamingIndicator):
+
+    STATE_FIELDS = ("ema",)
+
+    def __init__(self, name: str, params: Dict[str, Any], period: int):
+        super().__init__(name, params)
+        self.period = period
+        self.ema = ExponentialAverage.from_span(period)
+
+    def _step(self, candle, commit):
+        close = float(candle["close"])
+        value = self.ema.peek(close)
+        if commit:
+            self.ema.push(close)
+        return {"value": value, "metadata": {"period": self.period}}
+
+
+class StreamingRSI(StreamingIndicator):
+
+    STATE_FIELDS = ("avg_gain", "avg_loss", "prev_close")
+
+    def __init__(self, name: str, params: Dict[str, Any]):
+        super().__init__(name, params)
+        self.period = int(self.params.get("period", 14))
+        self.overbought = float(self.params.get("overbought", 70))
+        self.oversold = float(self.params.get("oversold", 30))
+        self.avg_gain = ExponentialAverage(1.0 / self.period)
+        self.avg_loss = ExponentialAverage(1.0 / self.period)
+        self.prev_close: Optional[float] = None
+
+    def _step(self, candle, commit):
+        close = float(candle["close"])
+        delta = close - self.prev_close if self.prev_close is not None else 0.0
+        gain = max(delta, 0.0)
+        loss = max(-delta, 0.0)
+
+        avg_gain = self.avg_gain.peek(gain)
+        avg_loss = self.avg_loss.peek(loss)
+
+        if avg_loss == 0 and avg_gain > 0:
+            rsi = 100.0
+        elif avg_gain == 0 and avg_loss > 0:
+            rsi = 0.0
+        elif avg_gain == 0 and avg_loss == 0:
+            rsi = 50.0
+        else:
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        signal = 0
+        if rsi > self.overbought:
+            signal = -1
+        if rsi < self.oversold:
+            signal = 1
+
+        if commit:
+            self.avg_gain.push(gain)
+            self.avg_loss.push(loss)
+            self.prev_close = close
+
+        return {
+            "value": rsi,
+            "signal": signal,
+            "metadata": {"period": self.period, "overbought": self.overbought, "oversold": self.oversold}
+        }
+
+
+class StreamingMACD(StreamingIndicator):
+
+    STATE_FIELDS = ("ema_fast", "ema_slow", "ema_signal", "prev_macd", "prev_signal")
+
+    def __init__(self, name: str, params: Dict[str, Any]):
+        super().__init__(name, params)
+        self.fast = self.params.get("fast", 12)
+        self.slow = self.params.get("slow", 26)
+        self.signal = self.params.get("signal", 9)
+        self.ema_fast = ExponentialAverage.from_span(self.fast)
+        self.ema_slow = ExponentialAverage.from_span(self.slow)
+        self.ema_signal = ExponentialAverage.from_span(self.signal)
+        self.prev_macd: Optional[float] = None
+        self.prev_signal: Optional[float] = None
+
+    def _step(self, candle, commit):
+        close = float(candle["close"])
+        macd_line = self.ema_fast.peek(close) - self.ema_slow.peek(close)
+        signal_line = self.ema_signal.peek(macd_line)
+        histogram = macd_line - signal_line
+
+        signal = 0
+        if self.prev_macd is not None:
+            if macd_line > signal_line and self.prev_macd <= self.prev_signal:
+                signal = 1
+            if macd_line < signal_line and self.prev_macd >= self.prev_signal:
+                signal = -1
+
+        if commit:
+            self.ema_fast.push(close)
+            self.ema_slow.push(close)
+            self.ema_signal.push(macd_line)
+            self.prev_macd = macd_line
+            self.prev_signal = signal_line
+
+        return {
+            "value": macd_line,
+            "signal": signal,
+            "metadata": {
+                "macd_line": macd_line,
+                "signal_line": signal_line,
+                "histogram": histogram,
+                "fast": self.fast,
+                "slow": self.slow,
+                "signal": self.signal
+            }
+        }
+
+
+class StreamingBollinger(StreamingIndicator):
+
+    STATE_FIELDS = ("window",)
+
+    def __init__(self, name: str, params: Dict[str, Any]):
+        super().__init__(name, params)
+        self.period = self.params.get("period", 20)
+        self.std_dev = self.params.get("std", 2)
+        self.window = RollingWindow(self.period)
+
+    def _step(self, candle, commit):
+        close = float(candle["close"])
+        sma = self.window.mean(close)
+        rolling_std = self.window.std(close)
+        upper_band = sma + rolling_std * self.std_dev
+        lower_band = sma - rolling_std * self.std_dev
+        with np.errstate(divide='ignore', invalid='ignore'):
+            band_width = float(np.float64(upper_band - lower_band) / np.float64(sma))
+
+        signal = 0
+        if close < lower_band:
+            signal = 1
+        if close > upper_band:
+            signal = -1
+
+        if commit:
+            self.window.push(close)
+
+        return {
+            "value": sma,
+            "signal": signal,
+            "metadata": {
+                "sma": sma,
+                "upper_band": upper_band,
+                "lower_band": lower_band,
+                "band_width": band_width,
+                "period": self.period,
+                "std": self.std_dev
+            }
+        }
+
+
+class StreamingATR(StreamingIndicator):
+
+    STATE_FIELDS = ("window", "prev_close")
+
+    def __init__(self, name: str, params: Dict[str, Any]):
+        super().__init__(name, params)
+        self.period = self.params.get("period", 14)
+        self.window = RollingWindow(self.period)
+        self.prev_close: Optional[float] = None
+
+    def _step(self, candle, commit):
+        high = float(candle["high"])
+        low = float(candle["low"])
+        true_range = high - low
+        if self.prev_close is not None:
+            true_range = max(true_range, abs(high - self.prev_close), abs(low - self.prev_close))
+
+        value = self.window.mean(true_range)
+
+        if commit:
+            self.window.push(true_range)
+            self.prev_close = float(candle["close"])
+
+        return {"value": value, "metadata": {"period": self.period}}
+
+
+class StreamingStochastic(StreamingIndicator):
+
+    STATE_FIELDS = ("lowest", "highest", "k_window", "d_window")
+
+    def __init__(self, name: str, params: Dict[str, Any]):
+        super().__init__(name, params)
+        self.k_period = self.params.get("k_period", 14)
+        self.d_period = self.params.get("d_period", 3)
+        self.smooth = self.params.get("smooth", 3)
+        self.overbought = self.params.get("overbought", 80)
+        self.oversold = self.params.get("oversold", 20)
+        self.lowest = RollingExtreme(self.k_period, "min")
+        self.highest = RollingExtreme(self.k_period, "max")
+        self.k_window = RollingWindow(self.smooth)
+        self.d_window = RollingWindow(self.d_period)
+
+    def _step(self, candle, commit):
+        high = float(candle["high"])
+        low = float(candle["low"])
+        close = float(candle["close"])
+
+        low_min = self.lowest.extreme(low)
+        high_max = self.highest.extreme(high)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k_line = float(100 * (np.float64(close - low_min) / np.float64(high_max - low_min)))
+
+        k_smoothed = self.k_window.mean(k_line)
+        d_line = self.d_window.mean(k_smoothed)
+
+        signal = 0
+        if k_smoothed < self.oversold and d_line < self.oversold:
+            signal = 1
+        if k_smoothed > self.overbought and d_line > self.overbought:
+            signal = -1
+
+        if commit:
+            self.lowest.push(low)
+            self.highest.push(high)
+            self.k_window.push(k_line)
+            self.d_window.push(k_smoothed)
+
+        return {
+            "value": k_smoothed,
+            "signal": signal,
+            "metadata": {
+                "k_line": k_smoothed,
+                "d_line": d_line,
+                "k_period": self.k_period,
+                "d_period": self.d_period,
+                "smooth": self.smooth,
+                "overbought": self.overbought,
+                "oversold": self.oversold
+            }
+        }
+
+
+def _sma_period(name: str, params: Dict[str, Any]) -> int:
+    """نفس منطق SMAIndicator: الفترة من الاسم (sma_8_1h -> 8) وإلا من المعاملات"""
+    try:
+        return int(name.split('_')[1])
+    except (IndexError, ValueError):
+        return params.get("period", 20)
+
+
+_STREAMING_FACTORIES = {
+    SMAIndicator: lambda name, params: StreamingSMA(name, params, _sma_period(name, params)),
+    SMAFastIndicator: lambda name, params: StreamingSMA(name, params, params.get("period", 10)),
+    SMASlowIndicator: lambda name, params: StreamingSMA(name, params, params.get("period", 20)),
+    EMAIndicator: lambda name, params: StreamingEMA(name, params, params.get("period", 20)),
+    EMA9Indicator: lambda name, params: StreamingEMA(name, params, params.get("period", 9)),
+    EMA21Indicator: lambda name, params: StreamingEMA(name, params, params.get("period", 21)),
+    RSIIndicator: StreamingRSI,
+    MACDIndicator: StreamingMACD,
+    BollingerBandsIndicator: StreamingBollinger,
+    ATRIndicator: StreamingATR,
+    StochasticIndicator: StreamingStochastic,
+}
+
+
+def create_streaming_indicator(config: Dict[str, Any]) -> Optional[StreamingIndicator]:
+    """
+    إنشاء نسخة تدريجية لمؤشر من السجل.
+
+    Returns:
+        StreamingIndicator أو None إذا لم يكن للمؤشر نسخة تدريجية
+        (يُحسب حينها بالطريقة الكاملة عبر apply_indicators)
+    """
+    try:
+        indicator_config = IndicatorConfig(**config)
+    except Exception as e:
+        logger.debug(f"Invalid indicator config for streaming: {e}")
+        return None
+
+    indicator_class: Optional[Type[BaseIndicator]] = IndicatorRegistry.get_indicator(indicator_config.name)
+    factory = _STREAMING_FACTORIES.get(indicator_class)
+    if factory is None:
+        return None
+
+    return factory(indicator_config.name, dict(indicator_config.params))
@@ -2,9 +2,11 @@
 import asyncio
 from datetime import datetime
 from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
 
 from app.markets.candle_builder import CandleBuilder
+from app.markets.tick_aggregator import BatchCandleAggregator, DEFAULT_TIMEFRAMES
 from app.markets.candle_store import CandleStore
 from app.markets.indicator_scheduler import IndicatorScheduler
 from app.chart.chart_hub import ChartHub
@@ -19,18 +21,22 @@ class MarketService:
     def __init__(self, max_candles: int = 1000):
         # المكونات الأساسية
         self.candle_builder = CandleBuilder()
+        self.tick_aggregator = BatchCandleAggregator(DEFAULT_TIMEFRAMES)
         self.candle_store = CandleStore(max_candles)
         self.indicator_scheduler = IndicatorScheduler(self.candle_store)
         self.chart_hub = ChartHub()
         self.broadcaster = IndicatorBroadcaster(self.indicator_scheduler, self.chart_hub)
         
         # الربط بين المكونات
+        # شموع التيكات (حجمها حجم 24 ساعة متحرك) لا تُحفظ ولا تُغذّي لوحة الفاحص؛
+        # التخزين الدائم والفاحص يعتمدان على شموع المزود فقط
         self.candle_builder.on_candle_close(self.indicator_scheduler.on_candle_close)
+        self.tick_aggregator.on_candles_close(self.indicator_scheduler.on_candles_close)
         self.indicator_scheduler.set_on_update(self.broadcaster.broadcast_last)
         
         # حالة النظام
         self.is_running = False
-        
+    
     def start_market_stream(self):
         """بدء استقبال بيانات السوق"""
         if not self.is_running:
@@ -40,21 +46,18 @@ class MarketService:
     async def _process_market_stream(self):
         """معالجة تدفق بيانات السوق"""
         async for msg in stream_all_market():
-            for tick in msg["data"]:
-                symbol = tick["symbol"]
-                price = tick["price"]
-                volume = tick["volume"]
-                timestamp = datetime.utcnow()
-                
-                # معالجة التيك لجميع الأطر الزمنية المطلوبة
-                for timeframe in ["1m", "5m", "15m", "1h", "4h", "1d"]:
-                    self.candle_builder.process_tick(
-                        symbol=symbol,
-                        timeframe=timeframe,
-                        price=price,
-                        volume=volume,
-                        timestamp=timestamp
-                    )
+            ticks = msg["data"]
+            if not ticks:
+                continue
+
+            # الرسالة كاملة كمصفوفات: كل الرموز وكل الأطر الزمنية في تمريرة واحدة
+            count = len(ticks)
+            self.tick_aggregator.process_batch(
+                symbols=[tick["symbol"] for tick in ticks],
+                prices=np.fromiter((tick["price"] for tick in ticks), dtype=np.float64, count=count),
+                volumes=np.fromiter((tick["volume"] for tick in ticks), dtype=np.float64, count=count),
+                timestamp=datetime.utcnow()
+            )
     
     async def register_chart_client(
         self,
@@ -95,10 +98,7 @@ class MarketService:
         limit: Optional[int] = None
     ) -> pd.DataFrame:
         """الحصول على الشموع كـ DataFrame"""
-        df = self.candle_store.to_dataframe(symbol, timeframe)
-        if limit and not df.empty:
-            return df.tail(limit)
-        return df
+        return self.candle_store.to_dataframe(symbol, timeframe, limit=limit or None)
 
 # إنشاء نسخة وحيدة من الخدمة
 market_service = MarketService()
\ No newline at end of file
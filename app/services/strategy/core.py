@@ -13,7 +13,8 @@ from .schemas import (
     Condition, CompositeCondition, PositionSide
 )
 from .conditions import ConditionEvaluator
-from app.services.indicators import apply_indicators, IndicatorCalculator
+from .vectorized import CompiledRules, compile_strategy_rules
+from app.services.indicators import apply_indicators, apply_indicators_columnar, IndicatorCalculator
 from app.services.indicators.base import IndicatorResult
 import logging
 logger = logging.getLogger(__name__)
@@ -49,6 +50,11 @@ class StrategyEngine:
         # كاش للعمليات
         self._indicators_cache: Dict[str, pd.Series] = {}
         self._condition_cache: Dict[str, pd.Series] = {}
+
+        # توليد الإشارات بأقنعة NumPy بدلاً من حلقة على الشموع
+        self.vectorized = True
+        self._compiled_rules: Optional[CompiledRules] = None
+        self._compiled_data: Optional[pd.DataFrame] = None
         
         # حالة الإستراتيجية
         self.current_position: Optional[Dict[str, Any]] = None
@@ -161,19 +167,8 @@ class StrategyEngine:
 
 
 
-    async def _calculate_indicators(self, data: pd.DataFrame, use_cache: bool) -> Dict[str, pd.Series]:
-        """حساب المؤشرات مع معالجة شاملة للأخطاء حسب شكل البيانات القادم من apply_indicators مع برينت لتأكيد النتائج"""
-
-        if not hasattr(self, '_indicators_cache'):
-            self._indicators_cache = {}
-
-        if use_cache and hasattr(self, '_last_cache_key') and hasattr(self, '_indicators_cache'):
-            cache_key = hash(tuple(data.index[-1:]) + tuple(data.columns))
-            if self._last_cache_key == cache_key:
-                logger.info("🔄 استخدام المؤشرات من الكاش")
-                return self._indicators_cache
-
-        indicators: Dict[str, pd.Series] = {}
+    def required_indicators(self) -> List[str]:
+        """المؤشرات المعرفة في التكوين + المؤشرات المذكورة في القواعد"""
         required_indicators = list({cfg.name for cfg in self.config.indicators})
 
         # جمع مؤشرات القواعد
@@ -187,43 +182,66 @@ class StrategyEngine:
                     if isinstance(val, str) and val.startswith("indicator:"):
                         required_indicators.append(val.split(":")[1])
 
-        required_indicators = list(set(required_indicators))
+        return list(set(required_indicators))
+
+    def indicators_fingerprint(self) -> str:
+        """
+        مفتاح نتائج المؤشرات: استراتيجيتان بنفس المفتاح تنتجان نفس المؤشرات
+        على نفس البيانات (قواعد وعتبات مختلفة لا تغير المفتاح)
+        """
+        return json.dumps([
+            [cfg.model_dump(mode="json") for cfg in self.config.indicators],
+            sorted(self.required_indicators())
+        ], sort_keys=True)
+
+    def use_precomputed_indicators(self, data: pd.DataFrame, indicators: Dict[str, pd.Series]):
+        """استخدام مؤشرات محسوبة مسبقاً لنفس البيانات (run_strategy مع use_cache=True)"""
+        self._indicators_cache = indicators
+        self._last_cache_key = hash(tuple(data.index[-1:]) + tuple(data.columns))
+
+    async def _calculate_indicators(self, data: pd.DataFrame, use_cache: bool) -> Dict[str, pd.Series]:
+        """حساب المؤشرات مع معالجة شاملة للأخطاء حسب شكل البيانات القادم من apply_indicators مع برينت لتأكيد النتائج"""
+
+        if not hasattr(self, '_indicators_cache'):
+            self._indicators_cache = {}
+
+        if use_cache and hasattr(self, '_last_cache_key') and hasattr(self, '_indicators_cache'):
+            cache_key = hash(tuple(data.index[-1:]) + tuple(data.columns))
+            if self._last_cache_key == cache_key:
+                logger.info("🔄 استخدام المؤشرات من الكاش")
+                return self._indicators_cache
+
+        indicators: Dict[str, pd.Series] = {}
+        required_indicators = self.required_indicators()
         logger.info(f"📋 المؤشرات المطلوبة: {required_indicators}")
 
         try:
-            # استدعاء apply_indicators
-            all_indicators = apply_indicators(
+            # النتائج كمصفوفات NumPy مباشرة (بدون تحويل إلى قوائم ثم Series)
+            batch = apply_indicators_columnar(
                 dataframe=data,
                 indicators_config=self.config.indicators,
-                use_cache=use_cache,
-                return_raw=True
+                use_cache=use_cache
             )
+            results = batch.results if batch is not None else {}
 
-            # التعامل مع كل مؤشر مهما كان هيكله
             for ind_name in required_indicators:
-                raw_values: list = [None] * len(data)
-
-                if ind_name in all_indicators:
-                    result = all_indicators[ind_name]
-
-                    if isinstance(result, IndicatorResult):
-                        raw_values = result.values.get("data", [None])
-                    elif isinstance(result, dict):
-                        raw_values = result.get("values", {}).get("data", [None])
-                    elif isinstance(result, pd.Series):
-                        raw_values = result.tolist()
-                    elif isinstance(result, list):
-                        raw_values = result
-
-                # طباعة Debug للقيم قبل التحويل
-                print(f"🔹 {ind_name} أول 5 قيم: {raw_values[:5]} ... آخر 5 قيم: {raw_values[-5:]}")
-
-                # padding إذا طول البيانات أقل من طول DataFrame
-                padding_len = max(0, len(data) - len(raw_values))
-                series_values = [None] * padding_len + raw_values[:len(data)]
-                indicators[ind_name] = pd.Series(series_values, index=data.index)
+                result = results.get(ind_name)
+                if result is None:
+                    indicators[ind_name] = pd.Series(np.nan, index=data.index)
+                    continue
+                if result.error is not None:
+                    logger.warning(f"⚠️ {ind_name}: {result.error}")
+
+                values = result.values
+                if len(values) == len(data):
+                    indicators[ind_name] = pd.Series(values, index=data.index)
+                else:
+                    # padding من البداية إذا طول النتيجة أقل من طول DataFrame
+                    padded = np.full(len(data), np.nan, dtype=np.float64 if values.dtype.kind in "fiub" else object)
+                    tail = values[:len(data)]
+                    padded[len(data) - len(tail):] = tail
+                    indicators[ind_name] = pd.Series(padded, index=data.index)
 
-                # طباعة Debug بعد التحويل إلى pd.Series
                 print(f"🔹 {ind_name} pd.Series sample: {indicators[ind_name].head(5).tolist()} ... {indicators[ind_name].tail(5).tolist()}")
 
             # حفظ الكاش
@@ -264,6 +282,17 @@ class StrategyEngine:
             indices_to_check = range(len(data))
         
         print(f"🔍 فحص {len(indices_to_check)} نقطة بيانات")
+
+        self._compiled_rules = None
+        self._compiled_data = None
+        if self.vectorized and not live_mode:
+            compiled = compile_strategy_rules(self.config, data, indicators)
+            if compiled is not None:
+                self._compiled_rules = compiled
+                self._compiled_data = data
+                signals = self._signals_from_masks(data, compiled)
+                print(f"✅ تم توليد {len(signals)} إشارة (vectorized)")
+                return signals
         
         for idx in indices_to_check:
             try:
@@ -292,6 +321,74 @@ class StrategyEngine:
 
 
 
+    def _signals_from_masks(
+        self,
+        data: pd.DataFrame,
+        compiled: CompiledRules
+    ) -> List[TradeSignal]:
+        """بناء الإشارات من الأقنعة بنفس ترتيب الحلقة: حسب الفهرس ثم ترتيب القاعدة"""
+        rules: List[Tuple[str, Any]] = []
+        masks: List[np.ndarray] = []
+
+        for rule, mask in compiled.entry_masks:
+            if self.config.position_side == PositionSide.LONG and rule.position_side == PositionSide.SHORT:
+                continue
+            if self.config.position_side == PositionSide.SHORT and rule.position_side == PositionSide.LONG:
+                continue
+            rules.append(("entry", rule))
+            masks.append(mask)
+
+        # قواعد الخروج تُقيّم فقط عند وجود مركز مفتوح (كما في الحلقة)
+        if self.current_position:
+            for rule, mask in compiled.exit_masks:
+                rules.append(("exit", rule))
+                masks.append(mask)
+
+        if not masks:
+            return []
+
+        hits = [np.flatnonzero(mask) for mask in masks]
+        positions = np.concatenate(hits)
+        rule_order = np.concatenate([np.full(len(h), k) for k, h in enumerate(hits)])
+        order = np.lexsort((rule_order, positions))
+
+        close_values = data['close'].to_numpy() if 'close' in data.columns else data.iloc[:, 3].to_numpy()
+        signals = []
+
+        for position, k in zip(positions[order], rule_order[order]):
+            current_index = int(position)
+            kind, rule = rules[k]
+
+            if kind == "entry":
+                signals.append(TradeSignal(
+                    timestamp=data.index[current_index],
+                    action="buy" if rule.position_side in [PositionSide.LONG, PositionSide.BOTH] else "sell",
+                    price=close_values[current_index],
+                    reason=f"قاعدة دخول: {rule.name}",
+                    rule_name=rule.name,
+                    strength=rule.weight,
+                    metadata={
+                        "position_side": rule.position_side,
+                        "rule_weight": rule.weight,
+                        "index": current_index
+                    }
+                ))
+            else:
+                signals.append(TradeSignal(
+                    timestamp=data.index[current_index],
+                    action="close",
+                    price=close_values[current_index],
+                    reason=f"Exit rule triggered: {rule.name} ({rule.exit_type})",
+                    rule_name=rule.name,
+                    strength=1.0,
+                    metadata={
+                        "exit_type": rule.exit_type,
+                        "exit_value": rule.value
+                    }
+                ))
+
+        return signals
+
     async def _evaluate_entry_rules(
         self,
         data: pd.DataFrame,
@@ -413,6 +510,13 @@ class StrategyEngine:
         """تطبيق قواعد الفلترة على الإشارات"""
         if not self.config.filter_rules:
             return signals
+
+        if self._compiled_rules is not None and self._compiled_data is data:
+            block_mask = self._compiled_rules.block_mask
+            return [
+                signal for signal in signals
+                if not block_mask[data.index.get_loc(signal.timestamp)]
+            ]
         
         filtered_signals = []
         
@@ -1,6 +1,6 @@
 
 from dataclasses import dataclass
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Union
 from enum import Enum
 from datetime import datetime
 import pandas as pd
@@ -9,7 +9,7 @@ import logging
 
 # استيراد التكوين والأدوات المساعدة للتفكير فقط
 from .schemas import (
-    StrategyConfig, Condition, CompositeCondition, PositionSide
+    StrategyConfig, Condition, CompositeCondition, PositionSide, Operator
 )
 from .conditions import ConditionEvaluator
 from app.services.indicators import apply_indicators
@@ -30,6 +30,89 @@ class Decision:
     reason: str
     metadata: Dict[str, Any] = None
 
+class IndicatorMatrix:
+    """
+    مصفوفة المؤشرات المحسوبة مسبقاً (عمود NumPy لكل حقل).
+    تُستخدم في وضع التقييم التدريجي: قيمة الشمعة i تُقرأ بالفهرس مباشرة
+    بدون تقطيع أو نسخ الـ DataFrame.
+    """
+
+    BASE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, index: pd.Index, columns: Dict[str, np.ndarray], indicator_names: List[str]):
+        self.index = index
+        self.columns = columns
+        # نفس المؤشرات التي يمررها _evaluate_rule_condition للمقيّم
+        self.indicator_names = {name for name in indicator_names if name in columns}
+        self._refs: Dict[Any, Union[float, np.ndarray, None]] = {}
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, indicator_names: List[str]) -> Optional['IndicatorMatrix']:
+        """بناء المصفوفة من الإطار المحسوب. يعيد None إذا تعذّر تمثيل الأعمدة كأرقام"""
+        if not frame.index.is_unique:
+            return None
+
+        columns = {}
+        for col in frame.columns:
+            series = frame[col]
+            if not (pd.api.types.is_numeric_dtype(series) or series.dtype == object):
+                return None
+            try:
+                columns[col] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            except (TypeError, ValueError):
+                return None
+        return cls(frame.index, columns, indicator_names)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def resolve(self, value: Any) -> Union[float, np.ndarray, None]:
+        """
+        تحويل مرجع القيمة (رقم، indicator:x، price.x، اسم عمود) إلى ثابت أو عمود.
+        نفس أولوية ConditionEvaluator._get_value.
+        """
+        if isinstance(value, (int, float)):
+            return float(value)
+
+        if isinstance(value, str):
+            if value.startswith('indicator:'):
+                indicator_ref = value.split(':')[1]
+                if indicator_ref in self.indicator_names:
+                    return self.columns[indicator_ref]
+                return None
+            elif value.startswith('price.'):
+                return self.columns.get(value.split('.')[1])
+            elif value in self.columns:
+                return self.columns[value]
+        return None
+
+    def value_at(self, value: Any, index: int) -> Optional[float]:
+        if value not in self._refs:
+            self._refs[value] = self.resolve(value)
+        ref = self._refs[value]
+
+        if ref is None:
+            return None
+        if isinstance(ref, float):
+            return ref
+
+        val = ref[index]
+        if np.isnan(val):
+            return None
+        return float(val)
+
+    def snapshot(self, index: int) -> Dict[str, float]:
+        """قيم المؤشرات (غير NaN) في الشمعة index"""
+        indicators = {}
+        for col, values in self.columns.items():
+            if col in self.BASE_COLUMNS:
+                continue
+            val = values[index]
+            if not np.isnan(val):
+                indicators[col] = float(val)
+        return indicators
+
+
 class StrategyEngine:
     """
     محرك الاستراتيجية (Decision Provider)
@@ -41,6 +124,7 @@ class StrategyEngine:
         self.condition_evaluator = ConditionEvaluator()
         self.current_data_frame = None
         self.full_data = None
+        self.matrix: Optional[IndicatorMatrix] = None
 
     async def run(self, market_context: pd.DataFrame) -> Decision:
         if market_context.empty or len(market_context) < 2:
@@ -73,6 +157,107 @@ class StrategyEngine:
             logger.exception(f"Strategy Engine Error: {e}")
             return self._create_hold_decision(f"Error: {str(e)}")
 
+    # =============================
+    # وضع التقييم التدريجي (Streaming)
+    # =============================
+
+    def enable_streaming(self, prepared_data: pd.DataFrame) -> bool:
+        """
+        تفعيل وضع التقييم التدريجي على بيانات محسوبة مسبقاً (مخرجات _prepare_indicators).
+        بعدها يُستدعى decide(i) لكل شمعة بدلاً من run(data.iloc[:i+1]).
+
+        Returns:
+            bool: False إذا تعذّر بناء المصفوفة (يبقى المسار القديم هو المستخدم)
+        """
+        indicator_names = [ind.name for ind in self.config.indicators]
+        self.matrix = IndicatorMatrix.from_frame(prepared_data, indicator_names)
+        if self.matrix is None:
+            logger.warning("Streaming mode unavailable: non-numeric columns or duplicate index")
+            return False
+        return True
+
+    def decide(self, index: int) -> Decision:
+        """
+        قرار الشمعة index من المصفوفة المحسوبة مسبقاً - O(عدد القواعد) لكل شمعة.
+        مطابق لنتيجة run(data.iloc[:index+1]).
+        """
+        if self.matrix is None:
+            raise RuntimeError("Streaming mode is not enabled, call enable_streaming() first")
+
+        if index < 1:
+            return self._create_hold_decision("Insufficient data")
+
+        try:
+            evaluate = lambda condition: self._evaluate_streaming_condition(condition, index)
+
+            exit_reason = self._first_exit_rule(evaluate)
+            if exit_reason:
+                return Decision(
+                    timestamp=self.matrix.index[index],
+                    action=DecisionAction.HOLD,
+                    confidence=1.0,
+                    reason=f"Exit Condition: {exit_reason}",
+                    metadata={"trigger": "exit_rule"}
+                )
+
+            return self._score_entry_rules(evaluate, self.matrix.index[index])
+
+        except Exception as e:
+            logger.exception(f"Strategy Engine Error: {e}")
+            return self._create_hold_decision(f"Error: {str(e)}")
+
+    def indicator_snapshot(self, index: int) -> Dict[str, float]:
+        """قيم المؤشرات في الشمعة index (بديل current_data_frame.iloc[-1] في وضع التقييم التدريجي)"""
+        if self.matrix is None or index < 1:
+            return {}
+        return self.matrix.snapshot(index)
+
+    def _evaluate_streaming_condition(self, condition: Any, index: int) -> bool:
+        try:
+            return self._evaluate_matrix_condition(condition, index)
+        except Exception as e:
+            logger.error(f"Streaming evaluation failed: {e}")
+            return False
+
+    def _evaluate_matrix_condition(self, condition: Any, index: int) -> bool:
+        """نسخة من ConditionEvaluator.evaluate تقرأ القيم من المصفوفة"""
+        if isinstance(condition, CompositeCondition):
+            if condition.type in ["logical_and", "and"]:
+                for sub_condition in condition.conditions:
+                    if not self._evaluate_matrix_condition(sub_condition, index):
+                        return False
+                return True
+            elif condition.type in ["logical_or", "or"]:
+                for sub_condition in condition.conditions:
+                    if self._evaluate_matrix_condition(sub_condition, index):
+                        return True
+                return False
+            logger.error(f"Unknown composite condition type: {condition.type}")
+            return False
+
+        if not isinstance(condition, Condition):
+            return False
+
+        if index <= 0:
+            return False
+
+        left_value = self.matrix.value_at(condition.left_value, index)
+        right_value = self.matrix.value_at(condition.right_value, index)
+        if left_value is None or right_value is None:
+            return False
+
+        operator_func = self.condition_evaluator.operator_functions.get(condition.operator)
+        if not operator_func:
+            raise ValueError(f"Unknown operator: {condition.operator}")
+
+        if condition.operator in [Operator.CROSSOVER_ABOVE, Operator.CROSSOVER_BELOW]:
+            prev_left_value = self.matrix.value_at(condition.left_value, index - 1)
+            prev_right_value = self.matrix.value_at(condition.right_value, index - 1)
+            if prev_left_value is None or prev_right_value is None:
+                return False
+            return operator_func(left_value, right_value, prev_left_value, prev_right_value)
+        return operator_func(left_value, right_value)
+
     async def _prepare_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
         """
         إعداد المؤشرات.
@@ -149,35 +334,46 @@ class StrategyEngine:
             return data
 
     def _check_exit_conditions(self, data: pd.DataFrame, index: int) -> Optional[str]:
+        return self._first_exit_rule(
+            lambda condition: self._evaluate_rule_condition(condition, data, index)
+        )
+
+    def _first_exit_rule(self, evaluate: Callable[[Any], bool]) -> Optional[str]:
         if not self.config.exit_rules:
             return None
         for rule in self.config.exit_rules:
             if not rule.enabled:
                 continue
-            if self._evaluate_rule_condition(rule.condition, data, index):
+            if evaluate(rule.condition):
                 return rule.name
         return None
 
     def _determine_trend(self, data: pd.DataFrame, index: int) -> Decision:
+        return self._score_entry_rules(
+            lambda condition: self._evaluate_rule_condition(condition, data, index),
+            data.index[index]
+        )
+
+    def _score_entry_rules(self, evaluate: Callable[[Any], bool], timestamp: datetime) -> Decision:
         long_score = 0.0
         short_score = 0.0
         active_reason = "No clear trend direction"
 
         for rule in self.config.entry_rules:
             if rule.enabled and rule.position_side in [PositionSide.LONG, PositionSide.BOTH]:
-                if self._evaluate_rule_condition(rule.condition, data, index):
+                if evaluate(rule.condition):
                     long_score += rule.weight
                     active_reason = rule.name
 
         for rule in self.config.entry_rules:
             if rule.enabled and rule.position_side in [PositionSide.SHORT, PositionSide.BOTH]:
-                if self._evaluate_rule_condition(rule.condition, data, index):
+                if evaluate(rule.condition):
                     short_score += rule.weight
                     active_reason = rule.name
 
         if long_score > short_score and long_score > 0:
             return Decision(
-                timestamp=data.index[index],
+                timestamp=timestamp,
                 action=DecisionAction.BUY,
                 confidence=min(long_score, 1.0),
                 reason=active_reason,
@@ -185,7 +381,7 @@ class StrategyEngine:
             )
         elif short_score > long_score and short_score > 0:
             return Decision(
-                timestamp=data.index[index],
+                timestamp=timestamp,
                 action=DecisionAction.SELL,
                 confidence=min(short_score, 1.0),
                 reason=active_reason,
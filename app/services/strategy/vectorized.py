@@ -0,0 +1,183 @@
+# app/services/strategy/vectorized.py
+
+import pandas as pd
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple, Union
+from .schemas import (
+    StrategyConfig, Condition, CompositeCondition, Operator,
+    EntryRule, ExitRule
+)
+import logging
+logger = logging.getLogger(__name__)
+
+
+class VectorizationUnsupported(ValueError):
+    """البيانات أو الشرط لا يمكن تمثيلها كمصفوفات (يُستخدم المقيّم العادي بدلاً منها)"""
+
+
+@dataclass
+class CompiledRules:
+    """أقنعة منطقية لكل قاعدة على كامل البيانات"""
+    entry_masks: List[Tuple[EntryRule, np.ndarray]] = field(default_factory=list)
+    exit_masks: List[Tuple[ExitRule, np.ndarray]] = field(default_factory=list)
+    block_mask: Optional[np.ndarray] = None
+
+
+class ConditionMaskCompiler:
+    """
+    تحويل الشروط إلى أقنعة NumPy على كامل الأعمدة.
+    النتيجة مطابقة لـ ConditionEvaluator.evaluate عند كل فهرس:
+    - القيمة المفقودة (NaN/None) تجعل الشرط False
+    - الفهرس 0 دائماً False
+    - التقاطع يستخدم القيم المزاحة بشمعة واحدة
+    """
+
+    _comparisons = {
+        Operator.GREATER_THAN: np.greater,
+        Operator.GREATER_THAN_EQUAL: np.greater_equal,
+        Operator.LESS_THAN: np.less,
+        Operator.LESS_THAN_EQUAL: np.less_equal,
+        Operator.EQUAL: np.equal,
+        Operator.NOT_EQUAL: np.not_equal,
+    }
+
+    def __init__(self, data: pd.DataFrame, indicators: Dict[str, Any]):
+        if not data.index.is_unique:
+            raise VectorizationUnsupported("Duplicate timestamps in data index")
+
+        self.data = data
+        self.indicators = indicators
+        self.length = len(data)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._operands: Dict[Any, Optional[Tuple[np.ndarray, np.ndarray]]] = {}
+
+    def compile(self, condition: Union[Condition, CompositeCondition]) -> np.ndarray:
+        if isinstance(condition, CompositeCondition):
+            masks = [self.compile(sub_condition) for sub_condition in condition.conditions]
+            if condition.type in ["logical_and", "and"]:
+                return np.logical_and.reduce(masks)
+            elif condition.type in ["logical_or", "or"]:
+                return np.logical_or.reduce(masks)
+            raise VectorizationUnsupported(f"Unknown composite condition type: {condition.type}")
+
+        if not isinstance(condition, Condition):
+            raise VectorizationUnsupported(f"Unknown condition type: {type(condition)}")
+
+        mask = np.zeros(self.length, dtype=bool)
+        left = self._operand(condition.left_value)
+        right = self._operand(condition.right_value)
+        if left is None or right is None or self.length < 2:
+            return mask
+
+        left_values, left_valid = left
+        right_values, right_valid = right
+
+        with np.errstate(invalid='ignore'):
+            if condition.operator in [Operator.CROSSOVER_ABOVE, Operator.CROSSOVER_BELOW]:
+                # القيم السابقة للفهرس i موجودة في i-1
+                valid = (left_valid[1:] & right_valid[1:] & left_valid[:-1] & right_valid[:-1])
+                if condition.operator == Operator.CROSSOVER_ABOVE:
+                    crossed = (left_values[1:] > right_values[1:]) & (left_values[:-1] <= right_values[:-1])
+                else:
+                    crossed = (left_values[1:] < right_values[1:]) & (left_values[:-1] >= right_values[:-1])
+                mask[1:] = valid & crossed
+            else:
+                compare = self._comparisons.get(condition.operator)
+                if compare is None:
+                    raise VectorizationUnsupported(f"Unknown operator: {condition.operator}")
+                mask[:] = left_valid & right_valid & compare(left_values, right_values)
+
+        # ConditionEvaluator يرفض الفهرس 0 دائماً
+        mask[0] = False
+        return mask
+
+    def _operand(self, value: Any) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(القيم، قناع الصلاحية) لقيمة الشرط، أو None إذا كانت القيمة غير متاحة لكل الفهارس"""
+        if value not in self._operands:
+            self._operands[value] = self._resolve(value)
+        return self._operands[value]
+
+    def _resolve(self, value: Any) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if isinstance(value, (int, float)):
+            # الثوابت الرقمية تُعاد كما هي حتى لو كانت NaN
+            return np.full(self.length, float(value)), np.ones(self.length, dtype=bool)
+
+        if isinstance(value, str):
+            if value.startswith('indicator:'):
+                indicator_ref = value.split(':')[1]
+                indicator_data = self.indicators.get(indicator_ref)
+                if indicator_data is None:
+                    return None
+                if not isinstance(indicator_data, pd.Series) or not indicator_data.index.equals(self.data.index):
+                    raise VectorizationUnsupported(f"Indicator '{indicator_ref}' is not aligned with data")
+                return self._with_valid(self._to_float(indicator_data, indicator_ref))
+
+            elif value.startswith('price.'):
+                price_field = value.split('.')[1]
+                if price_field in self.data.columns:
+                    return self._with_valid(self._column(price_field))
+                return None
+
+            elif value in self.data.columns:
+                return self._with_valid(self._column(value))
+
+        return None
+
+    def _column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = self._to_float(self.data[name], name)
+        return self._columns[name]
+
+    @staticmethod
+    def _to_float(series: pd.Series, name: str) -> np.ndarray:
+        if not (pd.api.types.is_numeric_dtype(series) or series.dtype == object):
+            raise VectorizationUnsupported(f"Column '{name}' is not numeric")
+        try:
+            return series.to_numpy(dtype=np.float64, na_value=np.nan)
+        except (TypeError, ValueError) as e:
+            raise VectorizationUnsupported(f"Column '{name}' is not numeric: {e}")
+
+    @staticmethod
+    def _with_valid(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return values, ~np.isnan(values)
+
+
+def compile_strategy_rules(
+    config: StrategyConfig,
+    data: pd.DataFrame,
+    indicators: Dict[str, Any]
+) -> Optional[CompiledRules]:
+    """
+    تجميع قواعد الدخول والخروج والفلترة المفعّلة إلى أقنعة منطقية.
+
+    Returns:
+        CompiledRules أو None إذا تعذّر التمثيل كمصفوفات
+    """
+    try:
+        compiler = ConditionMaskCompiler(data, indicators)
+        compiled = CompiledRules()
+
+        for rule in config.entry_rules:
+            if rule.enabled:
+                compiled.entry_masks.append((rule, compiler.compile(rule.condition)))
+
+        for rule in config.exit_rules:
+            if rule.enabled:
+                compiled.exit_masks.append((rule, compiler.compile(rule.condition)))
+
+        # فقط إجراء block يؤثر على الإشارات (allow و delay لا يغيران النتيجة)
+        block_masks = [
+            compiler.compile(rule.condition)
+            for rule in config.filter_rules
+            if rule.enabled and rule.action == "block"
+        ]
+        compiled.block_mask = (
+            np.logical_or.reduce(block_masks) if block_masks
+            else np.zeros(len(data), dtype=bool)
+        )
+        return compiled
+
+    except VectorizationUnsupported as e:
+        logger.info(f"Vectorized rules unavailable, falling back to scalar evaluation: {e}")
+        return None
@@ -0,0 +1,169 @@
+# app/websocket/chart_codec.py
+"""
+صيغة النقل المضغوطة للشارت (MessagePack عمودي).
+
+يطلبها العميل في رسالة التهيئة: {"format": "msgpack", "float_dtype": "float32"}
+وبدونها يبقى كل شيء JSON كما هو.
+
+- اللقطات (chart_initialized / indicator_added): الشموع والمؤشرات كأعمدة
+  مصفوفات مضغوطة بدلاً من قوائم قواميس
+- الرسائل الحية (price_update / candle_close): فرق فقط، الشمعة المتغيرة وآخر
+  قيمة لكل مؤشر
+- الإطارات الثنائية = MessagePack، والإطارات النصية = رسائل تحكم JSON
+
+المصفوفات تُرسل كـ ExtType (little-endian) يقرؤها العميل مباشرة كـ TypedArray:
+    1 = Float32Array, 2 = Float64Array, 3 = BigInt64Array
+القيم المفقودة (None) تصبح NaN.
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # الصيغة المضغوطة غير متاحة، يُستخدم JSON
+    msgpack = None
+
+JSON_FORMAT = "json"
+COMPACT_FORMAT = "msgpack"
+
+EXT_FLOAT32 = 1
+EXT_FLOAT64 = 2
+EXT_INT64 = 3
+
+FLOAT_DTYPES = {"float32": ("<f4", EXT_FLOAT32), "float64": ("<f8", EXT_FLOAT64)}
+
+CANDLE_FIELDS = ("open", "high", "low", "close", "volume")
+SNAPSHOT_TYPES = {"chart_initialized", "indicator_added"}
+DELTA_TYPES = {"price_update", "candle_close"}
+
+
+def negotiate_format(init_data: Dict[str, Any]) -> str:
+    """الصيغة المتفق عليها من رسالة التهيئة (JSON إذا لم تتوفر msgpack)"""
+    if init_data.get("format") == COMPACT_FORMAT and msgpack is not None:
+        return COMPACT_FORMAT
+    return JSON_FORMAT
+
+
+def negotiate_float_dtype(init_data: Dict[str, Any]) -> str:
+    dtype = init_data.get("float_dtype", "float32")
+    return dtype if dtype in FLOAT_DTYPES else "float32"
+
+
+def _float_block(values: Any, float_dtype: str = "float32") -> Optional["msgpack.ExtType"]:
+    """قائمة أرقام (مع None) إلى كتلة مصفوفة، أو None إذا لم تكن رقمية"""
+    try:
+        array = np.asarray(
+            [np.nan if v is None else v for v in values], dtype=np.float64
+        )
+    except (TypeError, ValueError):
+        return None
+    if array.ndim != 1:
+        return None
+    dtype, code = FLOAT_DTYPES[float_dtype]
+    return msgpack.ExtType(code, array.astype(dtype).tobytes())
+
+
+def _column(values: Any, float_dtype: str) -> Any:
+    if isinstance(values, (list, tuple, np.ndarray)) and len(values) > 0:
+        block = _float_block(values, float_dtype)
+        if block is not None:
+            return block
+    return values
+
+
+def _last(values: Any) -> Any:
+    if isinstance(values, (list, tuple, np.ndarray)):
+        return values[-1] if len(values) > 0 else None
+    return values
+
+
+def columnar_candles(candles: List[Dict], float_dtype: str = "float32") -> Dict[str, Any]:
+    """قائمة قواميس الشموع إلى أعمدة (الوقت int64 بالمللي ثانية)"""
+    times = np.asarray([int(c.get("time", 0)) for c in candles], dtype="<i8")
+    columns = {"count": len(candles), "time": msgpack.ExtType(EXT_INT64, times.tobytes())}
+    for field in CANDLE_FIELDS:
+        columns[field] = _float_block([c.get(field) for c in candles], float_dtype)
+    return columns
+
+
+def columnar_indicators(results: Dict[str, Any], float_dtype: str = "float32") -> Dict[str, Any]:
+    """نتائج المؤشرات {name: {values, signals, metadata}} إلى أعمدة"""
+    compact = {}
+    for name, result in (results or {}).items():
+        if not isinstance(result, dict):
+            continue
+        values = result.get("values")
+        if isinstance(values, dict):  # الصيغة الخام {"data", "index", "dtype"}
+            values = values.get("data", [])
+        signals = result.get("signals") or {}
+        metadata = result.get("metadata") or {}
+        compact[name] = {
+            "values": _column(values or [], float_dtype),
+            "signals": {
+                "data": _column(signals.get("data", []), float_dtype),
+                "index": _column(signals.get("index", []), float_dtype),
+            },
+            "metadata": {key: _column(value, float_dtype) for key, value in metadata.items()},
+        }
+    return compact
+
+
+def latest_indicators(results: Dict[str, Any]) -> Dict[str, Any]:
+    """آخر قيمة لكل مؤشر (وآخر قيمة لكل سلسلة في metadata)"""
+    latest = {}
+    for name, result in (results or {}).items():
+        if not isinstance(result, dict):
+            continue
+        values = result.get("values")
+        if isinstance(values, dict):
+            values = values.get("data", [])
+        signals = result.get("signals") or {}
+        metadata = result.get("metadata") or {}
+        latest[name] = {
+            "value": _last(values),
+            "signal": _last(signals.get("data")),
+            "metadata": {key: _last(value) for key, value in metadata.items()},
+        }
+    return latest
+
+
+def _default(value: Any) -> Any:
+    if hasattr(value, "item"):  # قيم NumPy المفردة
+        return value.item()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def compact_message(message: Dict[str, Any], float_dtype: str = "float32") -> Dict[str, Any]:
+    """تحويل رسالة الشارت إلى شكلها المضغوط (قبل الترميز)"""
+    message_type = message.get("type")
+
+    if message_type in DELTA_TYPES:
+        compact = {k: v for k, v in message.items() if k not in ("indicators", "indicators_results")}
+        compact["indicators"] = latest_indicators(message.get("indicators") or {})
+        return compact
+
+    if message_type in SNAPSHOT_TYPES:
+        compact = dict(message)
+        data = message.get("data")
+        if isinstance(data, dict):
+            data = dict(data)
+            data["candles"] = columnar_candles(data.get("candles") or [], float_dtype)
+            data["indicators_results"] = columnar_indicators(data.get("indicators_results"), float_dtype)
+            compact["data"] = data
+        if "indicators_results" in message:
+            compact["indicators_results"] = columnar_indicators(message["indicators_results"], float_dtype)
+        return compact
+
+    return message
+
+
+def encode_compact(message: Any, float_dtype: str = "float32") -> bytes:
+    """ترميز رسالة إلى MessagePack"""
+    if isinstance(message, dict):
+        message = compact_message(message, float_dtype)
+    return msgpack.packb(message, default=_default, use_bin_type=True)
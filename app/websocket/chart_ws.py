@@ -496,6 +496,8 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from app.core.live_stream import live_stream_manager
 from app.core.managers import chart_manager
 from app.schemas.indicators import ChartSubscription, IndicatorConfig
+from app.websocket.chart_codec import JSON_FORMAT, negotiate_float_dtype, negotiate_format
+from app.websocket.fanout import FanoutBroadcaster
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -677,15 +679,38 @@ class WebSocketManager:
     def __init__(self):
         self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
         self.chart_manager = chart_manager
+        # كل رسالة بث تُرمّز مرة واحدة وتُوضع في طابور كل اتصال
+        self.fanout = FanoutBroadcaster()
     
-    async def connect(self, websocket: WebSocket, connection_id: str, symbol: str, timeframe: str):
-        """إضافة اتصال جديد"""
+    async def connect(
+        self,
+        websocket: WebSocket,
+        connection_id: str,
+        symbol: str,
+        timeframe: str,
+        wire_format: str = JSON_FORMAT,
+        float_dtype: str = "float32"
+    ):
+        """إضافة اتصال جديد (wire_format: صيغة النقل المتفق عليها في التهيئة)"""
         key = f"{symbol}_{timeframe}"
         if key not in self.active_connections:
             self.active_connections[key] = {}
         
         self.active_connections[key][connection_id] = websocket
         
+        async def on_slow_close():
+            # العميل بطيء جداً أو فشل الإرسال: إغلاق الاتصال ليعيد العميل الاتصال
+            try:
+                await websocket.close(code=1013)
+            except Exception:
+                pass
+            await self.disconnect(connection_id, symbol, timeframe)
+        
+        self.fanout.register(
+            connection_id, websocket, on_close=on_slow_close,
+            wire_format=wire_format, float_dtype=float_dtype
+        )
+        
         # إضافة المشترك للشارت
         chart = await self.chart_manager.get_or_create_chart(symbol, timeframe)
         chart.subscribers.add(connection_id)
@@ -695,6 +720,7 @@ class WebSocketManager:
     async def disconnect(self, connection_id: str, symbol: str, timeframe: str):
         """إزالة اتصال"""
         key = f"{symbol}_{timeframe}"
+        await self.fanout.unregister(connection_id)
         
         if key in self.active_connections and connection_id in self.active_connections[key]:
             del self.active_connections[key][connection_id]
@@ -710,33 +736,17 @@ class WebSocketManager:
             self.chart_manager.charts[chart_key].subscribers.discard(connection_id)
     
     async def send_to_connection(self, connection_id: str, key: str, message: Dict):
-        """إرسال رسالة لاتصال محدد"""
+        """إرسال رسالة لاتصال محدد (عبر طابوره للحفاظ على ترتيب البث)"""
         if key in self.active_connections and connection_id in self.active_connections[key]:
-            try:
-                await self.active_connections[key][connection_id].send_json(message)
-            except Exception as e:
-                logger.error(f"❌ Error sending to connection {connection_id}: {e}")
-                await self.disconnect(connection_id, *key.split("_"))
+            self.fanout.send(connection_id, message)
     
     async def broadcast(self, key: str, message: Dict, exclude: Optional[str] = None):
-        """بث رسالة لجميع المشتركين"""
+        """بث رسالة لجميع المشتركين (ترميز واحد، بدون انتظار العملاء البطيئين)"""
         if key not in self.active_connections:
             return
         
-        tasks = []
-        for conn_id, websocket in self.active_connections[key].items():
-            if conn_id == exclude:
-                continue
-            
-            try:
-                tasks.append(websocket.send_json(message))
-            except Exception as e:
-                logger.error(f"❌ Error broadcasting to {conn_id}: {e}")
-                # تنظيف الاتصال الفاشل
-                asyncio.create_task(self.disconnect(conn_id, *key.split("_")))
-        
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        targets = [conn_id for conn_id in self.active_connections[key] if conn_id != exclude]
+        self.fanout.publish(targets, message)
 
 # المثيل العام
 ws_manager = WebSocketManager()
@@ -828,8 +838,11 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
         init_data = await websocket.receive_json()
         timeframe = init_data.get("timeframe", "1m")
         requested_indicators = init_data.get("indicators", [])
+        # صيغة النقل: JSON افتراضياً أو MessagePack عمودي إذا طلبها العميل
+        wire_format = negotiate_format(init_data)
+        float_dtype = negotiate_float_dtype(init_data)
         
-        logger.info(f"📩 Received Init: {symbol} | TF: {timeframe} | Requested Indicators: {len(requested_indicators)}")
+        logger.info(f"📩 Received Init: {symbol} | TF: {timeframe} | Requested Indicators: {len(requested_indicators)} | Format: {wire_format}")
         
         # 2. تحميل المؤشرات المحفوظة إذا لم يتم إرسال مؤشرات جديدة
         indicators_to_use = requested_indicators
@@ -854,7 +867,7 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
         )
         
         # 5. الاتصال بـ WebSocket Manager
-        key = await ws_manager.connect(websocket, connection_id, symbol, timeframe)
+        key = await ws_manager.connect(websocket, connection_id, symbol, timeframe, wire_format, float_dtype)
         
         # 6. إضافة المؤشرات المحفوظة  
         for indicator_config in indicators_to_use:
@@ -903,7 +916,8 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
         # 8. إرسال البيانات الأولية
         chart_data = await chart_manager.get_chart_data(symbol, timeframe)
         
-        await websocket.send_json({
+        # عبر طابور الاتصال حتى لا يسبقها أي price_update مبثوث
+        await ws_manager.send_to_connection(connection_id, key, {
             "type": "chart_initialized",
             "symbol": subscription.symbol,
             "timeframe": subscription.timeframe,
@@ -911,13 +925,15 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
             "data": chart_data,
             "saved_indicators_used": not bool(requested_indicators) and bool(indicators_to_use),
             "indicators_count": len(indicators_to_use),
+            "format": wire_format,
             "time": _now_ms()
         })
 
 
         # 9. إذا كنا نستخدم مؤشرات محفوظة، نرسل indicator_added بعد 3 ثواني
 
-        if using_saved_indicators:
+        # الصيغة المضغوطة تحمل نتائج المؤشرات كاملة في chart_initialized فلا حاجة لإعادة الإرسال
+        if using_saved_indicators and wire_format == JSON_FORMAT:
             # إنشاء مهمة منفصلة لإرسال indicator_added بعد تأخير
             async def send_saved_indicators():
                 await asyncio.sleep(3)  # انتظار 3 ثواني
@@ -936,7 +952,7 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
                             indicator_data = {
                                 indicator_name: indicators_results[indicator_name]
                             }                        
-                        await websocket.send_json({
+                        await ws_manager.send_to_connection(connection_id, key, {
                             "type": "indicator_added",
                             "indicator": indicator_name,
                             "indicators_results": indicator_data,
@@ -971,10 +987,18 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
                         await save_current_indicators(symbol, timeframe, chart_manager)
                     
                         updated_data = await chart_manager.get_chart_data(symbol, timeframe)
-                        await websocket.send_json({
+                        indicator_name = indicator_dict.get("name")
+                        indicators_results = updated_data["indicators_results"]
+                        if wire_format != JSON_FORMAT:
+                            # الصيغة المضغوطة: سلاسل المؤشر المضاف فقط (ومكوناته name_*)
+                            indicators_results = {
+                                name: result for name, result in indicators_results.items()
+                                if name == indicator_name or name.startswith(f"{indicator_name}_")
+                            }
+                        await ws_manager.send_to_connection(connection_id, key, {
                             "type": "indicator_added",
-                            "indicator": indicator_dict.get("name"),
-                            "indicators_results": updated_data["indicators_results"],
+                            "indicator": indicator_name,
+                            "indicators_results": indicators_results,
                             "saved": True,  # تم الحفظ تلقائياً
                             "time": _now_ms()
                         })
@@ -989,7 +1013,7 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
                             # حفظ الحالة بعد الإزالة
                             await save_current_indicators(symbol, timeframe, chart_manager)
                             
-                            await websocket.send_json({
+                            await ws_manager.send_to_connection(connection_id, key, {
                                 "type": "indicator_removed",
                                 "indicator": indicator_name,
                                 "saved": True,
@@ -999,7 +1023,7 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
                 elif action == "save_indicators":
                     # طلب حفظ يدوي للمؤشرات
                     success = await save_current_indicators(symbol, timeframe, chart_manager)
-                    await websocket.send_json({
+                    await ws_manager.send_to_connection(connection_id, key, {
                         "type": "indicators_saved",
                         "success": success,
                         "message": "Indicators saved successfully" if success else "Failed to save indicators",
@@ -1009,7 +1033,7 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
                 elif action == "load_indicators":
                     # طلب تحميل المؤشرات المحفوظة
                     saved_indicators = await load_saved_indicators(symbol, timeframe)
-                    await websocket.send_json({
+                    await ws_manager.send_to_connection(connection_id, key, {
                         "type": "saved_indicators",
                         "indicators": saved_indicators,
                         "count": len(saved_indicators),
@@ -1020,14 +1044,14 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
                     # مسح جميع المؤشرات المحفوظة
                     chart_state_db.save_chart_state(symbol, timeframe, [])
                     await chart_manager.clear_indicators(symbol, timeframe)
-                    await websocket.send_json({
+                    await ws_manager.send_to_connection(connection_id, key, {
                         "type": "indicators_cleared",
                         "message": "All indicators cleared and saved",
                         "time": _now_ms()
                     })
                 
                 elif action == "ping":
-                    await websocket.send_json({
+                    await ws_manager.send_to_connection(connection_id, key, {
                         "type": "pong",
                         "time": _now_ms()
                     })
@@ -1038,7 +1062,7 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
                         # حفظ الحالة الحالية قبل التغيير
                         await save_current_indicators(symbol, timeframe, chart_manager)
                         
-                        await websocket.send_json({
+                        await ws_manager.send_to_connection(connection_id, key, {
                             "type": "timeframe_changed",
                             "old_timeframe": timeframe,
                             "new_timeframe": new_timeframe,
@@ -1062,7 +1086,7 @@ async def chart_websocket(websocket: WebSocket, symbol: str):
                     
             except json.JSONDecodeError as e:
                 logger.error(f"❌ JSON decode error: {e}")
-                await websocket.send_json({
+                await ws_manager.send_to_connection(connection_id, key, {
                     "type": "error",
                     "message": "Invalid JSON format",
                     "time": _now_ms()
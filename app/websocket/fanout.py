@@ -0,0 +1,248 @@
+# app/websocket/fanout.py
+"""
+بث الرسائل لعدة مشتركين بترميز واحد.
+
+- الرسالة تُرمّز إلى JSON مرة واحدة (orjson إن وُجد) ويُرسل نفس النص لكل المشتركين
+  (ومرة واحدة لكل صيغة نقل أخرى، مثل MessagePack في chart_codec)
+- لكل اتصال طابور إرسال محدود ومهمة كتابة خاصة به، فالعميل البطيء لا يوقف البث
+- سياسة الدمج: الرسائل القابلة للدمج (price_update) تستبدل النسخة الأقدم المعلّقة،
+  أما الرسائل المهمة (candle_close) فلا تُحذف أبداً؛ إذا امتلأ الطابور بها يُفصل العميل
+"""
+import json
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from app.config import settings
+from app.websocket.chart_codec import JSON_FORMAT, encode_compact
+
+try:
+    import orjson
+except ImportError:  # الرجوع إلى json القياسي
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# أنواع الرسائل التي يكفي إرسال أحدث نسخة منها للعميل البطيء
+COALESCE_TYPES = {"price_update", "price"}
+
+
+def _default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):  # قيم NumPy المفردة
+        return value.item()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def encode_message(message: Any, wire_format: str = JSON_FORMAT, float_dtype: str = "float32") -> Any:
+    """ترميز رسالة إلى نص JSON، أو bytes للصيغة المضغوطة (مرة واحدة لكل المشتركين)"""
+    if isinstance(message, str):
+        return message
+    if wire_format != JSON_FORMAT:
+        return encode_compact(message, float_dtype)
+    if orjson is not None:
+        return orjson.dumps(
+            message,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(message, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def coalesce_key_for(message: Any) -> Optional[str]:
+    """مفتاح الدمج للرسالة (None = رسالة لا تُحذف)"""
+    if isinstance(message, dict):
+        message_type = message.get("type")
+        if message_type in COALESCE_TYPES:
+            return str(message_type)
+    return None
+
+
+class ConnectionSender:
+    """طابور إرسال محدود لاتصال واحد"""
+
+    def __init__(
+        self,
+        websocket: Any,
+        max_queue: int,
+        on_close: Optional[Callable[[], Awaitable[None]]] = None,
+        wire_format: str = JSON_FORMAT,
+        float_dtype: str = "float32"
+    ):
+        self.websocket = websocket
+        self.wire_format = wire_format
+        self.float_dtype = float_dtype
+        self.max_queue = max(1, max_queue)
+        self.on_close = on_close
+        # عناصر الطابور: (مفتاح الدمج أو None، النص أو bytes المرمّز)
+        self.queue: deque = deque()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._writer())
+
+    def offer(self, payload: Any, coalesce_key: Optional[str] = None) -> bool:
+        """
+        إضافة رسالة للطابور بدون انتظار.
+
+        Returns:
+            False إذا أُغلق الاتصال (مغلق مسبقاً أو امتلأ الطابور برسائل مهمة)
+        """
+        if self.closed:
+            return False
+
+        if coalesce_key is not None:
+            # استبدال النسخة المعلّقة بعد آخر رسالة مهمة فقط (حفاظاً على الترتيب)
+            for i in range(len(self.queue) - 1, -1, -1):
+                key = self.queue[i][0]
+                if key is None:
+                    break
+                if key == coalesce_key:
+                    del self.queue[i]
+                    self.dropped += 1
+                    break
+
+        if len(self.queue) >= self.max_queue and not self._drop_oldest_coalescable():
+            if coalesce_key is not None:
+                # الطابور ممتلئ برسائل مهمة: تُهمل التحديثات الجديدة فقط
+                self.dropped += 1
+                return True
+            logger.warning("⚠️ Send queue overflow, closing slow connection")
+            self._close()
+            return False
+
+        self.queue.append((coalesce_key, payload))
+        self._wakeup.set()
+        return True
+
+    def _drop_oldest_coalescable(self) -> bool:
+        for i, (key, _) in enumerate(self.queue):
+            if key is not None:
+                del self.queue[i]
+                self.dropped += 1
+                return True
+        return False
+
+    async def _writer(self):
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                _, payload = self.queue.popleft()
+                if isinstance(payload, bytes):
+                    await self.websocket.send_bytes(payload)
+                else:
+                    await self.websocket.send_text(payload)
+                self.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Error sending to websocket: {e}")
+            self._close()
+
+    def _close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        self._wakeup.set()
+        if self.on_close is not None:
+            asyncio.create_task(self.on_close())
+
+    async def stop(self):
+        """إيقاف مهمة الكتابة بدون استدعاء on_close"""
+        self.closed = True
+        self.queue.clear()
+        if not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class FanoutBroadcaster:
+    """بث رسالة مرمّزة مرة واحدة إلى طوابير المشتركين"""
+
+    def __init__(self, max_queue: Optional[int] = None):
+        self.max_queue = max_queue or settings.WS_SEND_QUEUE_SIZE
+        self.senders: Dict[Hashable, ConnectionSender] = {}
+        self.stats = {"messages_encoded": 0, "messages_queued": 0, "connections_dropped": 0}
+
+    def register(
+        self,
+        key: Hashable,
+        websocket: Any,
+        on_close: Optional[Callable[[], Awaitable[None]]] = None,
+        wire_format: str = JSON_FORMAT,
+        float_dtype: str = "float32"
+    ) -> ConnectionSender:
+        """تسجيل اتصال (لا يُعاد إنشاؤه إذا كان مسجلاً)"""
+        sender = self.senders.get(key)
+        if sender is None or sender.closed:
+            async def closed():
+                self.stats["connections_dropped"] += 1
+                if self.senders.get(key) is sender:
+                    del self.senders[key]
+                if on_close is not None:
+                    await on_close()
+
+            sender = ConnectionSender(websocket, self.max_queue, closed, wire_format, float_dtype)
+            self.senders[key] = sender
+        return sender
+
+    async def unregister(self, key: Hashable):
+        sender = self.senders.pop(key, None)
+        if sender is not None:
+            await sender.stop()
+
+    def send(self, key: Hashable, message: Any) -> bool:
+        """إرسال رسالة لاتصال واحد عبر طابوره (بنفس ترتيب البث)"""
+        sender = self.senders.get(key)
+        if sender is None:
+            return False
+        payload = encode_message(message, sender.wire_format, sender.float_dtype)
+        return sender.offer(payload, coalesce_key_for(message))
+
+    def publish(
+        self,
+        keys: Iterable[Hashable],
+        message: Any,
+        coalesce_key: Optional[str] = None
+    ) -> int:
+        """
+        ترميز الرسالة مرة واحدة ووضعها في طابور كل مشترك.
+
+        Args:
+            keys: مفاتيح الاتصالات المستهدفة
+            message: dict أو نص JSON جاهز
+            coalesce_key: مفتاح الدمج (افتراضياً حسب نوع الرسالة)
+
+        Returns:
+            عدد الاتصالات التي استلمت الرسالة في طابورها
+        """
+        senders = [self.senders[key] for key in keys if key in self.senders]
+        if not senders:
+            return 0
+
+        if coalesce_key is None:
+            coalesce_key = coalesce_key_for(message)
+
+        # ترميز واحد لكل صيغة نقل مستخدمة
+        encoded: Dict[tuple, Any] = {}
+        queued = 0
+        for sender in senders:
+            wire = (sender.wire_format, sender.float_dtype)
+            if wire not in encoded:
+                encoded[wire] = encode_message(message, *wire)
+                self.stats["messages_encoded"] += 1
+            queued += sender.offer(encoded[wire], coalesce_key)
+        self.stats["messages_queued"] += queued
+        return queued
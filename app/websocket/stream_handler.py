@@ -16,6 +16,7 @@ from app.services.data_service import DataService
 from app.services.indicators import apply_indicators
 from app.services.strategy import run_strategy
 from app.services.filtering import FilteringEngine
+from .fanout import FanoutBroadcaster
 
 class RealTimeStreamHandler:
     """معالج البث اللحظي - شبيه بـ TradingView"""
@@ -31,6 +32,9 @@ class RealTimeStreamHandler:
         # المشتركون حسب الرمز والإطار الزمني
         self.subscribers: Dict[str, Set[Any]] = defaultdict(set)
         
+        # طوابير الإرسال لكل اتصال (ترميز واحد لكل رسالة)
+        self.fanout = FanoutBroadcaster()
+        
         # كاش للبيانات
         self.price_cache: Dict[str, Dict] = {}
         self.indicator_cache: Dict[str, Dict] = {}
@@ -190,7 +194,10 @@ class RealTimeStreamHandler:
         
         # إزالة المشتركين
         if stream_id in self.subscribers:
-            del self.subscribers[stream_id]
+            websockets = self.subscribers.pop(stream_id)
+            for websocket in websockets:
+                if not any(websocket in subs for subs in self.subscribers.values()):
+                    await self.fanout.unregister(websocket)
         
         self.stats["streams_stopped"] += 1
         print(f"📡 Stream stopped: {stream_id}")
@@ -205,6 +212,13 @@ class RealTimeStreamHandler:
         self.subscribers[stream_id].add(websocket)
         self.stats["active_connections"] = sum(len(subs) for subs in self.subscribers.values())
         
+        async def on_slow_close():
+            # العميل البطيء أو المنقطع يُزال من كل البثوث
+            for sid in list(self.subscribers):
+                await self.unsubscribe(sid, websocket)
+        
+        self.fanout.register(websocket, websocket, on_close=on_slow_close)
+        
         # إرسال بيانات أولية للمشترك الجديد
         await self._send_initial_data(stream_id, websocket)
         
@@ -216,6 +230,8 @@ class RealTimeStreamHandler:
         if stream_id in self.subscribers and websocket in self.subscribers[stream_id]:
             self.subscribers[stream_id].remove(websocket)
             self.stats["active_connections"] = sum(len(subs) for subs in self.subscribers.values())
+            if not any(websocket in subs for subs in self.subscribers.values()):
+                await self.fanout.unregister(websocket)
             return True
         return False
     
@@ -533,15 +549,10 @@ class RealTimeStreamHandler:
         
         subscribers = list(self.subscribers[stream_id])
         for message in messages:
-            message_json = message.to_json()
-            
-            for websocket in subscribers:
-                try:
-                    await websocket.send_text(message_json)
-                except Exception as e:
-                    print(f"Error broadcasting to websocket: {e}")
-                    # إزالة المشترك إذا كان هناك خطأ
-                    await self.unsubscribe(stream_id, websocket)
+            # ترميز واحد لكل رسالة؛ الإرسال الفعلي في مهمة كل اتصال
+            # وأخطاء الإرسال تزيل المشترك عبر on_slow_close
+            coalesce_key = f"{stream_id}:price" if message.type == StreamDataType.PRICE else None
+            self.fanout.publish(subscribers, message.to_json(), coalesce_key=coalesce_key)
     
     async def _send_initial_data(self, stream_id: str, websocket):
         """إرسال بيانات أولية للمشترك الجديد"""
@@ -581,10 +592,8 @@ class RealTimeStreamHandler:
         
         # بث الرسائل الأولية
         for message in initial_messages:
-            try:
-                await websocket.send_text(message.to_json())
-            except Exception as e:
-                print(f"Error sending initial data: {e}")
+            if not self.fanout.send(websocket, message.to_json()):
+                print("Error sending initial data: connection closed")
                 break
     
     def _get_stream_interval(self, timeframe: str) -> int:
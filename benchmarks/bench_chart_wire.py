@@ -0,0 +1,81 @@
+# benchmarks/bench_chart_wire.py
+"""
+مقارنة حجم وزمن ترميز لقطة الشارت: JSON مقابل MessagePack العمودي.
+
+python -m benchmarks.bench_chart_wire --candles 500 --indicators 6
+"""
+import argparse
+import json
+import time
+import zlib
+
+import numpy as np
+
+from app.websocket.chart_codec import encode_compact
+from app.websocket.fanout import encode_message
+
+
+def make_snapshot(candles: int, indicators: int) -> dict:
+    rng = np.random.default_rng(0)
+    close = 60_000 + np.cumsum(rng.normal(0, 25, candles))
+    start = 1_735_689_600_000
+    rows = [
+        {
+            "time": start + i * 60_000,
+            "open": float(c - 3.1), "high": float(c + 12.7), "low": float(c - 14.2),
+            "close": float(c), "volume": float(rng.random() * 40),
+        }
+        for i, c in enumerate(close)
+    ]
+    results = {
+        f"ind_{k}": {
+            "name": f"ind_{k}",
+            "values": [None] * 20 + [float(v) for v in close[20:] * (1 + k / 100)],
+            "signals": {"data": [int(s) for s in rng.integers(-1, 2, candles)], "index": [], "dtype": "int64"},
+            "metadata": {"period": 20},
+        }
+        for k in range(indicators)
+    }
+    return {
+        "type": "chart_initialized", "symbol": "BTCUSDT", "timeframe": "1m", "market": "crypto",
+        "data": {"symbol": "BTCUSDT", "timeframe": "1m", "candles": rows,
+                 "indicators": [], "indicators_results": results, "metadata": {}},
+        "time": start,
+    }
+
+
+def measure(label: str, encode, repeat: int = 50):
+    payload = encode()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        encode()
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+    raw = payload.encode() if isinstance(payload, str) else payload
+    print(f"{label:<20} {len(raw) / 1024:9.1f} KB  deflate {len(zlib.compress(raw)) / 1024:8.1f} KB  {elapsed:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chart wire format benchmark")
+    parser.add_argument("--candles", type=int, default=500)
+    parser.add_argument("--indicators", type=int, default=6)
+    args = parser.parse_args()
+
+    snapshot = make_snapshot(args.candles, args.indicators)
+    print(f"📊 chart_initialized: {args.candles} candles × {args.indicators} indicators")
+    measure("json (stdlib)", lambda: json.dumps(snapshot))
+    measure("json (fanout)", lambda: encode_message(snapshot))
+    measure("msgpack float32", lambda: encode_compact(snapshot, "float32"))
+    measure("msgpack float64", lambda: encode_compact(snapshot, "float64"))
+
+    delta = {
+        "type": "price_update", "symbol": "BTCUSDT", "timeframe": "1m",
+        "live_candle": snapshot["data"]["candles"][-1],
+        "indicators": snapshot["data"]["indicators_results"], "time": snapshot["time"],
+    }
+    print("📊 price_update (full indicator series in, last values out)")
+    measure("json (fanout)", lambda: encode_message(delta), repeat=500)
+    measure("msgpack delta", lambda: encode_compact(delta), repeat=500)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_indicator_backends.py
+"""
+قياس تنفيذ المؤشرات: تسلسلي، خيوط فقط، وخيوط + عمليات (ذاكرة مشتركة).
+
+python -m benchmarks.bench_indicator_backends --bars 100000 --workers 4
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.indicators.calculator import IndicatorCalculator
+from app.services.indicators.executor import IndicatorExecutor
+
+# مؤشرات بحلقات بايثون ("process") ومؤشرات NumPy/pandas ("thread")
+PYTHON_HEAVY = ["obv", "pivot_points", "wma"]
+NUMPY_HEAVY = ["harmonic_patterns", "supply_demand", "volume_climax", "sma", "ema", "rsi", "macd", "bollinger_bands", "atr", "stochastic"]
+
+
+def make_frame(bars: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, bars)))
+    return pd.DataFrame({
+        "open": close * (1 + rng.normal(0, 0.0005, bars)),
+        "high": close * 1.002, "low": close * 0.998,
+        "close": close, "volume": rng.uniform(1, 100, bars),
+    }, index=pd.date_range("2020-01-01", periods=bars, freq="min", tz="UTC"))
+
+
+def timed(calculator, frame, configs, parallel, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        calculator.calculate_columnar(frame, configs, use_cache=False, parallel=parallel)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indicator execution backends benchmark")
+    parser.add_argument("--bars", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    frame = make_frame(args.bars)
+    configs = [{"name": name, "type": "trend", "params": {}} for name in PYTHON_HEAVY + NUMPY_HEAVY]
+    print(f"📊 {len(configs)} indicators × {args.bars} bars, {args.workers} workers")
+
+    calculator = IndicatorCalculator()
+    backends = {
+        "threads only": IndicatorExecutor(args.workers, args.workers, process_min_bars=args.bars + 1),
+        "threads + processes": IndicatorExecutor(args.workers, args.workers, process_min_bars=0),
+    }
+
+    calculator.executor = backends["threads only"]
+    print(f"{'sequential':<22} {timed(calculator, frame, configs, False, args.repeats):8.3f}s")
+
+    for label, executor in backends.items():
+        calculator.executor = executor
+        # إحماء: تشغيل العمليات (spawn) واستيراد التطبيق فيها
+        calculator.calculate_columnar(frame.iloc[:1000], configs, use_cache=False, parallel=True)
+        print(f"{label:<22} {timed(calculator, frame, configs, True, args.repeats):8.3f}s")
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/bench_monte_carlo.py
+"""
+قياس سرعة محاكاة مونت كارلو (حلقة بايثون مقابل المصفوفات).
+
+python -m benchmarks.bench_monte_carlo --simulations 100000 --trades 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.backtest.monte_carlo import MONTE_CARLO_METHODS, run_monte_carlo
+
+
+def run_loop(pnls, initial_capital, simulations):
+    """المنطق القديم: تبديل وجمع لكل محاكاة"""
+    returns = []
+    for _ in range(simulations):
+        shuffled = np.random.permutation(pnls)
+        returns.append(np.sum(shuffled) / initial_capital * 100)
+    return np.array(returns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo benchmark")
+    parser.add_argument("--simulations", type=int, default=100_000)
+    parser.add_argument("--trades", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pnls = rng.normal(5, 100, args.trades)
+    initial_capital = 10_000.0
+    print(f"📊 {args.simulations} simulations × {args.trades} trades")
+
+    started = time.perf_counter()
+    run_loop(pnls, initial_capital, args.simulations)
+    loop = time.perf_counter() - started
+    print(f"{'loop (returns only)':<24} {loop:8.3f}s")
+
+    # إحماء (تخصيص الذاكرة لأول مرة يشوّه القياس الأول)
+    run_monte_carlo(pnls, initial_capital, 10_000, seed=0)
+
+    for method in MONTE_CARLO_METHODS:
+        started = time.perf_counter()
+        run_monte_carlo(pnls, initial_capital, args.simulations, method=method, seed=0)
+        elapsed = time.perf_counter() - started
+        print(f"{method + ' (full stats)':<24} {elapsed:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# benchmarks/bench_pattern_indicators.py
+"""
+قياس مؤشرات الأنماط (harmonic / supply_demand / volume_climax):
+الحلقات القديمة بـ iloc مقابل النسخ الموجهة (NumPy).
+
+python -m benchmarks.bench_pattern_indicators --bars 50000
+"""
+import argparse
+import logging
+import time
+
+from tests.unit.pattern_reference import LEGACY, calculate, make_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pattern indicators benchmark")
+    parser.add_argument("--bars", type=int, default=50_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    frame = make_frame(args.bars)
+    print(f"📊 {args.bars} bars")
+    for name, legacy in LEGACY.items():
+        started = time.perf_counter()
+        expected = legacy(frame)
+        loop = time.perf_counter() - started
+
+        started = time.perf_counter()
+        metadata = calculate(name, frame)
+        vectorized = time.perf_counter() - started
+
+        assert metadata == expected, name
+        print(f"{name:<20} loop {loop:8.3f}s  vectorized {vectorized:8.4f}s  ×{loop / vectorized:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_tick_aggregator.py
+"""
+قياس سرعة بناء الشموع لكامل السوق (تيك/ثانية).
+
+python -m benchmarks.bench_tick_aggregator --symbols 2000 --batches 200
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.markets.candle_builder import CandleBuilder
+from app.markets.tick_aggregator import BatchCandleAggregator, DEFAULT_TIMEFRAMES
+
+
+def make_batches(n_symbols: int, n_batches: int):
+    rng = np.random.default_rng(0)
+    symbols = [f"SYM{i}USDT" for i in range(n_symbols)]
+    start = datetime(2025, 1, 1)
+    return [
+        (
+            symbols,
+            100 + rng.standard_normal(n_symbols),
+            rng.random(n_symbols) * 1000,
+            start + timedelta(seconds=b),  # رسالة كل ثانية مثل !ticker@arr
+        )
+        for b in range(n_batches)
+    ]
+
+
+def run_per_tick(batches):
+    builder = CandleBuilder()
+    builder.on_candle_close(lambda candle: None)
+    for symbols, prices, volumes, timestamp in batches:
+        for symbol, price, volume in zip(symbols, prices.tolist(), volumes.tolist()):
+            for timeframe in DEFAULT_TIMEFRAMES:
+                builder.process_tick(
+                    symbol=symbol, timeframe=timeframe,
+                    price=price, volume=volume, timestamp=timestamp
+                )
+
+
+def run_batched(batches):
+    aggregator = BatchCandleAggregator(DEFAULT_TIMEFRAMES)
+    aggregator.on_candles_close(lambda candles: None)
+    for symbols, prices, volumes, timestamp in batches:
+        aggregator.process_batch(symbols, prices, volumes, timestamp)
+
+
+def measure(name, func, batches, total_ticks):
+    started = time.perf_counter()
+    func(batches)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<12} {elapsed:8.3f}s  {total_ticks / elapsed:14,.0f} ticks/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tick ingestion benchmark")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--batches", type=int, default=120)
+    args = parser.parse_args()
+
+    batches = make_batches(args.symbols, args.batches)
+    total_ticks = args.symbols * args.batches
+    print(f"📊 {args.symbols} symbols × {args.batches} batches × {len(DEFAULT_TIMEFRAMES)} timeframes")
+
+    per_tick = measure("per-tick", run_per_tick, batches, total_ticks)
+    batched = measure("batched", run_batched, batches, total_ticks)
+    print(f"⚡ speedup: {per_tick / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# tests/unit/pattern_reference.py
+"""
+مرجع مؤشرات الأنماط: الحلقات القديمة بـ iloc التي تطابقها النسخ الموجهة.
+
+تستخدمه اختبارات test_pattern_indicators و benchmarks/bench_pattern_indicators.
+"""
+import numpy as np
+import pandas as pd
+
+from app.services.indicators.base import IndicatorConfig
+from app.services.indicators.registry import IndicatorRegistry
+
+
+def _time(index, i):
+    return index[i].isoformat() if hasattr(index[i], 'isoformat') else str(index[i])
+
+
+def harmonic_loop(data, depth=10):
+    """المنطق القديم: نافذة pandas لكل شمعة"""
+    pivots = []
+    for i in range(depth, len(data) - depth):
+        is_high = data['high'].iloc[i] == data['high'].iloc[i-depth:i+depth].max()
+        is_low = data['low'].iloc[i] == data['low'].iloc[i-depth:i+depth].min()
+        if is_high or is_low:
+            pivots.append({
+                "type": "high" if is_high else "low",
+                "price": float(data['high'].iloc[i] if is_high else data['low'].iloc[i]),
+                "time": _time(data.index, i),
+                "idx": i
+            })
+    return {"pivots": pivots}
+
+
+def supply_demand_loop(data, period=20, threshold=2.0):
+    body = (data['close'] - data['open']).abs()
+    explosive = body > (body.rolling(window=period).mean() * threshold)
+    zones = []
+    for i in range(1, len(data)):
+        if explosive.iloc[i]:
+            base_idx = i - 1
+            is_bullish = data['close'].iloc[i] > data['open'].iloc[i]
+            zones.append({
+                "type": "DZ" if is_bullish else "SZ",
+                "top": float(data['high'].iloc[base_idx]),
+                "bottom": float(data['low'].iloc[base_idx]),
+                "time": _time(data.index, base_idx)
+            })
+    return {"zones": zones}
+
+
+def volume_climax_loop(data, period=20, std_mult=2.0):
+    vol_mean = data['volume'].rolling(window=period).mean()
+    vol_std = data['volume'].rolling(window=period).std()
+    climax_mask = data['volume'] > (vol_mean + (std_mult * vol_std))
+    climax_points = []
+    for i in range(len(data)):
+        if climax_mask.iloc[i]:
+            climax_points.append({
+                "time": _time(data.index, i),
+                "high": float(data['high'].iloc[i]),
+                "low": float(data['low'].iloc[i])
+            })
+    return {"climax_points": climax_points}
+
+
+LEGACY = {
+    "harmonic_patterns": harmonic_loop,
+    "supply_demand": supply_demand_loop,
+    "volume_climax": volume_climax_loop,
+}
+
+
+def calculate(name, data, **params):
+    indicator = IndicatorRegistry.create_indicator(IndicatorConfig(name=name, type="trend", params=params))
+    return indicator.calculate(data).metadata
+
+
+def make_frame(bars: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = close * (1 + rng.normal(0, 0.002, bars))
+    return pd.DataFrame({
+        "open": open_, "high": np.maximum(open_, close) * 1.001,
+        "low": np.minimum(open_, close) * 0.999, "close": close,
+        "volume": rng.lognormal(3, 1, bars),
+    }, index=pd.date_range("2020-01-01", periods=bars, freq="min", tz="UTC"))
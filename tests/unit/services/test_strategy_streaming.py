@@ -0,0 +1,122 @@
+# tests/unit/services/test_strategy_streaming.py
+import pytest
+import pandas as pd
+import numpy as np
+
+from app.services.strategy.strategy_engine1 import StrategyEngine, DecisionAction
+from app.services.strategy.schemas import StrategyConfig
+
+
+def make_config():
+    """استراتيجية تستخدم كل أنواع المراجع: مؤشر، سعر، تقاطع، شرط مركب"""
+    return StrategyConfig(
+        name="streaming_parity",
+        indicators=[
+            {"name": "sma", "type": "trend", "params": {"period": 10}},
+            {"name": "rsi", "type": "momentum", "params": {"period": 14}},
+        ],
+        entry_rules=[
+            {
+                "name": "close_cross_above_sma",
+                "condition": {
+                    "type": "price_crossover",
+                    "operator": "cross_above",
+                    "left_value": "price.close",
+                    "right_value": "indicator:sma",
+                },
+                "position_side": "long",
+                "weight": 0.5,
+            },
+            {
+                "name": "rsi_overbought_below_sma",
+                "condition": {
+                    "type": "and",
+                    "conditions": [
+                        {
+                            "type": "indicator_value",
+                            "operator": ">",
+                            "left_value": "indicator:rsi",
+                            "right_value": 55,
+                        },
+                        {
+                            "type": "price_crossover",
+                            "operator": "<",
+                            "left_value": "close",
+                            "right_value": "indicator:sma",
+                        },
+                    ],
+                },
+                "position_side": "short",
+                "weight": 0.5,
+            },
+        ],
+        exit_rules=[
+            {
+                "name": "rsi_extreme",
+                "condition": {
+                    "type": "indicator_value",
+                    "operator": ">",
+                    "left_value": "indicator:rsi",
+                    "right_value": 68,
+                },
+                "exit_type": "signal_exit",
+            }
+        ],
+    )
+
+
+def make_data(n=300):
+    np.random.seed(7)
+    dates = pd.date_range("2025-01-01", periods=n, freq="h", tz="UTC")
+    close = 100 + np.cumsum(np.random.randn(n))
+    return pd.DataFrame({
+        "open": close + np.random.randn(n) * 0.2,
+        "high": close + np.abs(np.random.randn(n)),
+        "low": close - np.abs(np.random.randn(n)),
+        "close": close,
+        "volume": np.random.randint(1000, 10000, n),
+    }, index=dates)
+
+
+@pytest.mark.asyncio
+async def test_streaming_decisions_match_slice_path():
+    """قرارات decide(i) يجب أن تطابق run(data.iloc[:i+1]) شمعة بشمعة"""
+    data = make_data()
+    engine = StrategyEngine(make_config())
+    engine.full_data = await engine._prepare_indicators(data)
+    assert engine.enable_streaming(engine.full_data)
+
+    actions = set()
+    for i in range(len(data)):
+        expected = await engine.run(data.iloc[:i + 1])
+        actual = engine.decide(i)
+
+        assert actual.action == expected.action
+        assert actual.reason == expected.reason
+        assert actual.confidence == expected.confidence
+        assert actual.metadata == expected.metadata
+        if expected.action != DecisionAction.HOLD or expected.metadata:
+            assert actual.timestamp == expected.timestamp
+
+        if i >= 1:
+            row = engine.current_data_frame.iloc[-1]
+            legacy_snapshot = {
+                col: float(row[col])
+                for col in engine.current_data_frame.columns
+                if col not in ["open", "high", "low", "close", "volume"] and pd.notna(row[col])
+            }
+            assert engine.indicator_snapshot(i) == legacy_snapshot
+        actions.add(actual.action)
+
+    # التأكد أن الاختبار يغطي أكثر من حالة HOLD
+    assert len(actions) > 1
+
+
+def test_streaming_unavailable_for_non_numeric_columns():
+    data = make_data(20)
+    data["label"] = "x"
+    engine = StrategyEngine(make_config())
+
+    assert engine.enable_streaming(data) is False
+    with pytest.raises(RuntimeError):
+        engine.decide(5)
@@ -0,0 +1,129 @@
+# tests/unit/services/test_strategy_vectorized.py
+import pytest
+import pandas as pd
+import numpy as np
+
+from app.services.strategy.core import StrategyEngine
+from app.services.strategy.schemas import StrategyConfig
+
+
+def make_config(position_side="both"):
+    return StrategyConfig(
+        name="vectorized_parity",
+        position_side=position_side,
+        indicators=[
+            {"name": "sma", "type": "trend", "params": {"period": 10}},
+            {"name": "rsi", "type": "momentum", "params": {"period": 14}},
+        ],
+        entry_rules=[
+            {
+                "name": "close_cross_above_sma",
+                "condition": {
+                    "type": "price_crossover",
+                    "operator": "cross_above",
+                    "left_value": "price.close",
+                    "right_value": "indicator:sma",
+                },
+                "position_side": "long",
+                "weight": 0.4,
+            },
+            {
+                "name": "close_cross_below_sma",
+                "condition": {
+                    "type": "price_crossover",
+                    "operator": "cross_below",
+                    "left_value": "close",
+                    "right_value": "indicator:sma",
+                },
+                "position_side": "short",
+                "weight": 0.3,
+            },
+            {
+                "name": "rsi_band",
+                "condition": {
+                    "type": "or",
+                    "conditions": [
+                        {"type": "indicator_value", "operator": "<=", "left_value": "indicator:rsi", "right_value": 35},
+                        {"type": "indicator_value", "operator": ">=", "left_value": "indicator:rsi", "right_value": 60},
+                        {"type": "indicator_value", "operator": "!=", "left_value": "indicator:missing", "right_value": 1},
+                    ],
+                },
+                "position_side": "both",
+                "weight": 0.3,
+            },
+        ],
+        exit_rules=[
+            {
+                "name": "rsi_exit",
+                "condition": {"type": "indicator_value", "operator": ">", "left_value": "indicator:rsi", "right_value": 65},
+                "exit_type": "signal_exit",
+            }
+        ],
+        filter_rules=[
+            {
+                "name": "block_low_volume",
+                "condition": {"type": "volume_condition", "operator": "<", "left_value": "volume", "right_value": 2500},
+                "action": "block",
+            },
+            {
+                "name": "allow_all",
+                "condition": {"type": "volume_condition", "operator": ">", "left_value": "volume", "right_value": 0},
+                "action": "allow",
+            },
+        ],
+    )
+
+
+def make_data(n=400):
+    np.random.seed(11)
+    dates = pd.date_range("2025-01-01", periods=n, freq="h", tz="UTC")
+    close = 100 + np.cumsum(np.random.randn(n))
+    return pd.DataFrame({
+        "open": close + np.random.randn(n) * 0.2,
+        "high": close + np.abs(np.random.randn(n)),
+        "low": close - np.abs(np.random.randn(n)),
+        "close": close,
+        "volume": np.random.randint(1000, 10000, n),
+    }, index=dates)
+
+
+def as_tuples(signals):
+    return [
+        (s.timestamp, s.action, float(s.price), s.reason, s.rule_name, s.strength, s.metadata)
+        for s in signals
+    ]
+
+
+async def run_both(config, data, current_position=None):
+    results = []
+    for vectorized in (False, True):
+        engine = StrategyEngine(config)
+        engine.vectorized = vectorized
+        engine.current_position = current_position
+        results.append(await engine.run_strategy(data, use_cache=False))
+    return results
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("position_side", ["both", "long"])
+@pytest.mark.parametrize("current_position", [None, {"side": "long"}])
+async def test_vectorized_signals_match_scalar_evaluator(position_side, current_position):
+    data = make_data()
+    scalar, vectorized = await run_both(make_config(position_side), data, current_position)
+
+    assert len(scalar.signals) > 0
+    assert as_tuples(vectorized.signals) == as_tuples(scalar.signals)
+    assert as_tuples(vectorized.filtered_signals) == as_tuples(scalar.filtered_signals)
+    assert len(scalar.filtered_signals) < len(scalar.signals)
+    assert vectorized.metrics == scalar.metrics
+
+
+@pytest.mark.asyncio
+async def test_vectorized_falls_back_on_duplicate_index():
+    data = make_data(60)
+    data.index = data.index[:30].append(data.index[:30])
+
+    engine = StrategyEngine(make_config())
+    await engine.run_strategy(data, use_cache=False)
+
+    assert engine._compiled_rules is None
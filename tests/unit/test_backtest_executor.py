@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app.backtest.engine as engine_module
+from app.backtest.engine import BacktestEngine
+from app.backtest.executor import SymbolExecutor, arrays_to_frame, frame_to_arrays
+from app.backtest.schemas import BacktestConfig
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+
+def make_candles(seed: int, bars: int = 1200) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    # دورة: استقرار ثم قفزة ثم تراجع تدريجي مع ارتداد صغير (RSI منخفض فوق SMA20)
+    cycle = np.concatenate([np.zeros(30), [0.5], np.full(14, -0.005), [0.002], rng.normal(0, 0.01, 20), [-0.4]])
+    close = 100 * np.exp(np.cumsum(np.resize(cycle, bars) + rng.normal(0, 0.0005, bars)))
+    index = pd.date_range(START, periods=bars, freq="1h", name="timestamp")
+    return pd.DataFrame({
+        "open": close, "high": close + 0.5, "low": close - 0.5,
+        "close": close, "volume": rng.random(bars) * 100
+    }, index=index)
+
+
+class FakeDataService:
+    def __init__(self, frames):
+        self.frames = frames
+
+    async def get_historical(self, symbol, timeframe, market, days, use_cache):
+        if symbol not in self.frames:
+            raise ValueError("unknown symbol")
+        return self.frames[symbol].copy()
+
+
+def trade_rows(trades):
+    return [
+        (t.symbol, t.entry_time, t.exit_time, t.entry_price, t.exit_price,
+         t.position_size, t.pnl, t.commission, t.exit_reason)
+        for t in trades
+    ]
+
+
+def test_frame_arrays_roundtrip_keeps_tz_index():
+    df = make_candles(0, bars=10)
+    restored = arrays_to_frame(frame_to_arrays(df))
+    pd.testing.assert_frame_equal(restored, df, check_freq=False)
+
+
+@pytest.mark.asyncio
+async def test_process_pool_matches_inline_run(monkeypatch):
+    frames = {symbol: make_candles(seed) for seed, symbol in enumerate(["AAA", "BBB", "CCC"])}
+    engine = BacktestEngine(FakeDataService(frames))
+    config = BacktestConfig(
+        name="parity", start_date=START, end_date=END, timeframe="1h",
+        symbols=["CCC", "MISSING", "AAA", "BBB"], initial_capital=10000.0
+    )
+
+    monkeypatch.setattr(engine_module, "symbol_executor", SymbolExecutor(max_workers=1))
+    inline_trades, inline_equity = await engine._simulate_portfolio(config)
+
+    executor = SymbolExecutor(max_workers=2)
+    monkeypatch.setattr(engine_module, "symbol_executor", executor)
+    try:
+        pooled_trades, pooled_equity = await engine._simulate_portfolio(config)
+    finally:
+        executor.shutdown()
+
+    assert len(inline_trades) > 0
+    assert trade_rows(pooled_trades) == trade_rows(inline_trades)
+    assert pooled_equity == inline_equity
+
+    # الدمج بترتيب الرموز في التكوين والرمز الفاشل يُتجاهل
+    symbols = [t.symbol for t in pooled_trades]
+    assert symbols == sorted(symbols, key=["CCC", "AAA", "BBB"].index)
+
+
+@pytest.mark.asyncio
+async def test_capital_carries_over_between_symbols(monkeypatch):
+    monkeypatch.setattr(engine_module, "symbol_executor", SymbolExecutor(max_workers=1))
+    frames = {"AAA": make_candles(0), "BBB": make_candles(1)}
+    engine = BacktestEngine(FakeDataService(frames))
+    config = BacktestConfig(
+        name="chain", start_date=START, end_date=END, timeframe="1h",
+        symbols=["AAA", "BBB"], initial_capital=10000.0
+    )
+
+    first = await engine._plan_symbol("AAA", frames["AAA"], config)
+    second = await engine._plan_symbol("BBB", frames["BBB"], config)
+    first_trades = engine._execute_plan("AAA", first, config, 10000.0)
+    capital = 10000.0 + sum(t.pnl for t in first_trades if t.pnl)
+    expected = engine._execute_plan("BBB", second, config, capital)
+
+    trades, _ = await engine._simulate_portfolio(config)
+    bbb_trades = [t for t in trades if t.symbol == "BBB"]
+    assert [t.position_size for t in bbb_trades] == [t.position_size for t in expected]
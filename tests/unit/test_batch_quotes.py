@@ -0,0 +1,100 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from app.providers.stock_websocket import BatchQuotePoller, StockWebSocketManager, StockWebSocketTask
+from app.providers.yahoo_client import quotes_from_download
+
+
+class StubQuoteServer:
+    """مزود اقتباسات محلي: كل طلب متعدد الرموز يستغرق latency ثانية"""
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.batches = []
+        self.prices = {}
+
+    async def fetch_batch(self, symbols):
+        self.batches.append(list(symbols))
+        await asyncio.sleep(self.latency)
+        return {
+            s: {"symbol": s, "price": self.prices.get(s, 100.0), "volume": 1, "change": 0.0}
+            for s in symbols
+        }
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+def make_manager(stub):
+    # بدون __init__: لا حاجة لعملاء Yahoo الحقيقيين
+    manager = object.__new__(StockWebSocketManager)
+    manager.subscription_data = {}
+    manager.price_cache = {}
+    manager.cache_timestamps = {}
+    manager.stats = {"active_symbols": set(), "messages_sent": 0}
+    manager.quote_poller = BatchQuotePoller(stub.fetch_batch, batch_size=100, max_concurrency=5)
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_only_changed_quotes_are_broadcast():
+    stub = StubQuoteServer(latency=0)
+    manager = make_manager(stub)
+    ws = FakeWebSocket()
+    manager.subscription_data[ws] = {"AAPL", "MSFT"}
+    manager.stats["active_symbols"].update({"AAPL", "MSFT", "TSLA"})
+
+    assert await manager.update_prices(["AAPL", "MSFT", "TSLA"]) == 3
+    assert sorted(m["symbol"] for m in ws.sent if m["type"] == "price_update") == ["AAPL", "MSFT"]
+
+    ws.sent.clear()
+    stub.prices["MSFT"] = 101.0
+    assert await manager.update_prices(["AAPL", "MSFT", "TSLA"]) == 1
+    assert [(m["type"], m["symbol"]) for m in ws.sent] == [("price_update", "MSFT"), ("candle_update", "MSFT")]
+    assert ws.sent[0]["price"] == 101.0
+    assert len(stub.batches) == 2
+
+
+@pytest.mark.asyncio
+async def test_500_tickers_keep_configured_cadence():
+    stub = StubQuoteServer(latency=0.05)
+    manager = make_manager(stub)
+    symbols = [f"T{i:03d}" for i in range(500)]
+    manager.stats["active_symbols"].update(symbols)
+
+    task = StockWebSocketTask(manager)
+    task.update_interval = 0.1
+    await task.start()
+    await asyncio.sleep(0.45)
+    await task.stop()
+
+    # 5 دفعات متوازية لكل دورة، ودورة كل 0.1 ثانية رغم زمن الطلب
+    polls = len(stub.batches) // 5
+    assert 4 <= polls <= 6
+    assert all(len(batch) == 100 for batch in stub.batches)
+    assert len(manager.price_cache) == 500
+
+
+def test_quotes_from_multi_ticker_download():
+    index = pd.to_datetime(["2025-01-02", "2025-01-03"])
+    columns = pd.MultiIndex.from_product([["AAPL", "MSFT"], ["Open", "High", "Low", "Close", "Volume"]])
+    df = pd.DataFrame(
+        [[10, 11, 9, 10, 100, 20, 21, 19, 20, 200],
+         [10, 12, 9, 11, 150, None, None, None, None, None]],
+        index=index, columns=columns
+    )
+    quotes = quotes_from_download(df, ["AAPL", "MSFT", "GOOG"])
+
+    assert set(quotes) == {"AAPL", "MSFT"}
+    assert quotes["AAPL"]["price"] == 11
+    assert quotes["AAPL"]["change_percent"] == pytest.approx(10.0)
+    assert quotes["AAPL"]["volume"] == 150
+    # يوم بدون بيانات يُتجاهل ويُستخدم آخر يوم متاح
+    assert quotes["MSFT"]["price"] == 20
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from aiohttp import web
+
+from app.providers.binance_provider import BinanceProvider, binance_http
+
+MINUTE = 60_000
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+START_MS = int(START.timestamp() * 1000)
+
+
+class StubBinance:
+    """خادم HTTP محلي يحاكي /api/v3/klines"""
+
+    def __init__(self, fail_window_index=None):
+        self.fail_window_index = fail_window_index
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttled = False
+
+    async def klines(self, request):
+        params = request.query
+        start = int(params["startTime"])
+        end = int(params["endTime"])
+        limit = int(params["limit"])
+        self.requests.append((start, end))
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            window_index = (start - START_MS) // (limit * MINUTE)
+
+            if window_index == 1 and not self.throttled:
+                self.throttled = True
+                return web.Response(status=429, headers={"Retry-After": "0"})
+            if window_index == self.fail_window_index:
+                return web.Response(status=500)
+
+            first = -(-start // MINUTE) * MINUTE
+            times = np.arange(first, end + 1, MINUTE)[:limit]
+            rows = [
+                [int(t), str(t / MINUTE), str(t / MINUTE + 1), str(t / MINUTE - 1), str(t / MINUTE), "2.5",
+                 int(t) + MINUTE - 1, "0", 1, "0", "0", "0"]
+                for t in times
+            ]
+            return web.json_response(rows, headers={"X-MBX-USED-WEIGHT-1M": str(len(self.requests) * 2)})
+        finally:
+            self.in_flight -= 1
+
+
+async def run_with_stub(stub, minutes):
+    app = web.Application()
+    app.router.add_get("/api/v3/klines", stub.klines)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    provider = BinanceProvider()
+    provider.base_url = f"http://127.0.0.1:{port}"
+    try:
+        end = datetime.fromtimestamp((START_MS + minutes * MINUTE) / 1000, tz=timezone.utc)
+        return await provider.get_historicalcandl("btcusdt", "1m", START, end)
+    finally:
+        await binance_http.close()
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_windows_fetched_concurrently_and_assembled_in_order():
+    stub = StubBinance()
+    minutes = 4500
+    df = await run_with_stub(stub, minutes)
+
+    # آخر شمعة مغلقة تبدأ قبل النهاية بدقيقة
+    expected_times = np.arange(START_MS, START_MS + minutes * MINUTE, MINUTE)
+    assert list(df.columns) == ["time", "open", "high", "low", "close", "volume"]
+    np.testing.assert_array_equal(df["time"].to_numpy(), expected_times)
+    np.testing.assert_allclose(df["close"].to_numpy(), expected_times / MINUTE)
+    assert df["volume"].eq(2.5).all()
+
+    # 5 نوافذ + إعادة المحاولة بعد 429
+    assert len(stub.requests) == 6
+    assert stub.max_in_flight > 1
+
+
+@pytest.mark.asyncio
+async def test_failed_window_keeps_contiguous_prefix():
+    stub = StubBinance(fail_window_index=2)
+    df = await run_with_stub(stub, 4500)
+
+    assert len(df) == 2000
+    assert df["time"].iloc[-1] == START_MS + 1999 * MINUTE
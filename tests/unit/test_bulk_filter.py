@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from app.services.filtering import BulkFilterPlanner, FilterCriteria, FilteringEngine, ScreenerPanel
+from tests.unit.test_screener import make_df
+
+
+class FakeDataService:
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.symbol_calls = 0
+        self.history_calls = []
+        self.active = 0
+        self.peak = 0
+
+    async def get_symbols(self, market):
+        self.symbol_calls += 1
+        return self.symbols
+
+    async def get_historical(self, symbol, timeframe, market, days):
+        self.history_calls.append((symbol, timeframe, market, days))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.001)
+        self.active -= 1
+        if symbol == "BADUSDT":
+            raise RuntimeError("no data")
+        return make_df(200, seed=len(symbol), start=float(len(symbol)))
+
+
+@pytest.fixture
+def engine():
+    symbols = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BADUSDT", "AAPL"]
+    # لوحة عامة فارغة حتى لا تتداخل مع المثيل العام
+    return FilteringEngine(FakeDataService(symbols), screener=ScreenerPanel("1h", 168, "crypto", 1))
+
+
+@pytest.mark.asyncio
+async def test_shared_prefetch_deduplicates_needs(engine):
+    criteria_list = [
+        FilterCriteria(symbol_pattern="*USDT", indicator_filters={"rsi": {"min": 0, "max": 100}}),
+        FilterCriteria(symbol_pattern="*USDT", min_price=0.5, sort_by="price", sort_order="desc"),
+        FilterCriteria(user_preferences={"excluded_symbols": ["AAPL"]}, sort_by="change_24h"),
+        FilterCriteria(symbol_pattern="A*"),
+    ]
+    bulk = await BulkFilterPlanner(engine, max_concurrency=2).run(["crypto"], criteria_list)
+
+    service = engine.data_service
+    assert service.symbol_calls == 1
+    assert len(service.history_calls) == len(set(service.history_calls)) == 4
+    assert service.peak <= 2
+    assert bulk["plan"]["history_requested"] == 12
+    assert bulk["plan"]["history_unique"] == 4
+    assert bulk["plan"]["history_loaded"] == 3
+    assert set(bulk["timings_ms"]) >= {"symbols", "plan", "prefetch", "evaluate", "total"}
+
+    results = bulk["results"]
+    assert results["crypto_0"]["source"] == "prefetch"
+    assert set(results["crypto_0"]["symbols"]) == {"BTCUSDT", "ETHUSDT", "SOLUSDT"}
+    assert results["crypto_0"]["total_count"] == 5
+    # سعر البداية = طول الرمز، فالترتيب التنازلي حسب السعر ثابت تقريباً
+    prices = [item["price"] for item in results["crypto_1"]["filtered_symbols"]]
+    assert prices == sorted(prices, reverse=True)
+    assert "AAPL" not in results["crypto_2"]["symbols"]
+    assert results["crypto_3"] == {
+        "market": "crypto", "criteria_index": 3, "source": "symbols", "symbols": ["AAPL"],
+        "count": 1, "total_count": 5, "filtered_count": 1,
+        "filtered_symbols": [{"symbol": "AAPL", "market": "crypto"}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_populated_panel_skips_network(engine):
+    engine.screener.load_history("BTCUSDT", make_df(50, seed=1))
+    bulk = await BulkFilterPlanner(engine).run(["crypto"], [FilterCriteria(indicator_filters={"rsi": {"min": 0}})])
+
+    assert bulk["results"]["crypto_0"]["source"] == "screener"
+    assert engine.data_service.symbol_calls == 0
+    assert engine.data_service.history_calls == []
+
+
+@pytest.mark.asyncio
+async def test_screener_feed_loads_provider_history(engine):
+    feed = asyncio.create_task(engine.run_screener_feed(engine.data_service, max_concurrency=2))
+    try:
+        for _ in range(500):
+            if engine.screener.symbol_count == 4:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        feed.cancel()
+
+    assert set(engine.screener.symbols) == {"BTCUSDT", "ETHUSDT", "SOLUSDT", "AAPL"}
+    assert engine.screener.can_screen("crypto", FilterCriteria(indicator_filters={"rsi": {"min": 0}}))
+    assert {call[3] for call in engine.data_service.history_calls} == {7}
+
+
+@pytest.mark.asyncio
+async def test_no_candidates_returns_empty_result(engine):
+    criteria = FilterCriteria(symbol_pattern="NOPE*", indicator_filters={"rsi": {"min": 0}})
+    bulk = await BulkFilterPlanner(engine).run(["crypto"], [criteria])
+
+    result = bulk["results"]["crypto_0"]
+    assert "error" not in result
+    assert result["symbols"] == [] and result["filtered_count"] == 0
+    assert result["total_count"] == 5
+    assert engine.data_service.history_calls == []
+
+
+@pytest.mark.asyncio
+async def test_request_data_service_does_not_leak_into_engine():
+    shared = FilteringEngine(screener=ScreenerPanel("1h", 168, "crypto", 1))
+    service = FakeDataService(["BTCUSDT", "ETHUSDT"])
+    bulk = await BulkFilterPlanner(shared, data_service=service).run(["crypto"], [FilterCriteria(min_price=1)])
+
+    assert set(bulk["results"]["crypto_0"]["symbols"]) == {"BTCUSDT", "ETHUSDT"}
+    assert service.symbol_calls == 1
+    assert shared.data_service is None
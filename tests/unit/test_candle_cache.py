@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.candle_cache import HistoricalCandleCache, missing_intervals
+
+pytest.importorskip("pyarrow")
+
+HOUR = 3_600_000
+START = 1735689600000  # 2025-01-01 00:00 UTC
+
+
+def make_fetch(calls, listed_from=START):
+    async def fetch(start_ms, end_ms):
+        calls.append((start_ms, end_ms))
+        times = np.arange(max(start_ms, listed_from), end_ms + 1, HOUR, dtype=np.int64)
+        close = times / HOUR
+        return pd.DataFrame({
+            "time": times, "open": close, "high": close + 1,
+            "low": close - 1, "close": close, "volume": np.ones(len(times)),
+        })
+    return fetch
+
+
+def test_missing_intervals():
+    coverage = [(10, 20), (30, 40)]
+    assert missing_intervals(coverage, 0, 50, 1) == [(0, 9), (21, 29), (41, 50)]
+    assert missing_intervals(coverage, 12, 18, 1) == []
+    assert missing_intervals([], 5, 7, 1) == [(5, 7)]
+
+
+@pytest.mark.asyncio
+async def test_only_missing_gap_is_fetched(tmp_path):
+    cache = HistoricalCandleCache(str(tmp_path))
+    calls = []
+    fetch = make_fetch(calls)
+
+    # نطاق يعبر حدود الشهر
+    mid = START + 30 * 24 * HOUR
+    end = START + 40 * 24 * HOUR
+    first = await cache.get_range("crypto", "btcusdt", "1h", mid, end, fetch)
+    assert calls == [(mid, end)]
+    assert first["time"].iloc[0] == mid and first["time"].iloc[-1] == end
+
+    calls.clear()
+    wider = await cache.get_range("crypto", "BTCUSDT", "1h", START + 1, end + HOUR, fetch)
+    assert calls == [(START + HOUR, mid - HOUR), (end + HOUR, end + HOUR)]
+    assert wider["time"].tolist() == list(range(START + HOUR, end + 2 * HOUR, HOUR))
+    assert list(wider.columns) == ["time", "open", "high", "low", "close", "volume"]
+
+    calls.clear()
+    again = await cache.get_range("crypto", "BTCUSDT", "1h", START + HOUR, end, fetch)
+    assert calls == []
+    pd.testing.assert_frame_equal(again, wider.iloc[:-1])
+
+
+@pytest.mark.asyncio
+async def test_empty_fetch_is_not_recorded_as_covered(tmp_path):
+    cache = HistoricalCandleCache(str(tmp_path))
+    calls = []
+
+    async def failing_fetch(start_ms, end_ms):
+        calls.append((start_ms, end_ms))
+        return pd.DataFrame()
+
+    result = await cache.get_range("crypto", "ETHUSDT", "1h", START, START + 5 * HOUR, failing_fetch)
+    assert result.empty
+    await cache.get_range("crypto", "ETHUSDT", "1h", START, START + 5 * HOUR, failing_fetch)
+    assert len(calls) == 2
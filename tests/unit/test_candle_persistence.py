@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.candle_persistence import CandlePersistence, covered_runs, records_to_arrays
+from app.services.indicators.fingerprint import DataFingerprinter
+
+HOUR = 3_600_000
+
+
+class FakeConn:
+    """اتصال asyncpg وهمي: جدول في الذاكرة بمفتاح (symbol, timeframe, time)"""
+
+    def __init__(self, table):
+        self.table = table
+        self.copied = []
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, *args):
+        return "OK"
+
+    async def copy_records_to_table(self, name, records, columns):
+        self.copied.append(list(records))
+        for row in records:
+            time_ms = int(row[2].timestamp() * 1000)
+            self.table.setdefault((row[0], row[1], time_ms), (time_ms, *row[3:8]))
+
+    async def fetch(self, sql, symbol, timeframe, start, end):
+        start_ms, end_ms = int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+        return sorted(
+            row for (s, tf, t), row in self.table.items()
+            if s == symbol and tf == timeframe and start_ms <= t <= end_ms
+        )
+
+
+class FakePool:
+    def __init__(self):
+        self.table = {}
+        self.conn = FakeConn(self.table)
+
+    def acquire(self):
+        return self.conn
+
+
+@pytest.fixture
+def persistence():
+    persistence = CandlePersistence("postgresql://test", batch_size=2)
+    persistence.enabled = True
+    pool = FakePool()
+
+    async def create_pool():
+        return pool
+
+    persistence._create_pool = create_pool
+    persistence.pool = pool
+    return persistence
+
+
+def frame(times):
+    times = np.asarray(times, dtype=np.int64)
+    return pd.DataFrame({
+        "time": times, "open": times / HOUR, "high": times / HOUR + 1,
+        "low": times / HOUR - 1, "close": times / HOUR, "volume": 1.0,
+    })
+
+
+def test_covered_runs_and_arrays():
+    times = np.array([0, 1, 2, 5, 6, 9]) * HOUR
+    assert covered_runs(times, HOUR) == [(0, 2 * HOUR), (5 * HOUR, 6 * HOUR), (9 * HOUR, 9 * HOUR)]
+    assert covered_runs(np.array([], dtype=np.int64), HOUR) == []
+
+    arrays = records_to_arrays([(HOUR, 1.0, 2.0, 0.5, 1.5, 10.0)])
+    assert arrays["time"].dtype == np.int64 and arrays["time"][0] == HOUR
+    assert arrays["close"][0] == 1.5
+    assert len(records_to_arrays([])["volume"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_copies_deduplicated_batches(persistence):
+    for close in (1.0, 2.0):
+        persistence.record("BTCUSDT", "1h", 0, 1, 1, 1, close, 1)
+    persistence.record("BTCUSDT", "1h", HOUR, 1, 1, 1, 3.0, 1)
+    persistence.record("ETHUSDT", "1h", 0, 1, 1, 1, 4.0, 1)
+
+    assert await persistence.flush() == 3
+    conn = persistence.pool.conn
+    assert [len(batch) for batch in conn.copied] == [2, 1]
+    assert conn.copied[0][0][6] == 2.0  # آخر نسخة من الشمعة هي المكتوبة
+    assert persistence.get_stats()["pending"] == 0
+
+    arrays = await persistence.read_range("BTCUSDT", "1h", 0, HOUR)
+    assert arrays["time"].tolist() == [0, HOUR]
+    assert arrays["close"].tolist() == [2.0, 3.0]
+
+
+@pytest.mark.asyncio
+async def test_get_range_fetches_only_gaps(persistence):
+    persistence.write_frame("BTCUSDT", "1h", frame(np.r_[0:5, 8:10] * HOUR))
+    await persistence.flush()
+
+    calls = []
+
+    async def fetch(start_ms, end_ms):
+        calls.append((start_ms, end_ms))
+        return frame(np.arange(start_ms, end_ms + 1, HOUR))
+
+    # بادئة بصمة محفوظة للسلسلة قبل إكمال الفجوات
+    fingerprinter = DataFingerprinter()
+    fingerprinter.fingerprint(frame(np.r_[0:5, 8:10] * HOUR), "BTCUSDT", "1h")
+    assert fingerprinter.get_stats()["prefix_states"] == 1
+
+    df = await persistence.get_range("crypto", "BTCUSDT", "1h", 0, 11 * HOUR + 5, fetch)
+    assert calls == [(5 * HOUR, 7 * HOUR), (10 * HOUR, 11 * HOUR)]
+    assert df["time"].tolist() == list(range(0, 12 * HOUR, HOUR))
+    assert fingerprinter.get_stats()["prefix_states"] == 0
+
+    # الفجوات حُفظت: الطلب التالي من قاعدة البيانات فقط
+    calls.clear()
+    df = await persistence.get_range("crypto", "BTCUSDT", "1h", 0, 11 * HOUR, fetch)
+    assert calls == [] and len(df) == 12
+    assert persistence.stats["read_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unavailable_database_returns_none():
+    persistence = CandlePersistence("postgresql://test")
+    persistence.enabled = True
+
+    async def create_pool():
+        raise OSError("connection refused")
+
+    persistence._create_pool = create_pool
+    persistence.record("BTCUSDT", "1h", 0, 1, 1, 1, 1, 1)
+    assert await persistence.get_range("crypto", "BTCUSDT", "1h", 0, HOUR, None) is None
+    assert await persistence.flush() == 0
+    assert persistence.get_stats()["pending"] == 1
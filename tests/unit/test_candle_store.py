@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+
+from app.markets.candle_store import CandleStore
+from app.markets.indicator_scheduler import IndicatorScheduler
+from app.markets.models import Candle
+
+
+def make_candle(i, symbol="BTCUSDT", timeframe="1m"):
+    open_time = datetime(2025, 1, 1) + timedelta(minutes=i)
+    price = 100.0 + i
+    return Candle(
+        symbol=symbol,
+        timeframe=timeframe,
+        open_time=open_time,
+        close_time=open_time + timedelta(minutes=1),
+        open=price,
+        high=price + 1,
+        low=price - 1,
+        close=price + 0.5,
+        volume=10.0 * i,
+    )
+
+
+def test_ring_keeps_last_candles_in_order():
+    store = CandleStore(max_candles=5)
+    for i in range(13):
+        store.add(make_candle(i))
+
+    df = store.to_dataframe("BTCUSDT", "1m")
+    assert list(df.columns) == ["open", "high", "low", "close", "volume"]
+    assert df.index.name == "timestamp"
+    assert df["open"].tolist() == [108.0, 109.0, 110.0, 111.0, 112.0]
+    assert df.index[-1] == pd.Timestamp(datetime(2025, 1, 1) + timedelta(minutes=12))
+    assert store.to_dataframe("BTCUSDT", "1m", limit=2)["close"].tolist() == [111.5, 112.5]
+    assert store.count("BTCUSDT", "1m") == 5
+
+
+def test_memory_is_fixed_per_key():
+    store = CandleStore(max_candles=100)
+    store.add(make_candle(0))
+    initial = store.nbytes
+    for i in range(1, 1000):
+        store.add(make_candle(i))
+    assert store.nbytes == initial
+
+    store.add(make_candle(0, timeframe="5m"))
+    assert store.nbytes == 2 * initial
+
+
+def test_views_are_zero_copy_and_read_only():
+    store = CandleStore(max_candles=10)
+    for i in range(15):
+        store.add(make_candle(i))
+
+    columns = store.view("BTCUSDT", "1m", limit=4)
+    assert columns["close"].tolist() == [111.5, 112.5, 113.5, 114.5]
+    assert not columns["close"].flags.writeable
+    ring = store._store["BTCUSDT:1m"]
+    assert np.shares_memory(columns["close"], ring.values)
+
+    df = store.to_dataframe("BTCUSDT", "1m", copy=False)
+    assert np.shares_memory(df["close"].to_numpy(), ring.values)
+    copied = store.to_dataframe("BTCUSDT", "1m")
+    assert not np.shares_memory(copied["close"].to_numpy(), ring.values)
+
+    assert store.view("ETHUSDT", "1m") == {}
+    assert store.to_dataframe("ETHUSDT", "1m").empty
+
+
+def test_scheduler_calculates_on_store_view():
+    store = CandleStore(max_candles=200)
+    scheduler = IndicatorScheduler(store)
+    scheduler.register_indicators("BTCUSDT", "1m", [
+        {"name": "rsi", "type": "momentum", "params": {"period": 14}},
+        {"name": "bollinger_bands", "type": "volatility", "params": {"period": 20}},
+    ])
+    for i in range(60):
+        scheduler.on_candle_close(make_candle(i))
+
+    cached = scheduler.results_cache["BTCUSDT:1m"]
+    assert set(cached["indicators"]) == {"rsi", "bollinger_bands"}
+    assert cached["last_candle"]["open"] == 159.0
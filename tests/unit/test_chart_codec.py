@@ -0,0 +1,92 @@
+import msgpack
+import numpy as np
+
+from app.websocket.chart_codec import (
+    COMPACT_FORMAT, EXT_FLOAT32, EXT_FLOAT64, EXT_INT64, JSON_FORMAT,
+    encode_compact, negotiate_float_dtype, negotiate_format
+)
+
+EXT_DTYPES = {EXT_FLOAT32: "<f4", EXT_FLOAT64: "<f8", EXT_INT64: "<i8"}
+
+
+def decode(payload: bytes):
+    return msgpack.unpackb(
+        payload, raw=False,
+        ext_hook=lambda code, data: np.frombuffer(data, dtype=EXT_DTYPES[code])
+    )
+
+
+def candles(n=5):
+    return [
+        {"time": 1_700_000_000_000 + i * 60_000, "open": 100.0 + i, "high": 101.5 + i,
+         "low": 99.25 + i, "close": 100.5 + i, "volume": 3.0 * i}
+        for i in range(n)
+    ]
+
+
+RESULTS = {
+    "rsi": {
+        "name": "rsi", "values": [None, None, 45.5, 51.25, 60.0],
+        "signals": {"data": [0, 0, 0, 1, -1], "index": [], "dtype": "int64"},
+        "metadata": {"period": 14},
+    },
+    "bb_0": {
+        "name": "bb_0", "values": [1.0, 2.0, 3.0, 4.0, 5.0], "signals": None,
+        "metadata": {"upper_band": [2.0, 3.0, 4.0, 5.0, 6.0], "std": 2},
+    },
+}
+
+
+def test_negotiation_defaults_to_json():
+    assert negotiate_format({}) == JSON_FORMAT
+    assert negotiate_format({"format": "xml"}) == JSON_FORMAT
+    assert negotiate_format({"format": "msgpack"}) == COMPACT_FORMAT
+    assert negotiate_float_dtype({"float_dtype": "float64"}) == "float64"
+    assert negotiate_float_dtype({"float_dtype": "int8"}) == "float32"
+
+
+def test_snapshot_is_columnar_with_typed_blocks():
+    message = {
+        "type": "chart_initialized", "symbol": "BTCUSDT", "format": "msgpack",
+        "data": {"candles": candles(), "indicators_results": RESULTS, "metadata": {"total_candles": 5}},
+    }
+    decoded = decode(encode_compact(message))
+
+    columns = decoded["data"]["candles"]
+    assert columns["count"] == 5
+    assert columns["time"].dtype == np.int64
+    np.testing.assert_array_equal(columns["time"], [c["time"] for c in candles()])
+    assert columns["close"].dtype == np.float32
+    np.testing.assert_allclose(columns["close"], [c["close"] for c in candles()])
+
+    rsi = decoded["data"]["indicators_results"]["rsi"]
+    assert np.isnan(rsi["values"][:2]).all()
+    np.testing.assert_allclose(rsi["values"][2:], [45.5, 51.25, 60.0])
+    np.testing.assert_array_equal(rsi["signals"]["data"], [0, 0, 0, 1, -1])
+    assert rsi["metadata"]["period"] == 14
+
+    bb = decoded["data"]["indicators_results"]["bb_0"]
+    np.testing.assert_allclose(bb["metadata"]["upper_band"], [2, 3, 4, 5, 6])
+    assert decoded["data"]["metadata"] == {"total_candles": 5}
+
+
+def test_float64_snapshot_keeps_full_precision():
+    rows = [{"time": 0, "open": 65000.123, "high": 65000.123, "low": 65000.123,
+             "close": 65000.123, "volume": 1.0}]
+    message = {"type": "chart_initialized", "data": {"candles": rows, "indicators_results": {}}}
+    decoded = decode(encode_compact(message, "float64"))
+    assert decoded["data"]["candles"]["close"].dtype == np.float64
+    assert decoded["data"]["candles"]["close"][0] == 65000.123
+
+
+def test_live_messages_carry_only_last_values():
+    message = {
+        "type": "candle_close", "symbol": "BTCUSDT", "timeframe": "1m",
+        "candle": candles()[-1], "indicators": RESULTS, "time": 1,
+    }
+    decoded = decode(encode_compact(message))
+
+    assert decoded["candle"] == candles()[-1]
+    assert decoded["indicators"]["rsi"] == {"value": 60.0, "signal": -1, "metadata": {"period": 14}}
+    assert decoded["indicators"]["bb_0"]["metadata"] == {"upper_band": 6.0, "std": 2}
+    assert len(encode_compact(message)) < 300
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app.core.managers as managers
+from app.core.chart_snapshots import ChartSnapshotStore
+from app.core.managers import ChartManager
+
+HOUR = 3_600_000
+START = 1_700_000_000_000 // HOUR * HOUR
+INDICATORS = [
+    {"name": "sma", "type": "trend", "params": {"period": 20}},
+    {"name": "rsi", "type": "momentum", "params": {"period": 14}},
+    {"name": "macd", "type": "trend", "params": {}},
+]
+
+
+def make_candles(n, start=START):
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return [
+        {"time": start + i * HOUR, "open": float(c), "high": float(c * 1.01),
+         "low": float(c * 0.99), "close": float(c), "volume": float(i + 1)}
+        for i, c in enumerate(close)
+    ]
+
+
+class FakeProvider:
+    def __init__(self, candles):
+        self.candles = candles
+        self.history_calls = []
+        self.last_closed_calls = 0
+
+    async def get_historicalcandl(self, symbol, timeframe, start_date, end_date):
+        self.history_calls.append((start_date, end_date))
+        start_ms = int(start_date.timestamp() * 1000)
+        end_ms = int(end_date.timestamp() * 1000) - HOUR
+        return pd.DataFrame([c for c in self.candles if start_ms <= c["time"] <= end_ms])
+
+    async def get_last_closed_candles(self, symbol, timeframe, limit):
+        self.last_closed_calls += 1
+        return pd.DataFrame(self.candles[-limit:])
+
+
+@pytest.fixture(autouse=True)
+def no_live_stream(monkeypatch):
+    async def subscribe(symbol, callback):
+        pass
+
+    monkeypatch.setattr(managers.live_stream_manager, "subscribe", subscribe)
+
+
+def make_manager(tmp_path, provider, now_ms):
+    manager = ChartManager()
+    manager.snapshots = ChartSnapshotStore(str(tmp_path))
+    manager.crypto_provider = provider
+    manager._now_ms = lambda: now_ms
+
+    async def calculate(chart):
+        chart.indicators_results = {"recalculated": len(chart.candles)}
+
+    manager._calculate_indicators_on_close = calculate
+    return manager
+
+
+async def snapshot_chart(tmp_path, candles):
+    manager = make_manager(tmp_path, FakeProvider(candles), candles[-1]["time"] + HOUR + 1)
+    chart = await manager.get_or_create_chart("BTCUSDT", "1h", num_last_candles=len(candles))
+    chart.indicators = [dict(config) for config in INDICATORS]
+    manager._sync_streaming_indicators(chart)
+    chart.live_candle = {**candles[-1], "time": candles[-1]["time"] + HOUR}
+    chart.last_update = chart.last_update.replace(microsecond=1)
+    assert await manager.save_snapshots() == 1
+    assert await manager.save_snapshots() == 0  # بدون تغيير لا يُعاد الحفظ
+    return chart
+
+
+@pytest.mark.asyncio
+async def test_restore_backfills_only_missing_bars(tmp_path):
+    all_candles = make_candles(260)
+    await snapshot_chart(tmp_path, all_candles[:250])
+
+    # إعادة تشغيل بعد 10 شموع: الشمعة الحية القديمة تُستبدل بالمغلقة من المزود
+    provider = FakeProvider(all_candles)
+    manager = make_manager(tmp_path, provider, all_candles[-1]["time"] + HOUR + 5)
+    chart = await manager.get_or_create_chart("BTCUSDT", "1h")
+
+    assert provider.last_closed_calls == 0
+    assert len(provider.history_calls) == 1
+    assert [c["time"] for c in chart.candles] == [c["time"] for c in all_candles]
+    assert chart.live_candle is None
+    assert chart.indicators == INDICATORS
+    assert chart.indicators_results == {"recalculated": 260}
+
+    # حالة المؤشرات المستعادة + الشموع الجديدة = بناء كامل من البداية
+    live = {**all_candles[-1], "time": all_candles[-1]["time"] + HOUR, "close": 123.0}
+    chart.live_candle = live
+    restored, _ = manager._update_streaming_indicators(chart)
+    chart.streaming_indicators = {}
+    rebuilt, _ = manager._update_streaming_indicators(chart)
+    for name in ("sma", "rsi", "macd"):
+        assert restored[name]["values"] == pytest.approx(rebuilt[name]["values"]), name
+
+
+@pytest.mark.asyncio
+async def test_current_live_candle_is_kept_and_large_gaps_reload(tmp_path):
+    candles = make_candles(100)
+    saved = await snapshot_chart(tmp_path, candles)
+
+    provider = FakeProvider(candles)
+    manager = make_manager(tmp_path, provider, saved.live_candle["time"] + 60_000)
+    chart = await manager.get_or_create_chart("BTCUSDT", "1h")
+    assert chart.live_candle == saved.live_candle
+    assert provider.history_calls == [] and provider.last_closed_calls == 0
+
+    # فجوة أكبر من عدد الشموع المطلوب: تحميل كامل من المزود كالمعتاد
+    provider = FakeProvider(make_candles(700))
+    manager = make_manager(tmp_path, provider, START + 700 * HOUR)
+    chart = await manager.get_or_create_chart("BTCUSDT", "1h")
+    assert provider.last_closed_calls == 1
+    assert chart.indicators == [] and len(chart.candles) == 500
+
+
+@pytest.mark.asyncio
+async def test_cancelled_creation_releases_waiters(tmp_path):
+    import asyncio
+
+    candles = make_candles(50)
+    provider = FakeProvider(candles)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_last_closed(symbol, timeframe, limit):
+        started.set()
+        await release.wait()
+        return pd.DataFrame(candles[-limit:])
+
+    provider.get_last_closed_candles = slow_last_closed
+    manager = make_manager(tmp_path, provider, candles[-1]["time"] + HOUR + 1)
+
+    creator = asyncio.create_task(manager.get_or_create_chart("BTCUSDT", "1h", num_last_candles=50))
+    await started.wait()
+    waiter = asyncio.create_task(manager.get_or_create_chart("BTCUSDT", "1h", num_last_candles=50))
+    await asyncio.sleep(0)
+    creator.cancel()
+    release.set()
+
+    # المنتظر لا يعلق: يعيد الإنشاء بعد إلغاء المنشئ
+    chart = await asyncio.wait_for(waiter, 5)
+    assert len(chart.candles) == 50
+    assert manager.charts["BTCUSDT_1h"] is chart
+    assert manager._chart_ready == {}
+    with pytest.raises(asyncio.CancelledError):
+        await creator
+
+
+def test_snapshot_does_not_unpickle(tmp_path):
+    import pickle
+
+    store = ChartSnapshotStore(str(tmp_path))
+    candles = make_candles(5)
+    data = store.dumps({"symbol": "BTCUSDT", "timeframe": "1h", "candles": candles,
+                        "indicators_results": {"sma": {"values": np.arange(2.0)}}})
+    payload = store.loads(data)
+    assert payload["candles"] == candles
+    assert payload["indicators_results"] == {"sma": {"values": [0.0, 1.0]}}
+
+    # لقطات pickle القديمة (أو ملف معدّل) لا تُحمّل ككائنات
+    assert store.loads(pickle.dumps({"version": 2, "candles": candles})) is None
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.indicators import apply_indicators_columnar
+from app.services.indicators.base import ColumnarIndicatorResult, IndicatorConfig
+from app.services.indicators.calculator import IndicatorCalculator
+
+CONFIGS = [
+    {"name": "sma", "type": "trend", "params": {"period": 20}},
+    {"name": "rsi", "type": "momentum", "params": {"period": 14}},
+    {"name": "macd", "type": "trend", "params": {}},
+    {"name": "bollinger_bands", "type": "volatility", "params": {}},
+    {"name": "not_an_indicator", "type": "trend", "params": {}},
+]
+
+
+@pytest.fixture
+def ohlcv():
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))
+    index = pd.date_range("2024-01-01", periods=300, freq="h", tz="UTC")
+    return pd.DataFrame({
+        "open": close, "high": close * 1.01, "low": close * 0.99,
+        "close": close, "volume": rng.uniform(1, 10, 300),
+    }, index=index)
+
+
+def test_edge_conversion_matches_legacy_to_dict(ohlcv):
+    calculator = IndicatorCalculator()
+    batch = calculator.calculate_columnar(ohlcv, CONFIGS, use_cache=False)
+
+    for config in CONFIGS:
+        name = config["name"]
+        result = batch.results[name]
+        if result.error is not None:
+            legacy = {"name": name, "values": [np.nan] * len(ohlcv), "metadata": {"error": result.error}}
+        else:
+            indicator = calculator.registry.create_indicator(IndicatorConfig(**config))
+            legacy = indicator.calculate(ohlcv).to_dict()
+            assert result.index is batch.index  # فهرس واحد مشترك للدفعة
+        assert calculator._clean_indicator_result(result.to_dict()) == \
+            calculator._clean_indicator_result(legacy), name
+
+    assert batch.results["not_an_indicator"].error is not None
+
+
+def test_cached_results_are_shared_read_only(ohlcv):
+    calculator = IndicatorCalculator()
+    first = calculator.calculate_columnar(ohlcv, CONFIGS[:1]).results["sma"]
+    second = calculator.calculate_columnar(ohlcv, CONFIGS[:1]).results["sma"]
+    assert first is second
+    with pytest.raises(ValueError):
+        first.values[-1] = 0.0
+
+    # الواجهة القديمة تُرجع نفس القواميس النظيفة
+    cleaned = calculator.apply_indicators(ohlcv, CONFIGS[:1])["sma"]
+    assert cleaned["values"]["data"][-1] == round(float(first.values[-1]), 8)
+    assert cleaned["values"]["index"][0] == ohlcv.index[0].isoformat()
+
+
+def test_module_helper_preprocesses_like_apply_indicators(ohlcv):
+    ohlcv.iloc[5, ohlcv.columns.get_loc("close")] = np.inf
+    batch = apply_indicators_columnar(ohlcv, CONFIGS[:1], use_cache=False)
+    series = batch.series("sma")
+    assert series.dtype == np.float64 and series.index.equals(ohlcv.index)
+    assert np.isfinite(series.iloc[19:]).all()
+    assert apply_indicators_columnar(ohlcv.iloc[:0], CONFIGS[:1]) is None
+    assert isinstance(batch.results["sma"], ColumnarIndicatorResult)
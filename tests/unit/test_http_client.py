@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from app.providers.binance_provider import BinanceProvider, binance_http
+from app.providers.http_client import ProviderHTTPClient, close_http_clients
+
+
+class StubServer:
+    def __init__(self):
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def klines(self, request):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+            limit = int(request.query["limit"])
+            start = int(request.query.get("startTime", 0))
+            rows = [[start + i * 60_000, "1", "2", "0.5", "1.5", "10", 0, "0", 1, "0", "0", "0"] for i in range(limit)]
+            return web.json_response(rows)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest_asyncio.fixture
+async def server():
+    stub = StubServer()
+    app = web.Application()
+    app.router.add_get("/api/v3/klines", stub.klines)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    stub.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    yield stub
+    await close_http_clients()
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_burst_of_identical_chart_opens_hits_upstream_once(server):
+    provider = BinanceProvider()
+    provider.base_url = server.url
+    coalesced = binance_http.stats["coalesced"]
+
+    frames = await asyncio.gather(*(
+        provider.get_last_closed_candles("btcusdt", "1m", limit=50) for _ in range(20)
+    ))
+
+    assert server.calls == 1
+    assert binance_http.stats["coalesced"] - coalesced == 19
+    assert all(len(df) == 50 for df in frames)
+
+    # بعد انتهاء الطلب لا يُعاد استخدام النتيجة
+    await provider.get_last_closed_candles("btcusdt", "1m", limit=50)
+    assert server.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_distinct_requests_share_pool_under_concurrency_cap(server):
+    client = ProviderHTTPClient("test", max_concurrency=3)
+    try:
+        results = await asyncio.gather(*(
+            client.get(f"{server.url}/api/v3/klines", {"limit": 2, "startTime": i}) for i in range(12)
+        ))
+    finally:
+        await client.close()
+
+    assert server.calls == 12
+    assert server.max_in_flight <= 3
+    assert [r.data[0][0] for r in results] == list(range(12))
+    assert all(r.ok for r in results)
+
+
+@pytest.mark.asyncio
+async def test_session_from_previous_loop_is_closed(server):
+    client = ProviderHTTPClient("test")
+
+    # حلقة انتهت (asyncio.run في خيط آخر)
+    finished = await asyncio.to_thread(asyncio.run, client.session())
+
+    # حلقة ما زالت تعمل في خيط آخر: الإغلاق يتم على حلقتها
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        await client.session()
+        running = asyncio.run_coroutine_threadsafe(client.session(), other_loop).result(5)
+        current = await client.session()
+        for _ in range(100):
+            if running.closed:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(5)
+        other_loop.close()
+
+    assert finished.closed and running.closed
+    assert not current.closed
+    result = await client.get(f"{server.url}/api/v3/klines", {"limit": 1})
+    assert result.ok
+    await client.close()
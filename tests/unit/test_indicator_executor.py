@@ -0,0 +1,94 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.indicators.calculator import IndicatorCalculator
+from app.services.indicators.executor import (
+    PROCESS, THREAD, IndicatorExecutor, _frame_layout, _read_frame, _write_frame,
+)
+
+CONFIGS = [
+    {"name": name, "type": "trend", "params": {}}
+    for name in ("harmonic_patterns", "supply_demand", "volume_climax", "obv", "rsi", "macd", "missing")
+]
+
+
+@pytest.fixture
+def ohlcv():
+    rng = np.random.default_rng(2)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 600)))
+    return pd.DataFrame({
+        "open": close * (1 + rng.normal(0, 0.002, 600)), "high": close * 1.01,
+        "low": close * 0.99, "close": close, "volume": rng.uniform(1, 10, 600),
+        "symbol": "BTCUSDT",
+    }, index=pd.date_range("2024-01-01", periods=600, freq="h", tz="UTC", name="time"))
+
+
+def test_shared_memory_frame_round_trip(ohlcv):
+    layout = _frame_layout(ohlcv)
+    shm = shared_memory.SharedMemory(create=True, size=layout["nbytes"])
+    try:
+        _write_frame(shm.buf, ohlcv, layout)
+        frame = _read_frame(shm.buf, layout)
+        pd.testing.assert_frame_equal(frame, ohlcv.drop(columns=["symbol"]), check_freq=False)
+        del frame
+    finally:
+        shm.close()
+        shm.unlink()
+    assert _frame_layout(ohlcv.reset_index(drop=True).set_index("symbol")) is None
+
+
+def test_backend_selection_by_indicator_and_size(ohlcv):
+    calculator = IndicatorCalculator()
+    executor = IndicatorExecutor(process_min_bars=500)
+    obv = calculator.registry.get_indicator("obv")
+    harmonic = calculator.registry.get_indicator("harmonic_patterns")
+    rsi = calculator.registry.get_indicator("rsi")
+    assert executor.backend_for(obv, 600) == PROCESS
+    assert executor.backend_for(obv, 499) == THREAD
+    # الأنماط أصبحت موجهة (NumPy) فتبقى في الخيوط
+    assert executor.backend_for(harmonic, 10**6) == THREAD
+    assert executor.backend_for(rsi, 10**6) == THREAD
+    assert executor.backend_for(None, 10**6) == THREAD
+
+
+def test_process_backend_matches_sequential(ohlcv):
+    calculator = IndicatorCalculator()
+    expected = calculator.apply_indicators(ohlcv, CONFIGS, use_cache=False)
+
+    calculator.executor = IndicatorExecutor(thread_workers=2, process_workers=2, process_min_bars=100)
+    try:
+        assert calculator.apply_indicators(ohlcv, CONFIGS, parallel=True) == expected
+        stats = calculator.executor.get_stats()
+        assert stats[PROCESS] == 1 and stats[THREAD] == 6
+
+        # النتائج العائدة من العمليات تشارك فهرس الدفعة وتُخزن في الكاش
+        batch = calculator.calculate_columnar(ohlcv, CONFIGS, parallel=True)
+        assert batch.results["obv"].index is batch.index
+        assert calculator.executor.get_stats()[PROCESS] == 1
+    finally:
+        calculator.executor.shutdown()
+
+
+def test_process_errors_fall_back_to_threads(ohlcv):
+    from concurrent.futures import Future
+
+    class FailingPool:
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_exception(ValueError("result could not be unpickled"))
+            return future
+
+    calculator = IndicatorCalculator()
+    expected = calculator.apply_indicators(ohlcv, CONFIGS, use_cache=False)
+
+    calculator.executor = IndicatorExecutor(thread_workers=2, process_workers=2, process_min_bars=100)
+    calculator.executor._get_processes = lambda: FailingPool()
+    try:
+        assert calculator.apply_indicators(ohlcv, CONFIGS, use_cache=False, parallel=True) == expected
+        stats = calculator.executor.get_stats()
+        assert stats["process_fallbacks"] == 1 and stats[PROCESS] == 0
+    finally:
+        calculator.executor.shutdown()
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.indicators.calculator import IndicatorCalculator
+from app.services.indicators.fingerprint import DataFingerprinter, config_hash
+
+SMA = {"name": "sma", "type": "trend", "params": {"period": 20}}
+
+
+def make_frame(n, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range("2024-01-01", periods=n, freq="h", tz="UTC")
+    return pd.DataFrame({
+        "open": close, "high": close * 1.01, "low": close * 0.99,
+        "close": close, "volume": rng.uniform(1, 10, n),
+    }, index=index)
+
+
+def test_incremental_fingerprint_matches_full_pass():
+    frame = make_frame(500)
+    incremental = DataFingerprinter()
+    incremental.fingerprint(frame.iloc[:400], "btcusdt", "1h")
+    grown = incremental.fingerprint(frame, "BTCUSDT", "1h")
+    assert incremental.get_stats()["incremental"] == 1
+
+    assert grown == DataFingerprinter().fingerprint(frame, "BTCUSDT", "1h")
+    assert grown.length == 500 and grown.first == frame.index[0].value
+
+    # تغيير شمعة الحد أو الأولى يُبطل البادئة
+    for row in (0, 498):
+        changed = frame.copy()
+        changed.iloc[row, changed.columns.get_loc("close")] += 1
+        assert incremental.fingerprint(changed, "BTCUSDT", "1h") != grown
+
+    # بدون رمز: لا افتراض لثبات البادئة، أي تغيير يُكتشف
+    anonymous = DataFingerprinter()
+    base = anonymous.fingerprint(frame)
+    changed = frame.copy()
+    changed.iloc[200, changed.columns.get_loc("close")] += 1
+    assert anonymous.fingerprint(changed) != base
+    assert anonymous.get_stats() == {"prefix_states": 0, "full": 2, "incremental": 0}
+
+    # تحديث الشمعة الحية الأخيرة فقط يغيّر البصمة
+    live = frame.copy()
+    live.iloc[-1, live.columns.get_loc("close")] += 1
+    assert incremental.fingerprint(live, "BTCUSDT", "1h") != grown
+    assert DataFingerprinter().fingerprint(frame, "ETHUSDT", "1h").key != grown.key
+
+
+
+def test_prefix_sample_and_invalidate():
+    frame = make_frame(500)
+    fingerprinter = DataFingerprinter()
+    fingerprinter.fingerprint(frame.iloc[:400], "BTCUSDT", "1h")
+    expected = DataFingerprinter().fingerprint(frame, "BTCUSDT", "1h")
+
+    positions = set(DataFingerprinter._positions(399).tolist())
+    sampled = sorted(positions)[len(positions) // 2]
+    unsampled = next(row for row in range(1, 399) if row not in positions)
+
+    # تعديل صف من العينة داخل البادئة يُبطلها ويُحسب كاملاً
+    changed = frame.copy()
+    changed.iloc[sampled, changed.columns.get_loc("close")] += 1
+    assert fingerprinter.fingerprint(changed, "BTCUSDT", "1h") == DataFingerprinter().fingerprint(changed, "BTCUSDT", "1h")
+    assert fingerprinter.get_stats()["incremental"] == 0
+
+    # صف خارج العينة لا يُكتشف إلا بعد invalidate
+    fingerprinter.fingerprint(frame.iloc[:400], "BTCUSDT", "1h")
+    changed = frame.copy()
+    changed.iloc[unsampled, changed.columns.get_loc("close")] += 1
+    assert fingerprinter.fingerprint(changed, "BTCUSDT", "1h") == expected
+
+    assert fingerprinter.invalidate("btcusdt") == 1
+    assert fingerprinter.fingerprint(changed, "BTCUSDT", "1h") != expected
+    assert fingerprinter.invalidate() == 1 and fingerprinter.get_stats()["prefix_states"] == 0
+
+
+def test_time_column_on_range_index():
+    """إطارات DataService.get_historical: الوقت عمود time بالمللي ثانية على RangeIndex"""
+    frame = make_frame(500)
+    frame.insert(0, "time", frame.index.asi8 // 1_000_000)
+    frame = frame.reset_index(drop=True)
+
+    fingerprinter = DataFingerprinter()
+    early = fingerprinter.fingerprint(frame.iloc[:300], "BTCUSDT", "1h")
+    late = fingerprinter.fingerprint(frame.iloc[200:].reset_index(drop=True), "BTCUSDT", "1h")
+    assert (early.first, early.last) == (frame["time"][0], frame["time"][299])
+    assert late.first == frame["time"][200]
+    # نافذتان مختلفتان لا تتشاركان حالة بادئة
+    assert fingerprinter.get_stats() == {"prefix_states": 2, "full": 2, "incremental": 0}
+
+    # إدراج شمعة ناقصة داخل البادئة يزيح الأوقات ويُكتشف
+    gapped = frame.drop(index=150).reset_index(drop=True)
+    fingerprinter.fingerprint(gapped.iloc[:400], "BTCUSDT", "1h")
+    filled = fingerprinter.fingerprint(frame.iloc[:450], "BTCUSDT", "1h")
+    assert filled == DataFingerprinter().fingerprint(frame.iloc[:450], "BTCUSDT", "1h")
+
+def test_config_hash_is_canonical():
+    assert config_hash({"name": "sma", "params": {"period": 20, "column": "close"}}) == \
+        config_hash({"params": {"column": "close", "period": 20}, "name": "sma"})
+    assert config_hash(SMA) != config_hash({**SMA, "params": {"period": 21}})
+
+
+def test_calculator_cache_hits_and_reports_hit_rate():
+    calculator = IndicatorCalculator()
+    frame = make_frame(300)
+
+    first = calculator.calculate_columnar(frame, [SMA])
+    # نسخة مختلفة من نفس البيانات = نفس المفتاح
+    again = calculator.calculate_columnar(frame.copy(), [SMA])
+    assert again.results["sma"] is first.results["sma"]
+
+    # نفس آخر 100 شمعة لكن بداية مختلفة: المفتاح القديم كان يتصادم هنا
+    shifted = frame.copy()
+    shifted.iloc[50, shifted.columns.get_loc("close")] = 1.0
+    other = calculator.calculate_columnar(shifted, [SMA])
+    assert other.results["sma"] is not first.results["sma"]
+
+    stats = calculator.get_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-4)
+    assert stats["entries"] == 2
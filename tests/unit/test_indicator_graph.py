@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from app.services.indicators import graph as ops
+from app.services.indicators.calculator import IndicatorCalculator
+
+CONFIGS = [
+    {"name": name, "type": "trend", "params": {}}
+    for name in (
+        "sma_slow", "bollinger_bands", "ema_21", "rsi", "rsi_1h",
+        "macd", "macd_1h", "atr", "stochastic", "volume_climax",
+    )
+]
+
+
+@pytest.fixture
+def ohlcv():
+    rng = np.random.default_rng(11)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 400)))
+    return pd.DataFrame({
+        "open": close * (1 + rng.normal(0, 0.002, 400)), "high": close * 1.01,
+        "low": close * 0.99, "close": close, "volume": rng.uniform(1, 10, 400),
+    }, index=pd.date_range("2024-01-01", periods=400, freq="h"))
+
+
+def test_primitives_are_computed_once_per_key(ohlcv):
+    graph = ops.PrimitiveGraph(ohlcv)
+    macd = ops.sub(ops.ema(ops.col("close"), 12), ops.ema(ops.col("close"), 26))
+    first = graph.get(ops.ema(macd, 9))
+    assert graph.get(ops.ema(macd, 9)) is first
+    assert graph.get(macd) is graph.get(macd)
+    # col + ema12 + ema26 + sub + ema9
+    assert graph.computed == 5
+
+    expected = ohlcv["close"].ewm(span=12, adjust=False).mean() - ohlcv["close"].ewm(span=26, adjust=False).mean()
+    pdt.assert_series_equal(graph.get(macd), expected)
+
+    high_low = ohlcv["high"] - ohlcv["low"]
+    prev_close = ohlcv["close"].shift(1)
+    tr = pd.concat([high_low, (ohlcv["high"] - prev_close).abs(), (ohlcv["low"] - prev_close).abs()], axis=1).max(axis=1)
+    pdt.assert_series_equal(graph.get(ops.true_range()), tr)
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_batch_shares_primitives_and_matches_standalone(ohlcv, parallel):
+    calculator = IndicatorCalculator()
+    batch = calculator.calculate_columnar(ohlcv, CONFIGS, use_cache=False, parallel=parallel)
+    stats = batch.primitives
+    assert stats["computed"] < stats["requests"]
+
+    # sma_slow و bollinger_bands (فترة 20) يتشاركان نفس المتوسط
+    assert np.shares_memory(batch.results["sma_slow"].values, batch.results["bollinger_bands"].values)
+    assert np.shares_memory(batch.results["macd"].values, batch.results["macd_1h"].values)
+
+    for config in CONFIGS:
+        name = config["name"]
+        _, alone = calculator._calculate_single_indicator(ohlcv, config, use_cache=False)
+        shared = batch.results[name]
+        assert shared.error is None and alone.error is None, name
+        assert calculator._clean_indicator_result(shared.to_dict()) == \
+            calculator._clean_indicator_result(alone.to_dict()), name
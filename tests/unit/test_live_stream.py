@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.core.live_stream import LiveStreamManager
+
+
+@pytest.fixture
+def manager():
+    # نسخة مستقلة عن المثيل العام (singleton)
+    instance = object.__new__(LiveStreamManager)
+    instance._initialized = False
+    instance.__init__()
+    return instance
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def ticks(symbol, prices, volume=1.0):
+    return [{"symbol": symbol, "price": p, "volume": volume} for p in prices]
+
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced_to_latest_tick_with_accumulated_volume(manager):
+    received = []
+
+    async def handler(data):
+        received.append(data)
+
+    await manager.subscribe("BTCUSDT", handler)
+    manager._ingest(ticks("BTCUSDT", [100, 105, 95, 101], volume=2.5))
+    manager._ingest(ticks("ETHUSDT", [10] * 1000))  # رمز بدون مشتركين لا يُوزّع
+
+    assert manager._drain_dirty() == 1
+    await settle()
+
+    assert len(received) == 1
+    tick = received[0]
+    assert tick["price"] == 101
+    assert tick["volume"] == 10.0
+    assert (tick["high"], tick["low"], tick["tick_count"]) == (105, 95, 4)
+    assert manager._stream_data["ETHUSDT"]["price"] == 10
+    assert manager._dirty == {}
+
+
+@pytest.mark.asyncio
+async def test_single_inflight_dispatch_per_symbol(manager):
+    release = asyncio.Event()
+    received = []
+
+    async def slow_handler(data):
+        received.append(data)
+        await release.wait()
+
+    await manager.subscribe("BTCUSDT", slow_handler)
+    manager._ingest(ticks("BTCUSDT", [1]))
+    manager._drain_dirty()
+    await settle()
+
+    # المعالج ما زال يعمل: التيكات الجديدة تبقى مدمجة ولا تُنشأ coroutines إضافية
+    for price in range(2, 2000):
+        manager._ingest(ticks("BTCUSDT", [price]))
+        assert manager._drain_dirty() == 0
+    assert len(manager._inflight) == 1
+    assert len(manager._dirty) == 1
+
+    release.set()
+    await settle()
+    assert manager._inflight == {}
+
+    assert manager._drain_dirty() == 1
+    await settle()
+    assert received[-1]["price"] == 1999
+    assert received[-1]["volume"] == 1998.0
+    assert sum(t["volume"] for t in received) == 1999.0
+
+
+@pytest.mark.asyncio
+async def test_dispatch_loop_drains_at_configured_rate(manager):
+    received = []
+
+    async def handler(data):
+        received.append(data["price"])
+
+    manager.dispatch_interval = 0.01
+    await manager.subscribe("BTCUSDT", handler)
+    task = asyncio.create_task(manager._dispatch_loop())
+    try:
+        manager._ingest(ticks("BTCUSDT", [1, 2, 3]))
+        await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+
+    assert received == [3]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.backtest.monte_carlo import path_statistics, run_monte_carlo, sample_indices
+
+PNLS = [120.0, -80.0, 45.0, -200.0, 310.0, -15.0, 60.0, -90.0, 150.0, -40.0, 25.0, -300.0]
+
+
+def test_path_statistics_on_known_sequence():
+    pnl = np.array([[100.0, -300.0, 100.0, 250.0, -50.0]])
+    stats = path_statistics(pnl, initial_capital=1000.0, ruin_level=750.0)
+
+    np.testing.assert_allclose(stats["equity"][0], [1000, 1100, 800, 900, 1150, 1100])
+    assert stats["total_return"][0] == pytest.approx(10.0)
+    assert stats["max_drawdown"][0] == pytest.approx(300 / 1100 * 100)
+    # تحت القمة 1100 لصفقتين (800, 900) ثم تحت 1150 لصفقة واحدة
+    assert stats["time_under_water"][0] == 2
+    assert not stats["ruined"][0]
+
+
+@pytest.mark.parametrize("method", ["shuffle", "bootstrap", "block_bootstrap"])
+def test_sample_indices_shape_and_range(method):
+    rng = np.random.default_rng(1)
+    indices = sample_indices(rng, 50, 7, method, block_size=3)
+    assert indices.shape == (50, 7)
+    assert indices.min() >= 0 and indices.max() < 7
+    if method == "shuffle":
+        assert (np.sort(indices, axis=1) == np.arange(7)).all()
+    if method == "block_bootstrap":
+        # داخل الكتلة الفهارس متتالية (دائرياً)
+        assert ((indices[:, 1] - indices[:, 0]) % 7 == 1).all()
+
+
+def test_shuffle_keeps_total_return_and_varies_drawdown():
+    result = run_monte_carlo(PNLS, 10000.0, simulations=2000, method="shuffle", seed=7)
+    expected = sum(PNLS) / 10000.0 * 100
+
+    assert result["min_return"] == pytest.approx(expected)
+    assert result["max_return"] == pytest.approx(expected)
+    assert result["max_drawdown"]["max"] > result["max_drawdown"]["percentile_5"]
+    assert len(result["equity_percentiles"]["50"]) == len(PNLS) + 1
+
+
+def test_chunked_run_matches_single_chunk_statistics():
+    full = run_monte_carlo(PNLS, 1000.0, simulations=20000, method="bootstrap", seed=3)
+    chunked = run_monte_carlo(PNLS, 1000.0, simulations=20000, method="bootstrap", seed=3, chunk_size=1500)
+
+    assert chunked["simulations"] == 20000
+    assert chunked["mean_return"] == pytest.approx(full["mean_return"], abs=1.0)
+    assert chunked["probability_of_ruin"] == pytest.approx(full["probability_of_ruin"], abs=0.02)
+    # خسارة كبيرة ممكنة مع السحب بالإرجاع من رأس مال صغير
+    assert 0 < full["probability_of_ruin"] < 1
+
+
+def test_seed_is_reproducible_and_unknown_method_rejected():
+    first = run_monte_carlo(PNLS, 1000.0, simulations=500, method="block_bootstrap", seed=11)
+    second = run_monte_carlo(PNLS, 1000.0, simulations=500, method="block_bootstrap", seed=11)
+    assert first == second
+
+    with pytest.raises(ValueError):
+        run_monte_carlo(PNLS, 1000.0, method="jackknife")
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from tests.unit.pattern_reference import LEGACY, calculate, make_frame
+
+PARAMS = {
+    "harmonic_patterns": [{"depth": 10}, {"depth": 1}, {"depth": 3}],
+    "supply_demand": [{"period": 20, "threshold": 2.0}, {"period": 5, "threshold": 1.2}],
+    "volume_climax": [{"period": 20, "std_mult": 2.0}, {"period": 7, "std_mult": 0.5}],
+}
+CASES = [(name, params) for name, variants in PARAMS.items() for params in variants]
+
+
+def rough_frame():
+    """قمم مسطحة (تعادل) و NaN وقيم صحيحة وفهرس غير زمني"""
+    rng = np.random.default_rng(4)
+    frame = make_frame(400).reset_index(drop=True)
+    frame["high"] = np.round(frame["high"], 0)
+    frame["low"] = np.round(frame["low"], 0)
+    frame.loc[rng.choice(400, 25, replace=False), ["high", "low", "close", "volume"]] = np.nan
+    frame["volume"] = frame["volume"].fillna(0).astype(int)
+    return frame
+
+
+@pytest.mark.parametrize("name,params", CASES)
+@pytest.mark.parametrize("frame_factory", [lambda: make_frame(1500), rough_frame])
+def test_vectorized_metadata_matches_loop(name, params, frame_factory):
+    frame = frame_factory()
+    assert calculate(name, frame, **params) == LEGACY[name](frame, **params)
+
+
+@pytest.mark.parametrize("name", list(LEGACY))
+@pytest.mark.parametrize("bars", [0, 1, 5, 20, 21])
+def test_short_histories(name, bars):
+    frame = make_frame(bars)
+    assert calculate(name, frame) == LEGACY[name](frame)
+
+
+def test_volume_climax_values_unchanged():
+    frame = make_frame(300)
+    from app.services.indicators.base import IndicatorConfig
+    from app.services.indicators.registry import IndicatorRegistry
+
+    indicator = IndicatorRegistry.create_indicator(IndicatorConfig(name="volume_climax", type="volume"))
+    result = indicator.calculate(frame)
+    points = result.metadata["climax_points"]
+    assert int(result.values.sum()) == len(points) > 0
+    assert [p["time"] for p in points] == [t.isoformat() for t in frame.index[result.values.to_numpy() == 1]]
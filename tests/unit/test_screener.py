@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.filtering.schemas import (
+    CompositeFilter, FilterCondition, FilterCriteria, FilterOperator, FilterRule, FilterType
+)
+from app.services.filtering.screener import ScreenerPanel
+from app.services.indicators.base import IndicatorConfig, IndicatorType
+from app.services.indicators.registry import IndicatorRegistry
+
+
+def make_df(n, seed, start=100.0):
+    rng = np.random.default_rng(seed)
+    close = start * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = np.abs(rng.normal(0, 0.005, n)) * close
+    return pd.DataFrame(
+        {
+            "open": close * (1 + rng.normal(0, 0.002, n)),
+            "high": close + spread,
+            "low": close - spread,
+            "close": close,
+            "volume": rng.uniform(10, 1000, n),
+        },
+        index=pd.date_range("2024-01-01", periods=n, freq="h"),
+    )
+
+
+@pytest.fixture
+def panel():
+    panel = ScreenerPanel("1h", max_bars=120, initial_capacity=2)
+    for i, symbol in enumerate(["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT"]):
+        panel.load_history(symbol, make_df(200 if i else 60, seed=i, start=10.0 ** (i % 3)))
+    return panel
+
+
+@pytest.mark.parametrize("name", ["sma", "sma_8_1h", "ema", "rsi", "macd", "bollinger_bands", "atr", "stochastic"])
+def test_kernels_match_registry_indicators(panel, name):
+    indicator_class = IndicatorRegistry.get_indicator(name)
+    values = panel.field(name)
+    for row, symbol in enumerate(panel.symbols):
+        count = panel.counts[row]
+        df = pd.DataFrame({c: panel.data[i, row, -count:] for i, c in enumerate(panel.columns())})
+        config = IndicatorConfig(name=name, type=IndicatorType.TREND, params={})
+        expected = indicator_class(config).calculate(df).values.iloc[-1]
+        assert values[row] == pytest.approx(expected, rel=1e-9, nan_ok=True), symbol
+
+
+def test_live_candles_roll_the_panel(panel):
+    class Candle:
+        def __init__(self, symbol, timeframe, open_time, close):
+            self.symbol, self.timeframe, self.open_time = symbol, timeframe, open_time
+            self.open = self.high = self.low = self.close = close
+            self.volume = 1.0
+
+    next_time = pd.Timestamp("2024-01-01") + pd.Timedelta(hours=200)
+    panel.on_candles_close([
+        Candle("BTCUSDT", "1h", next_time, 1.0),
+        Candle("NEWUSDT", "1h", next_time, 5.0),
+        Candle("ETHUSDT", "5m", next_time, 99.0),  # إطار آخر يُتجاهل
+    ])
+    # إعادة إرسال نفس الشمعة تستبدلها بدون إزاحة
+    panel.on_candles_close([Candle("BTCUSDT", "1h", next_time, 2.0)])
+
+    row = panel.symbols.index("BTCUSDT")
+    assert panel.counts[row] == 61
+    assert panel.data[3, row, -1] == 2.0
+    assert panel.symbol_count == 5
+    assert panel.field("price")[panel.symbols.index("NEWUSDT")] == 5.0
+    assert panel.data[3, panel.symbols.index("ETHUSDT"), -1] != 99.0
+
+
+def test_screen_filters_sorts_and_paginates(panel):
+    rsi = panel.field("rsi")
+    price = panel.field("price")
+
+    criteria = FilterCriteria(
+        indicator_filters={"rsi": {"min": 0, "max": 100}},
+        sort_by="price",
+        sort_order="desc",
+        limit=2,
+    )
+    assert panel.can_screen("crypto", criteria)
+    result = panel.screen(criteria)
+
+    ready = [s for i, s in enumerate(panel.symbols) if panel.counts[i] >= 20 and not np.isnan(rsi[i])]
+    expected = sorted(ready, key=lambda s: -price[panel.symbols.index(s)])
+    assert result["filtered_count"] == len(ready)
+    assert result["symbols"] == expected[:2]
+    assert result["filtered_symbols"][0]["indicators"]["rsi"] == pytest.approx(rsi[panel.symbols.index(expected[0])])
+
+    composite = FilterCriteria(
+        symbol_pattern="*USDT",
+        user_preferences={"excluded_symbols": ["SOLUSDT"]},
+        composite_filter=CompositeFilter(type="or", filters=[
+            FilterRule(name="cheap", type=FilterType.MARKET, conditions=[
+                FilterCondition(field="price", operator=FilterOperator.LESS_THAN, value=5)
+            ]),
+            FilterRule(name="expensive", type=FilterType.MARKET, conditions=[
+                FilterCondition(field="price", operator=FilterOperator.GREATER_THAN, value=50)
+            ]),
+        ]),
+    )
+    expected = {s for i, s in enumerate(panel.symbols) if s != "SOLUSDT" and (price[i] < 5 or price[i] > 50)}
+    assert set(panel.screen(composite)["symbols"]) == expected
+
+
+def test_unsupported_criteria_fall_back(panel):
+    assert not panel.can_screen("stocks", FilterCriteria())
+    assert not panel.can_screen("crypto", FilterCriteria(indicator_filters={"vwap": {"min": 1}}))
+    assert not panel.can_screen("crypto", FilterCriteria(sort_by="market_cap"))
+
+
+def test_live_only_history_is_not_screened_until_window_is_full():
+    panel = ScreenerPanel("1h", max_bars=30, initial_capacity=2)
+    panel.load_history("BTCUSDT", make_df(10, seed=0))  # تاريخ كامل أقصر من النافذة
+    df = make_df(30, seed=1)
+    for i in range(25):
+        panel.append_batch(["ETHUSDT"], [df.index[i].value], df.iloc[i].to_numpy()[:, None])
+
+    rsi = FilterCriteria(indicator_filters={"rsi": {"min": 0}})
+    change = FilterCriteria(sort_by="change_24h")
+    assert panel.can_screen("crypto", FilterCriteria(min_price=1))
+    assert panel.can_screen("crypto", change)
+    assert not panel.can_screen("crypto", rsi)
+
+    for i in range(25, 30):
+        panel.append_batch(["ETHUSDT"], [df.index[i].value], df.iloc[i].to_numpy()[:, None])
+    assert panel.can_screen("crypto", rsi)
+
+    panel.append_batch(["NEWUSDT"], [df.index[-1].value], df.iloc[-1].to_numpy()[:, None])
+    assert panel.can_screen("crypto", FilterCriteria(min_price=1))
+    assert not panel.can_screen("crypto", change)
+    assert panel.get_stats()["loaded_symbols"] == 1
@@ -0,0 +1,113 @@
+import pytest
+import pandas as pd
+import numpy as np
+
+from app.services.indicators.base import IndicatorConfig
+from app.services.indicators.registry import IndicatorRegistry
+from app.services.indicators.streaming import StreamingIndicator, create_streaming_indicator
+
+
+CONFIGS = [
+    {"name": "sma", "type": "trend", "params": {"period": 10}},
+    {"name": "ema_21", "type": "trend", "params": {}},
+    {"name": "rsi", "type": "momentum", "params": {"period": 14}},
+    {"name": "macd", "type": "momentum", "params": {}},
+    {"name": "bollinger_bands", "type": "volatility", "params": {"period": 20, "std": 2}},
+    {"name": "atr", "type": "volatility", "params": {"period": 14}},
+    {"name": "stochastic", "type": "momentum", "params": {}},
+]
+
+
+def make_candles(n=400):
+    np.random.seed(3)
+    close = 100 + np.cumsum(np.random.randn(n))
+    start = 1735689600000
+    return [
+        {
+            "time": start + i * 60000,
+            "open": float(close[i]),
+            "high": float(close[i] + abs(np.random.randn())),
+            "low": float(close[i] - abs(np.random.randn())),
+            "close": float(close[i]),
+            "volume": 1000.0,
+        }
+        for i in range(n)
+    ]
+
+
+def batch_result(config, candles):
+    df = pd.DataFrame(candles)
+    df.index = pd.to_datetime(df.pop("time"), unit="ms")
+    indicator_class = IndicatorRegistry.get_indicator(config["name"])
+    return indicator_class(IndicatorConfig(**config)).calculate(df)
+
+
+def as_float(value):
+    return np.nan if value is None else value
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=[c["name"] for c in CONFIGS])
+def test_streaming_commit_matches_batch(config):
+    candles = make_candles()
+    expected = batch_result(config, candles)
+
+    indicator = create_streaming_indicator(config)
+    assert indicator is not None
+
+    values, signals = [], []
+    for candle in candles:
+        result = indicator.commit(candle)
+        values.append(result["values"][0] if result["values"] else np.nan)
+        if result["signals"] is not None:
+            signals.append(result["signals"]["data"][0])
+
+    np.testing.assert_allclose(values, expected.values.to_numpy(dtype=float), rtol=1e-6, atol=1e-6)
+    if expected.signals is not None:
+        assert signals == expected.signals.tolist()
+
+    for key in ("macd_line", "signal_line", "upper_band", "lower_band", "d_line"):
+        if key in expected.metadata:
+            assert as_float(result["metadata"][key][0]) == pytest.approx(
+                expected.metadata[key][-1], rel=1e-6, nan_ok=True
+            )
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=[c["name"] for c in CONFIGS])
+def test_live_update_does_not_mutate_state(config):
+    candles = make_candles(120)
+    indicator = create_streaming_indicator(config)
+    indicator.warm_up(candles[:-1])
+
+    live = dict(candles[-1])
+    for price in (live["close"] - 3, live["close"] + 3):
+        indicator.update({**live, "close": price, "high": max(live["high"], price), "low": min(live["low"], price)})
+
+    expected = batch_result(config, candles)
+    assert indicator.update(live)["values"][0] == pytest.approx(expected.values.iloc[-1], rel=1e-6)
+    assert indicator.commit(live)["values"][0] == pytest.approx(expected.values.iloc[-1], rel=1e-6)
+
+
+def test_unsupported_indicator_returns_none():
+    assert create_streaming_indicator({"name": "vwap", "type": "volume", "params": {}}) is None
+    assert create_streaming_indicator({"name": "unknown_indicator", "type": "trend"}) is None
+
+
+@pytest.mark.parametrize("config", CONFIGS, ids=[c["name"] for c in CONFIGS])
+def test_state_round_trip_through_json(config):
+    import json
+
+    candles = make_candles(150)
+    indicator = create_streaming_indicator(config)
+    indicator.warm_up(candles[:100])
+
+    state = json.loads(json.dumps(indicator.to_state()))
+    restored = StreamingIndicator.from_state(config, state)
+    assert restored is not None and restored is not indicator
+
+    for candle in candles[100:]:
+        assert restored.commit(candle)["values"] == pytest.approx(indicator.commit(candle)["values"])
+
+
+def test_mismatched_state_is_discarded():
+    sma = create_streaming_indicator(CONFIGS[0])
+    assert StreamingIndicator.from_state(CONFIGS[2], sma.to_state()) is None
@@ -0,0 +1,54 @@
+import numpy as np
+from datetime import datetime, timedelta
+
+from app.markets.candle_builder import CandleBuilder
+from app.markets.tick_aggregator import BatchCandleAggregator, DEFAULT_TIMEFRAMES
+
+
+def make_batches(n_batches=40, n_symbols=30):
+    rng = np.random.default_rng(5)
+    start = datetime(2025, 1, 1, 0, 58)
+    batches = []
+    for b in range(n_batches):
+        # بعض الرموز تتكرر وبعضها يغيب عن الدفعة
+        symbols = [f"S{i}USDT" for i in rng.integers(0, n_symbols, size=n_symbols)]
+        prices = 100 + rng.standard_normal(len(symbols))
+        volumes = rng.random(len(symbols)) * 10
+        batches.append((symbols, prices, volumes, start + timedelta(seconds=20 * b)))
+    return batches
+
+
+def candle_key(c):
+    return (c.symbol, c.timeframe, c.open_time, c.close_time, c.open, c.high, c.low, c.close, round(c.volume, 9))
+
+
+def test_batch_matches_per_tick_builder():
+    builder = CandleBuilder()
+    expected = []
+    builder.on_candle_close(expected.append)
+
+    aggregator = BatchCandleAggregator(DEFAULT_TIMEFRAMES, initial_capacity=4)
+    actual = []
+    aggregator.on_candles_close(actual.extend)
+
+    for symbols, prices, volumes, timestamp in make_batches():
+        for symbol, price, volume in zip(symbols, prices, volumes):
+            for timeframe in DEFAULT_TIMEFRAMES:
+                builder.process_tick(
+                    symbol=symbol, timeframe=timeframe,
+                    price=float(price), volume=float(volume), timestamp=timestamp
+                )
+        aggregator.process_batch(symbols, prices, volumes, timestamp)
+
+    assert len(expected) > 0
+    assert sorted(map(candle_key, actual)) == sorted(map(candle_key, expected))
+
+    for key, candle in builder._candles.items():
+        live = aggregator.current_candle(candle.symbol, candle.timeframe)
+        assert candle_key(live) == candle_key(candle)
+
+
+def test_empty_batch_and_unknown_symbol():
+    aggregator = BatchCandleAggregator()
+    assert aggregator.process_batch([], np.array([]), np.array([]), datetime(2025, 1, 1)) == []
+    assert aggregator.current_candle("BTCUSDT", "1m") is None
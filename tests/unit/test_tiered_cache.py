@@ -0,0 +1,123 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.database.cache import LocalLRU, TieredCache, decode_value, encode_value
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.gets = 0
+        self.fail = False
+
+    async def get(self, key):
+        self.gets += 1
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def remote():
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(remote):
+    async def get_remote():
+        return remote
+
+    return TieredCache(get_remote, LocalLRU(1 << 20), local_max_ttl=60, ttl_jitter=0.5)
+
+
+def test_codec_round_trips_frames_arrays_and_legacy_json():
+    df = pd.DataFrame(
+        {"close": [1.5, 2.5], "volume": np.array([1, 2], dtype=np.int32)},
+        index=pd.DatetimeIndex(["2024-01-01", "2024-01-02"], tz="UTC", name="time"),
+    )
+    restored = decode_value(encode_value(df))
+    pd.testing.assert_frame_equal(restored, df)
+
+    array = np.arange(6, dtype=np.float32).reshape(2, 3)
+    assert np.array_equal(decode_value(encode_value(array)), array)
+    assert decode_value(encode_value({"a": [1, None]})) == {"a": [1, None]}
+    # قيم مكتوبة بالعميل القديم (JSON نصي)
+    assert decode_value(b'[{"close": 1}]') == [{"close": 1}]
+
+
+def test_local_lru_is_bounded_by_bytes():
+    lru = LocalLRU(max_bytes=100)
+    lru.set("a", b"x" * 40, ttl=60)
+    lru.set("b", b"x" * 40, ttl=60)
+    lru.get("a")
+    lru.set("c", b"x" * 40, ttl=60)
+    assert "a" in lru and "c" in lru and "b" not in lru
+    assert lru.size_bytes == 80 and lru.evictions == 1
+    lru.set("expired", b"x", ttl=-1)
+    assert lru.get("expired") is None
+
+
+@pytest.mark.asyncio
+async def test_local_tier_serves_repeat_reads(cache, remote):
+    df = pd.DataFrame({"close": [1.0, 2.0]})
+    await cache.set("historical:BTC", df, ttl=100)
+    assert 100 <= remote.ttls["historical:BTC"] <= 150  # TTL مع تذبذب
+
+    first = await cache.get("historical:BTC")
+    first["close"] = 0.0  # تعديل النسخة لا يفسد الكاش
+    pd.testing.assert_frame_equal(await cache.get("historical:BTC"), df)
+    assert remote.gets == 0
+
+    # نسخة أخرى (LRU فارغ) تقرأ من Redis ثم محلياً
+    cache.local.clear()
+    await cache.get("historical:BTC")
+    await cache.get("historical:BTC")
+    stats = cache.get_stats()["namespaces"]["historical"]
+    assert (stats["local_hits"], stats["remote_hits"], remote.gets) == (3, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_single_flight(cache):
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return pd.DataFrame({"close": [float(calls)]})
+
+    results = await asyncio.gather(*(cache.get_or_set("historical:ETH", load, 60) for _ in range(10)))
+    assert calls == 1
+    assert all(r["close"].tolist() == [1.0] for r in results)
+    assert len({id(r) for r in results}) == 10
+    assert cache.get_stats()["namespaces"]["historical"]["coalesced"] == 9
+
+    # النتائج الفارغة لا تُخزن
+    async def empty():
+        return []
+
+    await cache.get_or_set("symbols:none", empty)
+    assert await cache.get("symbols:none") is None
+
+
+@pytest.mark.asyncio
+async def test_remote_failure_falls_back_to_local(cache, remote):
+    remote.fail = True
+    await cache.set("price:BTC", {"price": 1.0}, ttl=10)
+    assert await cache.get("price:BTC") == {"price": 1.0}
+    stats = cache.get_stats()
+    assert stats["remote_available"] is False
+    assert stats["namespaces"]["price"]["errors"] == 1
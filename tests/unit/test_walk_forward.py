@@ -0,0 +1,205 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app.services.strategy.core as strategy_core
+from app.backtest.engine import BacktestEngine
+from app.backtest.executor import SymbolExecutor
+from app.backtest.schemas import BacktestConfig
+from app.backtest.walk_forward import (
+    WalkForwardOptimizer,
+    apply_parameters,
+    parameter_sets,
+    parameter_stability,
+    split_windows,
+)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+STRATEGY = {
+    "name": "walk_forward",
+    "position_side": "both",
+    "indicators": [
+        {"name": "sma", "type": "trend", "params": {"period": 10}},
+        {"name": "rsi", "type": "momentum", "params": {"period": 14}},
+    ],
+    "entry_rules": [
+        {
+            "name": "cross_up",
+            "condition": {
+                "type": "and",
+                "conditions": [
+                    {"type": "price_crossover", "operator": "cross_above",
+                     "left_value": "price.close", "right_value": "indicator:sma"},
+                    {"type": "indicator_value", "operator": "<",
+                     "left_value": "indicator:rsi", "right_value": 70},
+                ],
+            },
+            "position_side": "long",
+            "weight": 0.5,
+        },
+        {
+            "name": "cross_down",
+            "condition": {"type": "price_crossover", "operator": "cross_below",
+                          "left_value": "price.close", "right_value": "indicator:sma"},
+            "position_side": "short",
+            "weight": 0.5,
+        },
+    ],
+}
+
+SPACE = {
+    "indicators.0.params.period": [10, 20],
+    "entry_rules.0.condition.conditions.1.right_value": [50, 60, 70],
+}
+
+
+def make_candles(seed: int, bars: int = 1500) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.standard_normal(bars))
+    index = pd.date_range(START, periods=bars, freq="1h")
+    return pd.DataFrame({
+        "open": close, "high": close + 0.5, "low": close - 0.5,
+        "close": close, "volume": rng.integers(1000, 10000, bars).astype(float)
+    }, index=index)
+
+
+class FakeDataService:
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = 0
+
+    async def get_historical(self, symbol, **kwargs):
+        self.calls += 1
+        return self.frames[symbol].copy()
+
+
+def make_config(symbols=("AAA",)):
+    return BacktestConfig(
+        name="wf", start_date=START, end_date=END, timeframe="1h",
+        symbols=list(symbols), strategy_config=STRATEGY
+    )
+
+
+def test_parameter_sets_grid_and_random():
+    grid = parameter_sets(SPACE)
+    assert len(grid) == 6
+    assert grid[0] == {"indicators.0.params.period": 10, "entry_rules.0.condition.conditions.1.right_value": 50}
+
+    random_sets = parameter_sets(SPACE, search="random", max_combinations=4, seed=1)
+    assert len(random_sets) == 4
+    assert all(params in grid for params in random_sets)
+    assert len({tuple(p.values()) for p in random_sets}) == 4
+    assert random_sets == parameter_sets(SPACE, search="random", max_combinations=4, seed=1)
+
+
+def test_apply_parameters_does_not_mutate_base_config():
+    updated = apply_parameters(STRATEGY, {"indicators.0.params.period": 30})
+    assert updated["indicators"][0]["params"]["period"] == 30
+    assert STRATEGY["indicators"][0]["params"]["period"] == 10
+
+    with pytest.raises(ValueError):
+        apply_parameters(STRATEGY, {"indicators.9.params.period": 30})
+
+
+def test_split_windows_rolling_and_anchored():
+    rolling = split_windows(START, END, periods=3)
+    anchored = split_windows(START, END, periods=3, anchored=True)
+
+    assert len(rolling) == 3
+    assert rolling[0]["in_sample_end"] == rolling[0]["out_of_sample_start"]
+    assert rolling[1]["in_sample_start"] == rolling[0]["out_of_sample_start"]
+    assert rolling[-1]["out_of_sample_end"] == END
+    assert all(window["in_sample_start"] == START for window in anchored)
+
+
+def test_parameter_stability_summary():
+    stability = parameter_stability(
+        {"period": [10, 20]},
+        [{"period": 10}, {"period": 10}, None, {"period": 20}]
+    )["period"]
+
+    assert stability["values"] == [10, 10, 20]
+    assert stability["distinct"] == 2
+    assert stability["most_common"] == 10
+    assert stability["most_common_ratio"] == pytest.approx(2 / 3)
+    assert stability["mean"] == pytest.approx(40 / 3)
+
+
+@pytest.mark.asyncio
+async def test_optimizer_loads_once_and_reuses_indicators(monkeypatch):
+    calls = []
+    original = strategy_core.apply_indicators_columnar
+
+    def counting_apply_indicators(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(strategy_core, "apply_indicators_columnar", counting_apply_indicators)
+
+    data_service = FakeDataService({"AAA": make_candles(0)})
+    optimizer = WalkForwardOptimizer(BacktestEngine(data_service), SymbolExecutor(max_workers=1))
+    report = await optimizer.run(make_config(), SPACE, periods=3)
+
+    assert data_service.calls == 1
+    assert report["parameter_sets"] == 6
+    assert len(report["periods"]) == 3
+    # مجموعتا مؤشرات (period=10/20) لكل نافذة داخل العينة + تقييم واحد خارج العينة
+    assert len(calls) == 3 * 2 + 3
+
+    for period in report["periods"]:
+        assert period["best_params"] in parameter_sets(SPACE)
+        assert period["out_of_sample_metrics"]["total_trades"] > 0
+    assert set(report["parameter_stability"]) == set(SPACE)
+
+
+@pytest.mark.asyncio
+async def test_process_pool_report_matches_inline():
+    frames = {"AAA": make_candles(0), "BBB": make_candles(1)}
+    config = make_config(["AAA", "BBB"])
+
+    inline = await WalkForwardOptimizer(
+        BacktestEngine(FakeDataService(frames)), SymbolExecutor(max_workers=1)
+    ).run(config, SPACE, periods=2)
+
+    executor = SymbolExecutor(max_workers=2)
+    try:
+        pooled = await WalkForwardOptimizer(
+            BacktestEngine(FakeDataService(frames)), executor
+        ).run(config, SPACE, periods=2)
+    finally:
+        executor.shutdown()
+
+    assert pooled["periods"] == inline["periods"]
+    assert pooled["summary"] == inline["summary"]
+
+
+@pytest.mark.asyncio
+async def test_ties_resolve_in_original_search_order(monkeypatch):
+    import app.backtest.walk_forward as walk_forward
+
+    space = {
+        "entry_rules.0.condition.conditions.1.right_value": [101, 102],
+        "indicators.1.params.period": [14, 7],
+    }
+    grid = parameter_sets(space)
+    # التجميع حسب المؤشرات يضع (102, 14) قبل (101, 7) رغم أن ترتيب الشبكة عكس ذلك
+    tied = [grid[1], grid[2]]
+    original = walk_forward.score_parameter_sets
+
+    async def tied_scores(frames, config, param_sets):
+        results = await original(frames, config, param_sets)
+        for entry in results:
+            entry["metrics"]["total_return"] = 1.0 if entry["params"] in tied else 0.0
+        return results
+
+    monkeypatch.setattr(walk_forward, "score_parameter_sets", tied_scores)
+    optimizer = WalkForwardOptimizer(
+        BacktestEngine(FakeDataService({"AAA": make_candles(0)})), SymbolExecutor(max_workers=1)
+    )
+    report = await optimizer.run(make_config(), space, periods=2, objective="total_return", min_trades=0)
+
+    assert [period["best_params"] for period in report["periods"]] == [grid[1], grid[1]]
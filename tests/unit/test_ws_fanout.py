@@ -0,0 +1,158 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+import app.websocket.fanout as fanout_module
+from app.websocket.fanout import FanoutBroadcaster, encode_message
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.sent = []
+        self.closed = False
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("connection reset")
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        await self.send_text(data)
+
+    def messages(self):
+        return [json.loads(text) for text in self.sent]
+
+
+async def drain():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_message_encoded_once_for_all_subscribers(monkeypatch):
+    calls = []
+    original = fanout_module.encode_message
+    monkeypatch.setattr(fanout_module, "encode_message", lambda m, *wire: calls.append(m) or original(m, *wire))
+
+    broadcaster = FanoutBroadcaster(max_queue=10)
+    sockets = {f"c{i}": FakeWebSocket() for i in range(5)}
+    for key, ws in sockets.items():
+        broadcaster.register(key, ws)
+
+    queued = broadcaster.publish(list(sockets), {"type": "candle_close", "close": np.float64(1.5)})
+    await drain()
+
+    assert queued == 5 and len(calls) == 1
+    texts = {ws.sent[0] for ws in sockets.values()}
+    assert len(texts) == 1
+    assert json.loads(texts.pop())["close"] == 1.5
+
+    for key in sockets:
+        await broadcaster.unregister(key)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_coalesces_price_updates_but_keeps_candle_close():
+    broadcaster = FanoutBroadcaster(max_queue=4)
+    fast, slow = FakeWebSocket(), FakeWebSocket()
+    slow.gate.clear()  # العميل البطيء لا يستهلك شيئاً حتى نفتح البوابة
+    broadcaster.register("fast", fast)
+    broadcaster.register("slow", slow)
+
+    for i in range(50):
+        broadcaster.publish(["fast", "slow"], {"type": "price_update", "seq": i})
+        if i in (10, 30):
+            broadcaster.publish(["fast", "slow"], {"type": "candle_close", "seq": i})
+        await asyncio.sleep(0)
+
+    # البث لم يتوقف بسبب العميل البطيء
+    await drain()
+    assert fast.messages()[-1] == {"type": "price_update", "seq": 49}
+    assert slow.sent == []
+    assert [m["seq"] for m in fast.messages() if m["type"] == "candle_close"] == [10, 30]
+
+    slow.gate.set()
+    await drain()
+    received = slow.messages()
+    closes = [m["seq"] for m in received if m["type"] == "candle_close"]
+    prices = [m["seq"] for m in received if m["type"] == "price_update"]
+
+    assert closes == [10, 30]
+    assert prices == sorted(prices) and prices[-1] == 49
+    assert len(received) < 52
+
+    await broadcaster.unregister("fast")
+    await broadcaster.unregister("slow")
+
+
+@pytest.mark.asyncio
+async def test_overflow_of_critical_messages_closes_connection():
+    closed = []
+
+    async def on_close():
+        closed.append(True)
+
+    broadcaster = FanoutBroadcaster(max_queue=2)
+    slow = FakeWebSocket()
+    slow.gate.clear()
+    broadcaster.register("slow", slow, on_close=on_close)
+
+    for i in range(4):
+        broadcaster.publish(["slow"], {"type": "candle_close", "seq": i})
+    await drain()
+
+    assert closed == [True]
+    assert "slow" not in broadcaster.senders
+    assert broadcaster.publish(["slow"], {"type": "candle_close"}) == 0
+
+
+@pytest.mark.asyncio
+async def test_send_error_unregisters_connection():
+    closed = []
+
+    async def on_close():
+        closed.append(True)
+
+    broadcaster = FanoutBroadcaster(max_queue=5)
+    broadcaster.register("bad", FakeWebSocket(fail=True), on_close=on_close)
+    broadcaster.publish(["bad"], {"type": "price_update"})
+    await drain()
+
+    assert closed == [True]
+    assert broadcaster.senders == {}
+
+
+def test_encode_message_handles_numpy_and_passthrough_text():
+    assert encode_message('{"a":1}') == '{"a":1}'
+    assert json.loads(encode_message({"v": np.array([1, 2]), "n": np.int64(3)})) == {"v": [1, 2], "n": 3}
+
+
+@pytest.mark.asyncio
+async def test_mixed_wire_formats_encode_once_per_format(monkeypatch):
+    calls = []
+    original = fanout_module.encode_message
+    monkeypatch.setattr(fanout_module, "encode_message", lambda m, *wire: calls.append(wire) or original(m, *wire))
+
+    broadcaster = FanoutBroadcaster(max_queue=10)
+    sockets = {"j1": FakeWebSocket(), "j2": FakeWebSocket(), "m1": FakeWebSocket(), "m2": FakeWebSocket()}
+    for key, ws in sockets.items():
+        broadcaster.register(key, ws, wire_format="msgpack" if key.startswith("m") else "json")
+
+    broadcaster.publish(list(sockets), {"type": "price_update", "live_candle": {"close": 1.0}, "indicators": {}})
+    await drain()
+
+    assert len(calls) == 2
+    assert isinstance(sockets["j1"].sent[0], str)
+    assert isinstance(sockets["m1"].sent[0], bytes)
+    assert sockets["m1"].sent[0] == sockets["m2"].sent[0]
+
+    for key in sockets:
+        await broadcaster.unregister(key)